@@ -0,0 +1,16 @@
+"""Throughput benchmarks for the parts of a sweep that are not the solver.
+
+Run from the repository root:
+
+    python -m benchmarks                      # every scenario at every size
+    python -m benchmarks --quick              # the smallest size of each, as a smoke check
+    python -m benchmarks -k parse             # scenarios whose name contains 'parse'
+    python -m benchmarks compare A.json B.json
+
+Each run writes its timings, with the commit they were taken at, to .benchmarks/<commit>.json; two
+such files compared say which scenarios got slower between the commits. The inputs are generated
+from a fixed seed by benchmarks.synthetic, so both sides of a comparison time the same work.
+
+The suite lives outside tests/ so that pytest does not collect it: a full pass takes minutes, and a
+timing is only worth comparing against one taken on the same machine.
+"""
@@ -0,0 +1,10 @@
+import sys
+from pathlib import Path
+
+# The suite imports core, omphalos and coeus as top-level packages, as the tests do, and its
+# scenarios change directory, so the repository root has to be on the path by its full name.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.harness import main  # noqa: E402
+
+sys.exit(main())
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""A stand-in for the CrunchTope executable, for exercising a sweep where no build is installed.
+
+Point crunch_dir at this file and omphalos and rhea run their whole pipeline against it: the fake
+reads the deck it is given, prints the per-step progress lines stall detection reads, writes the
+TecPlot snapshots the deck's OUTPUT block asks for, a .out log, any time series the deck names and,
+where the RUNTIME block asks for one, a restart file. The values in them are random; their shapes
+are the deck's.
+
+It costs what it is told to, so orchestration can be timed against a known solver cost, and fails
+how it is told to, so every failure path can be reached on purpose:
+
+    cost       Seconds per snapshot. Default 0.
+    mode       'sleep' (the default) waits the cost out; 'burn' spins a core for it.
+    steps      Progress lines printed per snapshot. Default 5.
+    fail       One of FAILURES: how the run goes wrong.
+    fail_at    Fraction of the snapshots written before it does. Default 0.5.
+    failures   Per-run chances, as 'name:probability,...', e.g. 'TRY A:0.05,hang:0.01'. Which runs
+               fail is decided from the seed and the run directory's name, so is the same every time.
+    seed       Default 0.
+    restart    'true' to write a restart file even when the deck does not ask for one.
+
+Each is read from the environment as FAKE_CRUNCHTOPE_<NAME>, which is what a sweep sets, and is
+overridden by a comment line in the deck itself, which is what a test writes:
+
+    ! fake_crunchtope fail=divide by zero fail_at=0.2
+
+Everything after the first '=' is the value, so names with spaces need no quoting; several settings
+on one line are split at the words that name a setting.
+
+Deliberately standalone but for numpy and benchmarks.synthetic: it has to run from crunch_dir under
+an interpreter that may have nothing of Omphalos's installed but those.
+"""
+
+import os
+import random
+import re
+import signal
+import struct
+import sys
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.synthetic import tecplot_text  # noqa: E402
+
+# What each failure prints, matching the entry of omphalos.run.CT_ERROR_PATTERNS it is named for,
+# and whether CrunchTope then waits on stdin rather than exiting.
+FAILURES = {
+    'Cannot find input file': (' Cannot find input file', True),
+    'Return to continue': (' Hindmarsh solver unavailable in 2D: switching to PETSc\n'
+                           ' Return to continue', True),
+    'location for pressure': (' No Y location for pressure specified in zone', False),
+    'location for timeseries must be specified':
+        (' Y location for timeseries must be specified', False),
+    'species missing in reaction': (' Calcite: species missing in reaction', True),
+    'EXCEEDED MAXIMUM ITERATIONS': (' EXCEEDED MAXIMUM ITERATIONS IN NEWTON', False),
+    'TRY A': (' TRY A SMALLER TIMESTEP', False),
+    'divide by zero': (' floating point exception: divide by zero', False),
+    'NaN': (' Residual =  NaN ', False),
+    'forrtl:': ('forrtl: severe (174): SIGSEGV, segmentation fault occurred', False),
+    'Segmentation fault': ('Segmentation fault (core dumped)', False),
+    'Killed': ('Killed', False),
+    'FATAL': (' FATAL: negative concentration', False),
+}
+
+# Failures CT_ERROR_PATTERNS does not see, and has to catch otherwise:
+#   hang   stops printing and never exits: the timeout.
+#   stall  keeps printing, with a timestep that collapses: stall detection.
+#   crash  dies of SIGSEGV without a word: EOF, with whatever output was written by then.
+SILENT_FAILURES = ('hang', 'stall', 'crash')
+
+DEFAULTS = {'cost': '0', 'mode': 'sleep', 'steps': '5', 'fail': '', 'fail_at': '0.5',
+            'failures': '', 'seed': '0', 'restart': ''}
+
+ENVIRONMENT_PREFIX = 'FAKE_CRUNCHTOPE_'
+DIRECTIVE = re.compile(r'!\s*fake_crunchtope\b(.*)')
+
+# What is written per snapshot, and which of the deck's names each category has a column for.
+CATEGORIES = {'totcon': 'species', 'conc': 'species', 'volume': 'minerals'}
+
+# Fortran unformatted sequential records, as omphalos/restart_file.py reads them.
+MARKER = struct.Struct('<i')
+
+
+def read_deck(path):
+    """The deck's blocks, as block name to its entry lines split into words.
+
+    Comments are dropped, and lines continued with a trailing '&' are joined, as CrunchTope reads
+    them.
+    """
+    blocks = {}
+    current = None
+    pending = []
+
+    for raw in Path(path).read_text().splitlines():
+        line = raw.split('!', 1)[0].rstrip()
+        if line.endswith('&'):
+            pending.append(line[:-1])
+            continue
+        line = ' '.join(pending + [line]).strip()
+        pending = []
+        if not line:
+            continue
+
+        words = line.split()
+        if current is None:
+            current = words[0].upper() if words[0].lower() != 'condition' else None
+            if current is not None:
+                blocks.setdefault(current, [])
+            else:
+                current = '_condition'
+        elif words[0].upper() == 'END':
+            current = None
+        elif current != '_condition':
+            blocks[current].append(words)
+
+    return blocks
+
+
+def settings(deck_path, environ=None):
+    """The fake's settings: DEFAULTS, then the environment, then the deck's directives."""
+    environ = os.environ if environ is None else environ
+    found = dict(DEFAULTS)
+    for name in DEFAULTS:
+        value = environ.get(f'{ENVIRONMENT_PREFIX}{name.upper()}')
+        if value is not None:
+            found[name] = value
+
+    names = '|'.join(DEFAULTS)
+    for line in Path(deck_path).read_text().splitlines():
+        match = DIRECTIVE.search(line)
+        if not match:
+            continue
+        for name, value in re.findall(rf'\b({names})=(.*?)(?=\s+\b(?:{names})=|$)',
+                                      match.group(1).strip()):
+            found[name] = value.strip()
+
+    return found
+
+
+def entries(block, keyword):
+    return [words[1:] for words in block if words[0].lower() == keyword]
+
+
+def grid(blocks):
+    """The (nx, ny, nz) cell counts the DISCRETIZATION block declares."""
+    block = blocks.get('DISCRETIZATION', [])
+    shape = []
+    for axis in ('xzones', 'yzones', 'zzones'):
+        counts = [int(float(words[index])) for words in entries(block, axis)
+                  for index in range(0, len(words) - 1, 2)]
+        shape.append(sum(counts) or 1)
+
+    return tuple(shape)
+
+
+def snapshot_times(blocks):
+    output = blocks.get('OUTPUT', [])
+    times = entries(output, 'spatial_profile') or entries(output, 'spatial_profile_at_time')
+
+    return [float(value) for words in times for value in words]
+
+
+def time_units(blocks):
+    for block in ('OUTPUT', 'RUNTIME'):
+        for words in entries(blocks.get(block, []), 'time_units'):
+            if words:
+                return words[0]
+
+    return 'years'
+
+
+def choose_failure(found, run_name):
+    """The failure this run suffers, or ''.
+
+    'fail' names one outright. Otherwise each of 'failures' is drawn for in turn, from a generator
+    seeded by the seed and the run's name, so a sweep fails the same runs every time it is run.
+    """
+    if found['fail']:
+        return found['fail']
+
+    draw = random.Random(f'{found["seed"]}:{run_name}')
+    for item in filter(None, found['failures'].split(',')):
+        name, _, chance = item.rpartition(':')
+        if draw.random() < float(chance):
+            return name.strip()
+
+    return ''
+
+
+def spend(seconds, mode):
+    """Take seconds of wall time, asleep or busy."""
+    if seconds <= 0:
+        return
+    if mode == 'burn':
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            pass
+    else:
+        time.sleep(seconds)
+
+
+def fail(failure, write):
+    """Go wrong as failure says. Does not return."""
+    if failure == 'hang':
+        while True:
+            time.sleep(3600)
+    if failure == 'crash':
+        sys.stdout.flush()
+        os.kill(os.getpid(), signal.SIGSEGV)
+    message, waits = FAILURES[failure]
+    write(message)
+    if waits:
+        sys.stdin.readline()
+    sys.exit(1)
+
+
+def write_restart(path, time_value, columns, shape, rng):
+    """A restart file of the record structure CrunchTope writes: the time, then a field per species."""
+    cells = int(np.prod(shape))
+    payloads = [struct.pack('<d', time_value)]
+    payloads += [rng.lognormal(-8, 2, cells).astype('<f8').tobytes() for _ in columns]
+
+    with Path(path).open('wb') as file:
+        for payload in payloads:
+            file.write(MARKER.pack(len(payload)))
+            file.write(payload)
+            file.write(MARKER.pack(len(payload)))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or not Path(argv[0]).exists():
+        print(' Cannot find input file', flush=True)
+        sys.stdin.readline()
+        return 1
+
+    deck = Path(argv[0])
+    blocks = read_deck(deck)
+    found = settings(deck)
+    run_name = Path.cwd().name
+    rng = np.random.default_rng(zlib.crc32(f'{found["seed"]}:{run_name}'.encode()))
+    log = open(deck.with_suffix('.out'), 'w')
+
+    def write(text):
+        print(text, flush=True)
+        log.write(text + '\n')
+
+    failure = choose_failure(found, run_name)
+    if failure and failure not in FAILURES and failure not in SILENT_FAILURES:
+        write(f' fake_crunchtope: unknown failure {failure!r}; known are '
+              f'{sorted(FAILURES) + list(SILENT_FAILURES)}')
+        return 2
+
+    shape = grid(blocks)
+    species = [words[0] for words in blocks.get('PRIMARY_SPECIES', [])]
+    minerals = [words[0] for words in blocks.get('MINERALS', [])]
+    columns = {'species': species, 'minerals': minerals}
+    times = snapshot_times(blocks)
+    units = time_units(blocks)
+    label = {'years': 'yrs', 'days': 'dys', 'hours': 'hrs'}.get(units, units)
+    steps = max(int(found['steps']), 1)
+    cost = float(found['cost'])
+    fail_after = int(len(times) * float(found['fail_at'])) if failure else None
+    series = (entries(blocks.get('OUTPUT', []), 'time_series')
+              + entries(blocks.get('OUTPUT', []), 'time_series_at_node'))
+
+    write(f' fake_crunchtope: {deck.name}, {shape[0]}x{shape[1]}x{shape[2]} cells, '
+          f'{len(species)} species, {len(times)} snapshots')
+
+    now = 0.0
+    series_rows = []
+    for snapshot, target in enumerate(times, start=1):
+        if fail_after is not None and snapshot > fail_after:
+            if failure == 'stall':
+                delt = (target - now) / steps
+                while True:
+                    delt /= 10
+                    now += delt
+                    write(f' Time ({label}) = {now:12.5E}  Delt ({label}) = {delt:12.5E}')
+                    time.sleep(0.05)
+            fail(failure, write)
+
+        delt = (target - now) / steps
+        for _ in range(steps):
+            spend(cost / steps, found['mode'])
+            now += delt
+            write(f' Time ({label}) = {now:12.5E}  Delt ({label}) = {delt:12.5E}')
+            series_rows.append([now, *rng.lognormal(-8, 2, len(species))])
+
+        for category, kind in CATEGORIES.items():
+            if columns[kind]:
+                (Path.cwd() / f'{category}{snapshot}.tec').write_text(
+                    tecplot_text(columns[kind], shape, rng, title=category))
+        write(f' Writing out spatial profile {snapshot} at time {target:g} {units}')
+
+    if fail_after is not None:
+        fail(failure, write)
+
+    for words in series:
+        with open(words[0], 'w') as file:
+            file.write(f'# Time series at grid cell: {" ".join(words[1:]) or "1"}\n')
+            file.write('VARIABLES = "Time" ' + ' '.join(f'"{name}"' for name in species) + '\n')
+            for row in series_rows:
+                file.write(' '.join(f'{value:17.8E}' for value in row) + '\n')
+
+    restarts = [words[0] for words in entries(blocks.get('RUNTIME', []), 'save_restart') if words]
+    if not restarts and found['restart'].lower() in ('true', 'yes', '1'):
+        restarts = [deck.with_suffix('.rst').name]
+    for name in restarts:
+        write_restart(name, now, species, shape, rng)
+
+    write(' Execution complete')
+    log.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
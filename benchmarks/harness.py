@@ -0,0 +1,242 @@
+"""Time the scenarios, record the timings against the commit, and compare two records.
+
+Each scenario at each size is set up once, called once untimed to warm whatever caches it fills, and
+then timed `repeats` times or until `budget` seconds have gone on it, whichever comes first -- but
+always at least once, so the 10000-run compile is timed even though one call of it blows the
+budget. The minimum is what is compared: on a quiet machine it is the closest to the cost of the
+code itself, where the mean also carries whatever else the machine was doing.
+
+What the scenarios print -- and most of this code prints as it goes -- is swallowed, and is timed as
+part of the work, since a real sweep pays for it too.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.scenarios import SCENARIOS
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Where a run's record is written unless told otherwise. Ignored by git: timings belong to the
+# machine they were taken on.
+RESULTS_DIR = REPO_ROOT / '.benchmarks'
+
+DEFAULT_REPEATS = 5
+DEFAULT_BUDGET = 30.0
+DEFAULT_SEED = 0
+
+# A scenario this much slower than before is reported as a regression by compare.
+DEFAULT_THRESHOLD = 0.10
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=REPO_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """What a timing depends on besides the code: the commit, the interpreter, the libraries."""
+    import numpy
+    import pandas
+    import xarray
+
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'xarray': xarray.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def measure(work, repeats=DEFAULT_REPEATS, budget=DEFAULT_BUDGET, clock=time.perf_counter):
+    """Time work() repeatedly.
+
+    Returns:
+        A dict of the individual times and their minimum, median and mean, in seconds.
+    """
+    work()
+
+    times = []
+    spent = 0.0
+    while len(times) < repeats and (not times or spent < budget):
+        started = clock()
+        work()
+        times.append(clock() - started)
+        spent += times[-1]
+
+    return {'min': min(times), 'median': statistics.median(times),
+            'mean': statistics.fmean(times), 'repeats': len(times), 'times': times}
+
+
+def select(pattern=None, quick=False, sizes=None):
+    """The (scenario, size) pairs a run times.
+
+    Args:
+        pattern: Only scenarios whose name contains this.
+        quick: Only the smallest size of each.
+        sizes: Only these sizes, where a scenario has them.
+    """
+    chosen = []
+    for name, entry in SCENARIOS.items():
+        if pattern and pattern not in name:
+            continue
+        entry_sizes = entry.sizes[:1] if quick else entry.sizes
+        if sizes:
+            entry_sizes = [size for size in entry_sizes if size in sizes]
+        chosen += [(entry, size) for size in entry_sizes]
+
+    return chosen
+
+
+def run(chosen, repeats=DEFAULT_REPEATS, budget=DEFAULT_BUDGET, seed=DEFAULT_SEED, report=print):
+    """Time each (scenario, size) pair, each in a scratch directory of its own.
+
+    Returns:
+        The record: the environment, the settings, and the timings under results[name][size].
+    """
+    record = {**environment(), 'seed': seed, 'repeats': repeats, 'budget': budget, 'results': {}}
+
+    cwd = os.getcwd()
+    for entry, size in chosen:
+        with tempfile.TemporaryDirectory(prefix='omphalos_bench_') as directory:
+            # Some of what is timed writes to the working directory: results.nc, for one.
+            os.chdir(directory)
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    work = entry.setup(size, Path(directory), seed)
+                    timing = measure(work, repeats, budget)
+            except ImportError as error:
+                # A scenario that needs what this machine lacks -- omphalos/settings.py, say -- is
+                # left out of the record, so a comparison does not read its absence as a change.
+                report(f'{entry.name:<24} {entry.axis:>8} {size:>6}  skipped: {error}')
+                continue
+            finally:
+                os.chdir(cwd)
+
+        record['results'].setdefault(entry.name, {})[str(size)] = {'axis': entry.axis, **timing}
+        report(f'{entry.name:<24} {entry.axis:>8} {size:>6}  {_seconds(timing["min"]):>10}  '
+               f'(median {_seconds(timing["median"])}, {timing["repeats"]} repeats)')
+
+    return record
+
+
+def save(record, path=None):
+    """Write a record, by default to RESULTS_DIR/<commit>.json, and return where it went."""
+    if path is None:
+        name = (record.get('commit') or 'uncommitted')[:12]
+        if record.get('dirty'):
+            name += '-dirty'
+        path = RESULTS_DIR / f'{name}.json'
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(record, indent=1))
+
+    return path
+
+
+def compare(before, after, threshold=DEFAULT_THRESHOLD):
+    """Compare two records' minimum times, scenario by scenario.
+
+    Returns:
+        (table, regressions): the comparison as text, and the (name, size, ratio) of each scenario
+        more than threshold slower in after than in before. Scenarios only one record has are left
+        out of both.
+    """
+    lines = [f'{"scenario":<24} {"size":>6} {"before":>10} {"after":>10} {"ratio":>7}']
+    regressions = []
+    for name, timings in after['results'].items():
+        for size, timing in timings.items():
+            old = before['results'].get(name, {}).get(size)
+            if old is None:
+                continue
+            ratio = timing['min'] / old['min'] if old['min'] > 0 else float('inf')
+            flag = ''
+            if ratio > 1 + threshold:
+                regressions.append((name, size, ratio))
+                flag = '  slower'
+            elif ratio < 1 - threshold:
+                flag = '  faster'
+            lines.append(f'{name:<24} {size:>6} {_seconds(old["min"]):>10} '
+                         f'{_seconds(timing["min"]):>10} {ratio:>6.2f}x{flag}')
+
+    return '\n'.join(lines), regressions
+
+
+def _seconds(value):
+    if value < 1e-3:
+        return f'{value * 1e6:.1f} us'
+    if value < 1:
+        return f'{value * 1e3:.1f} ms'
+    return f'{value:.2f} s'
+
+
+def main(argv=None):
+    """python -m benchmarks [options], or python -m benchmarks compare BEFORE AFTER."""
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    if argv[:1] == ['compare']:
+        parser = argparse.ArgumentParser(prog='python -m benchmarks compare',
+                                         description='Compare two benchmark records.')
+        parser.add_argument('before', type=Path)
+        parser.add_argument('after', type=Path)
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help='fractional slowdown reported as a regression (default 0.10)')
+        args = parser.parse_args(argv[1:])
+
+        before, after = (json.loads(path.read_text()) for path in (args.before, args.after))
+        table, regressions = compare(before, after, args.threshold)
+        print(f'{(before.get("commit") or "?")[:12]} -> {(after.get("commit") or "?")[:12]}')
+        print(table)
+        for name, size, ratio in regressions:
+            print(f'REGRESSION: {name} at {size} is {ratio:.2f}x slower')
+
+        return 1 if regressions else 0
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Time the non-solver parts of a sweep.')
+    parser.add_argument('-k', dest='pattern', help='only scenarios whose name contains this')
+    parser.add_argument('--quick', action='store_true', help='only the smallest size of each')
+    parser.add_argument('--sizes', type=int, nargs='+', help='only these sizes')
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                        help='seconds to spend on one scenario at one size before stopping')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--output', type=Path, help='where to write the record')
+    parser.add_argument('--list', action='store_true', help='list the scenarios and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for entry in SCENARIOS.values():
+            print(f'{entry.name:<24} {entry.axis:>8} {list(entry.sizes)}  {entry.description}')
+        return 0
+
+    chosen = select(args.pattern, args.quick, args.sizes)
+    if not chosen:
+        print('No scenario matches.')
+        return 1
+
+    record = run(chosen, args.repeats, args.budget, args.seed)
+    print(f'Written to {save(record, args.output)}')
+
+    return 0
@@ -0,0 +1,218 @@
+"""What is timed, and at what sizes.
+
+A scenario is a setup function registered with @scenario. It is given one size and a scratch
+directory, builds whatever the timed work needs -- untimed -- and returns a function of no
+arguments that does the work once. The harness calls that function as many times as it measures.
+
+Sizes are along the axis the cost grows with:
+
+- `runs` for what is done once per sweep over all its runs: evaluating the config, building and
+  modifying the InputFiles, writing every run's inputs, compiling the results. These are timed at
+  10, 1000 and 10000 runs.
+- `cells` for what is done once per run, whatever the sweep's size: parsing its output. Timing it
+  at 10000 runs would be timing the same run 10000 times, so it is timed over the grid instead.
+- `species` for editing a database, whose cost grows with the database rather than the sweep.
+
+`run_dataset` times the orchestration itself -- spawning, watching and parsing each run -- against
+benchmarks/fake_crunchtope.py at no solver cost, so what is left is Omphalos's own overhead per run.
+It needs omphalos/settings.py, as anything that runs CrunchTope does, and is skipped without it.
+
+The inputs all come from benchmarks.synthetic with the harness's seed.
+"""
+
+import copy
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks import synthetic
+
+RUNS = (10, 1000, 10000)
+CELLS = (100, 1000, 10000)
+SPECIES = (10, 100, 1000)
+
+# The deck the sweep-scale scenarios generate: a modest 1D column with a realistic species count.
+SWEEP_SPECIES = 10
+SWEEP_CELLS = 50
+SNAPSHOTS = 5
+
+# Orchestration runs a process per run, so is timed at sizes a few minutes can cover.
+ORCHESTRATED_RUNS = (10, 100, 1000)
+
+FAKE_CRUNCHTOPE = Path(__file__).resolve().parent / 'fake_crunchtope.py'
+
+SCENARIOS = {}
+
+
+def scenario(name, axis, sizes):
+    """Register a setup function as the scenario name, timed at each of sizes along axis."""
+    def register(setup):
+        SCENARIOS[name] = SimpleNamespace(name=name, axis=axis, sizes=tuple(sizes), setup=setup,
+                                          description=(setup.__doc__ or '').strip().splitlines()[0])
+        return setup
+
+    return register
+
+
+def _template(directory, runs, seed):
+    from omphalos.template import Template
+
+    config = synthetic.write_sweep_inputs(directory, SWEEP_SPECIES, SNAPSHOTS, SWEEP_CELLS, runs,
+                                          seed=seed)
+    return Template(config)
+
+
+def _results(directory, seed):
+    """One run's parsed results, from synthetic output on the sweep deck's grid."""
+    from omphalos.input_file import InputFile
+
+    run_dir = Path(directory) / 'results_run'
+    synthetic.write_outputs(run_dir, SWEEP_SPECIES, (SWEEP_CELLS, 1, 1), SNAPSHOTS,
+                            np.random.default_rng(seed))
+    output = SimpleNamespace(contents={'spatial_profile': [str(10 * (index + 1))
+                                                           for index in range(SNAPSHOTS)]})
+    input_file = InputFile(run_dir / 'deck.in', {'OUTPUT': output}, {}, None, None, {})
+    input_file.get_results(str(run_dir))
+
+    return input_file.results
+
+
+@scenario('evaluate_config', 'runs', RUNS)
+def evaluate_config(size, directory, seed):
+    """Draw every swept value for the sweep: generate_inputs.evaluate_config."""
+    from omphalos import generate_inputs
+
+    config = synthetic.write_sweep_inputs(directory, SWEEP_SPECIES, SNAPSHOTS, SWEEP_CELLS, size,
+                                          seed=seed)
+
+    def work():
+        np.random.seed(seed)
+        generate_inputs.evaluate_config(config)
+
+    return work
+
+
+@scenario('make_dict', 'runs', RUNS)
+def make_dict(size, directory, seed):
+    """Copy the template once per run: Template.make_dict."""
+    template = _template(directory, size, seed)
+
+    return lambda: template.make_dict()
+
+
+@scenario('configure_input_files', 'runs', RUNS)
+def configure_input_files(size, directory, seed):
+    """Build every run's InputFile with its swept values applied, Database.modify included."""
+    from omphalos import generate_inputs
+
+    template = _template(directory, size, seed)
+    tmp_dir = f'{directory}/'
+
+    def work():
+        np.random.seed(seed)
+        generate_inputs.configure_input_files(template, tmp_dir, rhea=True)
+
+    return work
+
+
+@scenario('write_inputs', 'runs', RUNS)
+def write_inputs(size, directory, seed):
+    """Write each run's deck, database and pickled InputFile into its own directory."""
+    from core.file_methods import pickle_data_set
+
+    template = _template(directory, size, seed)
+    file_dict = template.make_dict()
+    for file_num, input_file in file_dict.items():
+        run_dir = Path(directory) / f'run{file_num}'
+        run_dir.mkdir(exist_ok=True)
+        input_file.path = str(run_dir / 'synthetic.in')
+
+    def work():
+        for file_num, input_file in file_dict.items():
+            run_dir = Path(directory) / f'run{file_num}'
+            input_file.print()
+            input_file.database.print(str(run_dir / 'synthetic.dbs'))
+            pickle_data_set(input_file, f'input_file{file_num}.pkl', str(run_dir))
+
+    return work
+
+
+@scenario('compile', 'runs', RUNS)
+def compile_results(size, directory, seed):
+    """Concatenate every run's results into results.nc: file_methods.dataset_to_netcdf."""
+    from core.file_methods import dataset_to_netcdf
+
+    results = _results(directory, seed)
+
+    def work():
+        # Fresh dicts each time, as fix_smalls repairs them in place; the datasets are shared, as
+        # nothing here writes into them.
+        dataset = {file_num: SimpleNamespace(results=dict(results)) for file_num in range(size)}
+        path = dataset_to_netcdf(dataset)
+        os.remove(path)
+
+    return work
+
+
+@scenario('run_dataset', 'runs', ORCHESTRATED_RUNS)
+def run_dataset(size, directory, seed):
+    """Run every run through the fake solver on every core: omphalos.run.run_dataset."""
+    from omphalos import run
+
+    run.crunch_dir = str(FAKE_CRUNCHTOPE)
+    template = _template(directory, size, seed)
+    tmp_dir = f'{directory}/'
+
+    def work():
+        run.run_dataset(template.make_dict(), tmp_dir, 60, workers=os.cpu_count() or 1,
+                        config=template.config)
+
+    return work
+
+
+@scenario('parse_output', 'cells', CELLS)
+def parse_output(size, directory, seed):
+    """Read one snapshot file: file_methods.parse_output."""
+    from core.file_methods import parse_output as parse
+
+    synthetic.write_outputs(directory, SWEEP_SPECIES, (size, 1, 1), 1, np.random.default_rng(seed))
+
+    return lambda: parse(str(directory), 'totcon', 1)
+
+
+@scenario('get_results', 'cells', CELLS)
+def get_results(size, directory, seed):
+    """Parse a whole run's output, every category at every snapshot: InputFile.get_results."""
+    from omphalos.input_file import InputFile
+
+    synthetic.write_outputs(directory, SWEEP_SPECIES, (size, 1, 1), SNAPSHOTS,
+                            np.random.default_rng(seed))
+    output = SimpleNamespace(contents={'spatial_profile': [str(10 * (index + 1))
+                                                           for index in range(SNAPSHOTS)]})
+
+    def work():
+        input_file = InputFile(Path(directory) / 'deck.in', {'OUTPUT': output}, {}, None, None, {})
+        input_file.get_results(str(directory))
+
+    return work
+
+
+@scenario('database_modify', 'species', SPECIES)
+def database_modify(size, directory, seed):
+    """Rewrite every mineral's log K once in a database of that many species: Database.modify."""
+    from omphalos.database import Database
+
+    path = Path(directory) / 'synthetic.dbs'
+    path.write_text(synthetic.database_text(size, np.random.default_rng(seed)))
+    database = Database(str(path))
+    minerals = synthetic.mineral_names(size)
+    values = np.random.default_rng(seed).uniform(-8, 8, size)
+
+    def work():
+        edited = copy.deepcopy(database)
+        for mineral, value in zip(minerals, values):
+            edited.modify('minerals', mineral, 'log_k', float(value))
+
+    return work
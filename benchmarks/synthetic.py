@@ -0,0 +1,202 @@
+"""Synthetic CrunchTope decks, databases and TecPlot output, of whatever size a benchmark asks for.
+
+The fixtures under tests/ are real inputs, which makes them right for testing and wrong for timing:
+they are one size, and nobody chose it. These are generated to order -- N species, a grid of any
+shape, any number of snapshots -- so that a benchmark can say how a cost grows as well as what it is.
+
+Everything is drawn from a numpy Generator seeded by the caller, so two machines, or two commits,
+generate byte-identical inputs and time the same work.
+
+Species are named 'Sp1', 'Sp2', ... with one mineral, 'Min1', 'Min2', ..., dissolving to each. The
+names are meaningless to CrunchTope but are shaped like real ones, so nothing here takes a path
+through the parsers that a real deck would not.
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+# Temperature grid of the synthetic database: the usual eight points.
+TEMPERATURES = (0.0, 25.0, 60.0, 100.0, 150.0, 200.0, 250.0, 300.0)
+
+# Snapshot categories written per run, with the columns each carries beyond X, Y, Z. 'species'
+# stands for one column per primary species and 'minerals' for one per mineral.
+CATEGORIES = {
+    'totcon': 'species',
+    'conc': 'species',
+    'volume': 'minerals',
+}
+
+
+def species_names(species):
+    return [f'Sp{index + 1}' for index in range(species)]
+
+
+def mineral_names(species):
+    return [f'Min{index + 1}' for index in range(species)]
+
+
+def _row(name, *fields):
+    return ' '.join([f"'{name}'"] + [str(field) for field in fields]) + '\n'
+
+
+def database_text(species, rng):
+    """A thermodynamic database with one primary, secondary species and mineral per species.
+
+    Every mineral has a tst rate law in a mineral kinetics block, so `database_parameters` can sweep
+    rates as well as log Ks.
+    """
+    points = len(TEMPERATURES)
+    lines = [
+        _row('temperature points', points, *(f'{t:.1f}' for t in TEMPERATURES)),
+        _row('Debye-Huckel adh', *(f'{0.49 + 0.01 * i:.4f}' for i in range(points))),
+        _row('Debye-Huckel bdh', *(f'{0.32 + 0.002 * i:.4f}' for i in range(points))),
+        _row('Debye-Huckel bdt', *(f'{0.037 + 0.001 * i:.4f}' for i in range(points))),
+        _row('H+', 9.0, 1.0, 1.0079),
+        _row('H2O', 0.0, 0.0, 18.0153),
+    ]
+    for name in species_names(species):
+        lines.append(_row(name, 4.0, 1.0, f'{rng.uniform(10, 200):.4f}'))
+    lines.append(_row('End of primary', 0.0, 0.0, 0.0))
+
+    for name in species_names(species):
+        log_k = ' '.join(f'{value:.4f}' for value in rng.uniform(-14, 14, points))
+        lines.append(f"'{name}OH' 2 1.0 '{name}' 1.0 'H2O' {log_k} 4.0 0.0 {rng.uniform(20, 220):.4f}\n")
+    lines.append(_row('End of secondary', 1, '0.', "'0'", *(['0.'] * (points + 3))))
+    lines.append(_row('End of gases', '0.', 1, '1.', "'0'", *(['0.'] * (points + 1))))
+
+    for name, mineral in zip(species_names(species), mineral_names(species)):
+        log_k = ' '.join(f'{value:.4f}' for value in rng.uniform(-10, 10, points))
+        lines.append(f"'{mineral}' {rng.uniform(20, 60):.4f} 1 1.0 '{name}' {log_k} "
+                     f'{rng.uniform(50, 250):.4f}\n')
+    lines.append(_row('End of minerals', '0.', 1, '0.', "'0'", *(['0.'] * (points + 1))))
+
+    lines.append('Begin mineral kinetics\n')
+    for mineral in mineral_names(species):
+        lines += ['+----------------------------------------------------\n',
+                  f'{mineral}\n',
+                  '  label = default\n',
+                  '  type = tst\n',
+                  f'  rate(25C) = {rng.uniform(-12, -6):.2f}\n',
+                  '  activation = 15.0  (kcal/mole)\n',
+                  '  dependence :\n']
+    lines.append('+----------------------------------------------------\n')
+    lines.append('End of mineral kinetics\n')
+
+    return ''.join(lines)
+
+
+def deck_text(species, snapshots, cells, database='synthetic.dbs'):
+    """A 1D reactive transport deck over the synthetic database.
+
+    Args:
+        species: Number of primary species, and so of minerals.
+        snapshots: Number of spatial_profile times.
+        cells: Number of grid cells along X.
+        database: Name of the database the RUNTIME block points at.
+    """
+    names, minerals = species_names(species), mineral_names(species)
+    times = '  '.join(f'{10.0 * (index + 1):g}' for index in range(snapshots))
+
+    def condition(name, concentration):
+        return (f'Condition {name}\ntemperature  25.0\npH  7.0\n'
+                + ''.join(f'{species}  {concentration}\n' for species in names)
+                + ''.join(f'{mineral}  0.01  ssa  1.0\n' for mineral in minerals)
+                + 'END\n\n')
+
+    return (
+        'TITLE\nsynthetic benchmark deck\nEND\n\n'
+        f'RUNTIME\ntime_units  years\ntimestep_max  1.0\ndatabase  {database}\nEND\n\n'
+        f'OUTPUT\ntime_units  years\nspatial_profile  {times}\nEND\n\n'
+        'PRIMARY_SPECIES\nH+\n' + ''.join(f'{name}\n' for name in names) + 'END\n\n'
+        'MINERALS\n' + ''.join(f'{mineral}  -label default\n' for mineral in minerals) + 'END\n\n'
+        f'DISCRETIZATION\nxzones  {cells}  {float(cells)}\nEND\n\n'
+        + condition('initial', '1.0E-04') + condition('boundary', '1.0E-03')
+        + f'INITIAL_CONDITIONS\ninitial  1-{cells}  1-1  1-1\nEND\n\n'
+        'BOUNDARY_CONDITIONS\nx_begin  boundary  flux\nx_end  initial  flux\nEND\n\n'
+        'FLOW\ntime_units  years\nconstant_flow  1.0\nEND\n'
+    )
+
+
+def sweep_config(deck, database, runs, species):
+    """An omphalos config sweeping every species, every mineral and every mineral's log K.
+
+    That is three sweep entries per species, which is what makes config evaluation and per-run
+    modification grow with the species count as well as the run count.
+    """
+    names, minerals = species_names(species), mineral_names(species)
+
+    return {
+        'template': str(deck),
+        'database': str(database),
+        'aqueous_database': None,
+        'catabolic_pathways': None,
+        'restart_file': '',
+        'timeout': 60,
+        'number_of_files': runs,
+        'nodes': 1,
+        'conditions': ['initial', 'boundary'],
+        'concentrations': {'boundary': {name: ['random_uniform', [1e-4, 1e-2]] for name in names}},
+        'mineral_volumes': {'initial': {mineral: ['random_uniform', [0.001, 0.1]]
+                                        for mineral in minerals}},
+        'database_parameters': {'minerals': {mineral: {'log_k': ['random_uniform', [-8, 8]]}
+                                             for mineral in minerals}},
+    }
+
+
+def tecplot_text(columns, shape, rng, title='Total Concentrations'):
+    """One snapshot file as CrunchTope writes it: point-ordered, X fastest.
+
+    Args:
+        columns: Names of the data columns after X, Y and Z.
+        shape: (nx, ny, nz) cell counts.
+        rng: numpy Generator the values are drawn from.
+    """
+    nx, ny, nz = shape
+    z, y, x = np.meshgrid(np.arange(nz) + 0.5, np.arange(ny) + 0.5, np.arange(nx) + 0.5,
+                          indexing='ij')
+    values = rng.lognormal(-8, 3, (nx * ny * nz, len(columns)))
+    data = np.column_stack([x.ravel(), y.ravel(), z.ravel(), values])
+
+    header = (f' TITLE = "{title}" \n'
+              'VARIABLES = ' + ' '.join(f'"{name}"' for name in ['X', 'Y', 'Z', *columns]) + '\n'
+              f' ZONE I=  {nx} , J=  {ny} , K=  {nz}  F=POINT\n')
+    rows = '\n'.join(' '.join(f'{value:17.8E}' for value in row) for row in data)
+
+    return header + rows + '\n'
+
+
+def write_outputs(directory, species, shape, snapshots, rng):
+    """Write a run's snapshot files into directory, as CrunchTope would have left them.
+
+    Returns:
+        The category names written.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    columns = {'species': ['H+', *species_names(species)], 'minerals': mineral_names(species)}
+
+    for category, kind in CATEGORIES.items():
+        for snapshot in range(1, snapshots + 1):
+            (directory / f'{category}{snapshot}.tec').write_text(
+                tecplot_text(columns[kind], shape, rng, title=category))
+
+    return list(CATEGORIES)
+
+
+def write_sweep_inputs(directory, species, snapshots, cells, runs, seed=0):
+    """Write a deck and database into directory, and return the config that sweeps them.
+
+    Returns:
+        The config, as a dict, with absolute paths to the two files.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    database = directory / 'synthetic.dbs'
+    database.write_text(database_text(species, rng))
+    deck = directory / 'synthetic.in'
+    deck.write_text(deck_text(species, snapshots, cells, database=database.name))
+
+    return sweep_config(deck, database, runs, species)
@@ -24,7 +24,9 @@ def filter_errors(dataset, verbose=False):
 
     A run fails by carrying a non-zero error_code, set by the simulator wrapper: 1 is a timeout,
     higher values are the error patterns matched in the simulator's output (see CT_ERROR_PATTERNS in
-    omphalos/run.py), and -1 means the simulator exited without writing any output.
+    omphalos/run.py), -1 means the simulator exited without writing any output, -2 that the run was
+    stopped for having stalled (see omphalos/stall.py), and -3 that it was stopped at a timeout
+    learned from the sweep's other runs (see omphalos/timeouts.py).
 
     The input dictionary is left untouched; both returned dictionaries are new, and keyed by run
     number so they stay aligned with results.nc.
@@ -2,6 +2,7 @@
 
 import csv
 import glob
+import hashlib
 import pickle
 import re
 import warnings
@@ -321,6 +322,26 @@ def data_cats(path):
     return f_set
 
 
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, as a hex string.
+
+    Read in chunks, since a thermodynamic database can run to tens of megabytes.
+
+    Args:
+        path: Path to the file.
+        chunk_size: Bytes read at a time.
+
+    Returns:
+        The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
 def pickle_data_set(data_set, file_name, path_to_file='.'):
     """Pickle a dataset to a file.
 
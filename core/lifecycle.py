@@ -0,0 +1,482 @@
+"""Tidy each run directory once its run is over: archive it, delete it, or leave it be.
+
+A run directory keeps everything its run wrote long after the result is recorded: a ``.tec`` file per
+category per snapshot, CrunchTope's ``.out`` files, its restart, its decks, and the links to the
+shared databases. That is hundreds of files a run, so a 10,000-run sweep leaves millions of inodes
+behind it, which is where a shared filesystem's quota runs out first. clear_run_directories empties
+the directories only when the next sweep starts, and then all of them. A ``run_directories`` section
+says what becomes of each one as soon as its run is over:
+
+    run_directories:
+      successful: archive    # keep, delete or archive
+      failed: keep           # the same, for a run that failed
+      format: tar.gz         # or tar.xz, zip
+      when: finished         # or background
+      keep: ['*.out']        # left as they are, whatever the policy
+
+``archive`` packs the directory's files into a single file inside it, ``run<N>/run<N>.tar.gz``, and
+removes them; ``delete`` removes them. Either way the run's completion record -- the pickle its
+results are compiled from -- and its solver log (see core/solver_log.py) stay, as does anything
+``keep`` names, so a run directory ends with a handful of inodes rather than hundreds. Files staged
+as links to one shared copy (see core/staging.py) are removed without being archived: there is one
+copy of them for the whole sweep, and packing one into every run's archive would undo what linking
+saved. ``successful: delete`` with ``failed: keep`` keeps only the failures, whole, for inspection.
+``run_directories: archive`` is short for ``successful: archive`` and the defaults for the rest.
+
+``when: finished`` tidies a run's directory as soon as its record is written, in the process that
+ran it. ``when: background`` hands that to a Sweeper thread in rhea, which tidies the finished runs
+every few seconds while it waits for the rest, so that no run spends its own time packing. Only a
+backend rhea waits on has one; with slurm, rhea has gone before the runs start, and the runs tidy as
+they finish instead.
+
+Nothing is lost to forensics: RunFiles reads a run directory's files whether they are loose or
+packed, and so does ``rhea runs list|show|extract <run_dir>``. ``rhea runs tidy <config>`` applies a
+config's policy to every finished run of a sweep after the fact.
+
+Only run directories of their own are tidied: ``run<N>`` under rhea, and ``tmp/run<N>`` under
+omphalos where runs are isolated. A run in ``tmp/`` itself shares it, and is left alone.
+"""
+
+import argparse
+import fnmatch
+import os
+import re
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+from core import solver_log
+
+POLICIES = ('keep', 'delete', 'archive')
+
+# Archive formats, and the tarfile mode each is written with; zip goes through zipfile.
+FORMATS = {'tar.gz': 'w:gz', 'tar.xz': 'w:xz', 'zip': None}
+
+WHEN = ('finished', 'background')
+
+DEFAULTS = {'successful': 'archive', 'failed': 'keep', 'format': 'tar.gz', 'when': 'finished'}
+
+# Never archived or removed: the completion record, which compile_results and rhea --resume read, and
+# the solver log, which says how the run went.
+KEPT = ('*_complete.pkl',) + solver_log.LOG_PATTERNS
+
+# How often, in seconds, a Sweeper looks for runs that have finished.
+SWEEP_INTERVAL = 5.0
+
+# Set while a Sweeper is tidying, so that the runs rhea starts leave their directories to it. The
+# local backends pass rhea's environment on to their runs.
+SWEEPER_ENV = 'OMPHALOS_RUN_SWEEPER'
+
+_RUN_DIR = re.compile(r'^run(\d+)$')
+
+
+def settings(config):
+    """The run_directories section of a config, with its defaults filled in, or None if it is off.
+
+    Returns:
+        dict of 'successful' and 'failed', each one of POLICIES, 'format', one of FORMATS, 'when',
+        one of WHEN, and 'keep', a tuple of glob patterns.
+
+    Raises:
+        ValueError: Where the section is malformed.
+    """
+    section = (config or {}).get('run_directories')
+    if not section:
+        return None
+    if isinstance(section, str):
+        section = {'successful': section}
+    elif not isinstance(section, dict):
+        raise ValueError('run_directories is a policy, or a mapping of successful, failed, format, '
+                         'when and keep')
+
+    resolved = {key: section.get(key, default) for key, default in DEFAULTS.items()}
+    for key in ('successful', 'failed'):
+        if resolved[key] not in POLICIES:
+            raise ValueError(f'run_directories {key} is one of {", ".join(POLICIES)}, '
+                             f'not {resolved[key]!r}')
+    if resolved['format'] not in FORMATS:
+        raise ValueError(f'run_directories format is one of {", ".join(FORMATS)}, '
+                         f'not {resolved["format"]!r}')
+    if resolved['when'] not in WHEN:
+        raise ValueError(f'run_directories when is one of {", ".join(WHEN)}, '
+                         f'not {resolved["when"]!r}')
+
+    keep = section.get('keep') or ()
+    resolved['keep'] = (keep,) if isinstance(keep, str) else tuple(keep)
+
+    return resolved
+
+
+def archive_path(run_dir, fmt='tar.gz'):
+    """Where tidy packs run_dir's files: run<N>/run<N>.<format>."""
+    run_dir = Path(run_dir)
+    return run_dir / f'{run_dir.name}.{fmt}'
+
+
+def find_archive(run_dir):
+    """The archive tidy left in run_dir, in whichever format, or None."""
+    for fmt in FORMATS:
+        path = archive_path(run_dir, fmt)
+        if path.is_file():
+            return path
+    return None
+
+
+def _kept(relative, keep):
+    name = relative.as_posix()
+    return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative.name, pattern)
+               for pattern in KEPT + tuple(keep))
+
+
+def _shared(path):
+    """Whether path is one of the sweep's shared copies, staged by link rather than written.
+
+    A link, or a hard link with more than one other name: the store's copy is one, and another run's
+    is the rest. A file a run's own sweep values were written to has the store's copy alone.
+    """
+    return path.is_symlink() or path.stat().st_nlink > 2
+
+
+def _members(run_dir, keep):
+    """The files tidy acts on, as paths relative to run_dir, in a stable order."""
+    archives = {archive_path(run_dir, fmt).name for fmt in FORMATS}
+    members = []
+    for path in sorted(run_dir.rglob('*')):
+        relative = path.relative_to(run_dir)
+        if (path.is_file() or path.is_symlink()) and relative.as_posix() not in archives \
+                and not _kept(relative, keep):
+            members.append(relative)
+    return members
+
+
+def pack(run_dir, members, fmt='tar.gz'):
+    """Write members of run_dir, given relative to it, into its archive, replacing any there was.
+
+    Written under a temporary name and moved into place, so that an archive found in a run directory
+    is always a whole one.
+    """
+    run_dir = Path(run_dir)
+    archive = archive_path(run_dir, fmt)
+    partial = archive.with_name(archive.name + '.part')
+    if FORMATS[fmt] is None:
+        with zipfile.ZipFile(partial, 'w', zipfile.ZIP_DEFLATED) as packed:
+            for relative in members:
+                packed.write(run_dir / relative, relative.as_posix())
+    else:
+        with tarfile.open(partial, FORMATS[fmt]) as packed:
+            for relative in members:
+                packed.add(run_dir / relative, relative.as_posix(), recursive=False)
+    os.replace(partial, archive)
+
+    return archive
+
+
+def tidy(run_dir, section, failed=False):
+    """Do with run_dir what section's policy says for a run that succeeded, or that failed.
+
+    Args:
+        run_dir: The run's own directory.
+        section: The run_directories settings, as settings returns them.
+        failed: Whether the run failed, which picks the 'failed' policy over 'successful'.
+
+    Returns:
+        dict of 'policy', the one applied, 'archived' and 'removed', the numbers of files.
+    """
+    run_dir = Path(run_dir)
+    policy = section['failed' if failed else 'successful']
+    if policy == 'keep' or not run_dir.is_dir():
+        return {'policy': policy, 'archived': 0, 'removed': 0}
+
+    members = _members(run_dir, section['keep'])
+    archived = []
+    if policy == 'archive':
+        archived = [relative for relative in members if not _shared(run_dir / relative)]
+        if archived:
+            pack(run_dir, archived, section['format'])
+
+    for relative in members:
+        (run_dir / relative).unlink()
+    # Deepest first, so that a directory emptied of its subdirectories goes too.
+    for path in sorted((path for path in run_dir.rglob('*') if path.is_dir()), reverse=True):
+        if not any(path.iterdir()):
+            path.rmdir()
+
+    return {'policy': policy, 'archived': len(archived), 'removed': len(members)}
+
+
+def finished(run_dir, config, error_code=0):
+    """Tidy run_dir now its run's record is written, where the config asks for it.
+
+    Left to the Sweeper where one is tidying for rhea. A directory that cannot be tidied is said so
+    and left as it is: the run itself is over, and went however it went.
+
+    Returns:
+        What tidy returned, or None where nothing was done.
+    """
+    section = settings(config)
+    if section is None or (section['when'] == 'background' and os.environ.get(SWEEPER_ENV)):
+        return None
+
+    try:
+        return tidy(run_dir, section, failed=bool(error_code))
+    except (OSError, tarfile.TarError, zipfile.BadZipFile) as exc:
+        print(f'Could not tidy {run_dir}: {exc}')
+        return None
+
+
+def record_path(run_dir):
+    """The completion record rhea leaves in run<N>: run<N>/input_file<N>_complete.pkl."""
+    run_dir = Path(run_dir)
+    number = _RUN_DIR.match(run_dir.name).group(1)
+    return run_dir / f'input_file{number}_complete.pkl'
+
+
+def _run_failed(run_dir, since=None):
+    """Whether the run in run_dir failed, from its record; None where it has none to read yet.
+
+    Args:
+        run_dir: The run directory.
+        since: Nanoseconds since the epoch. A record last written before then is not this run's.
+    """
+    from core import file_methods as fm
+
+    path = record_path(run_dir)
+    try:
+        if since is not None and path.stat().st_mtime_ns < since:
+            return None
+        record = fm.unpickle(path)
+    except Exception:
+        # Not written yet, or still being written.
+        return None
+    return bool(getattr(record, 'error_code', 0))
+
+
+class Sweeper:
+    """Tidies the directories of rhea's runs as they finish, from a thread, while rhea waits.
+
+    A run counts as finished once its record has been written since the Sweeper was made.
+    clear_run_directories keeps the record a rerun's last sweep left, beside the deck and database
+    just staged for this one; taken for finished, that run's directory would be tidied away before
+    it had started. On a filesystem with coarse timestamps, a run finishing within the same tick as
+    the Sweeper was made is left as it is, rather than a stale one being taken for it.
+
+    Args:
+        runs: The run numbers to watch for.
+        section: The run_directories settings, as settings returns them.
+        directory: Where the run directories are. Defaults to the working directory.
+        interval: Seconds between looks.
+    """
+
+    def __init__(self, runs, section, directory=None, interval=SWEEP_INTERVAL):
+        self.started = time.time_ns()
+        self.pending = set(runs)
+        self.section = section
+        self.directory = Path(directory) if directory is not None else Path.cwd()
+        self.interval = interval
+        self.tidied = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        os.environ[SWEEPER_ENV] = '1'
+        self._thread = threading.Thread(target=self._loop, name='run-sweeper', daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.sweep()
+
+    def sweep(self):
+        """Tidy every watched run whose record is now written. Returns how many were."""
+        tidied = 0
+        for run in sorted(self.pending):
+            run_dir = self.directory / f'run{run}'
+            failed = _run_failed(run_dir, since=self.started)
+            if failed is None:
+                continue
+            try:
+                tidy(run_dir, self.section, failed=failed)
+            except (OSError, tarfile.TarError, zipfile.BadZipFile) as exc:
+                print(f'Could not tidy {run_dir}: {exc}')
+            self.pending.discard(run)
+            tidied += 1
+
+        self.tidied += tidied
+        return tidied
+
+    def stop(self):
+        """Stop looking, then tidy whatever has finished since the last look."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        os.environ.pop(SWEEPER_ENV, None)
+        self.sweep()
+
+
+def tidy_sweep(config, directory=None):
+    """Apply config's policy to every finished run directory under directory, after the fact.
+
+    Returns:
+        dict mapping run number to what tidy returned, for the runs with a record.
+
+    Raises:
+        ValueError: Where the config has no run_directories section to apply.
+    """
+    section = settings(config)
+    if section is None:
+        raise ValueError('the config has no run_directories section to tidy by')
+
+    directory = Path(directory) if directory is not None else Path.cwd()
+    tidied = {}
+    for path in sorted(directory.iterdir()):
+        match = _RUN_DIR.match(path.name)
+        if not match or not path.is_dir():
+            continue
+        failed = _run_failed(path)
+        if failed is not None:
+            tidied[int(match.group(1))] = tidy(path, section, failed=failed)
+
+    return tidied
+
+
+class RunFiles:
+    """A run directory's files, whether tidy left them loose or packed them.
+
+    Names are relative to the run directory, as they were when the run wrote them. A file both loose
+    and packed -- one the run wrote again after a resume -- is read loose.
+
+    Args:
+        run_dir: The run directory.
+    """
+
+    def __init__(self, run_dir):
+        self.run_dir = Path(run_dir)
+        self.archive = find_archive(self.run_dir)
+
+    def _packed(self):
+        if self.archive is None:
+            return []
+        if self.archive.suffix == '.zip':
+            with zipfile.ZipFile(self.archive) as packed:
+                return packed.namelist()
+        with tarfile.open(self.archive) as packed:
+            return [member.name for member in packed.getmembers() if not member.isdir()]
+
+    def loose(self):
+        """The names of the files left loose in the run directory."""
+        return [path.relative_to(self.run_dir).as_posix() for path in sorted(self.run_dir.rglob('*'))
+                if path.is_file() and path != self.archive]
+
+    def names(self):
+        """Every file's name, loose or packed."""
+        return sorted(set(self.loose()) | set(self._packed()))
+
+    def read(self, name):
+        """The bytes of the file called name.
+
+        Raises:
+            KeyError: Where the run directory has no such file, loose or packed.
+        """
+        path = self.run_dir / name
+        if path.is_file():
+            return path.read_bytes()
+        if self.archive is not None:
+            if self.archive.suffix == '.zip':
+                with zipfile.ZipFile(self.archive) as packed:
+                    if name in packed.namelist():
+                        return packed.read(name)
+            else:
+                with tarfile.open(self.archive) as packed:
+                    try:
+                        return packed.extractfile(name).read()
+                    except KeyError:
+                        pass
+        raise KeyError(f'{self.run_dir} has no file {name}')
+
+    def extract(self, destination=None):
+        """Unpack the archive into destination, the run directory by default.
+
+        Returns:
+            The names unpacked; none where there is no archive.
+        """
+        if self.archive is None:
+            return []
+        destination = Path(destination) if destination is not None else self.run_dir
+        destination.mkdir(parents=True, exist_ok=True)
+        if self.archive.suffix == '.zip':
+            with zipfile.ZipFile(self.archive) as packed:
+                packed.extractall(destination)
+        else:
+            with tarfile.open(self.archive) as packed:
+                # The data filter refuses absolute paths and links out of destination, where this
+                # Python has it; an archive tidy wrote has neither.
+                if hasattr(tarfile, 'data_filter'):
+                    packed.extractall(destination, filter='data')
+                else:
+                    packed.extractall(destination)
+
+        return self._packed()
+
+
+def main(argv=None):
+    """``rhea runs tidy|list|show|extract``: tidy a sweep's run directories, or look inside one.
+
+    Returns:
+        The exit status: 1 where there was nothing to do it to.
+    """
+    parser = argparse.ArgumentParser(prog='rhea runs',
+                                     description='Tidy run directories, and read what they kept.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    tidy_parser = commands.add_parser('tidy', help="Apply the config's run_directories policy to "
+                                                   'every finished run, from the sweep directory.')
+    tidy_parser.add_argument('path_to_config', type=str)
+    list_parser = commands.add_parser('list', help="List a run directory's files, loose or packed.")
+    list_parser.add_argument('run_dir', type=str)
+    show_parser = commands.add_parser('show', help='Write one of them to stdout.')
+    show_parser.add_argument('run_dir', type=str)
+    show_parser.add_argument('name', type=str)
+    extract_parser = commands.add_parser('extract', help="Unpack a run directory's archive.")
+    extract_parser.add_argument('run_dir', type=str)
+    extract_parser.add_argument('--to', type=str, default=None,
+                                help='Where to unpack it (default: the run directory itself).')
+    args = parser.parse_args(argv)
+
+    if args.command == 'tidy':
+        import yaml
+
+        with open(args.path_to_config) as file:
+            config = yaml.safe_load(file)
+        try:
+            tidied = tidy_sweep(config)
+        except ValueError as exc:
+            print(f'ERROR: {exc}')
+            return 1
+        archived = sum(result['archived'] for result in tidied.values())
+        removed = sum(result['removed'] for result in tidied.values())
+        print(f'Tidied {len(tidied)} finished run(s): {archived} file(s) archived, '
+              f'{removed} removed.')
+        return 0 if tidied else 1
+
+    files = RunFiles(args.run_dir)
+    if args.command == 'list':
+        loose = set(files.loose())
+        names = files.names()
+        for name in names:
+            print(name if name in loose else f'{name}  (packed)')
+        return 0 if names else 1
+    if args.command == 'show':
+        try:
+            sys.stdout.buffer.write(files.read(args.name))
+        except KeyError as exc:
+            print(f'ERROR: {exc.args[0]}')
+            return 1
+        return 0
+
+    names = files.extract(args.to)
+    print(f'Unpacked {len(names)} file(s) from {files.archive} into '
+          f'{args.to or args.run_dir}.' if names else f'{args.run_dir} has no archive.')
+    return 0 if names else 1
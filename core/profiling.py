@@ -0,0 +1,235 @@
+"""Time the phases of a sweep, to say where a slow one spends its time.
+
+A sweep's time goes to parsing the template, evaluating the config, recomputing log K, modifying the
+database, printing decks, the solver itself, parsing its output, writing the completion records and
+compiling them -- and when a sweep is slow, nothing says which. With ``profiling: true`` in the
+config, each of those phases is timed:
+
+- Phases timed while a run is in hand -- from reading its deck to parsing its output -- are gathered
+  into that run's record, which is kept on its InputFile as ``timings`` and so travels in its
+  completion record.
+- Phases timed outside any run -- generating the sweep -- are the sweep's own. rhea writes them to
+  PROFILE_FILE, so that compile_results can report them even when it runs as a separate job.
+
+A completion record cannot hold the time it took to write itself, so the pickling is measured where
+it is undone: compile_results times reading each record back, as ``unpickle``.
+
+At the end of the sweep, ``breakdown`` sums the lot into a table of each phase's total, its mean per
+run, and its share of the whole.
+
+Times are exclusive: a phase inside another -- the log K recomputation a Template does while it is
+parsed -- is counted once, under its own name, and not in the enclosing phase as well, so the shares
+add up to the time that was measured.
+
+Disabled, which is the default, a timed function costs one test of a module flag per call and phase()
+hands back a context manager that does nothing.
+"""
+
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Where rhea keeps the sweep's own phases for compile_results.
+PROFILE_FILE = '.omphalos_profile.json'
+
+_enabled = False
+
+# Per thread: the stack of phases open, and the run record phases are gathered into, if any.
+_local = threading.local()
+
+# Phases timed outside any run, by any thread.
+_sweep = {}
+_lock = threading.Lock()
+
+
+def configure(config):
+    """Turn profiling on or off as the config's ``profiling`` key says.
+
+    Returns:
+        Whether it is now on.
+    """
+    global _enabled
+    _enabled = bool((config or {}).get('profiling'))
+
+    return _enabled
+
+
+def enabled():
+    return _enabled
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _add(name, seconds):
+    record = getattr(_local, 'record', None)
+    if record is not None:
+        record[name] = record.get(name, 0.0) + seconds
+        return
+
+    with _lock:
+        _sweep[name] = _sweep.get(name, 0.0) + seconds
+
+
+class _Phase:
+    """Time the block it encloses, less the phases timed within it."""
+
+    __slots__ = ('name', 'started', 'inner')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        _stack().append(self)
+        self.inner = 0.0
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        stack = _stack()
+        stack.pop()
+        if stack:
+            stack[-1].inner += elapsed
+        _add(self.name, elapsed - self.inner)
+        return False
+
+
+class _Off:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_OFF = _Off()
+
+
+def phase(name):
+    """A context manager timing the block it encloses as phase name, if profiling is on."""
+    return _Phase(name) if _enabled else _OFF
+
+
+def timed(name):
+    """Decorate a function to be timed as phase name whenever profiling is on."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def add(record, name, seconds):
+    """Count seconds towards phase name in record, if profiling is on.
+
+    For the time phase() cannot take: a wait a coroutine holds across an await, while the other
+    coroutines on its thread open and close phases of their own on the same per-thread stack.
+    """
+    if _enabled:
+        record[name] = record.get(name, 0.0) + seconds
+
+
+@contextmanager
+def collect(record=None):
+    """Gather the phases this thread times into a record of their own: one run's.
+
+    Phases timed by other threads are not gathered, and count as the sweep's instead -- unless that
+    thread collects into the same record, as the supervisor's parsing threads do.
+
+    Args:
+        record: The record to carry on, where a run's phases are timed in more than one thread.
+            A new one by default.
+
+    Yields:
+        The record, a dict of phase name to seconds. Stays empty while profiling is off.
+    """
+    record = {} if record is None else record
+    if not _enabled:
+        yield record
+        return
+
+    outer = getattr(_local, 'record', None)
+    _local.record = record
+    try:
+        yield record
+    finally:
+        _local.record = outer
+
+
+def sweep_timings():
+    """The phases timed outside any run in this process so far, as phase name to seconds."""
+    with _lock:
+        return dict(_sweep)
+
+
+def reset():
+    """Forget the sweep's phases, and turn profiling off."""
+    global _enabled
+    _enabled = False
+    with _lock:
+        _sweep.clear()
+
+
+def save(path=PROFILE_FILE):
+    """Write the sweep's phases to path, if profiling is on, and remove any earlier sweep's if not."""
+    path = Path(path)
+    if not _enabled:
+        path.unlink(missing_ok=True)
+        return
+    path.write_text(json.dumps(sweep_timings()))
+
+
+def load(path=PROFILE_FILE):
+    """The phases save wrote, or an empty dict."""
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def breakdown(records, sweep=None):
+    """The table of where a sweep's time went.
+
+    Args:
+        records: Each run's timings, as collect gathered them.
+        sweep: The sweep's own phases, or None.
+
+    Returns:
+        The table as text, or an empty string when nothing was timed.
+    """
+    records = [record for record in records if record]
+    per_run, counts = {}, {}
+    for record in records:
+        for name, seconds in record.items():
+            per_run[name] = per_run.get(name, 0.0) + seconds
+            counts[name] = counts.get(name, 0) + 1
+    totals = dict(per_run)
+    for name, seconds in (sweep or {}).items():
+        totals[name] = totals.get(name, 0.0) + seconds
+
+    grand = sum(totals.values())
+    if not totals or grand <= 0:
+        return ''
+
+    lines = [f'Where the time went, over {len(records)} run(s):',
+             f'  {"phase":<16} {"total (s)":>11} {"per run (s)":>12} {"share":>7}']
+    for name, seconds in sorted(totals.items(), key=lambda item: -item[1]):
+        mean = f'{per_run[name] / counts[name]:.3f}' if name in counts else '-'
+        lines.append(f'  {name:<16} {seconds:>11.3f} {mean:>12} {100 * seconds / grand:>6.1f}%')
+    lines.append(f'  {"total":<16} {grand:>11.3f}')
+
+    return '\n'.join(lines)
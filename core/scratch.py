@@ -0,0 +1,150 @@
+"""Run in node-local scratch or tmpfs, and write back only what is wanted afterwards.
+
+A run writes a ``.tec`` file per category per snapshot, CrunchTope's ``.out`` logs and its restart
+files, and all of them go straight into its run directory. On a shared filesystem that is the
+bottleneck of a large sweep: Lustre serves file creation and stat from a metadata server the whole
+cluster shares, and thousands of runs each writing hundreds of small files keep it busy for far
+longer than the bytes take to move.
+
+A ``scratch`` section in the config moves each run somewhere local while it runs:
+
+    scratch:
+      location: tmpdir   # or shm, or a directory
+      keep: ['*.rst']
+
+- ``location`` is ``tmpdir`` for ``$TMPDIR`` (the default; most schedulers point it at node-local
+  disk for the job), ``shm`` for ``/dev/shm``, or a directory of your own. ``/dev/shm`` is memory:
+  what a run writes there counts against the node's RAM until the run ends.
+- ``keep`` lists glob patterns, relative to the run directory, of the files to copy back into it
+  when the run ends. Nothing else is. ``true`` for the section is ``location: tmpdir`` and no files.
+
+The run's results are parsed in scratch, so its completion record -- the pickle rhea writes, or the
+InputFile the local executor hands back -- carries them without any ``.tec`` file ever touching the
+shared filesystem. The scratch directory is removed however the run ends; the files in ``keep`` are
+copied back first, failed run or not, since a failed run's ``.out`` is what says why it failed. So is
+the run's solver log (see core/solver_log.py), which is copied back whatever ``keep`` says.
+
+Restart-chain stages run one after another in the same scratch directory, so the restart file one
+stage hands the next never leaves it. ``keep`` is for restart files a later sweep will start from.
+"""
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from core import solver_log
+
+# Where 'location: shm' places runs.
+SHM_DIR = '/dev/shm'
+
+# Not copied into scratch: the completion record of an earlier attempt, which rhea --resume reads
+# from the run directory and the run itself has no use for.
+_NOT_COPIED = ('*_complete.pkl',)
+
+
+def _location_dir(location):
+    if location == 'tmpdir':
+        return Path(os.environ.get('TMPDIR') or tempfile.gettempdir())
+    if location == 'shm':
+        return Path(SHM_DIR)
+
+    return Path(os.path.expandvars(str(location))).expanduser()
+
+
+def settings(config):
+    """The scratch section of a config, with its defaults filled in, or None if runs stay put.
+
+    Returns:
+        dict of 'root', the directory runs are placed under, and 'keep', the patterns to copy back.
+
+    Raises:
+        ValueError: Where the section is malformed.
+    """
+    section = (config or {}).get('scratch')
+    if not section:
+        return None
+    if section is True:
+        section = {}
+    elif isinstance(section, str):
+        section = {'location': section}
+    elif not isinstance(section, dict):
+        raise ValueError('scratch is true, a location, or a mapping of location and keep')
+
+    keep = section.get('keep') or ()
+    if isinstance(keep, str):
+        keep = [keep]
+
+    return {'root': _location_dir(section.get('location') or 'tmpdir'), 'keep': tuple(keep)}
+
+
+def write_back(work, run_dir, keep):
+    """Copy the files in work matching keep into run_dir, at the same relative paths.
+
+    Returns:
+        The relative paths copied.
+    """
+    work, run_dir = Path(work), Path(run_dir)
+    copied = []
+    for pattern in keep:
+        for path in sorted(work.glob(pattern)):
+            if not path.is_file():
+                continue
+            relative = path.relative_to(work)
+            dest = run_dir / relative
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            # A file rhea staged as a link to the sweep's store is replaced, not written through.
+            dest.unlink(missing_ok=True)
+            shutil.copy2(path, dest)
+            copied.append(relative)
+
+    return copied
+
+
+@contextmanager
+def placement(run_dir, config, shared=()):
+    """Where to run what run_dir holds: a copy of it in scratch, or run_dir itself.
+
+    The copy follows links, so that a run in tmpfs reads its databases from memory rather than
+    through a link to the store on the shared filesystem.
+
+    Args:
+        run_dir: The run directory, with everything the run reads already in it.
+        config: The sweep's config, for its ``scratch`` section.
+        shared: Names of directories the sweep keeps beside its run directories and every run must
+            see the same one of -- timeouts.LEDGER_DIR, say. Each is linked into the scratch
+            directory's parent, where a run looks for it, and created if it does not yet exist.
+
+    Yields:
+        The directory to run in, as a Path. Absolute in scratch.
+    """
+    section = settings(config)
+    run_dir = Path(run_dir)
+    if section is None:
+        yield run_dir
+        return
+
+    try:
+        root = Path(tempfile.mkdtemp(prefix='omphalos_', dir=section['root']))
+    except OSError as exc:
+        print(f'Cannot use {section["root"]} for scratch ({exc}); running in {run_dir}.')
+        yield run_dir
+        return
+
+    work = root / run_dir.name
+    try:
+        shutil.copytree(run_dir, work, ignore=shutil.ignore_patterns(*_NOT_COPIED))
+        for name in shared:
+            target = run_dir.resolve().parent / name
+            target.mkdir(parents=True, exist_ok=True)
+            (root / name).symlink_to(target, target_is_directory=True)
+
+        yield work
+    finally:
+        try:
+            if work.is_dir():
+                write_back(work, run_dir, section['keep'] + solver_log.LOG_PATTERNS)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
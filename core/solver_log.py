@@ -0,0 +1,222 @@
+"""Write each run's CrunchTope output to a log in its run directory, rather than to the console.
+
+Every run used to have its child's output echoed to stdout as it arrived. With a node's worth of
+runs side by side that is megabytes of interleaved solver output in the terminal or the SLURM log:
+the writes cost real time, and a failure in it cannot be told apart from the runs printing around
+it. Each run now writes its own:
+
+    solver_log:
+      successful: keep   # or compress, truncate, delete: what to do with the log of a run that succeeded
+      tail: 20           # lines kept in memory, to say how a failed run ended
+      echo: false        # true to echo the output to the console as well, as it used to be
+
+``solver_log: true``, or no section at all, takes these; ``solver_log: false`` writes no log and echoes
+the output to the console as before.
+
+The log is ``crunch.log`` in the run's directory, ``run<N>/crunch.log``. Where runs share one
+directory -- one worker and no scratch -- it is ``crunch<N>.log`` instead, so that one run's log does
+not overwrite the last. A failed run's log is always kept whole, since it is what says why; a
+successful run's is treated as ``successful`` says: ``compress`` gzips it to ``crunch.log.gz``,
+``truncate`` cuts it to its last ``tail`` lines, and ``delete`` removes it.
+
+The console gets one line per run saying how long it took and where its log is, and, for a run that
+failed, the last line it printed.
+"""
+
+import gzip
+import os
+import shutil
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+LOG_NAME = 'crunch.log'
+
+# What the log of a run that succeeded can become.
+POLICIES = ('keep', 'compress', 'truncate', 'delete')
+
+DEFAULT_POLICY = 'keep'
+DEFAULT_TAIL = 20
+
+# The longest unfinished line held while waiting for its newline. CrunchTope's lines are short; this
+# only bounds what a child printing no newlines at all can make the tail hold.
+MAX_PARTIAL = 4096
+
+# What core/scratch.py always copies back from a run in scratch, whatever its keep patterns say.
+LOG_PATTERNS = ('crunch*.log', 'crunch*.log.gz')
+
+
+def settings(config):
+    """The solver_log section of a config, with its defaults filled in, or None where it is false.
+
+    Returns:
+        dict of 'successful', one of POLICIES, 'tail', a number of lines, and 'echo', a bool.
+
+    Raises:
+        ValueError: Where the section is malformed.
+    """
+    section = (config or {}).get('solver_log', True)
+    if section is False:
+        return None
+    if section is True or section is None:
+        section = {}
+    elif not isinstance(section, dict):
+        raise ValueError('solver_log is true, false, or a mapping of successful, tail and echo')
+
+    policy = section.get('successful', DEFAULT_POLICY)
+    if policy not in POLICIES:
+        raise ValueError(f'solver_log successful is one of {", ".join(POLICIES)}, not {policy!r}')
+    tail = int(section.get('tail', DEFAULT_TAIL))
+    if tail < 1:
+        raise ValueError(f'solver_log tail is a number of lines, at least 1, not {tail}')
+
+    return {'successful': policy, 'tail': tail, 'echo': bool(section.get('echo', False))}
+
+
+def log_path(tmp_dir, file_num):
+    """Where a run's log goes: crunch.log in a run directory of its own, crunch<N>.log otherwise."""
+    tmp_path = Path(tmp_dir)
+    if tmp_path.name == f'run{file_num}':
+        return tmp_path / LOG_NAME
+
+    return tmp_path / f'{Path(LOG_NAME).stem}{file_num}{Path(LOG_NAME).suffix}'
+
+
+def from_config(config, tmp_dir, file_num, reader=None, append=False):
+    """The SolverLog a config asks for on one run.
+
+    Args:
+        config: The sweep's config, for its solver_log section.
+        tmp_dir: The directory the run executes in.
+        file_num: The run's number.
+        reader: What else reads the output as it arrives -- a stall.StallMonitor or
+            stall.ProgressReader -- or None.
+        append: Add to the log already there rather than starting it again, as a later stage of a
+            restart chain does.
+    """
+    section = settings(config)
+    if section is None:
+        return SolverLog(None, echo=sys.stdout, reader=reader)
+
+    return SolverLog(log_path(tmp_dir, file_num), tail=section['tail'],
+                     echo=sys.stdout if section['echo'] else None, reader=reader,
+                     successful=section['successful'], append=append)
+
+
+class SolverLog:
+    """A child's output, written to a file as it arrives, with only its last lines kept in memory.
+
+    Has the write and flush of a file, so that it can be a pexpect child's ``logfile_read``, and
+    passes what it is written on to reader, which is then fed exactly as if it were the logfile.
+
+    Args:
+        path: The log file, or None to write none.
+        tail: Lines of output to keep in memory.
+        echo: A stream to copy the output to as well, or None.
+        reader: Something else with a write method to pass the output to, or None.
+        successful: What finish does with the log of a run that succeeded; one of POLICIES.
+        append: Add to the file at path rather than replacing it.
+        clock: Seconds of wall time.
+    """
+
+    def __init__(self, path, tail=DEFAULT_TAIL, echo=None, reader=None, successful=DEFAULT_POLICY,
+                 append=False, clock=time.monotonic):
+        self.path = Path(path) if path is not None else None
+        self.lines = deque(maxlen=tail)
+        self.echo = echo
+        self.reader = reader
+        self.successful = successful
+        self.append = append
+        self.clock = clock
+        self.started = clock()
+        self._partial = ''
+        self._file = None
+        if self.path is not None:
+            # latin-1, as the child is spawned with: every byte it prints is a character, and is
+            # written back out as the same byte.
+            self._file = open(self.path, 'a' if append else 'w', encoding='latin-1')
+
+    def write(self, text):
+        """Take output from the child, a chunk at a time."""
+        if self._file is not None:
+            self._file.write(text)
+        if self.echo is not None:
+            self.echo.write(text)
+        if self.reader is not None:
+            self.reader.write(text)
+
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()[-MAX_PARTIAL:]
+        self.lines.extend(line.rstrip('\r') for line in lines)
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+        if self.echo is not None:
+            self.echo.flush()
+
+    def tail(self):
+        """The last lines of output, oldest first, including one not yet ended."""
+        lines = list(self.lines)
+        if self._partial.strip():
+            lines.append(self._partial.rstrip('\r'))
+
+        return lines[-self.lines.maxlen:]
+
+    def last_line(self):
+        """The last line of output with anything on it, stripped, or ''."""
+        for line in reversed(self.tail()):
+            if line.strip():
+                return line.strip()
+
+        return ''
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self, succeeded):
+        """Close the log and do with it what the config says for a run that ended as this one did.
+
+        Returns:
+            Where the log now is, or None where there is none.
+        """
+        self.close()
+        if self.path is None or not self.path.exists():
+            return None
+        if not succeeded or self.successful == 'keep':
+            return self.path
+
+        if self.successful == 'delete':
+            self.path.unlink()
+            return None
+
+        if self.successful == 'truncate':
+            kept = self.tail()
+            self.path.write_text(''.join(f'{line}\n' for line in kept), encoding='latin-1')
+            return self.path
+
+        # A later stage of a restart chain adds a member to the gzip file its first stage made, and
+        # gzip reads the members back as one stream.
+        compressed = self.path.with_name(self.path.name + '.gz')
+        with open(self.path, 'rb') as source, gzip.open(compressed,
+                                                        'ab' if self.append else 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.remove(self.path)
+
+        return compressed
+
+    def summary(self, file_num, succeeded):
+        """Close the log as finish does, and say in one line how the run went and where its log is."""
+        where = self.finish(succeeded)
+        line = f'File {file_num} complete in {self.clock() - self.started:.1f} s'
+        # The run directory and the name only: a run in scratch has its log copied back beside
+        # its deck, and the scratch path it was written to is gone by the time anyone looks.
+        if where is not None:
+            line += f'; solver output in {where.parent.name}/{where.name}'
+        if not succeeded and self.last_line():
+            line += f'; it ended: "{self.last_line()}"'
+
+        return line + '.'
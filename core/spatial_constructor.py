@@ -185,6 +185,27 @@ def initialise_array(input_file, variable_num, verbose=False):
     Returns:
         numpy array of zeros with appropriate dimensions
     """
+    cells = grid_shape(input_file, verbose)
+
+    # Get the total number of rows required by the tidy data format for this geometry.
+    row_count = cells[0] * cells[1] * cells[2]
+
+    # Initialise output volume np.array and get the condition volume fractions.
+    array = np.zeros((row_count, variable_num))
+
+    return array
+
+
+def grid_shape(input_file, verbose=False):
+    """Return the number of cells along x, y and z of an InputFile's grid.
+
+    Args:
+        input_file: InputFile object whose DISCRETIZATION block to read.
+        verbose: Whether to print warnings about missing discretization info.
+
+    Returns:
+        list: [x cells, y cells, z cells].
+    """
     # Initialise cell counts as CrunchTope defaults: an axis with no zones keyword is one cell deep.
     # Could probably move this to be the default when input files are being read in/generated but
     # will leave here for now.
@@ -211,13 +232,7 @@ def initialise_array(input_file, variable_num, verbose=False):
 
         cells[i] = zone_cell_count(discretization[zone])
 
-    # Get the total number of rows required by the tidy data format for this geometry.
-    row_count = cells[0] * cells[1] * cells[2]
-
-    # Initialise output volume np.array and get the condition volume fractions.
-    array = np.zeros((row_count, variable_num))
-
-    return array
+    return cells
 
 
 def compute_rows(input_file, condition):
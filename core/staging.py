@@ -0,0 +1,216 @@
+"""Stage the files runs share as links to one stored copy, rather than a copy per run.
+
+Every run directory needs the thermodynamic database, the aqueous kinetics and catabolic pathways
+files, the auxiliary data files the deck reads and any restart file beside its deck. Copied, a 2 MB
+database across 5,000 runs is 10 GB written to what is usually a shared filesystem, and most of it
+is byte-identical: only a sweep of ``database_parameters`` or ``namelists`` makes the files differ
+from run to run, and even then only the files it touches.
+
+A ContentStore keeps one copy of each distinct file, named by the SHA-256 of its contents, and each
+run directory gets a link to it. A file written per run -- the databases rhea writes out for every
+run -- is written to local scratch first and hashed, so a run whose database came out the same as
+the last one's links to the same copy, and only files that really differ are written to the store.
+
+A link is made with the first of these that the filesystem allows:
+
+- ``hardlink``: no extra space, and unaffected by the store being moved or cleared.
+- ``reflink``: a copy-on-write clone (btrfs, XFS, some NFS and Lustre setups), for when the run
+  directories are on another filesystem from the store, or hard links are refused.
+- ``symlink``: works anywhere, but follows the store; clearing the store breaks it.
+- ``copy``: what was done before.
+
+Stored copies are read-only, and anything writing a file into a run directory must unlink it first
+(see omphalos.run._print_aux_files): writing through a hard link changes every run's copy at once.
+A file the run itself may write, such as a restart file whose name the deck also saves to, should be
+staged with ``WRITABLE_MODES``, which never share storage.
+"""
+
+import errno
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from core import profiling
+from core.file_methods import file_digest
+
+# The store rhea keeps beside the run directories of a sweep.
+STORE_DIR = '.omphalos_store'
+
+# Tried in order; see the module docstring.
+LINK_MODES = ('hardlink', 'reflink', 'symlink', 'copy')
+
+# For files a run may write to: independent copies only, cloned where the filesystem can.
+WRITABLE_MODES = ('reflink', 'copy')
+
+# The modes a config's 'staging' value asks for.
+STAGING_MODES = {'link': LINK_MODES, 'copy': ('copy',)}
+
+# Linux's FICLONE ioctl, from linux/fs.h: clone one file's extents into another.
+_FICLONE = 0x40049409
+
+
+def modes_from_config(config):
+    """The link modes the config's ``staging`` key asks for: 'link' (the default) or 'copy'."""
+    setting = (config or {}).get('staging') or 'link'
+    try:
+        return STAGING_MODES[setting]
+    except KeyError:
+        raise ValueError(f"staging must be one of {sorted(STAGING_MODES)}, not {setting!r}") from None
+
+
+def sweep_store(run_dir, config=None):
+    """The ContentStore beside a run directory: the one rhea staged the sweep's files through.
+
+    Args:
+        run_dir: A run directory of the sweep.
+        config: The sweep's config, for its ``staging`` key.
+    """
+    return ContentStore(Path(run_dir).resolve().parent / STORE_DIR, modes_from_config(config))
+
+
+def _reflink(source, dest):
+    """Clone source into dest, sharing its blocks until either is written. Linux only."""
+    if not sys.platform.startswith('linux'):
+        raise OSError(errno.EOPNOTSUPP, 'reflinks are only attempted on Linux')
+
+    import fcntl
+
+    with open(source, 'rb') as src, open(dest, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.unlink(dest)
+            raise
+
+
+def place(source, dest, modes=LINK_MODES):
+    """Make dest a link to source, by the first of modes the filesystem allows.
+
+    Whatever was at dest is removed first, so that what was there -- possibly a link to another
+    stored copy -- is replaced rather than written through.
+
+    Args:
+        source: The file to link to.
+        dest: Where the link goes. Its directory is created if need be.
+        modes: Link modes to try, in order. 'copy', if listed, cannot be refused: its errors are
+            raised.
+
+    Returns:
+        The mode used.
+    """
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if dest.is_symlink() or dest.exists():
+        dest.unlink()
+
+    for mode in modes:
+        if mode == 'copy':
+            shutil.copyfile(source, dest)
+            return mode
+        try:
+            if mode == 'hardlink':
+                os.link(source, dest)
+            elif mode == 'reflink':
+                _reflink(source, dest)
+            elif mode == 'symlink':
+                os.symlink(os.path.abspath(source), dest)
+            else:
+                raise ValueError(f'unknown link mode {mode!r}')
+            return mode
+        except OSError:
+            continue
+
+    raise OSError(f'could not stage {source} at {dest} by any of {modes}')
+
+
+class ContentStore:
+    """One read-only copy of each distinct file, named by its contents' SHA-256.
+
+    Args:
+        path: The store directory. Created on first use.
+        modes: Link modes to stage files with, in order of preference.
+    """
+
+    def __init__(self, path, modes=LINK_MODES):
+        self.path = Path(path)
+        self.modes = tuple(modes)
+        # Digests of source files already stored, by (path, size, mtime), so that staging the
+        # template's database into 5,000 runs reads it once rather than 5,000 times.
+        self._known = {}
+
+    def clear(self):
+        """Remove every stored copy. Hard links and copies already staged are unaffected."""
+        shutil.rmtree(self.path, ignore_errors=True)
+        self._known.clear()
+
+    def add(self, source, remember=True):
+        """Store a copy of source, unless one with the same contents is already stored.
+
+        Args:
+            source: The file to store.
+            remember: Whether to remember its digest against its path, size and modification time.
+                Not for a scratch file, whose path may be reused for different contents.
+
+        Returns:
+            The stored copy's path.
+        """
+        stat = os.stat(source)
+        identity = (os.path.abspath(source), stat.st_size, stat.st_mtime_ns)
+        digest = self._known.get(identity) if remember else None
+        if digest is None:
+            digest = file_digest(source)
+            if remember:
+                self._known[identity] = digest
+
+        entry = self.path / digest[:2] / digest
+        if not entry.exists():
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            # Copied in under a temporary name and renamed, so that a concurrent stager sees the
+            # whole file or none of it.
+            fd, scratch = tempfile.mkstemp(dir=entry.parent, suffix='.tmp')
+            os.close(fd)
+            try:
+                shutil.copyfile(source, scratch)
+                os.chmod(scratch, 0o444)
+                os.replace(scratch, entry)
+            except BaseException:
+                Path(scratch).unlink(missing_ok=True)
+                raise
+
+        return entry
+
+    @profiling.timed('staging')
+    def stage(self, source, dest, modes=None):
+        """Stage source at dest as a link to its stored copy.
+
+        Args:
+            source: The file to stage.
+            dest: Where the run reads it.
+            modes: Overrides the store's link modes for this file; WRITABLE_MODES for a file the
+                run may write to.
+
+        Returns:
+            The mode used.
+        """
+        return place(self.add(source), dest, modes or self.modes)
+
+    def write(self, writer, dest):
+        """Stage a file that is written rather than copied, such as a run's own database.
+
+        Args:
+            writer: Called with a path; writes the file there. An InputFile's ``database.print``,
+                for instance.
+            dest: Where the run reads it.
+
+        Returns:
+            The mode used.
+        """
+        # Written to the machine's own scratch first: if the contents turn out to be stored
+        # already, the shared filesystem sees no write at all.
+        with tempfile.TemporaryDirectory(prefix='omphalos_stage_') as scratch:
+            written = Path(scratch) / Path(dest).name
+            writer(str(written))
+            return place(self.add(written, remember=False), dest, self.modes)
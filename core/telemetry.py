@@ -0,0 +1,396 @@
+"""Heartbeats from the runs of a sweep, and the progress table ``rhea status`` makes of them.
+
+While a sweep runs, all there is to go on is CrunchTope's own output, interleaved across every run
+on the node: nothing says how many runs have finished, how many failed, which are still going, or
+when the rest will be done. A ``telemetry`` section in the config has each run say so itself:
+
+    telemetry:
+      interval: 30                 # seconds between a running run's heartbeats
+      directory: .omphalos_status  # relative to where the sweep is started
+
+``telemetry: true`` takes these.
+
+Every run keeps one small JSON file in the status directory, ``run<N>.json``, replaced whole at each
+heartbeat: its phase (``running``, ``parsing``, then ``done`` or ``failed``), the model time it has
+reached and the time it runs to, its wall time so far, the resident memory of its CrunchTope child,
+and the host and process it is on. ``sweep.json`` beside them records how many runs the sweep has
+and when it started. ``rhea status <config>`` reads the lot into a table of how many runs are in
+each phase, the sweep's throughput so far, and when it is projected to finish.
+
+Files rather than SQLite, and no server: the status directory sits on whatever filesystem the sweep
+runs from, which on a cluster is one whose locking SQLite cannot trust, and a file per run means no
+two writers ever share one. A file is replaced by renaming a complete one over it, so a reader never
+sees half a heartbeat.
+
+A run that stops beating without finishing -- its node lost, its worker killed -- is reported as
+``lost`` once it has been silent for STALE_INTERVALS of its intervals.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import socket
+import tempfile
+import time
+from pathlib import Path
+
+STATUS_DIR = '.omphalos_status'
+SWEEP_FILE = 'sweep.json'
+
+DEFAULT_INTERVAL = 30.0
+
+# Heartbeats a running run may miss before it is reported lost.
+STALE_INTERVALS = 4
+
+# Phases a run passes through, and the two it ends in.
+ACTIVE = ('running', 'parsing')
+FINISHED = ('done', 'failed')
+
+# The rows of the progress table, in order.
+COUNTED = ('done', 'failed', 'running', 'lost', 'pending')
+
+
+def settings(config):
+    """The telemetry section of a config, with its defaults filled in, or None if it has none.
+
+    Returns:
+        dict of 'interval', in seconds, and 'directory', a Path.
+
+    Raises:
+        ValueError: Where the section is malformed.
+    """
+    section = (config or {}).get('telemetry')
+    if not section:
+        return None
+    if section is True:
+        section = {}
+    elif not isinstance(section, dict):
+        raise ValueError('telemetry is true or a mapping of interval and directory')
+
+    return {'interval': float(section.get('interval', DEFAULT_INTERVAL)),
+            'directory': Path(section.get('directory', STATUS_DIR))}
+
+
+def _write_json(path, data):
+    """Write data to path by renaming a complete file over it."""
+    fd, scratch = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as file:
+            json.dump(data, file)
+        os.replace(scratch, path)
+    except BaseException:
+        Path(scratch).unlink(missing_ok=True)
+        raise
+
+
+def _read_json(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+class StatusBoard:
+    """The status directory of a sweep: one file per run, and one for the sweep.
+
+    Args:
+        directory: The status directory.
+    """
+
+    def __init__(self, directory=STATUS_DIR):
+        self.directory = Path(directory)
+
+    def _run_path(self, file_num):
+        return self.directory / f'run{int(file_num)}.json'
+
+    def start_sweep(self, total, file_nums=()):
+        """Record a sweep of total runs starting now, and forget what file_nums did last time.
+
+        Only the runs about to run are forgotten, so a resumed sweep still counts the ones it skips.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for file_num in file_nums:
+            self._run_path(file_num).unlink(missing_ok=True)
+        _write_json(self.directory / SWEEP_FILE,
+                    {'total': int(total), 'started': time.time(), 'host': socket.gethostname()})
+
+    def sweep(self):
+        """What start_sweep recorded, or None."""
+        return _read_json(self.directory / SWEEP_FILE)
+
+    def read(self, file_num):
+        """A run's latest record, or None."""
+        return _read_json(self._run_path(file_num))
+
+    def write(self, record):
+        """Replace a run's record."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        _write_json(self._run_path(record['file_num']), record)
+
+    def records(self):
+        """Every run's latest record, in run order."""
+        records = (_read_json(path) for path in self.directory.glob('run*.json'))
+        return sorted((record for record in records if record), key=lambda r: r['file_num'])
+
+
+def rss(pid):
+    """A process's resident memory in bytes, or 0 if it has gone or /proc cannot say."""
+    try:
+        with open(f'/proc/{pid}/status') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    return 0
+
+
+class Heartbeat:
+    """Write one run's record to the board as it goes.
+
+    Args:
+        board: The sweep's StatusBoard.
+        file_num: The run's number.
+        interval: Seconds between heartbeats.
+        end: The model time the run goes to, in years, if known.
+        reader: Something with a ``model_time`` -- a stall.ProgressReader fed the run's output -- or
+            None.
+        clock: Seconds since the epoch.
+    """
+
+    def __init__(self, board, file_num, interval=DEFAULT_INTERVAL, end=None, reader=None,
+                 clock=time.time):
+        self.board = board
+        self.file_num = int(file_num)
+        self.interval = interval
+        self.end = end
+        self.reader = reader
+        self.clock = clock
+        self.pid = None
+        self.last = None
+
+        # A later stage of a restart chain carries on from the record of the earlier ones, so that
+        # the run's wall time is the chain's.
+        earlier = board.read(file_num)
+        active = earlier is not None and earlier.get('phase') in ACTIVE
+        self.started = earlier['started'] if active else clock()
+
+    def follow(self, pid):
+        """Report on the child with this pid, starting now."""
+        self.pid = pid
+        self.pulse()
+
+    def due(self):
+        return self.last is None or self.clock() - self.last >= self.interval
+
+    def pulse(self, phase='running'):
+        """Write the run's record as it stands."""
+        now = self.clock()
+        self.last = now
+        record = {'file_num': self.file_num, 'phase': phase,
+                  'model_time': getattr(self.reader, 'model_time', None), 'end_time': self.end,
+                  'wall_time': now - self.started, 'rss': rss(self.pid) if self.pid else 0,
+                  'host': socket.gethostname(), 'pid': os.getpid(), 'started': self.started,
+                  'updated': now, 'interval': self.interval}
+        try:
+            self.board.write(record)
+        except OSError as exc:
+            # A status directory that cannot be written to costs the sweep its table, not this run.
+            print(f'Could not record the status of file {self.file_num}: {exc}')
+
+
+def from_config(config, file_num, end=None, reader=None):
+    """The Heartbeat a config asks for on this run, or None."""
+    section = settings(config)
+    if section is None:
+        return None
+
+    return Heartbeat(StatusBoard(section['directory']), file_num, section['interval'], end=end,
+                     reader=reader)
+
+
+def start_sweep(config, total, file_nums):
+    """Record the start of a sweep, if the config keeps telemetry; see StatusBoard.start_sweep."""
+    section = settings(config)
+    if section is not None:
+        StatusBoard(section['directory']).start_sweep(total, file_nums)
+
+
+def finish(config, file_num, error_code, seconds=None):
+    """Record how a run ended, if the config keeps telemetry.
+
+    Args:
+        config: The sweep's config.
+        file_num: The run's number.
+        error_code: The run's error_code, 0 for a run that kept its results, or None for a run that
+            raised before it had one.
+        seconds: The run's wall time. Without it, the time since its first heartbeat.
+    """
+    section = settings(config)
+    if section is None:
+        return
+
+    board = StatusBoard(section['directory'])
+    now = time.time()
+    record = board.read(file_num) or {}
+    started = record.get('started', now)
+    record.update({'file_num': int(file_num), 'phase': 'done' if error_code == 0 else 'failed',
+                   'error_code': error_code, 'started': started, 'updated': now,
+                   'wall_time': seconds if seconds is not None else now - started,
+                   'interval': section['interval']})
+    try:
+        board.write(record)
+    except OSError as exc:
+        print(f'Could not record the status of file {file_num}: {exc}')
+
+
+def summarize(sweep, records, now=None):
+    """Count a sweep's runs by phase, and project when it will finish.
+
+    Args:
+        sweep: What StatusBoard.start_sweep recorded, or None.
+        records: Every run's latest record.
+        now: Seconds since the epoch.
+
+    Returns:
+        dict of 'total', 'counts' (by each of COUNTED), 'running' (the records of runs in hand),
+        'failed' and 'lost' (run numbers), 'elapsed' and 'eta' (seconds, or None) and 'rate' (runs
+        finished per hour, or None).
+    """
+    now = time.time() if now is None else now
+    counts = dict.fromkeys(COUNTED, 0)
+    running, failed, lost = [], [], []
+    for record in records:
+        phase = record.get('phase')
+        if phase in FINISHED:
+            counts[phase] += 1
+            if phase == 'failed':
+                failed.append(record['file_num'])
+        elif now - record.get('updated', 0) > STALE_INTERVALS * record.get('interval',
+                                                                           DEFAULT_INTERVAL):
+            counts['lost'] += 1
+            lost.append(record['file_num'])
+        else:
+            counts['running'] += 1
+            running.append(record)
+
+    total = sweep['total'] if sweep else len(records)
+    counts['pending'] = max(total - sum(counts.values()), 0)
+
+    finished = counts['done'] + counts['failed']
+    elapsed = now - sweep['started'] if sweep else None
+    rate = finished / elapsed if finished and elapsed and elapsed > 0 else None
+    remaining = total - finished
+    if remaining <= 0:
+        eta = 0.0
+    else:
+        eta = remaining / rate if rate else None
+
+    return {'total': total, 'counts': counts, 'running': running, 'failed': failed, 'lost': lost,
+            'elapsed': elapsed, 'eta': eta, 'rate': rate * 3600 if rate else None}
+
+
+def _duration(seconds):
+    return str(datetime.timedelta(seconds=int(seconds)))
+
+
+def _megabytes(size):
+    return f'{size / 1024 ** 2:.0f} MB' if size else '-'
+
+
+def _progress(record):
+    model_time, end = record.get('model_time'), record.get('end_time')
+    if model_time is None:
+        return '-'
+    if end:
+        return f'{model_time:.4g}/{end:.4g} yr ({100 * model_time / end:.0f}%)'
+    return f'{model_time:.4g} yr'
+
+
+def report(directory, now=None):
+    """The progress table for the sweep whose status directory this is, as text."""
+    board = StatusBoard(directory)
+    sweep = board.sweep()
+    now = time.time() if now is None else now
+
+    return table(sweep, summarize(sweep, board.records(), now), now)
+
+
+def table(sweep, summary, now=None):
+    """summarize's summary of a sweep as a progress table."""
+    now = time.time() if now is None else now
+    lines = []
+    if sweep:
+        started = datetime.datetime.fromtimestamp(sweep['started']).strftime('%Y-%m-%d %H:%M:%S')
+        lines.append(f'Sweep of {summary["total"]} runs, started {started} '
+                     f'({_duration(summary["elapsed"])} ago).')
+    else:
+        lines.append(f'{summary["total"]} runs have reported; the sweep did not record its size.')
+    for phase in COUNTED:
+        lines.append(f'  {phase:<8} {summary["counts"][phase]:>6}')
+
+    if summary['eta'] == 0:
+        lines.append('Every run has finished.')
+    elif summary['rate']:
+        finish_at = datetime.datetime.fromtimestamp(now + summary['eta']).strftime('%H:%M:%S')
+        lines.append(f'Throughput {summary["rate"]:.1f} runs/hour; projected to finish in '
+                     f'{_duration(summary["eta"])}, at {finish_at}.')
+    else:
+        lines.append('No run has finished yet, so there is no throughput to project from.')
+
+    if summary['failed']:
+        lines.append(f'Failed: {summary["failed"]}')
+    if summary['lost']:
+        lines.append(f'Lost (silent for over {STALE_INTERVALS} heartbeats): {summary["lost"]}')
+
+    if summary['running']:
+        lines.append('')
+        lines.append(f'{"run":>6}  {"phase":<8} {"model time":<28} {"wall":>9} {"RSS":>8}  host')
+        for record in summary['running']:
+            lines.append(f'{record["file_num"]:>6}  {record["phase"]:<8} {_progress(record):<28} '
+                         f'{_duration(record.get("wall_time", 0)):>9} '
+                         f'{_megabytes(record.get("rss")):>8}  {record.get("host", "")}')
+
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    """``rhea status <config> [--watch SECONDS]``: print the progress table of a running sweep.
+
+    Run from the directory the sweep was started in, as rhea itself is.
+
+    Returns:
+        The exit status: 1 where the config keeps no telemetry or nothing has been recorded.
+    """
+    import yaml
+
+    parser = argparse.ArgumentParser(prog='rhea status',
+                                     description='Show how far a sweep has got, from its heartbeats.')
+    parser.add_argument('path_to_config', type=str, help='The YAML file the sweep was started with.')
+    parser.add_argument('-w', '--watch', type=float, metavar='SECONDS',
+                        help='Print the table again every SECONDS until every run has finished.')
+    args = parser.parse_args(argv)
+
+    with open(args.path_to_config) as file:
+        section = settings(yaml.safe_load(file))
+    if section is None:
+        print('The config has no telemetry section, so its runs report nothing. Add '
+              '"telemetry: true" to it before starting the sweep.')
+        return 1
+    if not section['directory'].is_dir():
+        print(f'Nothing recorded in {section["directory"]} yet. Run from the directory the sweep '
+              'was started in.')
+        return 1
+
+    board = StatusBoard(section['directory'])
+    while True:
+        sweep = board.sweep()
+        summary = summarize(sweep, board.records())
+        print(table(sweep, summary))
+        if not args.watch or summary['eta'] == 0:
+            return 0
+        time.sleep(args.watch)
+        print()
@@ -0,0 +1,235 @@
+"""End a CrunchTope run as soon as the question the sweep is asking of it has been answered.
+
+Many sweeps only want to know whether something happens: whether a plume reaches a boundary, whether
+a mineral dissolves away. Once a snapshot has said so, everything CrunchTope computes after it is
+wasted. A ``termination_criteria`` section in the config lists the conditions that decide a run,
+under the outcome each one means:
+
+    termination_criteria:
+      success:
+        - total:Tracer > 1e-3 at x=0.95
+      failure:
+        - volume:Calcite < 1e-4 at x=0.05
+
+Each criterion is ``category[:variable] operator threshold [at axis=value[, axis=value]]``:
+
+- ``category`` is an output category as it appears in ``results`` -- the ``.tec`` file name without
+  its number, ``volume``, ``totcon``, ``total``, and so on.
+- ``variable`` is a column of it. Without one, the condition must hold for every column.
+- ``operator`` is one of ``<``, ``<=``, ``>`` and ``>=``.
+- ``at`` picks the grid cell nearest the given coordinates, in the deck's length units. Without it,
+  the condition must hold in every cell.
+
+The criteria are judged on each snapshot the streaming.SnapshotWatcher parses while the run goes on,
+in snapshot order; the first that holds, in the order the config lists them, decides the run. That is
+at most one snapshot late, since the watcher only reads a snapshot once the next has begun. The run is
+then stopped, its results parsed up to the snapshot that decided it, and the decision recorded on the
+InputFile as ``termination``. Either way the run kept its results: its ``error_code`` stays 0, and a
+``failure`` here is a finding about the model, not a failed run. A run that reaches its end first is
+left undecided, with ``termination`` None.
+
+Enabling criteria enables the watcher, as ``stream_results`` would.
+"""
+
+import operator
+import re
+
+# How often, in seconds of wall time, a waiting run's snapshots are judged.
+CHECK_INTERVAL = 5.0
+
+OUTCOMES = ('success', 'failure')
+
+OPERATORS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[Ee][-+]?\d+)?'
+
+# Species names carry +, -, ( and ), so a variable is anything up to the operator.
+_CRITERION = re.compile(r'\s*(?P<category>\w+)(?::(?P<variable>[^\s<>=]+))?\s*'
+                        r'(?P<operator><=|>=|<|>)\s*(?P<threshold>' + _NUMBER + r')'
+                        r'(?:\s+at\s+(?P<location>.+?))?\s*$')
+
+_COORDINATE = re.compile(r'\s*(?P<axis>[xyzXYZ])\s*=\s*(?P<value>' + _NUMBER + r')\s*$')
+
+
+def parse_location(text):
+    """Read ``x=0.5, y=1`` into {'X': 0.5, 'Y': 1.0}, the names parse_output gives the grid axes.
+
+    Raises:
+        ValueError: Where text is not a list of coordinates.
+    """
+    location = {}
+    for part in text.split(','):
+        match = _COORDINATE.match(part)
+        if match is None:
+            raise ValueError(f'"{part.strip()}" is not a coordinate; write x=<value>')
+        location[match['axis'].upper()] = float(match['value'])
+
+    return location
+
+
+class Criterion:
+    """One condition on a snapshot, and the outcome it decides a run with.
+
+    Args:
+        text: The condition, as written in the config.
+        outcome: 'success' or 'failure'.
+
+    Raises:
+        ValueError: Where text cannot be read, or outcome is neither.
+    """
+
+    def __init__(self, text, outcome):
+        if outcome not in OUTCOMES:
+            raise ValueError(f'termination_criteria outcome "{outcome}" is none of {OUTCOMES}')
+        match = _CRITERION.match(str(text))
+        if match is None:
+            raise ValueError(f'termination criterion "{text}" cannot be read; write '
+                             '"category[:variable] <op> <threshold> [at x=<value>]"')
+
+        self.text = str(text).strip()
+        self.outcome = outcome
+        self.category = match['category']
+        self.variable = match['variable']
+        self.operator = OPERATORS[match['operator']]
+        self.threshold = float(match['threshold'])
+        self.location = parse_location(match['location']) if match['location'] else {}
+
+    def holds(self, dataset):
+        """Whether the condition holds in one snapshot of this criterion's category.
+
+        A NaN satisfies no condition, so a run is never decided on values CrunchTope failed to compute.
+
+        Raises:
+            KeyError: Where the snapshot has no such variable or axis.
+        """
+        if self.variable is not None:
+            dataset = dataset[[self.variable]]
+        if self.location:
+            dataset = dataset.sel(self.location, method='nearest')
+
+        variables = list(dataset.data_vars)
+        if not variables:
+            return False
+
+        return all(bool(self.operator(dataset[name].values, self.threshold).all())
+                   for name in variables)
+
+
+def from_config(config):
+    """The Criteria a config lists, in the order it lists them, or None if it lists none.
+
+    Raises:
+        ValueError: Where the section is malformed, so that a typo fails before a sweep rather than
+            quietly deciding nothing.
+    """
+    section = (config or {}).get('termination_criteria')
+    if not section:
+        return None
+    if not isinstance(section, dict):
+        raise ValueError('termination_criteria maps success and failure to lists of criteria')
+
+    criteria = []
+    for outcome, texts in section.items():
+        if isinstance(texts, str):
+            texts = [texts]
+        criteria.extend(Criterion(text, outcome) for text in texts or ())
+
+    return criteria or None
+
+
+class Judge:
+    """Judge a running deck's snapshots against its criteria as the watcher parses them.
+
+    Args:
+        criteria: The Criteria, from from_config.
+        watcher: The streaming.SnapshotWatcher parsing the run's snapshots.
+        times: The deck's snapshot times, in order, for the record of when the run was decided.
+        file_offset: The watcher's file_offset: snapshot file file_offset + 1 is at times[0].
+    """
+
+    def __init__(self, criteria, watcher, times=(), file_offset=0):
+        self.criteria = criteria
+        self.watcher = watcher
+        self.times = list(times)
+        self.file_offset = file_offset
+        self.decision = None
+        self._judged = set()
+
+    def decide(self):
+        """Judge every snapshot parsed since the last call.
+
+        Snapshots are judged in order, and none past one still being parsed, so that a run is
+        decided on the first snapshot that decides it however the parses happen to finish.
+
+        Returns:
+            The decision -- a dict of 'criterion', 'outcome', 'snapshot' (the file number) and
+            'time' -- or None while the run is undecided.
+        """
+        if self.decision is not None:
+            return self.decision
+
+        # Pending first. A file that finishes between the two reads is then in both, and waits for
+        # the next call; one submitted between them is of the newest closed snapshot, which only
+        # escapes the horizon if every earlier file is already done.
+        pending = self.watcher.pending()
+        completed = self.watcher.completed()
+        horizon = min((index for _, index in pending), default=float('inf'))
+
+        for key in sorted(completed, key=lambda key: (key[1], key[0])):
+            category, index = key
+            if index >= horizon:
+                break
+            if key in self._judged:
+                continue
+            self._judged.add(key)
+            if completed[key] is None:
+                continue
+            for criterion in self.criteria:
+                if criterion.category == category and self._holds(criterion, completed[key]):
+                    self.decision = {'criterion': criterion.text, 'outcome': criterion.outcome,
+                                     'snapshot': index, 'time': self._time(index)}
+                    return self.decision
+
+        return None
+
+    def _holds(self, criterion, dataset):
+        try:
+            return criterion.holds(dataset)
+        except KeyError as exc:
+            # Wrong for every snapshot of the run, so say so once and stop asking.
+            print(f'WARNING: termination criterion "{criterion.text}" cannot be judged on '
+                  f'{criterion.category} output ({exc}); it is ignored.')
+            self.criteria = [c for c in self.criteria if c is not criterion]
+            return False
+
+    def _time(self, index):
+        position = index - self.file_offset - 1
+        if 0 <= position < len(self.times):
+            return self.times[position]
+        return None
+
+    def describe(self):
+        decision = self.decision
+        return (f'reached a {decision["outcome"]} criterion, "{decision["criterion"]}", '
+                f'at snapshot {decision["snapshot"]} (time {decision["time"]})')
+
+
+def judge(config, input_file, watcher, file_offset=0):
+    """The Judge a config asks for on this run, or None.
+
+    Args:
+        config: The sweep's config, as a dict, or None.
+        input_file: The InputFile about to be run, for its snapshot times.
+        watcher: The run's streaming.SnapshotWatcher, or None, in which case there is nothing to judge.
+        file_offset: Offset of the run's snapshot file numbers; see InputFile.get_results.
+    """
+    criteria = from_config(config)
+    if criteria is None or watcher is None:
+        return None
+
+    try:
+        times = list(input_file.output_times())
+    except (AttributeError, KeyError, TypeError, ValueError):
+        times = []
+
+    return Judge(criteria, watcher, times=times, file_offset=file_offset)
@@ -24,6 +24,7 @@ import copy
 import re
 import warnings
 
+from core import profiling
 from core.keyword_block import KEY_SEPARATOR, resolve_entry
 
 # A token is a single-quoted string, which may contain spaces ('Debye-Huckel adh'), or a run of
@@ -539,6 +540,7 @@ class Database:
 
         return found[0] if scalar else found
 
+    @profiling.timed('database')
     def modify(self, section, entry, parameter, value):
         """Rewrite one parameter in place.
 
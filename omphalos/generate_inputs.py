@@ -8,6 +8,7 @@ from pathlib import Path
 import numpy as np
 
 import core.keyword_block as kb
+from core import profiling
 import core.spatial_constructor as sc
 import omphalos.parameter_methods as pm
 
@@ -206,6 +207,30 @@ def support_files(template, config=None):
     return staged
 
 
+def staged_names(template):
+    """Return the names stage_support_files gives the files it copies, relative to the run directory.
+
+    The database lands under its basename and every auxiliary file under the relative path the deck
+    names it by. Anything that has to reproduce that layout somewhere else -- a run executing in a
+    directory of its own -- reads it from here rather than repeating the rule.
+
+    Args:
+        template: The Template object the run is generated from.
+
+    Returns:
+        list of names relative to the directory the files were staged into.
+    """
+    names = []
+
+    database = template.config.get('database')
+    if database:
+        names.append(Path(database).name)
+
+    names.extend(name for name in support_files(template) if name not in names)
+
+    return names
+
+
 def stage_support_files(template, tmp_dir):
     """Copy the database and every auxiliary data file into the run directory.
 
@@ -248,6 +273,7 @@ def get_block_changes(block, num_files, stage_num=None):
     return block_changes
 
 
+@profiling.timed('evaluate_config')
 def evaluate_config(config, stage_num=None):
     """Parse and evaluate the config file, returning a nested dictionary containing all the values needed to modify
     the InputFiles comprising the dataset.
@@ -411,6 +437,15 @@ def configure_input_files(template, tmp_dir, rhea=False, override_num=-1):
                     file_num = file_dict[file].file_num
                     file_dict[file].keyword_blocks[block_name].modify(entry, change_list[file_num], mod_pos)
 
+    # Where each run sits in parameter space, for what compares runs by that rather than by run
+    # number: rhea's adaptive timeouts learn a run's limit from the runs nearest it.
+    if override_num == -1:
+        swept = swept_values(modified_params)
+        for file in file_dict:
+            file_num = file_dict[file].file_num
+            file_dict[file].swept_values = {name: float(values[file_num])
+                                            for name, values in swept.items()}
+
     if not rhea:
         stage_support_files(template, tmp_dir)
 
@@ -424,6 +459,37 @@ def configure_input_files(template, tmp_dir, rhea=False, override_num=-1):
     return file_dict
 
 
+def swept_values(modified_params):
+    """Flatten evaluate_config's output to one number per run for each swept entry.
+
+    Entries whose values are not numbers, such as a recrystallisation option, and those with more
+    than one number per run, such as a log K over the temperature points, are left out.
+
+    Args:
+        modified_params: What evaluate_config returns.
+
+    Returns:
+        dict mapping a '/'-joined path through modified_params to an array indexed by run number.
+    """
+    flat = {}
+
+    def walk(node, path):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                walk(value, f'{path}/{key}' if path else str(key))
+            return
+        try:
+            values = np.asarray(node, dtype=float)
+        except (TypeError, ValueError):
+            return
+        if values.ndim == 1:
+            flat[path] = values
+
+    walk(modified_params, '')
+
+    return flat
+
+
 def _apply_logk_recomputation(input_file, logk_dict, run_num, quiet=False):
     """Recompute one run's log K columns, where the config sweeps a recomputation setting.
 
@@ -745,7 +811,7 @@ def _configure_restart_directives(input_file, run_num, stage_num, num_stages,
     """Configure restart and save_restart directives in the RUNTIME block.
 
     Stage 0 starts cold unless the config names a ``restart_file``. That file is copied into
-    every run directory by ``rhea/prep_directories.sh``, but nothing referenced it: stage 0's
+    every run directory by rhea, but nothing referenced it: stage 0's
     ``restart`` keyword was deleted unconditionally, so a staged spinup was ignored and the
     chain silently recomputed it.
 
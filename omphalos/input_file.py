@@ -5,6 +5,7 @@ from pathlib import Path
 import pandas as pd
 import xarray as xr
 
+from core import profiling
 from core.file_methods import netcdf_name, parse_time_series
 from core.keyword_block import KEY_SEPARATOR, snapshot_times, strip_entry_key, time_series_files
 from omphalos import file_methods as fm
@@ -13,6 +14,10 @@ from omphalos import file_methods as fm
 # Marks a line continued on the next one.
 CONTINUATION = '&'
 
+# Snapshot categories get_results does not read.
+SKIPPED_CATEGORIES = ('MineralPercent', 'velocityx', 'velocityy', 'velocityz', 'MineralVolfraction',
+                      'gases_conc', 'Temperature')
+
 # CrunchTope reads at most this many characters from a physical line.
 MAX_LINE_LENGTH = 132
 
@@ -69,7 +74,7 @@ class InputFile:
         self.aqueous_database = aqueous_database
         self.catabolic_pathways = catabolic_pathways
         # The thermodynamic database, carried per run so a sweep can edit it. None where the config
-        # names no database, which leaves the file prep_directories.sh copied in place.
+        # names no database, which leaves the file rhea staged in place.
         self.database = database
         # The settings a per-run log K recomputation was done with, or None where there was none.
         # A .dbs has no pressure row, so a database recomputed at depth is indistinguishable from
@@ -82,6 +87,8 @@ class InputFile:
         # 3 = charge balance error
         # 4 = singular matrix encountered
         self.error_code = 0
+        # What a termination criterion decided the run with, if one stopped it; see omphalos/criteria.py.
+        self.termination = None
         self.later_inputs = restarts
         self.stage_num = None  # Stage index for staged restart runs
 
@@ -158,6 +165,7 @@ class InputFile:
                 self.condition_blocks[condition].parameters.update(
                     {entry: contents[entry]})
 
+    @profiling.timed('print')
     def print(self):
         """Writes out a populated input file to a CrunchTope readable *.in file.
         """
@@ -341,13 +349,10 @@ class InputFile:
 
         return tuple(entry for entry in block.contents if entry != keyword)
 
-    def get_results(self, tmp_dir, file_offset=0):
-        """Parse CrunchTope output files and store results.
+    def output_times(self):
+        """The times of every snapshot the run writes, in order, as floats.
 
-        Args:
-            tmp_dir: Directory containing output files.
-            file_offset: Offset for file numbering (used in staged restarts where
-                files from previous stages have already been written). Default 0.
+        Includes those of any later input files, which continue the numbering of the snapshot files.
         """
         # Either spelling of the snapshot-times keyword; decks in the wild use both.
         times = list(snapshot_times(self.keyword_blocks['OUTPUT'].contents))
@@ -359,14 +364,32 @@ class InputFile:
                     self.later_inputs[file].keyword_blocks['OUTPUT'].contents)
                 times.extend(later_times)
 
-        # Convert time strings in raw input file to floats and make into pd.Index object.
-        times = [float(a) for a in times]
-        times = pd.Index(data=times, name='time')
+        # Convert time strings in raw input file to floats.
+        return [float(a) for a in times]
+
+    def get_results(self, tmp_dir, file_offset=0, parsed=None, through=None):
+        """Parse CrunchTope output files and store results.
+
+        Args:
+            tmp_dir: Directory containing output files.
+            file_offset: Offset for file numbering (used in staged restarts where
+                files from previous stages have already been written). Default 0.
+            parsed: Datasets already parsed while the run was going, keyed by (category, file
+                number) -- what a streaming.SnapshotWatcher returns. Anything absent is parsed here.
+            through: The number of the last snapshot file to read, for a run stopped part way by a
+                termination criterion, whose later files may be half written. Default None reads
+                every snapshot the deck asks for.
+        """
+        if parsed is None:
+            parsed = {}
+
+        times = pd.Index(data=self.output_times(), name='time')
+        if through is not None:
+            times = times[:max(through - file_offset, 0)]
 
-        bad_cats = ['MineralPercent', 'velocityx', 'velocityy', 'velocityz', 'MineralVolfraction', 'gases_conc', 'Temperature']
         categories = fm.data_cats(tmp_dir)
-        
-        for bad_cat in bad_cats:
+
+        for bad_cat in SKIPPED_CATEGORIES:
             if bad_cat in categories:
                 categories.remove(bad_cat)
 
@@ -382,6 +405,10 @@ class InputFile:
             leading_names = self._surface_sites() if category == 'surface' else ()
 
             for i, time in enumerate(times):
+                key = (category, i + 1 + file_offset)
+                if key in parsed:
+                    ds_list.append(parsed[key])
+                    continue
                 try:
                     ds = fm.parse_output(tmp_dir, category, i + 1 + file_offset,
                                          leading_names=leading_names)
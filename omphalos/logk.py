@@ -34,6 +34,7 @@ import math
 import re
 import warnings
 
+from core import profiling
 from omphalos.database import HEADER_LINES, tokenise
 from omphalos.isotopes import suspected_isotope_pairs
 
@@ -614,6 +615,7 @@ class LogKCalculator:
                 )
             return None
 
+    @profiling.timed('logk')
     def recompute(self, database, sections=None, reactions='all', on_unmatched='warn'):
         """Rewrite a database's log K columns in place.
 
@@ -2,6 +2,7 @@
 
 if __name__ == '__main__':
     import argparse
+    import os
     import sys
     from pathlib import Path
 
@@ -20,8 +21,18 @@ if __name__ == '__main__':
     parser.add_argument('config_path', type=str, help='YAML file containing options.')
     parser.add_argument('output_name', type=str, help='Output file name.')
     parser.add_argument('-d', '--debug', action='store_true')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Number of runs to execute at once, each in tmp/run<N>/ (default: 1).')
+    parser.add_argument('-s', '--supervise', action='store_true',
+                        help='Drive the --workers runs from this one process rather than a process pool.')
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Run every simulation, even where the config's run_cache holds its results.")
     args = parser.parse_args()
 
+    # Set in the environment rather than the config, so that pool workers see it too.
+    if args.no_cache:
+        os.environ['OMPHALOS_NO_CACHE'] = '1'
+
     tmp_dir = Path('tmp')
     tmp_dir.mkdir(exist_ok=True)
 
@@ -29,6 +40,10 @@ if __name__ == '__main__':
     with open(args.config_path) as file:
         config = yaml.safe_load(file)
 
+    # From here, with 'profiling: true', the sweep's phases are timed; see core/profiling.py.
+    from core import profiling
+    profiling.configure(config)
+
     # Import template file.
     print('*** Importing template file ***')
     template = Template(config)
@@ -39,10 +54,20 @@ if __name__ == '__main__':
     import omphalos.crunch_keywords as ck
     ck.check_deck(template.keyword_blocks['RUNTIME'].contents)
 
+    # Read the termination criteria now, so that one that cannot be read stops the sweep here rather
+    # than every run.
+    from omphalos import criteria
+    criteria.from_config(config)
+
     # Get a dictionary of input files.
     print('*** Generating input files ***')
     file_dict = gi.configure_input_files(template, str(tmp_dir) + '/')
 
+    # Turn away the runs that cannot succeed, before any of them is run. They stay in file_dict,
+    # under their run numbers, with the reasons; see omphalos/validate.py.
+    from omphalos import validate
+    validate.from_config(config, file_dict, template)
+
     if args.debug:
         print("*** DEBUG MODE: FILES NOT RUN ***")
         # Number the files before the extension, and take only the template's file name: appending the
@@ -57,11 +82,30 @@ if __name__ == '__main__':
         sys.exit()
     else:
         print('*** Begin running input files... ***')
-        run.run_dataset(file_dict, str(tmp_dir) + '/', config['timeout'])
+        # A fresh runtime ledger for adaptive timeouts, where the runs will look for it: beside
+        # their run directories, which are tmp/run<N> unless the runs go one at a time in tmp/ itself.
+        if config.get('adaptive_timeout'):
+            from omphalos import timeouts
+            from core import scratch
+            isolated = args.workers > 1 or args.supervise or scratch.settings(config) is not None
+            first_run = run.run_directory(tmp_dir, 0) if isolated else tmp_dir
+            timeouts.start_ledger(timeouts.ledger_dir(first_run), file_dict)
+        from core import telemetry
+        telemetry.start_sweep(config, len(file_dict), range(len(file_dict)))
+        # Runs executing side by side each read their own copy of what configure_input_files staged
+        # into tmp/, so say which files those are.
+        if args.supervise:
+            from omphalos import supervisor
+            dispatch = supervisor.run_dataset
+        else:
+            dispatch = run.run_dataset
+        dispatch(file_dict, str(tmp_dir) + '/', config['timeout'], workers=args.workers,
+                 shared_files=gi.staged_names(template), config=config)
 
     # Convert file dict to single xarray for saving as a netCDF4
     print('*** Writing results to results.nc ***')
-    fm.dataset_to_netcdf(file_dict)
+    with profiling.phase('compile'):
+        fm.dataset_to_netcdf(file_dict)
 
     # Delete data from the InputFile object.
     # I know this seems a little round-about, but either way when collecting the data the data needs to be assembled
@@ -74,5 +118,9 @@ if __name__ == '__main__':
 
     # Pickle the data.
     print(f"*** Writing InputFile record to {args.output_name} ***")
-    fm.pickle_data_set(file_dict, args.output_name)
+    with profiling.phase('pickle'):
+        fm.pickle_data_set(file_dict, args.output_name)
+    if profiling.enabled():
+        print(profiling.breakdown([getattr(file_dict[file], 'timings', None) for file in file_dict],
+                                  profiling.sweep_timings()))
     print("*** Run complete ***")
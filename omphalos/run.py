@@ -1,14 +1,20 @@
 """Methods to handle invoking CrunchTope on an InputFile object."""
 
 import subprocess
-import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 import numpy as np
 import pexpect as pexp
 import xarray as xr
 
+from core import lifecycle
+from core import profiling
+from core import scratch
+from core import solver_log
 from core import spatial_constructor as sc
+from core import staging
 import core.keyword_block as kb
 from core.file_methods import data_cats
 from core.keyword_block import SNAPSHOT_TIME_KEYWORDS, snapshot_times
@@ -80,6 +86,26 @@ CT_ERROR_LABELS = {NAN_PATTERN: 'NaN in a printed value'}
 # with an index into CT_ERROR_PATTERNS as that list grows.
 NO_OUTPUT_ERROR_CODE = -1
 
+# error_code for a run stall detection killed because its timestep had collapsed; see omphalos/stall.py.
+STALLED_ERROR_CODE = -2
+
+# error_code for a run stopped at a timeout learned from the sweep's other runs, shorter than the
+# config's; see omphalos/timeouts.py. Kept apart from 1 so that these runs can be given another go.
+ADAPTIVE_TIMEOUT_ERROR_CODE = -3
+
+# What waiting on a run returns when a termination criterion decided it; see omphalos/criteria.py.
+# Never left as an error_code: the run is stopped on purpose and keeps its results, so it ends at 0.
+CRITERION_MET = -4
+
+# How much of the child's output pexpect reads at a time, its own default, and how much of the newest
+# it searches for CT_ERROR_PATTERNS after each read. Without a window pexpect searches everything the
+# run has printed so far, every time it reads more: the whole output is held in memory and the cost
+# of a run's watching grows with the square of what it prints. The window must hold a whole read,
+# or the start of a long one would go unsearched, and then some, so that a pattern split across two
+# reads still matches.
+READ_SIZE = 2000
+SEARCH_WINDOW = 2 * READ_SIZE
+
 # Values CrunchTope's read_logical accepts as true.
 _TRUE_TOKENS = ('true', 'yes', 'on', 't', 'y')
 
@@ -167,18 +193,46 @@ def _get_database_name(input_file):
     return input_file.keyword_blocks['RUNTIME'].contents.get('database', [None])[0]
 
 
-def _print_aux_files(input_file, tmp_path):
+def _write_aux_file(printable, path, store=None):
+    """Write one auxiliary file into a run directory, replacing whatever is there.
+
+    What is there may be a hard link to a copy every run shares (core/staging.py), so it is unlinked
+    rather than written through: opening it for writing would change every run's at once.
+
+    Args:
+        printable: Anything with a print(path) method: a Database, Namelist or pathways file.
+        path: Where the run reads it.
+        store: A core.staging.ContentStore to stage it through, so that runs whose files come out
+            identical share one copy. None writes it in place.
+    """
+    if store is not None:
+        store.write(printable.print, path)
+        return
+
+    path = Path(path)
+    if path.is_symlink() or path.exists():
+        path.unlink()
+    printable.print(str(path))
+
+
+@profiling.timed('aux_files')
+def _print_aux_files(input_file, tmp_path, store=None):
     """Write auxiliary database and pathway files to the run directory.
 
     Every execution path -- sequential, rhea non-staged and staged restart -- comes through here, so
-    a swept database written at this one point reaches all three. rhea/prep_directories.sh has
-    already copied the template's database in; an edited one overwrites it under the same name.
+    a swept database written at this one point reaches all three. rhea has already staged the
+    template's database in; an edited one replaces it under the same name.
 
     A per-run log K recomputation is written out beside the database as LOGK_RECORD. It has to be:
     a CrunchTope database has no pressure row, so the file this writes is byte-comparable between a
     run at 500 bar and one at saturation, and rhea's worker rebuilds its InputFile from the run
     directory rather than from the object that carried the settings. Without the sidecar the
     pressure would be gone by the time anything came to record it.
+
+    Args:
+        input_file: The InputFile whose files to write.
+        tmp_path: The run directory.
+        store: Passed to _write_aux_file; rhea stages every run's files through one.
     """
     record_path = Path(tmp_path) / LOGK_RECORD
 
@@ -188,42 +242,147 @@ def _print_aux_files(input_file, tmp_path):
         with open(record_path, 'w') as record:
             json.dump(input_file.logk_settings, record, indent=2, sort_keys=True)
     elif record_path.exists():
-        # rhea/prep_directories.sh does `mkdir run$N` and never clears it, so a directory reused by
-        # a later sweep keeps whatever the last one left. A sidecar from a sweep that varied the
-        # pressure would otherwise be read back as this run's, and recorded as a pressure that never
-        # applied. Nothing swept means there is nothing to record.
+        # A run directory reused by a later sweep may keep whatever the last one left. A sidecar
+        # from a sweep that varied the pressure would otherwise be read back as this run's, and
+        # recorded as a pressure that never applied. Nothing swept means there is nothing to record.
         record_path.unlink()
 
     if input_file.aqueous_database:
         kinetic_db = _get_kinetic_db_name(input_file)
         if kinetic_db:
-            input_file.aqueous_database.print(str(tmp_path / kinetic_db))
+            _write_aux_file(input_file.aqueous_database, tmp_path / kinetic_db, store)
     if input_file.catabolic_pathways:
-        input_file.catabolic_pathways.print(str(tmp_path / _get_catabolic_file_name(input_file)))
+        _write_aux_file(input_file.catabolic_pathways,
+                        tmp_path / _get_catabolic_file_name(input_file), store)
     if input_file.database is not None:
         database_name = _get_database_name(input_file)
         if database_name:
-            input_file.database.print(str(tmp_path / database_name))
+            _write_aux_file(input_file.database, tmp_path / database_name, store)
 
 
-def run_dataset(file_dict, tmp_dir, timeout):
+def run_dataset(file_dict, tmp_dir, timeout, workers=1, shared_files=(), config=None):
     """Run all input files in the dataset.
 
+    With one worker the runs go one after another in tmp_dir itself, as they always have. With more,
+    or with a ``scratch`` section in the config (see core/scratch.py), each run gets a directory of
+    its own, tmp_dir/run<N>, and with more workers runs execute side by side in a process pool.
+    They cannot share tmp_dir: CrunchTope names its output by category and snapshot number only,
+    so two runs in one directory write the same totcon1.tec, and a run parses whichever of them
+    was written last.
+
     Args:
         file_dict: Dictionary of InputFile objects
         tmp_dir: Temporary directory for output files
         timeout: Timeout in seconds for each simulation
+        workers: Number of runs to execute at once.
+        shared_files: Names, relative to tmp_dir, of the files every run reads from its own
+            directory -- what generate_inputs.staged_names returns. Copied into each run's
+            directory before it starts. Unused with one worker and no scratch.
+        config: The sweep's config, passed on to crunchtope.
 
     Returns:
         Updated file_dict with results
     """
-    for file_num, entry in enumerate(file_dict):
-        file_dict[entry] = input_file(file_dict[entry], file_num, tmp_dir, timeout)
+    if workers <= 1 and scratch.settings(config) is None:
+        for file_num, entry in enumerate(file_dict):
+            file_dict[entry] = input_file(file_dict[entry], file_num, tmp_dir, timeout, config=config)
+
+        return file_dict
+
+    # A run placed in scratch copies back what the config keeps into the directory it came from,
+    # and tmp_dir is shared by every run, so placed runs get a directory each even one at a time.
+    if workers <= 1:
+        for file_num, entry in enumerate(file_dict):
+            file_dict[entry] = _run_isolated(file_dict[entry], file_num, tmp_dir, timeout,
+                                             tuple(shared_files), config)
+
+        return file_dict
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_run_isolated, file_dict[entry], file_num, tmp_dir, timeout,
+                        tuple(shared_files), config): entry
+            for file_num, entry in enumerate(file_dict)
+        }
+
+        # Each run comes back as the InputFile the worker filled in, which is a copy: the one in
+        # file_dict never left this process. Put it back under its own key, in whatever order the
+        # runs happen to finish.
+        for future in as_completed(futures):
+            file_dict[futures[future]] = future.result()
 
     return file_dict
 
 
-def input_file(input_file, file_num, tmp_dir, timeout):
+def run_directory(tmp_dir, file_num):
+    """The directory a run executes in when runs execute side by side."""
+    return Path(tmp_dir) / f'run{file_num}'
+
+
+def _run_isolated(run_file, file_num, tmp_dir, timeout, shared_files, config=None):
+    """Run one input file in a directory of its own, with its own copy of the shared files.
+
+    Module level so that a process pool can pickle it. Where the config asks for scratch, the run
+    directory is only assembled here and the run itself happens in a copy of it; see core/scratch.py.
+    """
+    from omphalos import validate
+
+    # Before a directory is made for it, which a run that is not going to run has no use for.
+    if validate.is_rejected(run_file):
+        return input_file(run_file, file_num, tmp_dir, timeout, config=config)
+    profiling.configure(config)
+    run_path = _make_run_directory(tmp_dir, file_num, shared_files,
+                                   modes=staging.modes_from_config(config))
+
+    with scratch.placement(run_path, config, shared=sweep_dirs(config)) as work:
+        run_file = input_file(run_file, file_num, work, timeout, config=config)
+    # Its results are parsed, so the directory can go the way the config says; see core/lifecycle.py.
+    lifecycle.finished(run_path, config, getattr(run_file, 'error_code', 0))
+
+    return run_file
+
+
+def sweep_dirs(config):
+    """What a run placed in scratch must still share with the rest of its sweep, by name.
+
+    The adaptive timeout's runtime ledger is looked for beside the run directory, and a run that
+    found an empty one there would neither learn from the sweep nor teach it. Everything else kept
+    beside the run directories -- the staging store -- is as good in scratch as anywhere.
+    """
+    from omphalos import timeouts
+
+    return (timeouts.LEDGER_DIR,) if (config or {}).get('adaptive_timeout') else ()
+
+
+def _make_run_directory(tmp_dir, file_num, shared_files, modes=staging.LINK_MODES):
+    """Create tmp_dir/run<N> and link the shared files into it.
+
+    Linked rather than copied where the filesystem allows (see core/staging.py); every run only
+    reads them, and _print_aux_files replaces rather than writes through the one it rewrites.
+
+    Args:
+        tmp_dir: The directory the shared files were staged into.
+        file_num: The run's number.
+        shared_files: Names of the files, relative to tmp_dir.
+        modes: Link modes to try, in order.
+
+    Returns:
+        The run directory.
+    """
+    tmp_path = Path(tmp_dir)
+    run_path = run_directory(tmp_path, file_num)
+    run_path.mkdir(parents=True, exist_ok=True)
+
+    for name in shared_files:
+        # generate_inputs.stage_support_files has already reported anything it could not stage.
+        if not (tmp_path / name).is_file():
+            continue
+        staging.place(tmp_path / name, run_path / name, modes)
+
+    return run_path
+
+
+def input_file(input_file, file_num, tmp_dir, timeout, config=None):
     """Run a single input file through CrunchTope.
 
     Args:
@@ -231,25 +390,57 @@ def input_file(input_file, file_num, tmp_dir, timeout):
         file_num: File number for logging
         tmp_dir: Temporary directory for output
         timeout: Timeout in seconds
+        config: The sweep's config, passed on to crunchtope.
 
     Returns:
         Updated InputFile with results
     """
+    from core import telemetry
+    from omphalos import validate
+
+    # A run validation turned away is not run; it keeps its place, its reasons and its error_code,
+    # and is counted among the failures by `rhea status`, which would otherwise wait on it forever.
+    if validate.is_rejected(input_file):
+        print(f'File {file_num} not run, rejected by validation: {"; ".join(input_file.invalid)}')
+        telemetry.finish(config, file_num, input_file.error_code, 0.0)
+        return input_file
+
+    with profiling.collect() as timings:
+        tmp_path = _write_run_files(input_file, tmp_dir)
+
+        started = time.monotonic()
+        crunchtope(input_file, file_num, timeout, tmp_path, config=config)
+    telemetry.finish(config, file_num, getattr(input_file, 'error_code', 0),
+                     time.monotonic() - started)
+    if profiling.enabled():
+        input_file.timings = timings
+
+    return input_file
+
+
+def _write_run_files(input_file, tmp_dir):
+    """Print the deck, any later decks and the per-run auxiliary files into tmp_dir.
+
+    Returns:
+        tmp_dir as a resolved Path, which is what crunchtope is then run in.
+    """
     tmp_path = Path(tmp_dir).resolve()
 
-    input_file.path = tmp_path / input_file.path
+    # The deck is written into tmp_dir under its own name. Joining the path as given put a template
+    # named by an absolute path back over the template itself, since joining an absolute path onto
+    # a directory yields the absolute path -- and crunchtope runs the basename from tmp_dir anyway.
+    input_file.path = tmp_path / Path(input_file.path).name
     input_file.print()
 
     if input_file.later_inputs:
         for name in input_file.later_inputs:
-            input_file.later_inputs[name].path = tmp_path / input_file.later_inputs[name].path
+            later_path = Path(input_file.later_inputs[name].path).name
+            input_file.later_inputs[name].path = tmp_path / later_path
             input_file.later_inputs[name].print()
 
     _print_aux_files(input_file, tmp_path)
 
-    crunchtope(input_file, file_num, timeout, tmp_path)
-
-    return input_file
+    return tmp_path
 
 
 def _terminate(process):
@@ -266,7 +457,7 @@ def _terminate(process):
         print(f'Could not close CrunchTope process: {exc}')
 
 
-def crunchtope(input_file, file_num, timeout, tmp_dir, file_offset=0):
+def crunchtope(input_file, file_num, timeout, tmp_dir, file_offset=0, config=None):
     """Execute CrunchTope on an input file.
 
     Args:
@@ -275,6 +466,210 @@ def crunchtope(input_file, file_num, timeout, tmp_dir, file_offset=0):
         timeout: Timeout in seconds
         tmp_dir: Working directory (Path object)
         file_offset: Offset for TecPlot file numbering (used in staged restarts).
+        config: The sweep's config, for the options that change how a run is watched
+            (``stream_results``, ``stall_detection``, ``adaptive_timeout``,
+            ``termination_criteria``). None runs with every option at its default.
+    """
+    from omphalos import criteria, stall, timeouts
+
+    cache, key = _cache_lookup(input_file, file_num, tmp_dir, config)
+    if cache is not None and key is None:
+        return input_file
+
+    adaptive = timeouts.from_config(config, tmp_dir)
+    limit = adaptive.limit(file_num, timeout) if adaptive else timeout
+
+    started = time.monotonic()
+    with profiling.phase('solver'):
+        spawned = time.time_ns()
+        process = _spawn(input_file, limit, tmp_dir)
+        watcher = _start_watcher(input_file, tmp_dir, file_offset, config, since=spawned)
+        monitor = stall.from_config(config, input_file, limit)
+        judge = criteria.judge(config, input_file, watcher, file_offset)
+        beat = _start_heartbeat(config, file_num, input_file, process, monitor)
+        # Nothing is read from the child until expect is called, so what it prints meanwhile waits
+        # in the pty for the log to be in place.
+        log = solver_log.from_config(config, tmp_dir, file_num, reader=_output_reader(monitor, beat),
+                                     append=file_offset > 0)
+        process.logfile_read = log
+
+        expect_list = [pexp.EOF, pexp.TIMEOUT] + CT_ERROR_PATTERNS
+        if monitor is None and judge is None and beat is None:
+            error_code = process.expect(expect_list)
+        else:
+            error_code = _expect_watching(process, expect_list, limit, file_num, monitor, judge,
+                                          beat)
+    if error_code == 1 and limit < timeout:
+        error_code = ADAPTIVE_TIMEOUT_ERROR_CODE
+
+    if beat is not None:
+        beat.pulse('parsing')
+    # What the watcher had not already parsed while the solver ran; that part is in 'solver'.
+    with profiling.phase('parse'):
+        parsed = watcher.stop() if watcher else None
+        _record_outcome(input_file, file_num, error_code, process, tmp_dir, file_offset,
+                        parsed=parsed, decision=judge.decision if judge else None, log=log)
+    _record_runtime(adaptive, file_num, time.monotonic() - started, input_file)
+    # A decided run's results stop short, so they are not the results of the deck.
+    if judge is None or judge.decision is None:
+        _cache_store(cache, key, input_file)
+
+    return input_file
+
+
+def _start_heartbeat(config, file_num, input_file, process, monitor):
+    """The telemetry.Heartbeat a config asks for on this run, already beating, or None.
+
+    It reports the model time the stall monitor reads, where there is one, and otherwise reads the
+    output for itself.
+    """
+    from core import telemetry
+    from omphalos import stall
+
+    if telemetry.settings(config) is None:
+        return None
+
+    reader = monitor if monitor is not None else stall.ProgressReader()
+    beat = telemetry.from_config(config, file_num, end=stall.end_time(input_file), reader=reader)
+    beat.follow(process.pid)
+
+    return beat
+
+
+def _output_reader(monitor, beat):
+    """What reads a run's output as it arrives, besides its log: the stall monitor or the heartbeat's."""
+    return monitor if monitor is not None else getattr(beat, 'reader', None)
+
+
+def _check_interval(monitor, judge, beat=None):
+    """Seconds between looks at a run that is watched by monitor, judge, beat, or any of them."""
+    from omphalos import criteria, stall
+
+    intervals = [module.CHECK_INTERVAL
+                 for module, watching in ((stall, monitor), (criteria, judge)) if watching is not None]
+    if beat is not None:
+        intervals.append(beat.interval)
+
+    return min(intervals)
+
+
+def _expect_watching(process, expect_list, timeout, file_num, monitor=None, judge=None, beat=None):
+    """Wait on the child as expect does, but a slice at a time, looking at how it is doing between.
+
+    pexpect keeps what it has read across a slice that times out, so a pattern is matched exactly as
+    one long expect would match it; only the overall timeout is kept here rather than by pexpect.
+    monitor and beat read the output through the child's logfile_read, which crunchtope has set.
+
+    Args:
+        monitor: A stall.StallMonitor to read the output and say whether the run has stalled, or None.
+        judge: A criteria.Judge to say whether the run's snapshots have decided it, or None.
+        beat: A telemetry.Heartbeat to write the run's status every interval, or None.
+
+    Returns:
+        What expect would have returned, STALLED_ERROR_CODE, or CRITERION_MET.
+    """
+    interval = _check_interval(monitor, judge, beat)
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return 1
+        error_code = process.expect(expect_list, timeout=min(interval, remaining))
+        if error_code != 1:
+            return error_code
+        if judge is not None and judge.decide() is not None:
+            print(f'File {file_num} {judge.describe()}.')
+            return CRITERION_MET
+        if monitor is not None and monitor.stalled():
+            print(f'File {file_num} {monitor.describe()}.')
+            return STALLED_ERROR_CODE
+        if beat is not None and beat.due():
+            beat.pulse()
+
+
+def _record_runtime(adaptive, file_num, seconds, input_file):
+    """Add a finished run to the adaptive timeout ledger, if the config keeps one."""
+    if adaptive is None:
+        return
+
+    try:
+        adaptive.record(file_num, seconds, getattr(input_file, 'error_code', 0))
+    except OSError as exc:
+        # An unwritable ledger costs the sweep its learned limits, not this run its results.
+        print(f'Could not record the runtime of file {file_num}: {exc}')
+
+
+def _cache_lookup(input_file, file_num, tmp_dir, config):
+    """Answer a run from the run cache, if the config enables one and it holds this run.
+
+    Returns:
+        (cache, key). cache is None where there is no cache to consult, or this run cannot be
+        cached. On a hit the results are restored onto input_file and key is None; on a miss, key
+        is what to store the results under once the run has finished.
+    """
+    from omphalos import run_cache
+
+    cache = run_cache.from_config(config)
+    if cache is None or not run_cache.cacheable(input_file):
+        return None, None
+
+    key = cache.key(input_file, tmp_dir, crunch_dir)
+    results = cache.load(key)
+    if results is None:
+        return cache, key
+
+    input_file.results = results
+    input_file.error_code = 0
+    print(f'File {file_num} restored from the run cache.')
+    print(f'File {file_num} complete.')
+
+    return cache, None
+
+
+def _cache_store(cache, key, input_file):
+    """Store a finished run's results in the run cache, if it succeeded and there is one."""
+    if cache is None or key is None or input_file.error_code != 0:
+        return
+
+    try:
+        cache.store(key, input_file.results)
+    except OSError as exc:
+        # A full or unwritable cache costs a future rerun, not this run's results.
+        print(f'Could not store results in the run cache: {exc}')
+
+
+def _start_watcher(input_file, tmp_dir, file_offset, config, since=None):
+    """Start parsing the run's snapshots as they are written, if the config asks for it.
+
+    Args:
+        since: When the run was spawned, in nanoseconds since the epoch. Snapshot files older than
+            that are a previous run's in the same directory; see streaming.SnapshotWatcher.
+
+    Returns:
+        The running streaming.SnapshotWatcher, or None.
+    """
+    # Termination criteria are judged on the snapshots the watcher parses, so they need one too.
+    config = config or {}
+    if not (config.get('stream_results', False) or config.get('termination_criteria')):
+        return None
+
+    from omphalos.input_file import SKIPPED_CATEGORIES
+    from omphalos.streaming import SnapshotWatcher
+
+    try:
+        leading_names = {'surface': input_file._surface_sites()}
+    except (AttributeError, KeyError):
+        leading_names = {}
+
+    return SnapshotWatcher(tmp_dir, file_offset=file_offset, skip=SKIPPED_CATEGORIES,
+                           leading_names=leading_names, since=since).start()
+
+
+def _spawn(input_file, timeout, tmp_dir):
+    """Start CrunchTope on an input file that has already been written into tmp_dir.
+
+    Returns:
+        The pexpect child, with no logfile set, searching only SEARCH_WINDOW of its newest output.
     """
     # Name only, not the path: pexpect splits the command string on whitespace, so an absolute
     # path containing a space reaches CrunchTope truncated at the first one -- it reports
@@ -282,12 +677,30 @@ def crunchtope(input_file, file_num, timeout, tmp_dir, file_offset=0):
     # overrun CrunchTope's own fixed-length buffer. The deck always sits directly in tmp_dir and
     # pexpect is already given cwd=tmp_dir, so the basename resolves and is the shortest form.
     command = f'{crunch_dir} {Path(input_file.path).name}'
-    process = pexp.spawn(command, timeout=timeout, cwd=str(tmp_dir), encoding='latin-1')
-    process.logfile = sys.stdout
 
-    expect_list = [pexp.EOF, pexp.TIMEOUT] + CT_ERROR_PATTERNS
-    error_code = process.expect(expect_list)
+    return pexp.spawn(command, timeout=timeout, cwd=str(tmp_dir), encoding='latin-1',
+                      maxread=READ_SIZE, searchwindowsize=SEARCH_WINDOW)
+
+
+def _record_outcome(input_file, file_num, error_code, process, tmp_dir, file_offset=0, parsed=None,
+                    decision=None, log=None):
+    """Act on how a CrunchTope child ended: parse its output, or flag the run and kill the child.
 
+    Shared by crunchtope, which waits on one child, and the supervisor, which watches many.
+
+    Args:
+        input_file: InputFile object that was run
+        file_num: File number for logging
+        error_code: Index into [EOF, TIMEOUT] + CT_ERROR_PATTERNS of what ended the run, or
+            STALLED_ERROR_CODE, ADAPTIVE_TIMEOUT_ERROR_CODE or CRITERION_MET.
+        process: The pexpect child.
+        tmp_dir: Working directory the child ran in.
+        file_offset: Offset for TecPlot file numbering (used in staged restarts).
+        parsed: Snapshots already parsed while the run was going; see InputFile.get_results.
+        decision: For CRITERION_MET, what criteria.Judge decided.
+        log: The run's solver_log.SolverLog, closed here and summarised in the run's last line, or
+            None.
+    """
     if error_code == 0:
         # EOF alone does not mean success: most of CrunchTope's fatal paths print a message and STOP,
         # which looks identical from here. If the deck asked for snapshots and none were written, the
@@ -297,21 +710,49 @@ def crunchtope(input_file, file_num, timeout, tmp_dir, file_offset=0):
                   'check its .out file for a CrunchTope error message.')
             input_file.error_code = NO_OUTPUT_ERROR_CODE
         else:
-            input_file.get_results(str(tmp_dir), file_offset=file_offset)
+            if parsed:
+                input_file.get_results(str(tmp_dir), file_offset=file_offset, parsed=parsed)
+            else:
+                input_file.get_results(str(tmp_dir), file_offset=file_offset)
             print(f'File {file_num} outputs recorded.')
+    elif error_code == CRITERION_MET:
+        # Stopped before the files after the deciding snapshot are read: the newest of them may be
+        # half written, and would be parsed as if it were whole.
+        _terminate(process)
+        input_file.get_results(str(tmp_dir), file_offset=file_offset, parsed=parsed or {},
+                               through=decision['snapshot'])
+        input_file.termination = decision
+        input_file.error_code = 0
+        print(f'File {file_num} outputs recorded up to snapshot {decision["snapshot"]}; '
+              f'outcome: {decision["outcome"]}.')
     elif error_code == 1:
         print(f'File {file_num} timed out.')
         input_file.error_code = error_code
         _terminate(process)
+    elif error_code == ADAPTIVE_TIMEOUT_ERROR_CODE:
+        print(f"File {file_num} ran past the timeout learned from the sweep's other runs; "
+              'rhea --resume gives it the full timeout.')
+        input_file.error_code = error_code
+        _terminate(process)
+    elif error_code == STALLED_ERROR_CODE:
+        print(f'File {file_num} stalled: its timestep collapsed and it would have overrun its budget.')
+        input_file.error_code = error_code
+        _terminate(process)
     else:
         pattern = CT_ERROR_PATTERNS[error_code - 2]
         print(f'Error in file {file_num}: "{CT_ERROR_LABELS.get(pattern, pattern)}".')
         input_file.error_code = error_code
         _terminate(process)
 
-    print(f'File {file_num} complete.')
-
-    return input_file
+    if log is None:
+        print(f'File {file_num} complete.')
+        return
+    succeeded = error_code in (0, CRITERION_MET) and input_file.error_code != NO_OUTPUT_ERROR_CODE
+    try:
+        print(log.summary(file_num, succeeded))
+    except OSError as exc:
+        # A log that cannot be compressed or removed costs disk space, not this run its results.
+        print(f'File {file_num} complete; could not tidy its solver log: {exc}')
 
 
 def clean_dir(tmp_dir, file_name):
@@ -506,7 +947,7 @@ def _spinup_file_offset(stage_file, tmp_path):
         return 0
 
 
-def run_staged_input(stages_dict, run_num, tmp_dir, timeout):
+def run_staged_input(stages_dict, run_num, tmp_dir, timeout, config=None):
     """Run stages sequentially for a single parallel run.
 
     Staged input files are already printed by rhea/main.py, so this function
@@ -517,6 +958,7 @@ def run_staged_input(stages_dict, run_num, tmp_dir, timeout):
         run_num: The parallel run number.
         tmp_dir: Temporary directory for running input files.
         timeout: Timeout for CrunchTope execution.
+        config: The sweep's config, passed on to crunchtope.
 
     Returns:
         InputFile: The first stage InputFile with concatenated results from all stages.
@@ -535,7 +977,8 @@ def run_staged_input(stages_dict, run_num, tmp_dir, timeout):
         # namelists gives each stage different ones, and CrunchTope reads them from the run
         # directory under the name the deck uses, so they have to be refreshed before each stage
         # runs. Writing them for stage 0 alone left every later stage running against stage 0's.
-        _print_aux_files(stage_file, tmp_path)
+        # Through the store rhea staged the sweep with, so unchanged files are linked, not rewritten.
+        _print_aux_files(stage_file, tmp_path, store=staging.sweep_store(tmp_path, config))
 
         if stage_num > 0:
             # A .rst carries no grid metadata, so a stage that changes xzones fails on its first
@@ -543,7 +986,7 @@ def run_staged_input(stages_dict, run_num, tmp_dir, timeout):
             regrid_between_stages(stages_dict, stage_num, tmp_path)
 
         print(f'Running run {run_num}, stage {stage_num}')
-        crunchtope(stage_file, run_num, timeout, tmp_path, file_offset=file_offset)
+        crunchtope(stage_file, run_num, timeout, tmp_path, file_offset=file_offset, config=config)
 
         output_contents = stage_file.keyword_blocks['OUTPUT'].contents
         if any(key in output_contents for key in SNAPSHOT_TIME_KEYWORDS):
@@ -552,8 +995,15 @@ def run_staged_input(stages_dict, run_num, tmp_dir, timeout):
         if stage_file.error_code != 0:
             print(f'Error in run {run_num}, stage {stage_num}. Stopping staged execution.')
             break
+        # A run decided by a termination criterion is decided for good: the later stages would only
+        # carry on the simulation the criterion stopped. A decision is the dict criteria.Judge makes.
+        if isinstance(getattr(stage_file, 'termination', None), dict):
+            print(f'Run {run_num} decided in stage {stage_num}. Stopping staged execution.')
+            break
 
     host = concat_staged_results(stages_dict)
+    if isinstance(getattr(stage_file, 'termination', None), dict):
+        stages_dict[host].termination = stage_file.termination
 
     return stages_dict[host]
 
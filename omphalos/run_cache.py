@@ -0,0 +1,198 @@
+"""A content-addressed cache of parsed run results, so an identical deck is never simulated twice.
+
+Sweeps overlap more than they look: a rerun after a typo in an unrelated section, ``linspace`` with
+repeats, a ``constant`` parameter carried from one campaign to the next. Each of those prints a deck
+CrunchTope has already run, byte for byte, against the same databases and the same build.
+
+The key is a hash of everything CrunchTope reads: the printed deck and any later decks, the
+thermodynamic database, the aqueous kinetics and catabolic pathways files, the auxiliary data files
+the deck names (see generate_inputs.auxiliary_files), a restart file it reads, and the identity of
+the binary -- its path, size and modification time, and which keyword generation
+crunch_keywords.identify_build finds in it. Every file is hashed as it sits in the run directory,
+after _print_aux_files has written the per-run ones, so a swept namelist or database parameter
+produces a different key even though the deck text is the same.
+
+Only successful runs are stored. A timeout or a matched error pattern can depend on the machine and
+its load, and replaying one would make the failure permanent.
+
+Two kinds of run are never cached, because skipping the solver would skip something besides the
+results: a stage of a restart chain, whose successor reads the .rst it writes, and a deck with later
+input files, which CrunchTope chains itself.
+
+Enabled with a ``run_cache`` section in the config, or ``run_cache: true`` for the defaults below,
+and overridden for one sweep with ``--no-cache`` or ``OMPHALOS_NO_CACHE=1``.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+from core.file_methods import file_digest
+import omphalos.crunch_keywords as ck
+
+# Where the cache lives unless the config says otherwise. Per user rather than per sweep, since
+# reuse across campaigns is half the point.
+DEFAULT_PATH = '~/.cache/omphalos/runs'
+
+# Size the cache is trimmed back to, least recently used entries first.
+DEFAULT_MAX_GB = 5
+
+# Bumped whenever what a cached entry holds, or how output is parsed into it, changes: entries
+# written before then are keyed differently and so are never read back.
+CACHE_FORMAT = 1
+
+# Set to anything but '0' or '' to turn the cache off regardless of the config. rhea exports it for
+# --no-cache, so that it reaches every worker.
+NO_CACHE_ENV = 'OMPHALOS_NO_CACHE'
+
+
+def from_config(config):
+    """The RunCache a config asks for, or None if it asks for none or the cache is turned off.
+
+    Args:
+        config: The sweep's config, as a dict, or None.
+    """
+    settings = (config or {}).get('run_cache')
+    if not settings or os.environ.get(NO_CACHE_ENV, '') not in ('', '0'):
+        return None
+
+    if settings is True:
+        settings = {}
+
+    return RunCache(settings.get('path', DEFAULT_PATH), settings.get('max_gb', DEFAULT_MAX_GB))
+
+
+def _binary_identity(binary):
+    """What identifies a CrunchTope build: its path, size, modification time and keyword generation."""
+    try:
+        stat = os.stat(binary)
+    except OSError:
+        return f'{binary}:missing'
+
+    return f'{binary}:{stat.st_size}:{stat.st_mtime_ns}:{ck.identify_build(binary)}'
+
+
+def _read_names(input_file):
+    """Every file the deck reads beside itself, by the name it reads it under."""
+    from omphalos import generate_inputs as gi
+    from omphalos import run
+
+    names = [
+        run._get_database_name(input_file),
+        run._get_kinetic_db_name(input_file),
+        run._get_catabolic_file_name(input_file),
+    ]
+    restart = input_file.keyword_blocks['RUNTIME'].contents.get('restart')
+    if restart:
+        names.append(restart[0])
+    names.extend(gi.auxiliary_files(input_file))
+
+    return [name for name in names if name]
+
+
+def cacheable(input_file):
+    """Whether a run can be answered from the cache without skipping anything but its results."""
+    return getattr(input_file, 'stage_num', None) is None and not input_file.later_inputs
+
+
+class RunCache:
+    """A directory of pickled results, one file per key.
+
+    Args:
+        path: The cache directory. Created on first store.
+        max_gb: Total size, in GB, the cache is trimmed back to after each store.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_gb=DEFAULT_MAX_GB):
+        self.path = Path(os.path.expanduser(str(path)))
+        self.max_bytes = int(float(max_gb) * 1024 ** 3)
+
+    def key(self, input_file, tmp_dir, binary):
+        """Hash everything a run reads.
+
+        Args:
+            input_file: The InputFile, already printed into tmp_dir.
+            tmp_dir: The run directory.
+            binary: The CrunchTope executable that would run it.
+
+        Returns:
+            The key, as a hex string.
+        """
+        tmp_path = Path(tmp_dir)
+        digest = hashlib.sha256()
+        digest.update(f'format:{CACHE_FORMAT}\n'.encode())
+        digest.update(f'binary:{_binary_identity(binary)}\n'.encode())
+
+        digest.update(f'deck:{file_digest(tmp_path / Path(input_file.path).name)}\n'.encode())
+
+        for name in _read_names(input_file):
+            # An absolute path joins to itself, so it is hashed where CrunchTope will read it.
+            source = tmp_path / name
+            found = file_digest(source) if source.is_file() else 'missing'
+            digest.update(f'{name}:{found}\n'.encode())
+
+        return digest.hexdigest()
+
+    def _entry(self, key):
+        return self.path / key[:2] / f'{key}.pkl'
+
+    def load(self, key):
+        """The results stored under key, or None on a miss.
+
+        A hit is touched, so that eviction sees it as recently used.
+        """
+        entry = self._entry(key)
+        try:
+            with open(entry, 'rb') as f:
+                results = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+
+        return results
+
+    def store(self, key, results):
+        """Store a run's results under key, then trim the cache to size.
+
+        Written to a temporary file and renamed into place, so that a worker reading the same key at
+        the same moment sees either the whole entry or none of it.
+        """
+        entry = self._entry(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, scratch = tempfile.mkstemp(dir=entry.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(results, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(scratch, entry)
+        except BaseException:
+            Path(scratch).unlink(missing_ok=True)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache is within its size limit."""
+        entries = []
+        for entry in self.path.glob('*/*.pkl'):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue           # removed by another worker's eviction
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                entry.unlink()
+            except OSError:
+                pass
+            total -= size
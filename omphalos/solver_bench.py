@@ -0,0 +1,344 @@
+"""Find the cheapest CrunchTope runtime settings that still give a sweep's answers.
+
+What a sweep costs is decided as much by its RUNTIME block as by its grid: ``timestep_max``,
+``gimrt`` against operator splitting, the solver tolerances. They are usually left at
+whatever the template had, since trying alternatives means running the model more than once by hand.
+A ``solver_bench`` section in the config says which alternatives to try:
+
+    solver_bench:
+      decks: 4                          # how many of the sweep's runs to try them on, or a list of
+                                        # run numbers; spread evenly across the sweep by default
+      variants:                         # RUNTIME keywords, and the values to try; every
+        timestep_max: [0.1, 1, 10]      # combination of them is a variant
+        gimrt: [true, false]
+      reference: {timestep_max: 0.01}   # what the variants are judged against; default the decks
+                                        # as generated
+      tolerance: 0.01                   # the largest deviation from the reference a variant may have
+      workers: 4
+
+and, from the directory the sweep would be run in,
+
+    python -m omphalos.solver_bench config.yaml
+
+generates the sweep, takes the decks, gives each one every variant and the reference through
+``KeywordBlock.modify`` -- adding a keyword the deck does not set -- and runs them all, each in a
+directory of its own under ``solver_bench/``. It then prints, for each variant, its failure rate, its
+wall time and speedup over the reference, and how far its results deviate from the reference's on
+the same deck, and names the cheapest variant that never failed and stayed within tolerance.
+
+The deviation of a run is the largest, over every variable of every output category the two runs
+share, of the largest difference between them at any snapshot and cell, relative to the largest
+magnitude the reference reaches for that variable -- so a species at 1e-12 is judged by its own
+scale, not by the chloride beside it. Runs are timed as omphalos times them, by wall clock around the
+whole run, and nothing that would cut a run short or answer it from elsewhere applies while they are:
+the run cache, adaptive timeouts and termination criteria are all left out.
+"""
+
+import argparse
+import copy
+import itertools
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_DECKS = 4
+DEFAULT_TOLERANCE = 0.01
+DEFAULT_DIRECTORY = 'solver_bench'
+
+# Sections of the sweep's config left out while benchmarking, since each would make a run's wall time
+# or results say something other than what its settings cost and give.
+NOT_BENCHED = ('run_cache', 'adaptive_timeout', 'termination_criteria', 'telemetry',
+               'run_directories', 'validation')
+
+REFERENCE = 'reference'
+
+
+def settings(config):
+    """The solver_bench section of a config, with its defaults filled in, or None if there is none.
+
+    Returns:
+        dict of 'decks', a count or a list of run numbers, 'variants', {keyword: [values]},
+        'reference', {keyword: value}, 'tolerance' and 'workers'.
+
+    Raises:
+        ValueError: Where the section is malformed.
+    """
+    section = (config or {}).get('solver_bench')
+    if not section:
+        return None
+    if not isinstance(section, dict):
+        raise ValueError('solver_bench is a mapping of decks, variants, reference, tolerance and '
+                         'workers')
+
+    grid = section.get('variants') or {}
+    if not isinstance(grid, dict) or not grid:
+        raise ValueError('solver_bench variants maps each RUNTIME keyword to the values to try')
+    grid = {keyword: list(values) if isinstance(values, (list, tuple)) else [values]
+            for keyword, values in grid.items()}
+    reference = section.get('reference') or {}
+    if not isinstance(reference, dict):
+        raise ValueError('solver_bench reference maps RUNTIME keywords to one value each')
+
+    decks = section.get('decks', DEFAULT_DECKS)
+    if isinstance(decks, int) and decks < 1:
+        raise ValueError(f'solver_bench decks is at least 1, not {decks}')
+
+    return {'decks': decks, 'variants': grid, 'reference': reference,
+            'tolerance': float(section.get('tolerance', DEFAULT_TOLERANCE)),
+            'workers': int(section.get('workers', 1))}
+
+
+def variants(grid):
+    """Every combination of the grid's values, as {keyword: value}, in the grid's order."""
+    keywords = list(grid)
+    return [dict(zip(keywords, values)) for values in itertools.product(*grid.values())]
+
+
+def label(variant):
+    """How a variant is named in the report: 'timestep_max=0.1 gimrt=true'."""
+    return ' '.join(f'{keyword}={runtime_token(value)}' for keyword, value in variant.items()) \
+        or 'as generated'
+
+
+def pick_decks(num_runs, decks):
+    """The run numbers to benchmark: those given, or decks of them spread evenly across the sweep."""
+    if isinstance(decks, (list, tuple)):
+        missing = [run for run in decks if not 0 <= run < num_runs]
+        if missing:
+            raise ValueError(f'solver_bench decks {missing} are not runs of a {num_runs}-run sweep')
+        return list(decks)
+
+    return sorted({int(run) for run in np.linspace(0, num_runs - 1, min(decks, num_runs)).round()})
+
+
+def runtime_token(value):
+    """A config value as a RUNTIME token. YAML's true and false are CrunchTope's."""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def apply_variant(input_file, variant):
+    """Set each RUNTIME keyword of variant on input_file, adding the ones its deck does not set."""
+    block = input_file.keyword_blocks['RUNTIME']
+    for keyword, value in variant.items():
+        try:
+            block.modify(keyword, runtime_token(value), -1)
+        except (KeyError, IndexError):
+            block.contents[keyword] = [runtime_token(value)]
+
+
+def deviation(results, reference):
+    """How far one run's results are from the reference run's on the same deck.
+
+    Returns:
+        The largest relative difference over the variables the two share; NaN where they share none.
+    """
+    import xarray as xr
+
+    worst = np.nan
+    for category in set(results) & set(reference):
+        try:
+            ours, theirs = xr.align(results[category], reference[category], join='inner')
+        except (ValueError, TypeError):
+            continue
+        for name in set(ours.data_vars) & set(theirs.data_vars):
+            a = np.asarray(ours[name].values, dtype=float)
+            b = np.asarray(theirs[name].values, dtype=float)
+            if a.size == 0 or a.shape != b.shape:
+                continue
+            scale = np.nanmax(np.abs(b))
+            difference = np.nanmax(np.abs(a - b))
+            value = difference / scale if scale > 0 else (0.0 if difference == 0 else np.inf)
+            worst = value if np.isnan(worst) else max(worst, value)
+
+    return worst
+
+
+def _timed(input_file, case, tmp_dir, timeout, shared_files, config):
+    """Run one case in a directory of its own, and say how long it took. Module level to pickle."""
+    from omphalos import run
+
+    started = time.monotonic()
+    input_file = run._run_isolated(input_file, case, tmp_dir, timeout, shared_files, config)
+    return input_file, time.monotonic() - started
+
+
+def run_cases(cases, tmp_dir, timeout, workers, shared_files, config):
+    """Run every case, workers at a time. Returns {case: (InputFile, seconds)}."""
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    if workers <= 1:
+        return {case: _timed(input_file, case, tmp_dir, timeout, tuple(shared_files), config)
+                for case, input_file in cases.items()}
+
+    done = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_timed, input_file, case, tmp_dir, timeout, tuple(shared_files),
+                               config): case for case, input_file in cases.items()}
+        for future in as_completed(futures):
+            done[futures[future]] = future.result()
+
+    return done
+
+
+def bench(config, directory=DEFAULT_DIRECTORY, workers=None):
+    """Generate the sweep, and run its chosen decks under every variant and the reference.
+
+    Returns:
+        (rows, section): a row per run -- deck, variant, seconds, error_code, deviation -- and the
+        settings it was run with.
+
+    Raises:
+        ValueError: Where the config has no solver_bench section, or a malformed one.
+    """
+    import contextlib
+    import io
+
+    from omphalos import generate_inputs as gi
+    from omphalos.template import Template
+
+    section = settings(config)
+    if section is None:
+        raise ValueError("the config has no solver_bench section saying what to try")
+    config = {key: value for key, value in config.items() if key not in NOT_BENCHED}
+    bench_dir = Path(directory)
+    bench_dir.mkdir(exist_ok=True)
+
+    print('*** Generating the sweep ***')
+    with contextlib.redirect_stdout(io.StringIO()):
+        template = Template(config)
+        file_dict = gi.configure_input_files(template, str(bench_dir) + '/')
+    keys = list(file_dict)
+    decks = pick_decks(len(keys), section['decks'])
+
+    tried = [section['reference']] + [variant for variant in variants(section['variants'])
+                                      if variant != section['reference']]
+    cases, plan = {}, {}
+    for deck in decks:
+        for index, variant in enumerate(tried):
+            input_file = copy.deepcopy(file_dict[keys[deck]])
+            apply_variant(input_file, variant)
+            case = len(cases)
+            cases[case] = input_file
+            plan[case] = (deck, REFERENCE if index == 0 else label(variant))
+
+    print(f'*** Running {len(decks)} deck(s) under {len(tried)} setting(s): {len(cases)} runs ***')
+    done = run_cases(cases, bench_dir, config['timeout'], workers or section['workers'],
+                     gi.staged_names(template), config)
+
+    references = {plan[case][0]: done[case][0] for case in done if plan[case][1] == REFERENCE}
+    rows = []
+    for case in sorted(done):
+        deck, name = plan[case]
+        input_file, seconds = done[case]
+        error_code = getattr(input_file, 'error_code', 0) or (0 if input_file.results else -1)
+        reference = references.get(deck)
+        compared = not error_code and reference is not None and not reference.error_code
+        rows.append({'deck': deck, 'variant': name, 'seconds': seconds, 'error_code': error_code,
+                     'deviation': deviation(input_file.results, reference.results) if compared
+                     else np.nan})
+
+    return rows, section
+
+
+def summarize(rows, tolerance):
+    """A row per variant: its runs, failures, wall time, speedup, worst deviation, and whether it is
+    within tolerance -- no failures, every run compared, and no deviation beyond tolerance.
+
+    A run with no deviation was not compared with the reference -- the reference failed on its
+    deck, or the two share no output -- so there is nothing to say it is within tolerance, and a
+    variant with one is not. The reference is within tolerance of itself wherever it ran.
+    Cheapest first.
+    """
+    import pandas as pd
+
+    frame = pd.DataFrame(rows)
+    frame['uncompared'] = frame['deviation'].isna() & (frame['error_code'] == 0)
+    summary = frame.groupby('variant', sort=False).agg(
+        runs=('deck', 'size'), failed=('error_code', lambda codes: int((codes != 0).sum())),
+        uncompared=('uncompared', 'sum'), median_s=('seconds', 'median'),
+        total_s=('seconds', 'sum'), max_deviation=('deviation', 'max'))
+    summary['failure_rate'] = summary['failed'] / summary['runs']
+    reference_total = summary['total_s'].get(REFERENCE, np.nan)
+    summary['speedup'] = reference_total / summary['total_s']
+    compared = (summary['uncompared'] == 0) & (summary['max_deviation'] <= tolerance)
+    summary['within_tolerance'] = (summary['failed'] == 0) & \
+        (compared | (summary.index == REFERENCE))
+
+    return summary.sort_values('total_s')
+
+
+def unreferenced(rows):
+    """The decks the reference failed on, on which no variant could be compared with it."""
+    return sorted({row['deck'] for row in rows
+                   if row['variant'] == REFERENCE and row['error_code'] != 0})
+
+
+def recommend(summary):
+    """The cheapest variant within tolerance, or None where none is."""
+    within = summary[summary['within_tolerance']]
+    return within.index[0] if len(within) else None
+
+
+def table(summary, tolerance, failed_references=()):
+    """summarize's frame as the text solver_bench prints, with the decks unreferenced returned."""
+    lines = [f'{"settings":<36} {"runs":>4} {"failed":>7} {"median":>9} {"total":>9} '
+             f'{"speedup":>8} {"deviation":>10}  ok']
+    for name, row in summary.iterrows():
+        lines.append(f'{name:<36} {row["runs"]:>4} {row["failure_rate"]:>7.0%} '
+                     f'{row["median_s"]:>8.1f}s {row["total_s"]:>8.1f}s {row["speedup"]:>7.2f}x '
+                     f'{row["max_deviation"]:>10.2e}  {"yes" if row["within_tolerance"] else "no"}')
+    best = recommend(summary)
+    lines.append('')
+    if failed_references:
+        lines.append(f'The reference failed on deck(s) {list(failed_references)}, so no settings '
+                     f'could be compared on them.')
+    lines.append(f'Cheapest within a deviation of {tolerance:g} with no failures: {best}.'
+                 if best is not None else
+                 f'No settings stayed within a deviation of {tolerance:g} without failures.')
+
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    """``python -m omphalos.solver_bench <config>``: benchmark the config's runtime settings.
+
+    Returns:
+        The exit status: 1 where the config asks for no benchmark or no setting qualified.
+    """
+    import yaml
+
+    parser = argparse.ArgumentParser(
+        prog='python -m omphalos.solver_bench',
+        description="Run some of a sweep's decks under other RUNTIME settings, and compare them.")
+    parser.add_argument('config_path', type=str, help='The YAML file the sweep would be run with.')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Runs at once, overriding the config's solver_bench workers.")
+    parser.add_argument('-d', '--directory', type=str, default=DEFAULT_DIRECTORY,
+                        help=f'Where the runs go (default: {DEFAULT_DIRECTORY}/).')
+    args = parser.parse_args(argv)
+
+    with open(args.config_path) as file:
+        config = yaml.safe_load(file)
+    try:
+        rows, section = bench(config, args.directory, args.workers)
+    except ValueError as exc:
+        print(f'ERROR: {exc}')
+        return 1
+
+    summary = summarize(rows, section['tolerance'])
+    summary.to_csv(Path(args.directory) / 'solver_bench.csv')
+    print(table(summary, section['tolerance'], unreferenced(rows)))
+    print(f'Written to {Path(args.directory) / "solver_bench.csv"}.')
+
+    return 0 if recommend(summary) is not None else 1
+
+
+if __name__ == '__main__':
+    _project_root = Path(__file__).resolve().parent.parent
+    if str(_project_root) not in sys.path:
+        sys.path.insert(0, str(_project_root))
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""Catch a CrunchTope run whose timestep has collapsed, rather than letting it burn its timeout.
+
+A run that is going to fail slowly seldom says so. Newton starts needing more iterations, CrunchTope
+cuts the timestep, and the step keeps shrinking until each one advances the simulation by a fraction
+of a second of model time. Nothing matches CT_ERROR_PATTERNS while that happens, so the run sits
+until the global ``timeout`` -- hours, on a cluster sweep -- and is then recorded as a timeout
+indistinguishable from one that was merely slow.
+
+CrunchTope prints the model time after every step:
+
+    Time (yrs) =  1.2345E-03  Delt (yrs) =  1.0000E-05
+
+A StallMonitor reads those lines from the child's output as they arrive, and compares how far model
+time got over the last ``window`` seconds of wall time with how far it still has to go: the last of
+the deck's ``spatial_profile`` times. Once the run is ``grace`` seconds old, it is declared stalled
+if, at that rate, it would not finish within ``factor`` times its timeout. A run that prints nothing
+at all over the window counts as advancing at the rate it managed before, which shrinks as the
+silence goes on.
+
+A run with no progress lines to read, a deck whose end time cannot be read, or a deck with later
+input files, whose model time runs past its own end, is never judged: the timeout still applies.
+
+Enabled with a ``stall_detection`` section in the config, or ``stall_detection: true`` for the
+defaults below. A stalled run is recorded with run.STALLED_ERROR_CODE.
+"""
+
+import re
+import time
+
+import core.keyword_block as kb
+
+# What a stall_detection section does not set. A factor of 1 kills only runs that would not finish in
+# time anyway; the default leaves room for a run that is slow early and speeds up.
+DEFAULT_FACTOR = 2.0
+DEFAULT_GRACE = 120.0
+DEFAULT_WINDOW = 300.0
+
+# How often, in seconds of wall time, a waiting run is checked.
+CHECK_INTERVAL = 5.0
+
+# A number as Fortran prints one, including the exponent without its E that a 1PE12.5 edit
+# descriptor falls back to beyond three digits (1.00000-100).
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[EeDd][-+]?\d+|[-+]\d{3})?'
+
+# CrunchTope's per-step line. Anchored at the start of a line so that summaries printed at the end
+# ('Total CPU Time (s) = ...') are not taken for progress.
+PROGRESS_PATTERN = re.compile(r'\s*Time\s*\(\s*([A-Za-z]+)\s*\)\s*=\s*(' + _NUMBER + ')')
+
+# Length of each unit in years, under each spelling CrunchTope prints or reads. CrunchTope's own
+# conversions use a 365-day year.
+TIME_UNITS = {
+    'years': 1.0, 'year': 1.0, 'yrs': 1.0, 'yr': 1.0, 'y': 1.0,
+    'days': 1 / 365, 'day': 1 / 365, 'd': 1 / 365,
+    'hours': 1 / 8760, 'hour': 1 / 8760, 'hrs': 1 / 8760, 'hr': 1 / 8760, 'h': 1 / 8760,
+    'minutes': 1 / 525600, 'minute': 1 / 525600, 'min': 1 / 525600,
+    'seconds': 1 / 31536000, 'second': 1 / 31536000, 'sec': 1 / 31536000, 's': 1 / 31536000,
+}
+
+
+def _fortran_float(text):
+    """Read a number as Fortran prints it, with or without the E of its exponent."""
+    text = text.replace('D', 'E').replace('d', 'e')
+    match = re.fullmatch(r'([-+]?(?:\d+\.?\d*|\.\d+))([-+]\d{3})', text)
+    if match:
+        text = f'{match.group(1)}E{match.group(2)}'
+    return float(text)
+
+
+def end_time(input_file):
+    """The model time a deck runs to, in years: its last snapshot time.
+
+    Returns:
+        The time, or None if the deck has none that can be read, or has later input files.
+    """
+    try:
+        if getattr(input_file, 'later_inputs', None):
+            return None
+        output = input_file.keyword_blocks['OUTPUT'].contents
+        times = [float(t) for t in kb.snapshot_times(output)]
+        units = str(output.get('time_units', ['years'])[0]).lower()
+        return max(times) * TIME_UNITS[units] if times else None
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+def from_config(config, input_file, timeout, clock=time.monotonic):
+    """The StallMonitor a config asks for on this run, or None if it asks for none.
+
+    Args:
+        config: The sweep's config, as a dict, or None.
+        input_file: The InputFile about to be run.
+        timeout: The run's timeout in seconds; the budget projections are measured against.
+        clock: Seconds of wall time, for tests.
+
+    Returns:
+        None as well where the run cannot be judged: no timeout, or no end time to aim for.
+    """
+    settings = (config or {}).get('stall_detection')
+    if not settings or not timeout:
+        return None
+    if settings is True:
+        settings = {}
+
+    end = end_time(input_file)
+    if end is None or end <= 0:
+        return None
+
+    return StallMonitor(end, float(timeout),
+                        factor=float(settings.get('factor', DEFAULT_FACTOR)),
+                        grace=float(settings.get('grace', DEFAULT_GRACE)),
+                        window=float(settings.get('window', DEFAULT_WINDOW)),
+                        clock=clock)
+
+
+class ProgressReader:
+    """Read a run's model time from the progress lines it prints, as they arrive.
+
+    Has the write and flush of a file, so that it can be a pexpect child's ``logfile_read``. What a
+    StallMonitor judges a run on, and what a telemetry heartbeat reports it has reached.
+
+    Args:
+        window: Seconds of wall time to keep samples for.
+        clock: Seconds of wall time.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        # (wall time, model time in years) per progress line, oldest first. Trimmed to the window
+        # plus the one sample before it, which is where the rate is measured from.
+        self.samples = []
+        self._partial = ''
+
+    def write(self, text):
+        """Take output from the child, a chunk at a time."""
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._read_line(line)
+
+    def flush(self):
+        pass
+
+    def _read_line(self, line):
+        match = PROGRESS_PATTERN.match(line)
+        if not match or match.group(1).lower() not in TIME_UNITS:
+            return
+        try:
+            model_time = _fortran_float(match.group(2)) * TIME_UNITS[match.group(1).lower()]
+        except ValueError:
+            return
+
+        now = self.clock()
+        self.samples.append((now, model_time))
+        while len(self.samples) > 2 and self.samples[1][0] <= now - self.window:
+            self.samples.pop(0)
+
+    @property
+    def model_time(self):
+        """The model time last printed, in years, or None before any has been."""
+        return self.samples[-1][1] if self.samples else None
+
+
+class StallMonitor(ProgressReader):
+    """Track a run's model time against wall time, from the progress lines it prints.
+
+    Args:
+        end: Model time the run has to reach, in years.
+        timeout: The run's budget in seconds.
+        factor: Multiple of the budget a projected finish may reach before the run is stalled.
+        grace: Seconds from the start before any run is judged.
+        window: Seconds of wall time the rate is measured over.
+        clock: Seconds of wall time.
+    """
+
+    def __init__(self, end, timeout, factor=DEFAULT_FACTOR, grace=DEFAULT_GRACE,
+                 window=DEFAULT_WINDOW, clock=time.monotonic):
+        super().__init__(window=window, clock=clock)
+        self.end = end
+        self.timeout = timeout
+        self.factor = factor
+        self.grace = grace
+        self.started = clock()
+
+    def projected_finish(self):
+        """Seconds from the start the run would take in all, at its recent rate.
+
+        Returns:
+            The projection, infinity for a run that has stopped advancing, or None before there is
+            a rate to go on: until two progress lines have been read.
+        """
+        if len(self.samples) < 2:
+            return None
+
+        now = self.clock()
+        latest = self.samples[-1][1]
+        reference = self.samples[0]
+        for sample in self.samples[:-1]:
+            if sample[0] <= now - self.window:
+                reference = sample
+        if now <= reference[0]:
+            return None
+
+        elapsed = now - self.started
+        remaining = self.end - latest
+        if remaining <= 0:
+            return elapsed
+
+        rate = (latest - reference[1]) / (now - reference[0])
+        if rate <= 0:
+            return float('inf')
+
+        return elapsed + remaining / rate
+
+    def stalled(self):
+        """Whether the run is past its grace period and projected to overrun factor times its budget."""
+        if self.clock() - self.started < self.grace:
+            return False
+
+        projection = self.projected_finish()
+        return projection is not None and projection > self.factor * self.timeout
+
+    def describe(self):
+        """One line on where the run had got to, for the log."""
+        model_time = self.samples[-1][1] if self.samples else 0.0
+        projection = self.projected_finish()
+        if projection is None or projection == float('inf'):
+            pace = 'no longer advancing'
+        else:
+            pace = f'projected to take {projection:.0f} s'
+
+        return (f'reached {model_time:.4g} of {self.end:.4g} yr after '
+                f'{self.clock() - self.started:.0f} s, {pace}; '
+                f'the budget is {self.factor:g} x {self.timeout:.0f} s')
@@ -0,0 +1,155 @@
+"""Parse a run's TecPlot snapshots while CrunchTope is still writing the later ones.
+
+``InputFile.get_results`` reads every ``{category}{n}.tec`` a run wrote, one after another, once the
+run has ended. For a deck with hundreds of ``spatial_profile`` times that is a long serial tail on
+every run, and all of it could have been done while the solver was busy with the next snapshot.
+
+A SnapshotWatcher polls the run directory from a thread of its own and hands each snapshot file to a
+small pool as soon as CrunchTope has finished writing it. When the run ends, the parsed datasets are
+passed to ``get_results``, which only has to read what the watcher had not yet reached -- usually the
+last snapshot alone.
+
+Knowing that CrunchTope has finished a file is the whole difficulty: its size can sit still between
+two buffered writes, and nothing is written to say a file is closed. What can be relied on is the
+order. CrunchTope writes every category for snapshot n before it takes another timestep, so once any
+file for snapshot n+1 exists, every file for snapshot n is closed. The last snapshot has no successor
+and is left to ``get_results``.
+
+A sequential sweep runs every deck in the same directory, so what is there when a run starts is the
+last run's. Only files written since the run was spawned are taken to be its own: the previous run's
+snapshots would otherwise be parsed as this one's, and judged by its termination criteria.
+
+Enabled per sweep with ``stream_results: true`` in the config.
+"""
+
+import glob
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from omphalos import file_methods as fm
+
+# Seconds between looks at the run directory.
+POLL_INTERVAL = 0.5
+
+# Snapshot files parsed at once. The parse is mostly pandas reading text, so a couple of threads are
+# enough to keep up with a solver that writes a snapshot every few seconds.
+PARSE_WORKERS = 2
+
+_TEC_NAME = re.compile(r'^(?P<category>.*?)(?P<index>\d+)\.tec$')
+
+
+class SnapshotWatcher:
+    """Parse a run directory's snapshot files as CrunchTope closes them.
+
+    Args:
+        tmp_dir: The directory CrunchTope is writing into.
+        file_offset: Snapshot files numbered at or below this belong to earlier stages of a staged
+            restart and are not this run's to parse, as in get_results.
+        skip: Categories not to parse, as get_results skips them.
+        leading_names: Mapping of category to the names its file omits; see get_results.
+        poll_interval: Seconds between looks at the directory.
+        workers: Snapshot files to parse at once.
+        since: Nanoseconds since the epoch, the time the run was spawned. A file last written
+            before then is a previous run's, and is not parsed. None takes every file as this run's.
+    """
+
+    def __init__(self, tmp_dir, file_offset=0, skip=(), leading_names=None,
+                 poll_interval=POLL_INTERVAL, workers=PARSE_WORKERS, since=None):
+        self.tmp_dir = str(tmp_dir)
+        self.file_offset = file_offset
+        self.since = since
+        self.skip = set(skip)
+        self.leading_names = leading_names or {}
+        self.poll_interval = poll_interval
+
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._futures = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _snapshots(self):
+        """The (category, index) of every snapshot file in the directory that is this run's."""
+        found = set()
+        for name in glob.glob(str(Path(self.tmp_dir) / '*.tec')):
+            match = _TEC_NAME.match(Path(name).name)
+            if match is None:
+                continue
+            category, index = match['category'], int(match['index'])
+            if index <= self.file_offset or category in self.skip or not self._fresh(name):
+                continue
+            found.add((category, index))
+
+        return found
+
+    def _fresh(self, path):
+        """Whether the file at path has been written since the run was spawned."""
+        if self.since is None:
+            return True
+        try:
+            return os.stat(path).st_mtime_ns >= self.since
+        except OSError:
+            # Gone between the glob and the stat.
+            return False
+
+    def poll(self):
+        """Submit every snapshot file that has become complete since the last poll."""
+        found = self._snapshots()
+        if not found:
+            return
+
+        newest = max(index for _, index in found)
+        for key in found:
+            if key[1] < newest and key not in self._futures:
+                category, index = key
+                self._futures[key] = self._pool.submit(
+                    fm.parse_output, self.tmp_dir, category, index,
+                    leading_names=self.leading_names.get(category, ()))
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.poll()
+
+    def completed(self):
+        """What has been parsed so far, without stopping: what criteria.Judge reads mid-run.
+
+        Returns:
+            dict mapping (category, index) to the parsed Dataset, or to None for a file that failed
+            to parse. Files still being parsed are absent.
+        """
+        completed = {}
+        # A copy, since the watching thread adds to the dict while this runs.
+        for key, future in list(self._futures.items()):
+            if future.done():
+                completed[key] = future.result() if future.exception() is None else None
+
+        return completed
+
+    def pending(self):
+        """The (category, index) of every file submitted and not yet parsed."""
+        return {key for key, future in list(self._futures.items()) if not future.done()}
+
+    def stop(self):
+        """Stop watching and wait for the files already submitted to be parsed.
+
+        Returns:
+            dict mapping (category, index) to the parsed Dataset. A file that failed to parse is left
+            out, so get_results tries it again and reports the failure as it always has.
+        """
+        self._stop.set()
+        if self._thread.ident is not None:
+            self._thread.join()
+        self._pool.shutdown(wait=True)
+
+        parsed = {}
+        for key, future in self._futures.items():
+            if future.exception() is None:
+                parsed[key] = future.result()
+
+        return parsed
@@ -0,0 +1,262 @@
+"""Drive many CrunchTope children from one process with asyncio.
+
+``run.crunchtope`` starts a child and then blocks in ``expect`` until it ends, so a Python process
+runs one simulation at a time and a node's worth of them needs a node's worth of interpreters. The
+supervisor here owns every child at once instead: each one's pty is registered with the event loop,
+whatever it prints is searched for CT_ERROR_PATTERNS as it arrives, and a run that outlives its
+timeout, stalls (see omphalos/stall.py), is decided by a termination criterion (see
+omphalos/criteria.py) or matches a pattern is killed exactly as ``crunchtope`` would kill it.
+Parsing a finished run's output is the only blocking step left, and it goes to a thread so that
+the other children keep being read meanwhile.
+
+pexpect has an ``async_=True`` mode of its own, but the release most environments install still
+builds it on ``asyncio.coroutine``, which Python 3.11 removed. Reading the pty directly costs a few
+lines and works on every version the project supports.
+"""
+
+import asyncio
+import re
+import time
+
+import pexpect as pexp
+
+from core import lifecycle, profiling, scratch, solver_log, staging, telemetry
+from omphalos import criteria, run, stall, timeouts, validate
+
+# How much of a child's output to read per wake-up.
+READ_SIZE = 4096
+
+# How much already-searched output to keep for a pattern split across two reads to still match.
+# Comfortably longer than any pattern in CT_ERROR_PATTERNS.
+SEARCH_WINDOW = 512
+
+
+class OutputSearcher:
+    """Search a child's output for CT_ERROR_PATTERNS a chunk at a time.
+
+    Matches the way pexpect's own expect does: patterns are regular expressions compiled with
+    DOTALL, and where several match, the one matching earliest in the output wins, with ties going to
+    whichever comes first in the list.
+    """
+
+    def __init__(self, patterns=None):
+        if patterns is None:
+            patterns = run.CT_ERROR_PATTERNS
+        self.patterns = [re.compile(pattern, re.DOTALL) for pattern in patterns]
+        self.buffer = ''
+
+    def feed(self, chunk):
+        """Add output and search it.
+
+        Returns:
+            The index into the pattern list of the match, or None if nothing has matched yet.
+        """
+        self.buffer += chunk
+
+        best = None
+        for index, pattern in enumerate(self.patterns):
+            match = pattern.search(self.buffer)
+            if match and (best is None or match.start() < best[0]):
+                best = (match.start(), index)
+
+        if best is not None:
+            return best[1]
+
+        self.buffer = self.buffer[-SEARCH_WINDOW:]
+        return None
+
+
+async def watch(process, timeout, patterns=None, monitor=None, judge=None, beat=None, log=None):
+    """Wait for a child to exit, time out, or print an error pattern, without blocking the loop.
+
+    Args:
+        process: A pexpect child.
+        timeout: Seconds to allow the child in total, or None for no limit.
+        patterns: Regular expressions to search for. Defaults to CT_ERROR_PATTERNS.
+        monitor: A stall.StallMonitor to feed the output to and check every CHECK_INTERVAL, or None.
+        judge: A criteria.Judge to ask every CHECK_INTERVAL whether the run is decided, or None.
+        beat: A telemetry.Heartbeat to feed the output to, where monitor does not, and to write the
+            run's status every interval, or None.
+        log: A solver_log.SolverLog to write the output to, which passes it on to monitor or beat
+            itself, or None.
+
+    Returns:
+        An index into [EOF, TIMEOUT] + patterns, as pexpect's expect would return,
+        run.STALLED_ERROR_CODE or run.CRITERION_MET.
+    """
+    loop = asyncio.get_running_loop()
+    ended = loop.create_future()
+    searcher = OutputSearcher(patterns)
+    reader = log if log is not None else run._output_reader(monitor, beat)
+    check = None
+
+    def finish(code):
+        if not ended.done():
+            ended.set_result(code)
+
+    def on_readable():
+        try:
+            chunk = process.read_nonblocking(READ_SIZE, timeout=0)
+        except pexp.EOF:
+            finish(0)
+            return
+        except pexp.TIMEOUT:
+            # Woken with nothing to read after all.
+            return
+
+        if reader is not None:
+            reader.write(chunk)
+        index = searcher.feed(chunk)
+        if index is not None:
+            finish(index + 2)
+
+    def look():
+        nonlocal check
+        if judge is not None and judge.decide() is not None:
+            finish(run.CRITERION_MET)
+        elif monitor is not None and monitor.stalled():
+            finish(run.STALLED_ERROR_CODE)
+        else:
+            if beat is not None and beat.due():
+                beat.pulse()
+            check = loop.call_later(interval, look)
+
+    loop.add_reader(process.child_fd, on_readable)
+    if monitor is not None or judge is not None or beat is not None:
+        interval = run._check_interval(monitor, judge, beat)
+        check = loop.call_later(interval, look)
+    try:
+        return await asyncio.wait_for(ended, timeout)
+    except asyncio.TimeoutError:
+        return 1
+    finally:
+        loop.remove_reader(process.child_fd)
+        if check is not None:
+            check.cancel()
+
+
+async def _supervise(input_file, file_num, timeout, tmp_dir, slots, config=None, timings=None):
+    """Run one input file whose deck is already written into tmp_dir, once a slot is free.
+
+    Placed in scratch, where the config asks for it, only once the slot is free: every run directory
+    is written before the first run starts, and copying them all out at once would hold the whole
+    sweep in scratch.
+
+    timings is the run's record of phases so far -- printing its deck -- and is carried on here and
+    kept on the InputFile, as run.input_file keeps it; see core/profiling.py.
+    """
+    timings = {} if timings is None else timings
+    loop = asyncio.get_running_loop()
+
+    async with slots:
+        started = time.monotonic()
+        with scratch.placement(tmp_dir, config, shared=run.sweep_dirs(config)) as work:
+            await _supervise_placed(input_file, file_num, timeout, work, config, loop, timings)
+        telemetry.finish(config, file_num, getattr(input_file, 'error_code', 0),
+                         time.monotonic() - started)
+    if profiling.enabled():
+        input_file.timings = timings
+    # Off the event loop, since packing a run directory is real work; see core/lifecycle.py.
+    await loop.run_in_executor(None, lifecycle.finished, tmp_dir, config,
+                               getattr(input_file, 'error_code', 0))
+
+    return input_file
+
+
+async def _supervise_placed(input_file, file_num, timeout, tmp_dir, config, loop, timings):
+    cache, key = await loop.run_in_executor(None, run._cache_lookup, input_file, file_num,
+                                            tmp_dir, config)
+    if cache is not None and key is None:
+        return input_file
+
+    adaptive = timeouts.from_config(config, tmp_dir)
+    limit = adaptive.limit(file_num, timeout) if adaptive else timeout
+
+    started = time.monotonic()
+    solving = time.perf_counter()
+    spawned = time.time_ns()
+    process = run._spawn(input_file, limit, tmp_dir)
+    watcher = run._start_watcher(input_file, tmp_dir, 0, config, since=spawned)
+    monitor = stall.from_config(config, input_file, limit)
+    judge = criteria.judge(config, input_file, watcher)
+    beat = run._start_heartbeat(config, file_num, input_file, process, monitor)
+    log = solver_log.from_config(config, tmp_dir, file_num,
+                                 reader=run._output_reader(monitor, beat))
+    error_code = await watch(process, limit, monitor=monitor, judge=judge, beat=beat, log=log)
+    # Timed by hand, not in a phase: phases nest on a per-thread stack, and every run in hand
+    # waits on this one thread, so their phases would close each other's.
+    profiling.add(timings, 'solver', time.perf_counter() - solving)
+    if error_code == run.STALLED_ERROR_CODE:
+        print(f'File {file_num} {monitor.describe()}.')
+    elif error_code == run.CRITERION_MET:
+        print(f'File {file_num} {judge.describe()}.')
+    elif error_code == 1 and limit < timeout:
+        error_code = run.ADAPTIVE_TIMEOUT_ERROR_CODE
+
+    if beat is not None:
+        beat.pulse('parsing')
+    # Parsing the output, or closing a child that will not die, blocks. Do either in a thread
+    # and keep the slot until it is done, so the number of runs in hand stays at the limit.
+    await loop.run_in_executor(None, _finish, input_file, file_num, error_code, process,
+                               tmp_dir, watcher, cache, key, judge, log, timings)
+    run._record_runtime(adaptive, file_num, time.monotonic() - started, input_file)
+
+    return input_file
+
+
+def _finish(input_file, file_num, error_code, process, tmp_dir, watcher, cache=None, key=None,
+            judge=None, log=None, timings=None):
+    # In the run's own record, though this is a thread of the executor's and not the run's.
+    with profiling.collect(timings), profiling.phase('parse'):
+        parsed = watcher.stop() if watcher else None
+        run._record_outcome(input_file, file_num, error_code, process, tmp_dir, parsed=parsed,
+                            decision=judge.decision if judge else None, log=log)
+    # A decided run's results stop short, so they are not the results of the deck.
+    if judge is None or judge.decision is None:
+        run._cache_store(cache, key, input_file)
+
+
+async def _supervise_all(file_dict, tmp_dir, timeout, workers, shared_files, config):
+    slots = asyncio.Semaphore(workers)
+    tasks = []
+    for file_num, entry in enumerate(file_dict):
+        # Skipped rather than left out of file_dict, which would renumber the runs after it.
+        if validate.is_rejected(file_dict[entry]):
+            print(f'File {file_num} not run, rejected by validation: '
+                  f'{"; ".join(file_dict[entry].invalid)}')
+            telemetry.finish(config, file_num, file_dict[entry].error_code, 0.0)
+            continue
+        run_path = run._make_run_directory(tmp_dir, file_num, shared_files,
+                                           modes=staging.modes_from_config(config))
+        # Nothing else runs on this thread until every deck is written, so a phase is safe here.
+        with profiling.collect() as timings:
+            run_path = run._write_run_files(file_dict[entry], run_path)
+        tasks.append(_supervise(file_dict[entry], file_num, timeout, run_path, slots, config,
+                                timings))
+
+    await asyncio.gather(*tasks)
+
+
+def run_dataset(file_dict, tmp_dir, timeout, workers=1, shared_files=(), config=None):
+    """Run all input files in the dataset from a single process, up to workers at a time.
+
+    A drop-in for run.run_dataset: each run executes in tmp_dir/run<N> with its own copy of the
+    shared files, and the InputFile objects in file_dict are filled in where they are, since nothing
+    leaves this process.
+
+    Args:
+        file_dict: Dictionary of InputFile objects
+        tmp_dir: Temporary directory for output files
+        timeout: Timeout in seconds for each simulation
+        workers: Number of CrunchTope children to run at once.
+        shared_files: Names, relative to tmp_dir, of the files every run reads from its own
+            directory -- what generate_inputs.staged_names returns.
+        config: The sweep's config, for the options that change how a run is watched.
+
+    Returns:
+        Updated file_dict with results
+    """
+    asyncio.run(_supervise_all(file_dict, tmp_dir, timeout, max(workers, 1), tuple(shared_files),
+                               config))
+
+    return file_dict
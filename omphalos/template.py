@@ -11,6 +11,7 @@ from omphalos.keyword_block import ConditionBlock
 from omphalos.database import Database
 from omphalos.namelist import CrunchNameList
 
+from core import profiling
 from core.keyword_block import KEY_SEPARATOR, REPEATABLE_ENTRIES
 from omphalos.input_file import CONTINUATION
 
@@ -39,6 +40,7 @@ def block_entry_key(keyword, line_list):
 class Template(InputFile):
     """Subclass of InputFile with special __init__ method for importing the template input file."""
 
+    @profiling.timed('template')
     def __init__(self, config):
         super().__init__(config['template'], {}, {}, {}, {}, 0)
         # Proceed to iterate through each keyword block to import the whole file.
@@ -0,0 +1,231 @@
+"""Per-run timeouts learned from how long the sweep's own runs have taken.
+
+One ``timeout`` for every run is a poor fit for a sweep. Set generously, a run that has hung holds its
+core for hours; set tightly, the slow but legitimate corners of parameter space are killed with the
+hung ones. Once a sweep has finished a few runs, though, it knows what a run of it costs.
+
+With an ``adaptive_timeout`` section in the config, every CrunchTope run records how long it took in
+a ledger beside the run directories. Once ``min_runs`` of them have succeeded, a new run's limit
+becomes the ``quantile`` of those runtimes times ``factor``, never less than ``min_timeout`` and
+never more than the config's ``timeout``, which stays the ceiling. With ``neighbours`` set, the
+quantile is taken over only that many successful runs nearest this one in swept-parameter space
+(each parameter scaled by its spread), so that a corner of the sweep known to be slow is allowed to
+be.
+
+A run stopped by a learned limit is recorded with run.ADAPTIVE_TIMEOUT_ERROR_CODE rather than as a
+timeout, and compile_results lists such runs apart. ``rhea --resume`` reruns them, and a run whose
+last attempt was stopped this way is given the full ``timeout``.
+
+The ledger is one line per run, appended with O_APPEND, so every worker of a sweep -- processes of a
+pool, tasks of a SLURM array -- can add to it at once. On a filesystem where appends can interleave
+(NFS), a torn line is skipped when the ledger is read rather than misread.
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+
+# Beside the run directories, as the content store is.
+LEDGER_DIR = '.omphalos_runtimes'
+LEDGER_FILE = 'runtimes.txt'
+FEATURES_FILE = 'swept_values.npz'
+
+# What an adaptive_timeout section does not set.
+DEFAULT_MIN_RUNS = 20
+DEFAULT_QUANTILE = 0.95
+DEFAULT_FACTOR = 3.0
+DEFAULT_MIN_TIMEOUT = 60.0
+DEFAULT_NEIGHBOURS = 0
+
+
+def ledger_dir(run_dir):
+    """The ledger directory for a run directory: beside it, shared by the whole sweep."""
+    return Path(run_dir).resolve().parent / LEDGER_DIR
+
+
+def from_config(config, run_dir):
+    """The AdaptiveTimeout a config asks for, for the sweep run_dir belongs to, or None.
+
+    Args:
+        config: The sweep's config, as a dict, or None.
+        run_dir: The directory the run executes in.
+    """
+    settings = (config or {}).get('adaptive_timeout')
+    if not settings:
+        return None
+    if settings is True:
+        settings = {}
+
+    return AdaptiveTimeout(ledger_dir(run_dir),
+                           min_runs=int(settings.get('min_runs', DEFAULT_MIN_RUNS)),
+                           quantile=float(settings.get('quantile', DEFAULT_QUANTILE)),
+                           factor=float(settings.get('factor', DEFAULT_FACTOR)),
+                           min_timeout=float(settings.get('min_timeout', DEFAULT_MIN_TIMEOUT)),
+                           neighbours=int(settings.get('neighbours', DEFAULT_NEIGHBOURS)))
+
+
+def start_ledger(directory, file_dict=None, resume=False):
+    """Prepare a sweep's ledger before anything runs.
+
+    Args:
+        directory: The ledger directory; see ledger_dir.
+        file_dict: The sweep's InputFiles by run number, for their swept_values. None, or files
+            without any, leave the limits unconditioned.
+        resume: Keep the runtimes already recorded, as a resumed sweep should: they are what its
+            limits are learned from, and they say which runs an adaptive limit stopped.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    if not resume:
+        (directory / LEDGER_FILE).unlink(missing_ok=True)
+
+    save_swept_values(directory / FEATURES_FILE, file_dict)
+
+
+def save_swept_values(path, file_dict):
+    """Write each run's swept_values (see generate_inputs.swept_values) to path, or remove it if none.
+
+    Args:
+        path: The .npz file to write.
+        file_dict: InputFiles by run number, or None.
+    """
+    names = sorted({name for input_file in (file_dict or {}).values()
+                    for name in getattr(input_file, 'swept_values', None) or {}})
+    if not names:
+        Path(path).unlink(missing_ok=True)
+        return
+
+    runs = sorted(file_dict)
+    values = np.array([[(getattr(file_dict[run], 'swept_values', None) or {}).get(name, np.nan)
+                        for name in names] for run in runs], dtype=float)
+    np.savez(path, runs=np.array(runs), values=values, names=np.array(names))
+
+
+def load_swept_values(path):
+    """Read what save_swept_values wrote.
+
+    Returns:
+        (names, rows): the parameter names, and each run's values in that order by run number. Both
+        empty if there is nothing readable at path.
+    """
+    try:
+        with np.load(path) as features:
+            names = [str(name) for name in features['names']]
+            rows = {int(run): row for run, row in zip(features['runs'], features['values'])}
+    except (OSError, KeyError, ValueError):
+        return [], {}
+
+    return names, rows
+
+
+class RuntimeLedger:
+    """How long each run of a sweep took, one line per run, shared by every worker of the sweep.
+
+    Args:
+        directory: The ledger directory.
+        name: The ledger file's name within it.
+    """
+
+    def __init__(self, directory, name=LEDGER_FILE):
+        self.directory = Path(directory)
+        self.path = self.directory / name
+
+    def record(self, file_num, seconds, error_code):
+        """Add a finished run to the ledger."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        line = f'{file_num} {seconds:.3f} {error_code}\n'.encode()
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def entries(self):
+        """Every run recorded, as (file_num, seconds, error_code), oldest first."""
+        try:
+            text = self.path.read_text()
+        except OSError:
+            return []
+
+        entries = []
+        for line in text.splitlines():
+            try:
+                file_num, seconds, error_code = line.split()
+                entries.append((int(file_num), float(seconds), int(error_code)))
+            except ValueError:
+                continue
+
+        return entries
+
+
+class AdaptiveTimeout(RuntimeLedger):
+    """A sweep's runtime ledger, and the limits learned from it.
+
+    Args:
+        directory: The ledger directory.
+        min_runs: Successful runs needed before any limit is learned.
+        quantile: Quantile of their runtimes to take.
+        factor: What the quantile is multiplied by.
+        min_timeout: Seconds below which no limit is set.
+        neighbours: Successful runs nearest in swept-parameter space to learn each run's limit from,
+            or 0 to learn from all of them.
+    """
+
+    def __init__(self, directory, min_runs=DEFAULT_MIN_RUNS, quantile=DEFAULT_QUANTILE,
+                 factor=DEFAULT_FACTOR, min_timeout=DEFAULT_MIN_TIMEOUT,
+                 neighbours=DEFAULT_NEIGHBOURS):
+        super().__init__(directory)
+        self.min_runs = max(1, min_runs)
+        self.quantile = quantile
+        self.factor = factor
+        self.min_timeout = min_timeout
+        self.neighbours = neighbours
+
+    def limit(self, file_num, timeout):
+        """The timeout to give a run.
+
+        Args:
+            file_num: The run's number.
+            timeout: The config's timeout: the ceiling, and what is given until there is enough to
+                learn from.
+        """
+        from omphalos.run import ADAPTIVE_TIMEOUT_ERROR_CODE
+
+        entries = self.entries()
+        previous = [error_code for run, _, error_code in entries if run == file_num]
+        if previous and previous[-1] == ADAPTIVE_TIMEOUT_ERROR_CODE:
+            return timeout
+
+        succeeded = {}
+        for run, seconds, error_code in entries:
+            if error_code == 0:
+                succeeded[run] = seconds
+        if len(succeeded) < self.min_runs:
+            return timeout
+
+        runtimes = self._nearest(file_num, succeeded)
+        learned = float(np.quantile(runtimes, self.quantile)) * self.factor
+
+        return min(timeout, max(self.min_timeout, learned))
+
+    def _nearest(self, file_num, succeeded):
+        """The runtimes to learn file_num's limit from: its nearest neighbours', if asked for and known."""
+        runtimes = np.array(list(succeeded.values()))
+        if self.neighbours <= 0 or len(succeeded) <= self.neighbours:
+            return runtimes
+
+        _, rows = load_swept_values(self.directory / FEATURES_FILE)
+        if file_num not in rows or any(run not in rows for run in succeeded):
+            return runtimes
+
+        points = np.array([rows[run] for run in succeeded])
+        spread = np.nanstd(np.vstack([points, rows[file_num]]), axis=0)
+        varied = spread > 0
+        if not varied.any():
+            return runtimes
+
+        offsets = (points[:, varied] - rows[file_num][varied]) / spread[varied]
+        distances = np.sqrt(np.nansum(offsets ** 2, axis=1))
+
+        return runtimes[np.argsort(distances, kind='stable')[:self.neighbours]]
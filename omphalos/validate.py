@@ -0,0 +1,411 @@
+"""Turn away the runs of a sweep that cannot succeed, before any solver time is spent on them.
+
+A sweep samples its parameters blind, and some of what it samples is a deck CrunchTope will refuse or
+fail on: a concentration pushed below zero, mineral volume fractions that leave no room for water.
+Others fail whatever was sampled, because the template names something its database does not have.
+Either way the run would take a slot, a directory and, on a cluster, a queue wait, only to stop with
+an error -- or, worse, to time out. These checks read the decks instead:
+
+- ``concentrations``: a concentration, or a gas's partial pressure, below zero.
+- ``mineral_volumes``: a volume fraction or surface area below zero, or volume fractions summing to 1
+  or more, which leaves no porosity. The sum is not judged where the deck fixes the porosity itself,
+  with fix_porosity in POROSITY or set_porosity in the condition.
+- ``charge_balance``: a condition balancing charge on a species the database does not have, or on a
+  neutral one, which no concentration of can balance anything.
+- ``database_names``: a primary species, mineral or gas the deck declares, or a mineral or gas a
+  condition is held in equilibrium with, that the database does not have.
+- ``output_times``: snapshot times that are not numbers, are negative, or do not increase.
+
+None of them runs unless the config asks, since a sweep that ran before would otherwise find some of
+its runs turned away:
+
+    validation: true                                # every check
+    validation:
+      checks: [concentrations, mineral_volumes]     # only these
+
+A run that fails a check is not run. Its InputFile is given ``error_code`` INVALID_ERROR_CODE and, as
+``invalid``, the reasons; it is otherwise kept, in its place and under its run number, so the sweep's
+record still lines up with the parameters it was generated from.
+
+The checks go by entry rather than by run, which is what lets 50,000 runs be checked in seconds. An
+entry no sweep sets is the template's in every run, so it is checked once; a swept one is read across
+the runs into one array and compared in one go. What only the template and database decide -- the
+names -- is decided once for the whole sweep.
+"""
+
+import numpy as np
+
+# Set on a run that validation turned away; see omphalos/run.py for the codes a run can end with.
+INVALID_ERROR_CODE = -5
+
+CHECKS = ('concentrations', 'mineral_volumes', 'charge_balance', 'database_names', 'output_times')
+
+# How many rejected runs report() lists one by one before summarising the rest.
+REPORTED = 10
+
+
+def settings(config):
+    """The validation section of a config, with its defaults filled in, or None if it has none.
+
+    Returns:
+        dict of 'checks', a tuple of names from CHECKS.
+
+    Raises:
+        ValueError: Where the section is malformed or names a check there is not.
+    """
+    section = (config or {}).get('validation')
+    if not section:
+        return None
+    if section is True:
+        section = {}
+    elif not isinstance(section, dict):
+        raise ValueError('validation is true, false, or a mapping with a list of checks')
+
+    checks = section.get('checks', CHECKS)
+    if isinstance(checks, str):
+        checks = [checks]
+    unknown = [check for check in checks if check not in CHECKS]
+    if unknown:
+        raise ValueError(f'validation checks are among {", ".join(CHECKS)}, not {unknown}')
+
+    return {'checks': tuple(checks)}
+
+
+def _floats(tokens):
+    """Read tokens as numbers, with NaN for any that is not one -- a mineral name, 'charge', None."""
+    import pandas as pd
+
+    return pd.to_numeric(pd.Series(tokens, dtype=object), errors='coerce').to_numpy(dtype=float)
+
+
+def _flag(problems, runs, mask, message, values=None):
+    """Add message to the reasons of every run mask holds for, with its value where it has one.
+
+    mask and values are either an array over runs or a scalar that holds for every run.
+    """
+    mask = np.broadcast_to(np.asarray(mask, dtype=bool), (len(runs),))
+    if values is not None:
+        values = np.broadcast_to(np.asarray(values), (len(runs),))
+    for i in np.flatnonzero(mask):
+        problems.setdefault(runs[i], []).append(
+            message.format(value=values[i]) if values is not None else message)
+
+
+def swept_entries(config):
+    """The (condition, entry) pairs the config's sweep gives a value of its own in each run.
+
+    Every section generate_inputs edits a geochemical condition from names its entries under the
+    condition; anything not named in one of them is the template's in every run.
+    """
+    from omphalos.generate_inputs import CT_IDs
+
+    swept = set()
+    for key, ids in CT_IDs.items():
+        if ids[0] != 'geochemical condition':
+            continue
+        for condition, entries in ((config or {}).get(key) or {}).items():
+            swept.update((condition, entry) for entry in entries or {})
+
+    return swept
+
+
+class _Columns:
+    """A condition entry's tokens across the runs, read from the template where no sweep sets them.
+
+    Args:
+        files: The runs' InputFiles, in run order.
+        template: The Template they were generated from, with its condition blocks sorted.
+        swept: The (condition, entry) pairs to read from the runs, or None to read every one.
+    """
+
+    def __init__(self, files, template, swept):
+        self.files = files
+        self.template = template
+        self.swept = swept
+
+    def value(self, condition, entry, position):
+        """The token at position as a number: an array over runs if swept, else a scalar."""
+        if self.swept is None or (condition, entry) in self.swept:
+            tokens = []
+            for input_file in self.files:
+                values = input_file.condition_blocks[condition].contents.get(entry) or []
+                tokens.append(values[position] if -len(values) <= position < len(values) else None)
+            return _floats(tokens)
+
+        values = self.template.condition_blocks[condition].contents[entry]
+        return _floats([values[position]])[0]
+
+
+def _check_concentrations(problems, runs, columns, template):
+    for condition, block in template.condition_blocks.items():
+        for entry in list(block.concentrations) + list(block.gases):
+            value = columns.value(condition, entry, -1)
+            _flag(problems, runs, value < 0,
+                  f'negative concentration of {entry} in condition {condition}: {{value:g}}', value)
+
+
+def _fixes_porosity(template, block):
+    porosity = template.keyword_blocks.get('POROSITY')
+    if porosity is not None and 'fix_porosity' in porosity.contents:
+        return True
+    return 'set_porosity' in block.contents
+
+
+def _check_mineral_volumes(problems, runs, columns, template):
+    from core.keyword_block import ConditionBlockModificationError, surface_area_position
+
+    for condition, block in template.condition_blocks.items():
+        total = 0.0
+        for entry, values in block.mineral_volumes.items():
+            volume = columns.value(condition, entry, 0)
+            _flag(problems, runs, volume < 0,
+                  f'negative volume fraction of {entry} in condition {condition}: {{value:g}}',
+                  volume)
+            total = total + np.nan_to_num(volume)
+            try:
+                position = surface_area_position(entry, values)
+            except ConditionBlockModificationError:
+                continue
+            area = columns.value(condition, entry, position)
+            _flag(problems, runs, area < 0,
+                  f'negative surface area of {entry} in condition {condition}: {{value:g}}', area)
+
+        if block.mineral_volumes and not _fixes_porosity(template, block):
+            _flag(problems, runs, total >= 1,
+                  f'mineral volume fractions in condition {condition} sum to {{value:.3g}}, '
+                  f'leaving no porosity', total)
+
+
+def _balanced_species(block):
+    """The species a condition balances charge on, if any: the entry given as 'charge'."""
+    for entry, values in block.contents.items():
+        if values and values[0] == 'charge':
+            # 'pH charge' balances on H+; every other entry names its species.
+            return 'H+' if entry == 'pH' else entry
+    return None
+
+
+def _aqueous(database, species):
+    """A species of the database's, whether it lists it as primary or secondary, or None.
+
+    CrunchTope rewrites the database's reactions around the deck's primary species, so a deck may
+    take as primary a species the database lists among its secondary ones.
+    """
+    return database.primary_species.get(species) or database.secondary_species.get(species)
+
+
+def _check_charge_balance(problems, runs, files, template, database):
+    for condition, block in template.condition_blocks.items():
+        species = _balanced_species(block)
+        if species is None:
+            continue
+        if _aqueous(database, species) is None:
+            _flag(problems, runs, True, f'condition {condition} balances charge on {species}, '
+                                        f'which {database.path} does not have')
+            continue
+        # A sweep of database_parameters can give each run a charge of its own. The runs share the
+        # template's parse, so a run's own is read from the row its edits rewrite.
+        line, column = _aqueous(database, species).parameters['charge']
+        if any(input_file.database is not None for input_file in files):
+            charge = np.array([(input_file.database or database).raw_database[line][column]
+                               for input_file in files], dtype=float)
+        else:
+            charge = float(database.raw_database[line][column])
+        _flag(problems, runs, charge == 0,
+              f'condition {condition} balances charge on {species}, which is neutral')
+
+
+def _constraint_phase(values):
+    """The mineral or gas a condition entry holds its species in equilibrium with, if it does.
+
+    'Fe+++ Goethite' names a mineral and 'O2(aq) O2(g) 0.21' a gas and its partial pressure; an entry
+    whose first token is a number, or 'charge', names neither.
+    """
+    if not values or values[0] == 'charge' or not np.isnan(_floats(values[:1])[0]):
+        return None
+    if len(values) == 1 or (len(values) == 2 and not np.isnan(_floats(values[1:])[0])):
+        return values[0]
+    return None
+
+
+def _declared(template, keyword):
+    """The names a keyword block of the deck declares, none where it has no such block."""
+    block = template.keyword_blocks.get(keyword)
+    # A block's contents open with the block's own name, which is not an entry.
+    return [name.split('&')[0] for name in block.contents if name != keyword] if block else []
+
+
+def _check_database_names(problems, runs, template, database):
+    aqueous = set(database.primary_species) | set(database.secondary_species)
+    declared = [('primary species', name, aqueous)
+                for name in _declared(template, 'PRIMARY_SPECIES')]
+    declared += [('mineral', name, database.minerals) for name in _declared(template, 'MINERALS')]
+    declared += [('gas', name, database.gases) for name in _declared(template, 'GASES')]
+    for kind, name, known in declared:
+        if name not in known:
+            _flag(problems, runs, True, f'the deck declares the {kind} {name}, '
+                                        f'which {database.path} does not have')
+
+    for condition, block in template.condition_blocks.items():
+        for entry, values in block.concentrations.items():
+            phase = _constraint_phase(values)
+            if phase is not None and phase not in database.minerals and phase not in database.gases:
+                _flag(problems, runs, True, f'condition {condition} holds {entry} in equilibrium '
+                                            f'with {phase}, which {database.path} does not have')
+
+
+def _time_problem(times):
+    """What is wrong with a run's snapshot times, or None."""
+    values = _floats(list(times))
+    if np.isnan(values).any():
+        return f'spatial_profile times {" ".join(times)} are not all numbers'
+    if (values < 0).any():
+        return f'spatial_profile times {" ".join(times)} include a negative time'
+    if (np.diff(values) <= 0).any():
+        return f'spatial_profile times {" ".join(times)} do not increase'
+    return None
+
+
+def _check_output_times(problems, runs, files, template, read_runs):
+    from core.keyword_block import snapshot_times
+
+    def times(input_file):
+        try:
+            return tuple(snapshot_times(input_file.keyword_blocks['OUTPUT'].contents))
+        except KeyError:
+            return None
+
+    # Many runs share their times, so each set of them is judged once.
+    grids = [times(input_file) for input_file in files] if read_runs else [times(template)]
+    verdicts = {grid: ('the OUTPUT block gives no spatial_profile times' if grid is None
+                       else _time_problem(grid)) for grid in set(grids)}
+    if len(grids) == 1:
+        if verdicts[grids[0]] is not None:
+            _flag(problems, runs, True, verdicts[grids[0]])
+        return
+    for run, grid in zip(runs, grids):
+        if verdicts[grid] is not None:
+            problems.setdefault(run, []).append(verdicts[grid])
+
+
+def _database(template, config):
+    """The database to check the runs against, or None, saying why, where there is none to read."""
+    from omphalos.database import Database
+
+    if getattr(template, 'database', None) is not None:
+        return template.database
+    path = (config or {}).get('database')
+    if not path:
+        print('Validation: no database in the config, so the database checks are skipped.')
+        return None
+    try:
+        return Database(path)
+    except (OSError, ValueError) as error:
+        print(f'Validation: {path} could not be read ({error}), so the database checks are skipped.')
+        return None
+
+
+def validate(file_dict, template, config=None, checks=CHECKS, database=None):
+    """Say what is wrong with each run of a sweep that cannot succeed.
+
+    Args:
+        file_dict: The runs, as configure_input_files returns them, or as
+            configure_staged_input_files does -- {run: {stage: InputFile}}, where a run fails if any
+            of its stages does.
+        template: The Template they were generated from.
+        config: The sweep's config, for what it sweeps and where its database is.
+        checks: The names, from CHECKS, of the checks to make.
+        database: The Database to check names against. Defaults to the template's or the config's.
+
+    Returns:
+        dict of {run: [reason, ...]} for the runs that failed a check.
+    """
+    if not file_dict:
+        return {}
+    if 'charge_balance' in checks or 'database_names' in checks:
+        database = database or _database(template, config)
+
+    if isinstance(next(iter(file_dict.values())), dict):
+        problems = {}
+        stages = sorted({stage for entry in file_dict.values() for stage in entry})
+        for stage in stages:
+            stage_files = {run: entry[stage] for run, entry in file_dict.items() if stage in entry}
+            for run, reasons in _validate(stage_files, template, None, checks, database).items():
+                problems.setdefault(run, []).extend(f'stage {stage}: {reason}' for reason in reasons)
+        return problems
+
+    return _validate(file_dict, template, swept_entries(config), checks, database,
+                     read_times='output' in (config or {}))
+
+
+def _validate(file_dict, template, swept, checks, database, read_times=True):
+    """validate for a flat {run: InputFile}; swept None reads every entry from the runs."""
+    runs = list(file_dict)
+    files = [file_dict[run] for run in runs]
+    # configure_input_files sorts only the conditions the config names; sorting is idempotent.
+    for condition in template.condition_blocks:
+        template.sort_condition_block(condition)
+    columns = _Columns(files, template, swept)
+
+    problems = {}
+    if 'concentrations' in checks:
+        _check_concentrations(problems, runs, columns, template)
+    if 'mineral_volumes' in checks:
+        _check_mineral_volumes(problems, runs, columns, template)
+    if 'charge_balance' in checks and database is not None:
+        _check_charge_balance(problems, runs, files, template, database)
+    if 'database_names' in checks and database is not None:
+        _check_database_names(problems, runs, template, database)
+    if 'output_times' in checks:
+        _check_output_times(problems, runs, files, template, read_times or swept is None)
+
+    return problems
+
+
+def reject(file_dict, problems):
+    """Mark the runs problems names as turned away: error_code INVALID_ERROR_CODE, and why.
+
+    Every stage of a staged run is marked, so that whichever of them a caller looks at says so.
+    """
+    for run, reasons in problems.items():
+        entry = file_dict[run]
+        for input_file in entry.values() if isinstance(entry, dict) else [entry]:
+            input_file.error_code = INVALID_ERROR_CODE
+            input_file.invalid = list(reasons)
+
+
+def is_rejected(input_file):
+    """Whether validation turned this run away."""
+    return getattr(input_file, 'error_code', 0) == INVALID_ERROR_CODE
+
+
+def report(problems, total):
+    """Print how many runs were turned away, and why, listing up to REPORTED of them."""
+    if not problems:
+        print(f'Validation: all {total} runs passed.')
+        return
+    print(f'Validation: {len(problems)} of {total} runs rejected before running.')
+    for run in sorted(problems)[:REPORTED]:
+        print(f'  run {run}: {"; ".join(problems[run])}')
+    if len(problems) > REPORTED:
+        print(f'  ... and {len(problems) - REPORTED} more.')
+
+
+def from_config(config, file_dict, template):
+    """Validate a sweep as its config asks, mark the runs that failed, and say which.
+
+    Returns:
+        The set of run numbers turned away, empty where validation is off.
+
+    Raises:
+        ValueError: Where the config's validation section is malformed.
+    """
+    section = settings(config)
+    if section is None:
+        return set()
+
+    problems = validate(file_dict, template, config, checks=section['checks'])
+    reject(file_dict, problems)
+    report(problems, len(file_dict))
+
+    return set(problems)
@@ -0,0 +1,476 @@
+"""The ways rhea can carry out a sweep's runs, behind one interface.
+
+By the time anything runs, rhea has printed every run's decks and staged its files into run<N>, so
+all that is left is to call slurm_exec.execute_and_record once per run number, somewhere. How is the
+executor's business:
+
+    serial    one run after another in this process. Nothing to install, and nothing between a test
+              and the code it tests.
+    xargs     one ``python rhea/slurm_exec.py N config`` per run, ``nodes`` at a time, through xargs.
+    parallel  the same through GNU Parallel.
+    pool      long-lived worker processes that each run many (see rhea/worker_pool.py).
+    slurm     a SLURM array, a task per run, or per ``runs_per_task`` runs with a ``task_farm``
+              section (see rhea/task_farm.py).
+
+Each has submit(run_ids), which starts the runs and returns; poll(), which is None while any is still
+going and then says how the executor itself ended; cancel(); and results(), what each run left. A
+new scheduler is a new subclass registered in BACKENDS, rather than another branch of shell in
+rhea/main.py.
+
+The config picks one:
+
+    executor: pool          # or a mapping:
+    executor:
+      backend: pool
+      workers: 8            # runs at once; default the config's nodes
+
+``-b/--backend`` overrides it. Without either, ``rhea config.yaml local`` uses xargs and ``rhea
+config.yaml cluster`` uses slurm, as they always have; naming a backend of the other kind for either
+is an error. A SLURM executor's runs outlive rhea, so rhea returns once they are queued rather than
+waiting to compile them.
+"""
+
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+_rhea_dir = Path(__file__).resolve().parent
+_project_root = _rhea_dir.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+SLURM_EXEC = _rhea_dir / 'slurm_exec.py'
+RUN_SBATCH = _rhea_dir / 'run_input_file.sbatch'
+FARM_SBATCH = _rhea_dir / 'task_farm.sbatch'
+
+# What run_type gives where neither the config nor the command line names a backend.
+DEFAULT_BACKENDS = {'local': 'xargs', 'cluster': 'slurm'}
+
+# Seconds between looks at a sweep that is being waited for.
+POLL_INTERVAL = 1.0
+
+
+class ExecutorError(Exception):
+    """A backend that cannot be used here: unknown, of the wrong kind, or not installed."""
+
+
+def completion_record(run_id, directory='.'):
+    """Where a finished run leaves its InputFile: run<N>/input_file<N>_complete.pkl."""
+    return Path(directory) / f'run{run_id}' / f'input_file{run_id}_complete.pkl'
+
+
+class Executor:
+    """Carry out runs whose directories rhea has already prepared.
+
+    Args:
+        config_path: The sweep's YAML config, which each run reads for itself.
+        workers: How many runs to have going at once, where the backend decides that.
+        pflo: Whether to use PFLOTRAN mode
+        min3p: Whether to use MIN3P mode
+        directory: Where the run directories are.
+    """
+
+    name = None
+
+    # Whether rhea waits for the runs to finish and compiles them. False where they outlive it.
+    waits = True
+
+    # Whether the backend starts each run itself, and so can hold it back for a resources.Admission.
+    admits = False
+
+    def __init__(self, config_path, workers=1, pflo=False, min3p=False, directory='.'):
+        self.config_path = str(config_path)
+        self.workers = max(1, int(workers))
+        self.pflo = pflo
+        self.min3p = min3p
+        self.directory = Path(directory)
+        self.submitted = []
+
+    def check(self):
+        """Raise ExecutorError if this backend cannot run here. Called before anything is prepared."""
+
+    def order(self, pending, config):
+        """The order to hand pending runs to submit in: longest first, where the config asks."""
+        from rhea import schedule
+
+        return schedule.plan(pending, self.workers, config)
+
+    def submit(self, run_ids):
+        """Start the runs. Returns once they are under way, not once they are done."""
+        raise NotImplementedError
+
+    def poll(self):
+        """None while any submitted run is still going; afterwards, 0 or the executor's failure code.
+
+        A run failing is not the executor failing: each run records its own outcome, and
+        compile_results accounts for them.
+        """
+        raise NotImplementedError
+
+    def cancel(self):
+        """Stop whatever has not finished. Runs already done keep their records."""
+        raise NotImplementedError
+
+    def wait(self, interval=POLL_INTERVAL):
+        """Poll until the runs are done, and return what poll then says."""
+        while True:
+            status = self.poll()
+            if status is not None:
+                return status
+            time.sleep(interval)
+
+    def results(self):
+        """dict of each submitted run to its completion record, or None where it has left none."""
+        records = {}
+        for run_id in self.submitted:
+            path = completion_record(run_id, self.directory)
+            records[run_id] = path if path.exists() else None
+
+        return records
+
+    def _flags(self):
+        return ' -p' if self.pflo else ' -m' if self.min3p else ''
+
+
+class SerialExecutor(Executor):
+    """Run each in turn, in this process, as submit is called.
+
+    What the tests drive a sweep with: no subprocesses, no shell, and an exception in a run is there
+    to be read in failed rather than lost in a child's stderr.
+    """
+
+    name = 'serial'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failed = {}
+        self._cancelled = False
+
+    def submit(self, run_ids):
+        import yaml
+
+        from rhea.slurm_exec import execute_and_record
+
+        with open(self.config_path) as file:
+            config = yaml.safe_load(file)
+
+        cwd = os.getcwd()
+        os.chdir(self.directory)
+        try:
+            for run_id in run_ids:
+                if self._cancelled:
+                    break
+                self.submitted.append(run_id)
+                try:
+                    execute_and_record(run_id, config, self.pflo, min3p=self.min3p)
+                except Exception:  # noqa: BLE001 - one run's failure must not stop the rest
+                    self.failed[run_id] = traceback.format_exc()
+                    print(f'File {run_id} raised:\n{self.failed[run_id]}')
+        finally:
+            os.chdir(cwd)
+
+    def poll(self):
+        return 0
+
+    def cancel(self):
+        self._cancelled = True
+
+
+class CommandExecutor(Executor):
+    """Run ``python rhea/slurm_exec.py N config`` once per run, from one shell command."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.process = None
+
+    def command(self, run_ids):
+        raise NotImplementedError
+
+    def submit(self, run_ids):
+        run_ids = list(run_ids)
+        self.submitted += run_ids
+        if not run_ids:
+            return
+        # A session of its own, so that cancel reaches the runs as well as the shell that started them.
+        self.process = subprocess.Popen(self.command(run_ids), shell=True, executable='/bin/bash',
+                                        cwd=self.directory, start_new_session=True)
+
+    def poll(self):
+        return 0 if self.process is None else self.process.poll()
+
+    def cancel(self):
+        if self.process is None or self.process.poll() is not None:
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        self.process.wait()
+
+    def _script(self):
+        return f'{sys.executable} {SLURM_EXEC}{self._flags()}'
+
+
+def run_numbers(run_ids):
+    """The runs, as xargs reads them on stdin and as GNU Parallel takes them after :::.
+
+    An unbroken range from 0, which is a whole sweep, is a range, which keeps the command short however
+    large the sweep; anything else -- a resumed sweep's remainder, or runs in scheduled order -- is
+    listed run by run.
+    """
+    run_ids = list(run_ids)
+    if run_ids == list(range(len(run_ids))):
+        return f'seq 0 {len(run_ids) - 1}', f'{{0..{len(run_ids) - 1}}}'
+    listed = ' '.join(str(run_id) for run_id in run_ids)
+
+    return f"printf '%s\\n' {listed}", listed
+
+
+class XargsExecutor(CommandExecutor):
+    name = 'xargs'
+
+    def command(self, run_ids):
+        stdin, _ = run_numbers(run_ids)
+        return f'{stdin} | xargs -I {{}} -P {self.workers} {self._script()} {{}} {self.config_path}'
+
+
+class ParallelExecutor(CommandExecutor):
+    name = 'parallel'
+
+    def check(self):
+        if shutil.which('parallel') is None:
+            raise ExecutorError('GNU Parallel not found. Install it or use --backend xargs')
+
+    def command(self, run_ids):
+        _, arguments = run_numbers(run_ids)
+        return (f'{shutil.which("parallel")} -P {self.workers} {self._script()} {{}} '
+                f'{self.config_path} ::: {arguments}')
+
+
+class PoolExecutor(Executor):
+    """Hand the runs to rhea/worker_pool.py's long-lived workers, from a thread of this process.
+
+    Args:
+        admission: A resources.Admission to start each run only once it fits, or None. Set by rhea
+            after construction, once it knows the runs' grids.
+    """
+
+    name = 'pool'
+    admits = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.admission = None
+        self.failed = {}
+        self._thread = None
+        self._error = None
+        self._cancelled = threading.Event()
+
+    def order(self, pending, config):
+        # The pool takes each run as a worker frees up, so the order can still be refitted on the
+        # sweep's own first runs.
+        from rhea import schedule
+
+        runs = super().order(pending, config)
+        if schedule.enabled(config):
+            runs = schedule.Dispatcher(runs, self.workers)
+
+        return runs
+
+    def _runs(self, run_ids):
+        # Read a few at a time by the pool, so a cancel stops the queue where it has got to.
+        for run_id in run_ids:
+            if self._cancelled.is_set():
+                return
+            self.submitted.append(run_id)
+            yield run_id
+
+    def _work(self, run_ids):
+        from rhea import worker_pool
+
+        try:
+            self.failed = worker_pool.run_pool(self.config_path, self._runs(run_ids), self.workers,
+                                               pflo=self.pflo, min3p=self.min3p,
+                                               admission=self.admission)
+        except Exception:  # noqa: BLE001 - reported by poll, as a shell command's exit code is
+            self._error = traceback.format_exc()
+            print(f'The worker pool failed:\n{self._error}')
+
+    def submit(self, run_ids):
+        self._thread = threading.Thread(target=self._work, args=(run_ids,), daemon=True)
+        self._thread.start()
+
+    def poll(self):
+        if self._thread is not None and self._thread.is_alive():
+            return None
+        return 1 if self._error else 0
+
+    def cancel(self):
+        self._cancelled.set()
+
+
+class SlurmExecutor(Executor):
+    """Submit the runs as a SLURM array, one task per run or, with a task_farm section, per chunk.
+
+    Args:
+        config: The sweep's config, for its task_farm section.
+    """
+
+    name = 'slurm'
+    waits = False
+
+    def __init__(self, *args, config=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        from rhea import task_farm
+
+        self.farm = task_farm.settings(config)
+        self.job_id = None
+
+    def check(self):
+        if shutil.which('sbatch') is None:
+            raise ExecutorError('sbatch not found. Cluster mode needs a SLURM scheduler; '
+                                'use run_type "local" on a workstation.')
+
+    def order(self, pending, config):
+        from rhea import schedule
+
+        if self.farm is None:
+            if schedule.enabled(config):
+                print('Schedule: a plain SLURM array starts runs by index, so they cannot be '
+                      'reordered. Add a task_farm section to have them start longest first.')
+            return list(pending)
+
+        runs_per_task, farm_workers = self.farm
+        tasks = self._tasks(len(pending))
+        queue = schedule.plan(pending, tasks * farm_workers, config)
+        if schedule.enabled(config):
+            from rhea import task_farm
+
+            queue = task_farm.deal(queue, tasks)
+
+        return queue
+
+    def _tasks(self, runs):
+        from rhea import task_farm
+
+        return task_farm.num_tasks(runs, self.farm[0])
+
+    def command(self, run_ids):
+        """The sbatch command line. OMPHALOS_DIR tells the batch script where this checkout lives."""
+        from rhea import slurm_interface as si
+
+        exports = f'CONFIG_PATH={self.config_path},PFLOTRAN="{self.pflo}"'
+        if self.farm is None:
+            return (f'sbatch --array={si.array_spec(run_ids)} '
+                    f'--export={exports},OMPHALOS_DIR={_project_root},ALL {RUN_SBATCH}')
+
+        runs_per_task, farm_workers = self.farm
+        tasks = self._tasks(len(run_ids))
+        return (f'sbatch --array=0-{tasks - 1} --cpus-per-task={farm_workers} '
+                f'--export={exports},RUNS_PER_TASK={runs_per_task},OMPHALOS_DIR={_project_root},'
+                f'ALL {FARM_SBATCH}')
+
+    def submit(self, run_ids):
+        from rhea import task_farm
+
+        run_ids = list(run_ids)
+        self.submitted += run_ids
+        if not run_ids:
+            return
+        if self.farm is not None:
+            # The tasks share the runs out between them through the queue written here.
+            task_farm.prepare(run_ids, self.directory)
+            print(f'Packing {len(run_ids)} run(s) into {self._tasks(len(run_ids))} array task(s) '
+                  f'of {self.farm[1]} CPU(s).')
+
+        result = subprocess.run(self.command(run_ids), shell=True, executable='/bin/bash',
+                                cwd=self.directory, capture_output=True, text=True)
+        print(result.stdout, end='')
+        if result.returncode != 0:
+            raise ExecutorError(f'sbatch exited with code {result.returncode}: '
+                                f'{result.stderr.strip()}')
+        match = re.search(r'Submitted batch job (\d+)', result.stdout)
+        self.job_id = match.group(1) if match else None
+
+    def poll(self):
+        """None while the array has tasks queued or running, as squeue says; 0 once it has none."""
+        if self.job_id is None or shutil.which('squeue') is None:
+            return 0
+        result = subprocess.run(['squeue', '--noheader', '--job', self.job_id],
+                                capture_output=True, text=True)
+        # squeue errors on a job it has already forgotten, which is a job that has finished.
+        return None if result.returncode == 0 and result.stdout.strip() else 0
+
+    def cancel(self):
+        if self.job_id is not None:
+            subprocess.run(['scancel', self.job_id])
+
+
+BACKENDS = {executor.name: executor for executor in
+            (SerialExecutor, XargsExecutor, ParallelExecutor, PoolExecutor, SlurmExecutor)}
+
+# Backends whose runs go to a cluster's scheduler rather than this machine.
+CLUSTER_BACKENDS = ('slurm',)
+
+
+def settings(config):
+    """The executor section of a config as (backend, workers), either of which may be None.
+
+    Raises:
+        ValueError: Where the section is malformed.
+    """
+    section = (config or {}).get('executor')
+    if not section:
+        return None, None
+    if isinstance(section, str):
+        section = {'backend': section}
+    elif not isinstance(section, dict):
+        raise ValueError('executor is a backend name, or a mapping of backend and workers')
+
+    workers = section.get('workers')
+
+    return section.get('backend'), (int(workers) if workers is not None else None)
+
+
+def from_config(config, config_path, run_type, backend=None, pflo=False, min3p=False,
+                directory='.'):
+    """The Executor to carry out a sweep's runs, checked as able to run here.
+
+    Args:
+        config: The sweep's config.
+        config_path: Where it was read from.
+        run_type: 'local' or 'cluster', from the command line.
+        backend: A backend named on the command line, which wins over the config's; or None.
+        pflo: Whether to use PFLOTRAN mode
+        min3p: Whether to use MIN3P mode
+        directory: Where the run directories are.
+
+    Raises:
+        ExecutorError: Where the backend is unknown, of the other kind from run_type, or cannot run
+            here.
+    """
+    if run_type not in DEFAULT_BACKENDS:
+        raise ExecutorError('run_type must be either local or cluster')
+
+    configured, workers = settings(config)
+    name = backend or configured or DEFAULT_BACKENDS[run_type]
+    if name not in BACKENDS:
+        raise ExecutorError(f'unknown executor backend {name!r}; known are {", ".join(BACKENDS)}')
+    if (name in CLUSTER_BACKENDS) != (run_type == 'cluster'):
+        raise ExecutorError(f'the {name} backend cannot carry out a {run_type} run')
+
+    if workers is None:
+        workers = (config or {}).get('nodes', 1)
+    kwargs = {'config': config} if name == 'slurm' else {}
+    executor = BACKENDS[name](config_path, workers, pflo=pflo, min3p=min3p, directory=directory,
+                              **kwargs)
+    executor.check()
+
+    return executor
@@ -7,7 +7,6 @@ Args:
 if __name__ == '__main__':
     import argparse
     import os
-    import subprocess
     import sys
     import time
     from pathlib import Path
@@ -20,8 +19,26 @@ if __name__ == '__main__':
     if str(_project_root) not in sys.path:
         sys.path.insert(0, str(_project_root))
 
+    # 'rhea status <config>' reads a running sweep's heartbeats instead of starting one.
+    if len(sys.argv) > 1 and sys.argv[1] == 'status':
+        from core import telemetry
+        sys.exit(telemetry.main(sys.argv[2:]))
+
+    # 'rhea plan <config>' forecasts what a sweep will take, without running it.
+    if len(sys.argv) > 1 and sys.argv[1] == 'plan':
+        from rhea import plan
+        sys.exit(plan.main(sys.argv[2:]))
+
+    # 'rhea runs tidy|list|show|extract' tidies a sweep's run directories, or reads what they kept.
+    if len(sys.argv) > 1 and sys.argv[1] == 'runs':
+        from core import lifecycle
+        sys.exit(lifecycle.main(sys.argv[2:]))
+
     import yaml
+    from rhea import executors
+    from rhea import schedule
     from rhea import slurm_interface as si
+    from core import staging
 
     parser = argparse.ArgumentParser()
     parser.add_argument('path_to_config', type=str, help='YAML file containing options.')
@@ -37,29 +54,29 @@ if __name__ == '__main__':
     parser.add_argument(
         '-b', '--backend',
         type=str,
-        choices=['xargs', 'parallel'],
-        default='xargs',
-        help='Parallelization backend: "xargs" (default) or "parallel" (GNU Parallel, which offers '
-             'better load balancing and progress reporting where it is installed and working)'
+        choices=list(executors.BACKENDS),
+        default=None,
+        help='Executor backend, overriding the config\'s executor section: "xargs" (the local '
+             'default), "parallel" (GNU Parallel, which offers better load balancing and progress '
+             'reporting where it is installed and working), "pool" (long-lived Python workers, for '
+             'sweeps of many short runs), "serial" (one run at a time in this process) or "slurm" '
+             '(the cluster default). See rhea/executors.py.'
+    )
+    parser.add_argument(
+        '-r', '--resume', action='store_true',
+        help='Skip runs that already finished cleanly with the decks this sweep would give them, '
+             'and run only the rest. CrunchTope and PFLOTRAN only.'
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help='Run every simulation, even where the config\'s run_cache holds its results.'
     )
     args = parser.parse_args()
 
-    def run_shell(command, description, env=None, fatal=True):
-        """Run a shell command, reporting a non-zero exit rather than carrying on regardless.
-
-        A failed directory-prep step used to surface much later as a FileNotFoundError on the first
-        input file, which points at the wrong thing entirely.
-        """
-        # Augment the environment rather than replacing it: a command run with no PATH resolves
-        # executables against os.defpath only, which is how sbatch or parallel go missing.
-        full_env = {**os.environ, **env} if env else None
-        result = subprocess.run(command, shell=True, executable='/bin/bash', env=full_env)
-        if result.returncode != 0:
-            message = f'{description} exited with code {result.returncode}.'
-            if fatal:
-                sys.exit(f'ERROR: {message} Aborting.')
-            print(f'WARNING: {message}')
-        return result.returncode
+    # The workers read the config themselves, so the override travels in the environment, which both
+    # the local backends and sbatch's --export=...,ALL pass on.
+    if args.no_cache:
+        os.environ['OMPHALOS_NO_CACHE'] = '1'
 
     # Settle --compile-inputs before anything runs, so an unsupported combination is known now rather
     # than after a sweep. It reads the per-run pickles the workers leave behind, so it needs runs that
@@ -104,19 +121,25 @@ if __name__ == '__main__':
         except Exception as exc:  # noqa: BLE001 - the results are already written; do not lose them
             print(f'WARNING: could not compile the input record: {exc}')
 
-    def build_prep_command(backend, prep_script, dict_size, parallel_exec=None):
-        """Build the directory preparation command for the chosen backend."""
-        if backend == 'parallel':
-            return f'{parallel_exec} env SLURM_ARRAY_TASK_ID={{}} {prep_script} ::: {{0..{dict_size}}}'
-        else:  # xargs
-            return f'seq 0 {dict_size} | xargs -I {{}} -P 0 env SLURM_ARRAY_TASK_ID={{}} {prep_script}'
+    def carry_out(executor, runs, description):
+        """Submit runs to executor and, where it runs them here, wait for them all to finish.
 
-    def build_run_command(backend, slurm_exec_script, dict_size, nodes, config_path, parallel_exec=None):
-        """Build the simulation execution command for the chosen backend."""
-        if backend == 'parallel':
-            return f'{parallel_exec} -P {nodes} python {slurm_exec_script} {{}} {config_path} ::: {{0..{dict_size}}}'
-        else:  # xargs
-            return f'seq 0 {dict_size} | xargs -I {{}} -P {nodes} python {slurm_exec_script} {{}} {config_path}'
+        Interrupted, the runs still going are cancelled rather than left running behind the prompt.
+        """
+        try:
+            executor.submit(runs)
+            if executor.waits:
+                status = executor.wait()
+                # A non-zero status means the runner itself struggled; individual simulation
+                # failures are recorded per run and reported by compile_results, so keep going and
+                # let it account for them.
+                if status:
+                    print(f'WARNING: {description} exited with code {status}.')
+        except executors.ExecutorError as exc:
+            sys.exit(f'ERROR: {exc} Aborting.')
+        except KeyboardInterrupt:
+            executor.cancel()
+            raise
 
     if args.min3p:
         from min3p.template import Template
@@ -128,21 +151,25 @@ if __name__ == '__main__':
         from omphalos.template import Template
         from omphalos import generate_inputs as gi
 
-    def write_aux_files(input_file, run_num, stage_num=None):
+    def write_aux_files(input_file, run_num, stage_num=None, store=None):
         """Write a run's swept auxiliary files into its own directory.
 
-        prep_directories.sh copies the template's thermodynamic database, aqueous database and
-        catabolic pathways into every run directory verbatim. Those copies are what slurm_exec.py
-        re-reads, so a sweep of 'database_parameters' or 'namelists' would reach the deck and
-        nothing else: every run would speciate against identical files and quietly agree with
-        itself. The modified copies live only on the InputFile objects configure_input_files
-        returned, so they have to be written out here, while those objects still exist.
+        The template's thermodynamic database, aqueous database and catabolic pathways are staged
+        into every run directory verbatim. Those copies are what slurm_exec.py re-reads, so a sweep
+        of 'database_parameters' or 'namelists' would reach the deck and nothing else: every run
+        would speciate against identical files and quietly agree with itself. The modified copies
+        live only on the InputFile objects configure_input_files returned, so they have to be
+        written out here, while those objects still exist.
 
         A chain's stages may hold different ones again, where a 'staged' sweep varies something in
         them, so each stage's go in a directory of their own; slurm_exec.py points that stage's
         Template at them, and run.run_staged_input copies them into the run directory under the
         deck's names before the stage runs.
 
+        Written through store, the sweep's core.staging.ContentStore, so a run whose files come out
+        the same as another's -- every run, for a file the sweep does not touch -- is given a link
+        to one copy rather than a copy of its own.
+
         Only CrunchTope has files Omphalos sweeps and so must write out per run. MIN3P's auxiliary
         files are copied verbatim, which its own branch does; PFLOTRAN has none.
         """
@@ -157,7 +184,7 @@ if __name__ == '__main__':
             directory = directory / f'stage{stage_num}_aux'
             directory.mkdir(exist_ok=True)
 
-        omphalos_run._print_aux_files(input_file, directory.resolve())
+        omphalos_run._print_aux_files(input_file, directory.resolve(), store=store)
 
     # Define procedural file generation name scheme at top for consistency.
     # Do not change as this is not passed to slurm_exec.py
@@ -166,6 +193,21 @@ if __name__ == '__main__':
     with open(args.path_to_config) as file:
         config = yaml.full_load(file)
 
+    # Settled before anything is prepared, so a backend that cannot run here -- no sbatch, no GNU
+    # Parallel -- says so now rather than as a failed shell command after every deck is printed.
+    try:
+        executor = executors.from_config(config, args.path_to_config, args.run_type,
+                                         backend=args.backend, pflo=args.pflotran, min3p=args.min3p)
+        # Likewise what becomes of the run directories, which the runs themselves act on.
+        from core import lifecycle
+        tidying = lifecycle.settings(config)
+    except (executors.ExecutorError, ValueError) as exc:
+        sys.exit(f'ERROR: {exc}')
+
+    # From here, with 'profiling: true', the sweep's phases are timed; see core/profiling.py.
+    from core import profiling
+    profiling.configure(config)
+
     template = Template(config)
 
     # Check once, before any run, that the deck spells its auxiliary-database keywords the way this
@@ -175,18 +217,25 @@ if __name__ == '__main__':
         import omphalos.crunch_keywords as ck
         ck.check_deck(template.keyword_blocks['RUNTIME'].contents)
 
+        # Likewise read the termination criteria now, so that one that cannot be read stops the
+        # sweep here rather than every run.
+        from omphalos import criteria
+        criteria.from_config(config)
+
     # Check for staged restart runs
     is_staged = 'restart_chain' in config and config['restart_chain']
 
     if args.min3p:
         # MIN3P has an isolated local-mode orchestration: it needs neither the
         # thermodynamic-database copy nor the temperature/restart machinery that
-        # the CrunchTope/PFLOTRAN prep script performs (MIN3P reads an absolute
+        # the CrunchTope/PFLOTRAN staging performs (MIN3P reads an absolute
         # database directory baked into each input file by generate_inputs). Its
         # own auxiliary files are handled below. This branch therefore bypasses
-        # prep_directories.sh entirely, leaving the other backends untouched.
+        # that staging entirely, leaving the other backends untouched.
         if args.run_type != 'local':
             sys.exit('ERROR: MIN3P backend currently supports only run_type "local" in rhea.')
+        if args.resume:
+            sys.exit('ERROR: --resume is not supported for the MIN3P backend.')
 
         file_dict = gi.configure_input_files(template, 'foo', rhea=True)
         dict_size = len(file_dict) - 1
@@ -214,26 +263,7 @@ if __name__ == '__main__':
             sys.exit('Debug mode: MIN3P input files generated. Exiting before running.')
 
         # Run each file through MIN3P via slurm_exec.py using the chosen backend.
-        slurm_exec_script = _rhea_dir / 'slurm_exec.py'
-        nodes = config.get('nodes', 1)
-        if args.backend == 'parallel':
-            result = subprocess.run('which parallel', shell=True, capture_output=True, text=True)
-            parallel_exec = result.stdout.strip()
-            if not parallel_exec:
-                print('ERROR: GNU Parallel not found. Install it or use --backend xargs')
-                sys.exit(1)
-            run_command = (
-                f'{parallel_exec} -P {nodes} python {slurm_exec_script} -m {{}} '
-                f'{args.path_to_config} ::: {{0..{dict_size}}}'
-            )
-        else:  # xargs
-            run_command = (
-                f'seq 0 {dict_size} | xargs -I {{}} -P {nodes} '
-                f'python {slurm_exec_script} -m {{}} {args.path_to_config}'
-            )
-        # A non-zero exit here means the runner itself struggled; individual simulation failures are
-        # recorded per run and reported by compile_results, so keep going and let it account for them.
-        run_shell(run_command, 'MIN3P run command', fatal=False)
+        carry_out(executor, range(dict_size + 1), 'MIN3P run command')
 
         summary = si.compile_results(dict_size + 1, simulator='min3p')
         compile_input_record(config, results_path=summary['results'])
@@ -248,7 +278,72 @@ if __name__ == '__main__':
     else:
         file_dict = gi.configure_input_files(template, 'foo', rhea=True)
         dict_size = len(file_dict) - 1
-    si.clear_run_directories(dict_size + 1)
+
+    # Turn away the runs that cannot succeed before anything is prepared or submitted for them; see
+    # omphalos/validate.py. Each keeps its run number, and is left a record saying why below.
+    from omphalos import validate
+    rejected = set()
+    if not args.pflotran:
+        try:
+            rejected = validate.from_config(config, staged_file_dict if is_staged else file_dict,
+                                            template)
+        except ValueError as exc:
+            sys.exit(f'ERROR: {exc}')
+
+    def print_decks(run_num, run_dir):
+        """Print a run's decks into run_dir, under the names slurm_exec.py will look for."""
+        run_dir = Path(run_dir)
+        paths = si.deck_paths(run_dir, config)
+        if is_staged:
+            # One file per stage per run: template_stage0.in, template_stage1.in, etc.
+            for stage_num in staged_file_dict[run_num]:
+                stage_file = staged_file_dict[run_num][stage_num]
+                stage_file.path = str(paths[stage_num])
+                Path(stage_file.path).parent.mkdir(parents=True, exist_ok=True)
+                stage_file.print()
+        else:
+            input_file = file_dict[run_num]
+            input_file.path = str(paths[0])
+            Path(input_file.path).parent.mkdir(parents=True, exist_ok=True)
+            input_file.print()
+            for later_file in input_file.later_inputs or {}:
+                input_file.later_inputs[later_file].path = str(run_dir / later_file)
+                input_file.later_inputs[later_file].print()
+
+    # A resumed sweep reruns only what has not already finished with the decks it would be given
+    # now. Those are printed somewhere out of the way first, to be hashed against what each run
+    # recorded, since the run directories themselves must not be touched until it is known which
+    # of them are being kept.
+    done = set()
+    if args.resume:
+        import tempfile
+
+        expected = {}
+        with tempfile.TemporaryDirectory(prefix='rhea_resume_') as scratch:
+            for run_num in range(dict_size + 1):
+                run_dir = Path(scratch) / f'{dir_name}{run_num}'
+                run_dir.mkdir()
+                print_decks(run_num, run_dir)
+                expected[run_num] = si.deck_hash(si.deck_paths(run_dir, config))
+        done = si.completed_runs(expected)
+        print(f'Resuming: {len(done)} of {dict_size + 1} run(s) already complete and skipped.')
+    pending = [run_num for run_num in range(dict_size + 1)
+               if run_num not in done and run_num not in rejected]
+    if not pending and not executor.waits:
+        sys.exit(f'Every run is already complete{" or rejected" if rejected else ""}; nothing to '
+                 f'submit. Compile them with python rhea/compile_results.py {dict_size + 1}.')
+
+    si.clear_run_directories(dict_size + 1, keep=done)
+
+    # A rejected run's record is the one its run would have left, written now, so that
+    # compile_results counts it among the failures and says why. A staged run's is its first stage's.
+    if rejected:
+        from core import file_methods as fm
+        for run_num in sorted(rejected - done):
+            Path(f'{dir_name}{run_num}').mkdir(exist_ok=True)
+            record = staged_file_dict[run_num][min(staged_file_dict[run_num])] if is_staged \
+                else file_dict[run_num]
+            fm.pickle_data_set(record, f'{dir_name}{run_num}/input_file{run_num}_complete.pkl')
 
     # Start timer for directory preparation and submission
     t_start = time.time()
@@ -270,141 +365,69 @@ if __name__ == '__main__':
     else:
         print('No auxiliary files found in template or config.')
 
-    # Script paths using pathlib
-    prep_script = _rhea_dir / 'prep_directories.sh'
-    slurm_exec_script = _rhea_dir / 'slurm_exec.py'
-    run_sbatch = _rhea_dir / 'run_input_file.sbatch'
-
-    if args.run_type == 'cluster':
-        # Run directory preparation script
-        for key in config:
-            if config[key] is None:
-                config[key] = ''
-
-        env_dict = {
-            "CONFIG_PATH": args.path_to_config,
-            "DATABASE_NAME": config["database"],
-            "AQUEOUS_DATABASE": config["aqueous_database"],
-            "CATABOLIC_PATHWAYS": config["catabolic_pathways"],
-            "AUX_FILES": ' '.join(aux_files),
-            "RESTART_FILE": config.get("restart_file") or "",
-            "PFLOTRAN": ""
-        }
-
-        if args.pflotran:
-            env_dict["PFLOTRAN"] = "TRUE"
-
-        print(env_dict)
-        sbatch_command = [
-            "sbatch",
-            f"--array=0-{dict_size}",
-            str(prep_script)
-        ]
-
-        # Run the sbatch command and capture the output. The environment is augmented rather than
-        # replaced, or sbatch itself may not be found: with no PATH, subprocess resolves executables
-        # against os.defpath alone.
-        try:
-            result = subprocess.run(sbatch_command, check=True, env={**os.environ, **env_dict},
-                                    capture_output=True, text=True)
-
-            output = result.stdout
-            print("Directory prep command executed successfully.")
-            print("Output:", output)
-
-            import re as _re
-            match = _re.search(r'Submitted batch job (\d+)', output)
-            if not match:
-                raise RuntimeError(
-                    f"Could not parse SLURM job ID from sbatch output: {output!r}"
-                )
-            job_id = match.group(1)
-            print("Job ID:", job_id)
-
-            # Wait for the job to complete by checking its status with squeue
-            job_running = True
-            while job_running:
-                squeue_command = ["squeue", "--job", job_id]
-                squeue_result = subprocess.run(squeue_command, capture_output=True, text=True)
-
-                if job_id not in squeue_result.stdout:
-                    job_running = False
-                else:
-                    print(f"Job {job_id} for directory population is still running. Checking again in 10 seconds...")
-                    time.sleep(10)
-
-            print(f"Job {job_id} has completed.")
-
-        except subprocess.CalledProcessError as e:
-            print("Error occurred while running sbatch command.")
-            print("Return code:", e.returncode)
-            print("Error output:", e.stderr)
-        except FileNotFoundError:
-            # No sbatch on PATH: cluster mode was asked for off a cluster, which is worth saying
-            # plainly rather than as a traceback.
-            sys.exit('ERROR: sbatch not found. Cluster mode needs a SLURM scheduler; '
-                     'use run_type "local" on a workstation.')
-
-    elif args.run_type == 'local':
-        if config['aqueous_database'] is None:
-            config['aqueous_database'] = ""
-
-        if config['catabolic_pathways'] is None:
-            config['catabolic_pathways'] = ""
-
-        env_dict = {
-            "CONFIG_PATH": args.path_to_config,
-            "DATABASE_NAME": config["database"],
-            "AQUEOUS_DATABASE": config["aqueous_database"],
-            "CATABOLIC_PATHWAYS": config["catabolic_pathways"],
-            "AUX_FILES": ' '.join(aux_files),
-            "RESTART_FILE": config.get("restart_file") or "",
-            "PFLOTRAN": ""
-        }
-
-        if args.pflotran:
-            env_dict["PFLOTRAN"] = "TRUE"
-
-        print(env_dict)
-
-        # Get parallel executable path if using GNU Parallel backend
-        parallel_exec = None
-        if args.backend == 'parallel':
-            result = subprocess.run('which parallel', shell=True, capture_output=True, text=True)
-            parallel_exec = result.stdout.strip()
-            if not parallel_exec:
-                print('ERROR: GNU Parallel not found. Install it or use --backend xargs')
-                sys.exit(1)
-
-        # Run directory preparation script
-        prep_command = build_prep_command(args.backend, prep_script, dict_size, parallel_exec)
-        run_shell(prep_command, 'Directory preparation', env=env_dict)
+    # Every file a run reads beside its decks, staged into each run directory as a link to one
+    # stored copy rather than copied (see core/staging.py): the thermodynamic database and, for
+    # CrunchTope, the aqueous kinetics and catabolic pathways files, then the auxiliary files. An
+    # absolutely-pathed one is read from where it is, and is left there. The restart file is the
+    # exception to linking: a deck may save its restart under the name it read it from, and that
+    # must not write through to every other run's.
+    shared_names = [config.get('database')]
+    if not args.pflotran:
+        shared_names += [config.get('aqueous_database'), config.get('catabolic_pathways')]
+    shared_names += aux_files
+    shared_files = [(name, None) for name in shared_names if name]
+    if config.get('restart_file'):
+        shared_files.append((config['restart_file'], staging.WRITABLE_MODES))
+
+    missing = [name for name, _ in shared_files if not Path(name).is_file()]
+    if missing:
+        print(f'WARNING: not found, so not staged into the run directories: {missing}')
+    shared_files = [(name, modes) for name, modes in shared_files
+                    if name not in missing and not Path(name).is_absolute()]
+
+    # Cleared each sweep: content-addressed, it would otherwise keep every swept database of every
+    # sweep run here. Hard links and copies already staged from it do not mind.
+    store = staging.ContentStore(staging.STORE_DIR, staging.modes_from_config(config))
+    store.clear()
+
+    # Likewise the adaptive timeout ledger, except on --resume: the runtimes already recorded are
+    # what the rerun's limits are learned from, and say which runs a learned limit stopped.
+    if config.get('adaptive_timeout') and not args.pflotran:
+        from omphalos import timeouts
+        timeouts.start_ledger(timeouts.ledger_dir(f'{dir_name}0'),
+                              None if is_staged else file_dict, resume=args.resume)
+
+    # Stage the shared files, print the decks, and write each run's swept files over the shared
+    # ones. Decks and swept files are written here, before anything runs or is submitted, so a
+    # cluster sweep is a single submission with nothing left for its tasks to prepare.
+    for run_num in pending:
+        run_dir = Path(f'{dir_name}{run_num}')
+        run_dir.mkdir(exist_ok=True)
+        for name, modes in shared_files:
+            store.stage(name, run_dir / name, modes)
+        print_decks(run_num, run_dir)
+        if is_staged:
+            for stage_num in staged_file_dict[run_num]:
+                write_aux_files(staged_file_dict[run_num][stage_num], run_num, stage_num, store)
+        else:
+            write_aux_files(file_dict[run_num], run_num, store=store)
 
-    else:
-        print('ERROR: run_type must be either local or cluster')
-        sys.exit(1)
+    # Fold the last sweep's runtimes into what rhea/schedule.py predicts from, and note where each of
+    # this sweep's runs sits in parameter space, whether or not this sweep is reordered by them. Only
+    # where the config asks for a schedule, 'index' included; otherwise .rhea_schedule is left alone.
+    if schedule.recording(config):
+        schedule.start(None if is_staged else file_dict, resume=args.resume)
 
-    # Print files to prepped directories
-    if is_staged:
-        # Print staged input files - one file per stage per run
-        for run_num in staged_file_dict:
-            for stage_num in staged_file_dict[run_num]:
-                stage_file = staged_file_dict[run_num][stage_num]
-                # Name files by stage: template_stage0.in, template_stage1.in, etc.
-                base_name = config["template"].rsplit('.', 1)[0]
-                ext = config["template"].rsplit('.', 1)[1] if '.' in config["template"] else 'in'
-                stage_file.path = f'{dir_name}{run_num}/{base_name}_stage{stage_num}.{ext}'
-                stage_file.print()
-                write_aux_files(stage_file, run_num, stage_num)
-    else:
-        for file in file_dict:
-            file_dict[file].path = f'{dir_name}{file}/{config["template"]}'
-            file_dict[file].print()
-            write_aux_files(file_dict[file], file)
-            if file_dict[file].later_inputs:
-                for later_file in file_dict[file].later_inputs:
-                    file_dict[file].later_inputs[later_file].path = f'{dir_name}{file}/{file_dict[file].later_inputs[later_file].path}'
-                    file_dict[file].later_inputs[later_file].print()
+    # Where `rhea status` counts the sweep's runs from; see core/telemetry.py. A rejected run is
+    # counted in the total, so it is recorded as failed now, or it would be pending for ever.
+    from core import telemetry
+    turned_away = sorted(rejected - done)
+    telemetry.start_sweep(config, dict_size + 1, pending + turned_away)
+    for run_num in turned_away:
+        telemetry.finish(config, run_num, validate.INVALID_ERROR_CODE, 0.0)
+
+    # What generating the sweep took, for compile_results to report beside the runs' own timings.
+    profiling.save()
 
     t_stop = time.time()
 
@@ -412,40 +435,46 @@ if __name__ == '__main__':
     if args.debug:
         sys.exit('Debug mode: files generated and directories prepped. Exiting before submission.')
 
-    if args.run_type == 'local':
-        nodes = config['nodes']
-        # Run instances using chosen backend
-        if args.pflotran:
-            if is_staged:
-                print('ERROR: Staged restart runs are not supported for PFLOTRAN mode.')
-                sys.exit(1)
-            # PFLOTRAN runs sequentially due to specific requirements
-            for file in file_dict:
-                run_shell(f'python {slurm_exec_script} -p {file} {args.path_to_config}',
-                          f'PFLOTRAN run of file {file}', fatal=False)
-                print(f'File {file} complete.')
-        else:
-            run_command = build_run_command(args.backend, slurm_exec_script, dict_size, nodes, args.path_to_config, parallel_exec)
-            # Individual simulation failures are recorded per run and reported by compile_results, so
-            # a non-zero exit here is a warning rather than a reason to stop before compiling.
-            run_shell(run_command, 'Run command', fatal=False)
+    if args.pflotran:
+        if is_staged and executor.waits:
+            print('ERROR: Staged restart runs are not supported for PFLOTRAN mode.')
+            sys.exit(1)
+        # PFLOTRAN runs sequentially due to specific requirements.
+        if executor.waits:
+            executor.workers = 1
+
+    if pending:
+        runs = executor.order(pending, config)
+        if config.get('resources'):
+            if executor.admits:
+                # Each run's grid, for the memory it is admitted against; see rhea/resources.py.
+                from rhea import resources
+                executor.admission = resources.from_config(
+                    config, resources.run_cells(staged_file_dict if is_staged else file_dict),
+                    executor.workers)
+                if executor.admission is not None:
+                    print(f'Resources: {executor.admission.describe()}.')
+            else:
+                print(f'Resources: the {executor.name} backend starts each run as it comes, so '
+                      'runs are neither pinned nor admitted by memory. Use -b pool for that.')
+        # Where the config hands tidying the run directories to rhea, a thread does it while rhea
+        # waits; without a wait there is no rhea to do it, and each run tidies its own as it ends.
+        # See core/lifecycle.py.
+        sweeper = None
+        if tidying is not None and tidying['when'] == 'background' and executor.waits:
+            sweeper = lifecycle.Sweeper(runs, tidying).start()
+        # No compile_input_record for an executor that does not wait: --compile-inputs is refused
+        # for cluster runs up front, since the array has not finished by the time this returns.
+        try:
+            carry_out(executor, runs, 'Run command')
+        finally:
+            if sweeper is not None:
+                sweeper.stop()
 
+    if executor.waits:
         # Compile results. compile_results reports the per-run breakdown itself; exit non-zero if
         # nothing came back, so a wholly failed sweep does not look like a success to a caller.
         summary = si.compile_results(dict_size + 1)
         compile_input_record(config, results_path=summary['results'])
         if not summary['compiled']:
             sys.exit(1)
-
-    elif args.run_type == 'cluster':
-        # No compile_input_record here: --compile-inputs is refused for cluster runs up front, since
-        # the array has not finished by the time this returns.
-        # OMPHALOS_DIR tells the batch script where this checkout lives, so it need not hardcode a path.
-        submit_runs = (
-            f'sbatch --array=0-{dict_size} '
-            f'--export=CONFIG_PATH={args.path_to_config},PFLOTRAN="{args.pflotran}",'
-            f'OMPHALOS_DIR={_project_root},ALL {run_sbatch}'
-        )
-        run_shell(submit_runs, 'Submitting run array')
-    else:
-        print('ERROR: run_type must be either local or cluster')
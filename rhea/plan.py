@@ -0,0 +1,461 @@
+"""``rhea plan <config>``: forecast what a sweep will take before it is run.
+
+A sweep of thousands of runs says how much disk, memory and core-time it needs only by running out
+of one of them partway through: a quota hit at run 6,000, a filesystem out of inodes, a node's worth
+of large grids OOM-killed together. Everything those depend on is known before any run starts -- the
+grids, the output times, the species the deck carries -- so this works them out from the design
+alone, without running the solver:
+
+- The design is generated as rhea would generate it, restart chains and ``refine`` grids included,
+  and each run's cell count read from its grids (see generate_inputs.resolve_grid).
+- Each run writes a TecPlot file per category per ``spatial_profile`` time. The categories and the
+  columns each carries follow from the deck's species, mineral, gas and sorption blocks (see
+  TEC_CATEGORIES), at about BYTES_PER_VALUE bytes a value, as CrunchTope prints them.
+- compile_results keeps every category get_results parses as float64: eight bytes per column per
+  cell per snapshot per run.
+- A run that saves a restart -- every stage of a chain but the last -- writes one record per solver
+  array, sized from the declarations in omphalos/restart_file.py.
+- Peak memory is resources.MemoryModel's estimate, from the peaks past sweeps recorded where there
+  are any, and the configured or default cost per cell where not.
+- Runtime, where the directory has runtimes recorded by past sweeps, comes from the model
+  rhea/schedule.py fits on them: total core-hours and the makespan over the workers.
+
+The category list is CrunchTope's as documented, and builds differ in what they write. Given a run
+directory a past sweep left (``--from-run run0``), the categories and their bytes per cell are
+measured from its .tec files instead, which holds for any sweep of the same chemistry.
+
+The plan ends with a warning for each limit it would break: the free space and free inodes of the
+filesystem the sweep runs on, and the ``--quota`` and ``--inodes`` given, which is where a cluster's
+per-user quota goes, as ``statvfs`` cannot see it. The exit status is 1 where there is a warning.
+
+Run from the directory the sweep would be started in. CrunchTope sweeps only.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+_project_root = Path(__file__).resolve().parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from rhea import resources  # noqa: E402
+
+# The TecPlot categories CrunchTope writes at each spatial_profile time, each with the deck blocks
+# whose entries are its columns beside X, Y and Z. None is a single column. A category whose blocks
+# are all empty is not written.
+TEC_CATEGORIES = {
+    'totcon': ('PRIMARY_SPECIES',),
+    'conc': ('PRIMARY_SPECIES', 'SECONDARY_SPECIES'),
+    'volume': ('MINERALS',),
+    'rate': ('MINERALS',),
+    'saturation': ('MINERALS',),
+    'MineralPercent': ('MINERALS',),
+    'MineralVolfraction': ('MINERALS',),
+    'AqRate': ('AQUEOUS_KINETICS',),
+    'gases_conc': ('GASES',),
+    'exchange': ('ION_EXCHANGE',),
+    'surface': ('SURFACE_COMPLEXATION',),
+    'pH': None,
+    'porosity': None,
+    'Temperature': None,
+    'velocityx': None,
+    'velocityy': None,
+    'velocityz': None,
+}
+
+# CrunchTope prints each value as a %17.8E field and a separator, and names its columns in a header
+# of about TEC_HEADER_BYTES plus TEC_HEADER_BYTES_PER_COLUMN a column.
+BYTES_PER_VALUE = 18
+TEC_HEADER_BYTES = 100
+TEC_HEADER_BYTES_PER_COLUMN = 24
+TEC_COORDINATES = 3
+
+NETCDF_BYTES_PER_VALUE = 8
+
+# Files and directories a run has beside its .tec files: its directory, decks, log, .out, pickle,
+# the links to the shared databases and the few small files CrunchTope always leaves. A hard link
+# takes no inode of its own, so this errs high where the store links.
+FILES_PER_RUN = 12
+
+# The runs the per-run lines of the budget name: the largest few.
+LARGEST_RUNS = 3
+
+
+def tec_columns(dims):
+    """The columns beside X, Y and Z of each TecPlot category a deck of these dims writes.
+
+    Args:
+        dims: The deck's block sizes, as restart_file.dims_from_input_file gives them.
+
+    Returns:
+        dict of category: columns, leaving out the categories with none.
+    """
+    columns = {}
+    for category, blocks in TEC_CATEGORIES.items():
+        count = 1 if blocks is None else sum(dims.get(block, 0) for block in blocks)
+        if count:
+            columns[category] = count
+
+    return columns
+
+
+def tec_bytes(cells, columns):
+    """The size of one TecPlot snapshot file of cells rows and columns data columns."""
+    return (TEC_HEADER_BYTES + TEC_HEADER_BYTES_PER_COLUMN * (TEC_COORDINATES + columns)
+            + cells * (TEC_COORDINATES + columns) * BYTES_PER_VALUE)
+
+
+def _extent(axis, shape, symbols):
+    """The stored length of one axis of a restart declaration, for a grid of shape."""
+    if axis.grid is not None:
+        return shape['xyz'.index(axis.grid)] + axis.offset - axis.lo + 1
+    if axis.literal is not None:
+        return axis.literal
+    # nsurf_sec, nexch_sec and nreactmax come from the database, not the deck; one of each is a
+    # floor rather than a guess at how many the database holds.
+    return sum(symbols.get(term, 1) for term in axis.symbol.split('+'))
+
+
+def restart_bytes(dims, shape):
+    """The size of the restart file a run of this grid and these dims saves.
+
+    Every record CrunchTope always writes, each at its first declared variant, with its record
+    markers; the saturation and erosion records it writes only in some runs are left out.
+    """
+    from omphalos import restart_file as rf
+
+    symbols = {symbol: dims.get(block, 0) for symbol, block in rf._SYMBOL_BLOCKS.items()}
+    total = 0
+    for name in rf._BASE + rf._TAIL:
+        # The header records have no declaration, and hold a few scalars.
+        declared = rf.DECLARATIONS.get(name)
+        count = 1
+        for axis in rf._parse_declaration(declared[0]) if declared else []:
+            count *= _extent(axis, shape, symbols)
+        size = 4 if name in rf.INT_RECORDS else 8
+        total += count * size + 2 * rf.MARKER_SIZE
+
+    return total
+
+
+def measure_run(run_dir):
+    """The TecPlot categories a finished run wrote, measured from its files.
+
+    Returns:
+        dict of category: (bytes per cell per snapshot, data columns), from the first file of each
+        category whose ZONE line gives its grid. Empty where run_dir holds no readable .tec files.
+    """
+    from core import file_methods as fm
+
+    measured = {}
+    for category in sorted(fm.data_cats(run_dir)):
+        files = sorted(Path(run_dir).glob(f'{category}[0-9]*.tec'))
+        if not files:
+            continue
+        with open(files[0], errors='replace') as file:
+            header = ''.join(file.readline() for _ in range(3))
+        zone = re.search(r'I=\s*(\d+)\s*,\s*J=\s*(\d+)\s*,\s*K=\s*(\d+)', header)
+        names = re.findall(r'"([^"]*)"', header.split('VARIABLES', 1)[-1].splitlines()[0])
+        if zone is None or not names:
+            continue
+        cells = int(zone[1]) * int(zone[2]) * int(zone[3])
+        size = statistics.mean(path.stat().st_size for path in files)
+        measured[category] = (size / cells, max(1, len(names) - TEC_COORDINATES))
+
+    return measured
+
+
+def estimate_run(stages, model, measured=None):
+    """What one run will write and need.
+
+    Args:
+        stages: The run's InputFiles in the order they run: one, or a restart chain's stages.
+        model: The resources.MemoryModel its peak memory is estimated with.
+        measured: measure_run's result, to use in place of TEC_CATEGORIES; or None.
+
+    Returns:
+        dict of 'cells', the largest stage's, 'snapshots', 'tec_files', 'tec_bytes', 'netcdf_bytes',
+        'restart_bytes' and 'memory', in bytes.
+    """
+    from core import spatial_constructor as sc
+    from core.keyword_block import snapshot_times
+    from omphalos.input_file import SKIPPED_CATEGORIES
+    from omphalos.restart_file import dims_from_input_file
+
+    estimate = dict.fromkeys(('cells', 'snapshots', 'tec_files', 'tec_bytes', 'netcdf_bytes',
+                              'restart_bytes'), 0)
+    for stage in stages:
+        shape = sc.grid_shape(stage)
+        cells = shape[0] * shape[1] * shape[2]
+        try:
+            snapshots = len(snapshot_times(stage.keyword_blocks['OUTPUT'].contents))
+        except KeyError:
+            snapshots = 0
+        dims = dims_from_input_file(stage)
+
+        if measured:
+            per_cell = {category: size for category, (size, _) in measured.items()}
+            columns = {category: count for category, (_, count) in measured.items()}
+            written = sum(per_cell.values()) * cells
+        else:
+            columns = tec_columns(dims)
+            written = sum(tec_bytes(cells, count) for count in columns.values())
+        parsed = sum(count for category, count in columns.items()
+                     if category not in SKIPPED_CATEGORIES)
+
+        estimate['cells'] = max(estimate['cells'], cells)
+        estimate['snapshots'] += snapshots
+        estimate['tec_files'] += len(columns) * snapshots
+        estimate['tec_bytes'] += written * snapshots
+        estimate['netcdf_bytes'] += NETCDF_BYTES_PER_VALUE * parsed * cells * snapshots
+        runtime = stage.keyword_blocks.get('RUNTIME')
+        if runtime is not None and runtime.contents.get('save_restart'):
+            estimate['restart_bytes'] += restart_bytes(dims, shape)
+
+    estimate['memory'] = model.estimate(estimate['cells'])
+
+    return estimate
+
+
+def predict_runtimes(file_dict, directory='.'):
+    """Each run's predicted seconds from the runtimes past sweeps recorded, or None without any.
+
+    Returns:
+        (seconds by run number, the model's description), or None.
+    """
+    from rhea import schedule
+
+    predictor = schedule.fit_predictor(directory, include_this_sweep=True)
+    if predictor is None:
+        return None
+
+    runs = [run for run, entry in file_dict.items() if not isinstance(entry, dict)]
+    names = sorted({name for run in runs
+                    for name in getattr(file_dict[run], 'swept_values', None) or {}})
+    if not runs or not names:
+        return None
+    rows = [[(file_dict[run].swept_values or {}).get(name, float('nan')) for name in names]
+            for run in runs]
+
+    return dict(zip(runs, predictor.predict(names, rows))), predictor.describe()
+
+
+def budget(estimates, workers, runtimes=None):
+    """The sweep's totals from each run's estimate_run.
+
+    Args:
+        estimates: estimate_run's result by run number.
+        workers: Runs that execute at once.
+        runtimes: Predicted seconds by run number, or None.
+
+    Returns:
+        dict of 'runs', the summed 'tec_bytes', 'netcdf_bytes', 'restart_bytes' and 'tec_files',
+        'disk', everything written, 'inodes', 'memory', what the workers largest runs need at once,
+        'largest', the run numbers of the largest runs, and, with runtimes, 'core_hours' and
+        'makespan' in seconds.
+    """
+    from rhea import schedule
+
+    total = {'runs': len(estimates)}
+    for key in ('tec_bytes', 'netcdf_bytes', 'restart_bytes', 'tec_files'):
+        total[key] = sum(estimate[key] for estimate in estimates.values())
+    total['disk'] = total['tec_bytes'] + total['netcdf_bytes'] + total['restart_bytes']
+    total['inodes'] = total['tec_files'] + FILES_PER_RUN * len(estimates)
+
+    memory = sorted((estimate['memory'] for estimate in estimates.values()), reverse=True)
+    total['memory'] = sum(memory[:max(1, workers)])
+    total['largest'] = sorted(estimates, key=lambda run: estimates[run]['tec_bytes'],
+                              reverse=True)[:LARGEST_RUNS]
+
+    if runtimes:
+        total['core_hours'] = sum(runtimes.values()) / 3600
+        total['makespan'] = schedule.makespan(sorted(runtimes.values(), reverse=True), workers)
+
+    return total
+
+
+def check_limits(total, directory='.', quota=None, inodes=None):
+    """A warning for each limit the sweep would break, as text; empty where it fits.
+
+    Args:
+        total: budget's result.
+        directory: Where the sweep runs, for the free space and inodes of its filesystem.
+        quota: Bytes the sweep may write, or None.
+        inodes: Files the sweep may create, or None.
+    """
+    warnings = []
+    free = shutil.disk_usage(directory).free
+    if total['disk'] > free:
+        warnings.append(f'The sweep writes {_size(total["disk"])}, but its filesystem has '
+                        f'{_size(free)} free.')
+    if quota is not None and total['disk'] > quota:
+        warnings.append(f'The sweep writes {_size(total["disk"])}, over the quota of '
+                        f'{_size(quota)}.')
+
+    # A filesystem with no inode count of its own, as some network ones report, says zero.
+    stats = os.statvfs(directory)
+    if stats.f_files and total['inodes'] > stats.f_favail:
+        warnings.append(f'The sweep creates about {total["inodes"]:,} files, but its filesystem '
+                        f'has {stats.f_favail:,} inodes free.')
+    if inodes is not None and total['inodes'] > inodes:
+        warnings.append(f'The sweep creates about {total["inodes"]:,} files, over the limit of '
+                        f'{inodes:,}.')
+
+    return warnings
+
+
+def _size(size):
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if abs(size) < 1024 or unit == 'TB':
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+
+
+def _duration(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    return f'{hours}:{rest // 60:02d}:{rest % 60:02d}'
+
+
+def table(total, estimates, workers, model=None):
+    """budget's totals as the text rhea plan prints."""
+    lines = [f'Plan for {total["runs"]} runs, {workers} at once.',
+             f'  {"TecPlot output":<22} {_size(total["tec_bytes"]):>10}   '
+             f'{total["tec_files"]:,} files',
+             f'  {"compiled netCDF":<22} {_size(total["netcdf_bytes"]):>10}',
+             f'  {"restart files":<22} {_size(total["restart_bytes"]):>10}',
+             f'  {"disk in all":<22} {_size(total["disk"]):>10}   '
+             f'about {total["inodes"]:,} files and directories',
+             f'  {"memory at once":<22} {_size(total["memory"]):>10}']
+    if 'core_hours' in total:
+        lines.append(f'  {"core-hours":<22} {total["core_hours"]:>10.1f}')
+        lines.append(f'  {"makespan":<22} {_duration(total["makespan"]):>10}')
+    if model:
+        lines.append(f'Runtimes predicted from {model["source"]}, '
+                     f'{model["training_runs"]} run(s).')
+    elif 'core_hours' not in total:
+        lines.append('No runtimes recorded by past sweeps here, so no runtime forecast.')
+
+    lines.append('')
+    lines.append(f'{"run":>6} {"cells":>9} {"snapshots":>9} {"TecPlot":>10} {"netCDF":>10} '
+                 f'{"restarts":>10} {"memory":>10}')
+    for run in total['largest']:
+        estimate = estimates[run]
+        lines.append(f'{run:>6} {estimate["cells"]:>9,} {estimate["snapshots"]:>9} '
+                     f'{_size(estimate["tec_bytes"]):>10} {_size(estimate["netcdf_bytes"]):>10} '
+                     f'{_size(estimate["restart_bytes"]):>10} {_size(estimate["memory"]):>10}')
+
+    return '\n'.join(lines)
+
+
+@contextlib.contextmanager
+def _shadow(directory):
+    """Change into a directory of links to directory's entries, so that what is written lands there.
+
+    resolve_grid writes each refined spatial file beside the one it refines, and a plan is not to
+    leave anything behind. Past sweeps' run directories are not needed, and refined files left by a
+    past sweep are not linked, since writing one again would write through the link.
+    """
+    directory = Path(directory).resolve()
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='rhea_plan_') as shadow:
+        for entry in directory.iterdir():
+            if re.fullmatch(r'run\d+', entry.name) or re.search(r'_stage\d+$', entry.stem):
+                continue
+            (Path(shadow) / entry.name).symlink_to(entry)
+        os.chdir(shadow)
+        try:
+            yield Path(shadow)
+        finally:
+            os.chdir(previous)
+
+
+def generate(config):
+    """The design the config asks for, as rhea would generate it.
+
+    Returns:
+        InputFiles by run number, or, for a restart chain, dicts of each run's stage InputFiles.
+    """
+    from omphalos import generate_inputs as gi
+    from omphalos.template import Template
+
+    template = Template(config)
+    if config.get('restart_chain'):
+        return gi.configure_staged_input_files(template, 'foo', rhea=True)
+
+    return gi.configure_input_files(template, 'foo', rhea=True)
+
+
+def main(argv=None):
+    """``rhea plan <config>``: print the budget of the sweep a config describes, without running it.
+
+    Returns:
+        The exit status: 1 where the sweep would break a limit.
+    """
+    import yaml
+
+    parser = argparse.ArgumentParser(
+        prog='rhea plan', description='Forecast the disk, memory and time a sweep will take.')
+    parser.add_argument('path_to_config', type=str, help='YAML file containing options.')
+    parser.add_argument('-w', '--workers', type=int,
+                        help='Runs that execute at once. Default: the executor section\'s workers, '
+                             'or nodes.')
+    parser.add_argument('--from-run', type=str, metavar='RUN_DIR',
+                        help='A run directory a past sweep of the same chemistry left, to measure '
+                             'the TecPlot output from rather than estimating it.')
+    parser.add_argument('--quota', type=float, metavar='GB',
+                        help='Warn where the sweep writes more than this.')
+    parser.add_argument('--inodes', type=int, metavar='FILES',
+                        help='Warn where the sweep creates more files than this.')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Show what generating the design prints.')
+    args = parser.parse_args(argv)
+
+    from rhea import executors
+
+    with open(args.path_to_config) as file:
+        config = yaml.full_load(file)
+    workers = args.workers or executors.settings(config)[1] or config.get('nodes', 1)
+
+    measured = None
+    if args.from_run:
+        measured = measure_run(args.from_run)
+        if not measured:
+            print(f'No TecPlot files to measure in {args.from_run}; estimating from the deck.')
+
+    # Generation reads the template, databases and spatial files from where the config names them,
+    # relative to where the sweep is started, as rhea does.
+    directory = Path.cwd()
+    output = None if args.verbose else io.StringIO()
+    with _shadow(directory), contextlib.redirect_stdout(output or sys.stdout):
+        file_dict = generate(config)
+
+        section = resources.settings(config) or {}
+        model = resources.MemoryModel(
+            section.get('base_memory', resources.DEFAULT_BASE_MEMORY),
+            section.get('memory_per_cell', resources.DEFAULT_MEMORY_PER_CELL),
+            section.get('margin', resources.DEFAULT_MARGIN), resources.PeakLedger(directory))
+        estimates = {run: estimate_run(entry.values() if isinstance(entry, dict) else [entry],
+                                       model, measured)
+                     for run, entry in file_dict.items()}
+
+    predicted = predict_runtimes(file_dict, directory)
+    runtimes, description = predicted if predicted else (None, None)
+    total = budget(estimates, workers, runtimes)
+    print(table(total, estimates, workers, description))
+
+    warnings = check_limits(total, directory,
+                            quota=args.quota * resources.GB if args.quota is not None else None,
+                            inodes=args.inodes)
+    for warning in warnings:
+        print(f'WARNING: {warning}')
+
+    return 1 if warnings else 0
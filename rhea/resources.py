@@ -0,0 +1,459 @@
+"""Pin local runs to cores and start them only while they fit in memory: a config ``resources`` section.
+
+Local mode runs ``nodes`` simulations at once whatever they are. A sweep that mixes grid sizes then
+gets it wrong both ways: a handful of large 3-D grids overcommit RAM and are OOM-killed, taking a
+worker with them, while a sweep of small 1-D columns could have run more at once than ``nodes``
+allows for fear of the large ones. And with nothing pinned, the kernel moves CrunchTope children
+between cores, and between NUMA nodes, away from the memory their arrays were first touched on.
+
+With a ``resources`` section and ``--backend pool``, the pool's dispatcher (rhea/worker_pool.py)
+decides when each run may start and where:
+
+- **Cores.** The CPUs this process may use are split into sets of ``cores_per_run``, each set within
+  one NUMA node, read from /sys/devices/system/node. A run is pinned to a free set with
+  ``os.sched_setaffinity`` in its worker before it starts, and CrunchTope inherits the affinity. Sets
+  are handed out alternating between nodes, so that a half-full machine spreads its runs over every
+  node's memory bandwidth. ``nodes`` stays the most runs at once.
+- **Memory.** A run is estimated to need ``base_memory`` plus ``memory_per_cell`` times its grid's
+  cell count -- for a restart chain, its largest stage's, as resolve_grid left it. A run starts only
+  while the estimates of the runs in hand, with its own, fit in ``memory_limit`` GB (default: the
+  fraction ``memory_fraction`` of MemAvailable when the sweep starts). The run at the head of the
+  queue waits rather than being passed over, so a large run is never starved by small ones behind it;
+  a run too large for the limit on its own is started once nothing else is running.
+
+The per-cell cost is a prior. Each worker samples the peak resident memory (VmHWM, from /proc) of the
+CrunchTope children it starts and records it with the run's cell count in
+``.rhea_resources/peak_memory.txt``. Once runs of this sweep have finished, a child's peak is fitted
+as a fixed part plus a cost per cell, by least squares over their grids, and a run is estimated at
+``base_memory`` plus that line, times ``margin``; before that, the fit is to past sweeps' runs in the
+directory; before any, the configured cost per cell is all there is. A ratio of peak to cells would
+charge a small grid's fixed solver overhead to every cell of a large one. The peaks are the
+children's alone, so ``base_memory`` stays the worker's own share, which they leave out.
+
+The xargs and GNU Parallel backends start ``-P`` runs at once by themselves, so neither can be told
+when a run may start: rhea says so and runs them as before.
+"""
+
+import os
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path for imports
+_project_root = Path(__file__).resolve().parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+RESOURCES_DIR = '.rhea_resources'
+LEDGER_FILE = 'peak_memory.txt'
+
+GB = 1024 ** 3
+
+# What a resources section does not set. The base covers a worker's interpreter, which stays
+# resident beside its CrunchTope child. Until runs are measured it also stands in for CrunchTope's
+# own arrays that do not scale with the grid; afterwards those are in the measured per-cell cost.
+DEFAULT_CORES_PER_RUN = 1
+DEFAULT_BASE_MEMORY = 0.25 * GB
+DEFAULT_MEMORY_PER_CELL = 100 * 1024
+DEFAULT_MEMORY_FRACTION = 0.9
+DEFAULT_MARGIN = 1.2
+
+# Seconds between samples of a running child's peak memory. VmHWM only rises, so a sample taken
+# late still sees a peak reached early; only a child that exits within the interval is missed.
+SAMPLE_INTERVAL = 0.5
+
+# Past observations read from the ledger, newest, so that it cannot grow without bound.
+HISTORY_LIMIT = 1000
+
+
+def settings(config):
+    """The resources section of a config, with its defaults filled in, or None if it has none.
+
+    ``resources: true`` takes the defaults.
+    """
+    section = (config or {}).get('resources')
+    if not section:
+        return None
+    if section is True:
+        section = {}
+
+    limit = section.get('memory_limit')
+    return {
+        'pin': bool(section.get('pin', True)),
+        'cores_per_run': max(1, int(section.get('cores_per_run', DEFAULT_CORES_PER_RUN))),
+        'base_memory': float(section.get('base_memory', DEFAULT_BASE_MEMORY / GB)) * GB,
+        'memory_per_cell': float(section.get('memory_per_cell', DEFAULT_MEMORY_PER_CELL)),
+        'memory_limit': None if limit is None else float(limit) * GB,
+        'memory_fraction': float(section.get('memory_fraction', DEFAULT_MEMORY_FRACTION)),
+        'margin': float(section.get('margin', DEFAULT_MARGIN)),
+    }
+
+
+def parse_cpulist(text):
+    """Read a kernel CPU list, such as '0-3,8-11', into a set of CPU numbers."""
+    cpus = set()
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        cpus.update(range(int(first), int(last or first) + 1))
+
+    return cpus
+
+
+def numa_nodes(root='/sys/devices/system/node'):
+    """The CPUs of each NUMA node that this process may run on, node by node.
+
+    A machine, or kernel, that reports no nodes is one node of every CPU allowed.
+    """
+    allowed = set(os.sched_getaffinity(0))
+    nodes = []
+    for path in sorted(Path(root).glob('node[0-9]*'), key=lambda path: int(path.name[4:])):
+        try:
+            cpus = parse_cpulist((path / 'cpulist').read_text()) & allowed
+        except (OSError, ValueError):
+            continue
+        if cpus:
+            nodes.append(cpus)
+
+    return nodes or [allowed]
+
+
+def core_sets(nodes, cores_per_run):
+    """Split each node's CPUs into sets of cores_per_run, and interleave the nodes' sets.
+
+    A node's CPUs that do not make up a whole set are left unused, rather than a run being given
+    CPUs on two nodes.
+
+    Returns:
+        list of tuples of CPU numbers, alternating between nodes.
+    """
+    per_node = []
+    for cpus in nodes:
+        cpus = sorted(cpus)
+        per_node.append([tuple(cpus[i:i + cores_per_run])
+                         for i in range(0, len(cpus) - cores_per_run + 1, cores_per_run)])
+
+    sets = []
+    for i in range(max((len(node) for node in per_node), default=0)):
+        sets.extend(node[i] for node in per_node if i < len(node))
+
+    return sets
+
+
+def available_memory(meminfo='/proc/meminfo'):
+    """MemAvailable in bytes, or None where the kernel does not say."""
+    try:
+        with open(meminfo) as file:
+            for line in file:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    return None
+
+
+def grid_cells(input_file):
+    """The number of cells in an InputFile's grid, or None where it cannot be read."""
+    from core import spatial_constructor as sc
+
+    try:
+        x, y, z = sc.grid_shape(input_file)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+    return x * y * z
+
+
+def run_cells(file_dict):
+    """Each run's cell count, by run number.
+
+    Args:
+        file_dict: InputFiles by run number, or, for a restart chain, dicts of each run's stage
+            InputFiles by stage number. A chain needs as much as its largest stage.
+    """
+    cells = {}
+    for run_num, entry in file_dict.items():
+        files = entry.values() if isinstance(entry, dict) else [entry]
+        counts = [count for count in map(grid_cells, files) if count]
+        if counts:
+            cells[run_num] = max(counts)
+
+    return cells
+
+
+def _children(pid):
+    """The pids of a process's children."""
+    listings = list(Path(f'/proc/{pid}/task').glob('*/children'))
+    if not listings:
+        return _children_by_scan(pid)
+
+    children = set()
+    for path in listings:
+        try:
+            children.update(int(child) for child in path.read_text().split())
+        except (OSError, ValueError):
+            continue
+
+    return children
+
+
+def _children_by_scan(pid):
+    """The pids of a process's children, for a kernel built without /proc/<pid>/task/*/children."""
+    children = set()
+    for path in Path('/proc').glob('[0-9]*/stat'):
+        try:
+            # The command name is in parentheses and may hold spaces; the parent pid follows it.
+            fields = path.read_text().rpartition(')')[2].split()
+            if int(fields[1]) == pid:
+                children.add(int(path.parent.name))
+        except (OSError, ValueError, IndexError):
+            continue
+
+    return children
+
+
+def _peak_rss(pid):
+    """A process's peak resident memory in bytes, or 0 if it has gone."""
+    try:
+        with open(f'/proc/{pid}/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    return 0
+
+
+class PeakMemory:
+    """Sample the peak resident memory of this process's children while a run goes on.
+
+    A context manager: ``peak`` is the most the children alive at once held, in bytes. 0 where /proc
+    cannot say.
+
+    Args:
+        interval: Seconds between samples.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _sample(self):
+        pid = os.getpid()
+        while True:
+            self.peak = max(self.peak, sum(_peak_rss(child) for child in _children(pid)))
+            if self._stop.wait(self.interval):
+                return
+
+
+class PeakLedger:
+    """Each run's cell count and peak memory, one line per run, appended by every worker at once.
+
+    Args:
+        directory: The directory the ledger is kept in.
+    """
+
+    def __init__(self, directory='.'):
+        self.directory = Path(directory) / RESOURCES_DIR
+        self.path = self.directory / LEDGER_FILE
+
+    def record(self, file_num, cells, peak):
+        """Add a finished run, as one write to a file opened O_APPEND, so that lines do not mix."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        line = f'{file_num} {cells} {int(peak)}\n'.encode()
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def entries(self):
+        """Every run recorded, as (file_num, cells, peak bytes), oldest first. Torn lines are skipped."""
+        try:
+            text = self.path.read_text()
+        except OSError:
+            return []
+
+        entries = []
+        for line in text.splitlines():
+            try:
+                file_num, cells, peak = line.split()
+                entries.append((int(file_num), int(cells), int(peak)))
+            except ValueError:
+                continue
+
+        return entries
+
+
+def record(file_num, input_file, peak, directory='.'):
+    """Record a finished run's peak memory against its grid, if both are known."""
+    cells = grid_cells(input_file)
+    if not cells or not peak:
+        return
+
+    try:
+        PeakLedger(directory).record(int(file_num), cells, peak)
+    except OSError as exc:
+        print(f'Could not record the peak memory of file {file_num}: {exc}')
+
+
+class MemoryModel:
+    """What a run is estimated to need: a fixed base, the solver's fixed part, and a cost per cell.
+
+    Args:
+        base: Bytes every run's worker needs whatever its grid, beside its CrunchTope child.
+        per_cell: The prior cost of a cell, in bytes.
+        margin: What an observed cost is multiplied by.
+        ledger: The PeakLedger observations are read from.
+    """
+
+    def __init__(self, base, per_cell, margin=DEFAULT_MARGIN, ledger=None):
+        self.base = base
+        self.per_cell = per_cell
+        # What a CrunchTope child needs whatever its grid, once runs have been seen to say.
+        self.fixed = 0.0
+        self.margin = margin
+        self.ledger = ledger
+        # Lines already in the ledger are past sweeps'.
+        self._past = len(ledger.entries()) if ledger else 0
+        self.refine()
+
+    def refine(self):
+        """Fit the child's fixed part and cost per cell to the runs observed, this sweep's in
+        preference to past ones.
+
+        A peak is its CrunchTope child's alone, without the worker's interpreter that base covers.
+        It is fitted as fixed + per_cell * cells by least squares, the cost per cell held at zero or
+        more, and the line then raised until no observed run lies above it. With one grid size
+        there is nothing to tell the two apart, and the whole peak is put down to the cells.
+        """
+        if self.ledger is None:
+            return
+
+        entries = self.ledger.entries()
+        for observed in (entries[self._past:], entries[:self._past][-HISTORY_LIMIT:]):
+            points = [(cells, peak) for _, cells, peak in observed if cells > 0]
+            if points:
+                fixed, per_cell = fit_peaks(points)
+                self.fixed, self.per_cell = fixed * self.margin, per_cell * self.margin
+                return
+
+    def estimate(self, cells):
+        """Bytes a run of cells cells is expected to need. Unknown grids are taken as a single cell."""
+        return self.base + self.fixed + self.per_cell * (cells or 1)
+
+
+def fit_peaks(points):
+    """The (fixed, per_cell) bytes of the lowest line fitted to (cells, peak) that no point is above.
+
+    The slope is the least-squares one, held at zero or more; the intercept is then the least that
+    leaves every point on or below the line, so no run already seen would have been underestimated.
+    """
+    cells, peaks = (np.asarray(values, dtype=float) for values in zip(*points))
+    if np.ptp(cells) == 0:
+        return 0.0, float(np.max(peaks / cells))
+
+    per_cell = max(float(np.polyfit(cells, peaks, 1)[0]), 0.0)
+    fixed = max(float(np.max(peaks - per_cell * cells)), 0.0)
+    return fixed, per_cell
+
+
+class Admission:
+    """Decide when each run of a pool may start, and which cores it is pinned to.
+
+    Args:
+        slots: The CPU tuples runs are pinned to, one per run at once, or empty tuples for as many
+            unpinned runs.
+        budget: Bytes the runs in hand may be estimated to need between them, or None for no limit.
+        model: The MemoryModel estimates come from.
+        cells: Each run's cell count, by run number.
+    """
+
+    def __init__(self, slots, budget, model, cells):
+        self.slots = list(slots)
+        self.budget = budget
+        self.model = model
+        self.cells = dict(cells)
+        self.in_flight = {}
+
+    def committed(self):
+        """Bytes the runs in hand are estimated to need between them."""
+        return sum(need for _, need in self.in_flight.values())
+
+    def admit(self, file_num):
+        """Start file_num if a slot is free and it fits.
+
+        Returns:
+            The CPUs to pin it to (empty to leave it unpinned), or None if it must wait.
+        """
+        busy = {slot for slot, _ in self.in_flight.values()}
+        free = [slot for slot in range(len(self.slots)) if slot not in busy]
+        if not free:
+            return None
+
+        need = self.model.estimate(self.cells.get(int(file_num)))
+        if self.budget is not None and self.committed() + need > self.budget:
+            if self.in_flight:
+                return None
+            print(f'File {file_num} is estimated to need {need / GB:.1f} GB, more than the '
+                  f'{self.budget / GB:.1f} GB allowed; starting it alone.')
+
+        self.in_flight[int(file_num)] = (free[0], need)
+        return self.slots[free[0]]
+
+    def release(self, file_num):
+        """A run has finished: free its slot, and learn from what it used."""
+        self.in_flight.pop(int(file_num), None)
+        self.model.refine()
+
+    def describe(self):
+        pinned = sum(1 for slot in self.slots if slot)
+        budget = 'no memory limit' if self.budget is None else f'{self.budget / GB:.1f} GB'
+        return (f'{len(self.slots)} run(s) at once, {pinned} pinned to their own cores; '
+                f'{budget}, {self.model.per_cell / 1024:.0f} KB per cell to start with')
+
+
+def from_config(config, cells, workers, directory='.'):
+    """The Admission a config's resources section asks for, or None if it has none.
+
+    Args:
+        config: The sweep's config.
+        cells: Each run's cell count; see run_cells.
+        workers: The most runs at once: the config's nodes.
+        directory: Where the runs are, and so the ledger.
+    """
+    section = settings(config)
+    if section is None:
+        return None
+
+    workers = max(1, int(workers))
+    if section['pin']:
+        slots = core_sets(numa_nodes(), section['cores_per_run'])[:workers]
+    else:
+        slots = [()] * workers
+
+    budget = section['memory_limit']
+    if budget is None:
+        available = available_memory()
+        budget = None if available is None else available * section['memory_fraction']
+
+    model = MemoryModel(section['base_memory'], section['memory_per_cell'], section['margin'],
+                        ledger=PeakLedger(directory))
+
+    return Admission(slots or [()], budget, model, cells)
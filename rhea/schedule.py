@@ -0,0 +1,382 @@
+"""Dispatch a sweep's runs longest-predicted-first: a config with ``schedule: longest_first``.
+
+rhea hands runs out in run-number order. Parameter space is seldom uniform in cost, and a sweep's
+slowest corner is as likely to sit at the end of the numbering as anywhere: the last run to start
+can then be the longest, and every other core sits idle while it finishes. Starting the longest
+runs first -- Graham's LPT rule -- bounds the makespan at 4/3 of the best possible, and in practice
+gets close to it.
+
+The runtimes come from a cheap model: log runtime as a least-squares function of each run's swept
+values (see generate_inputs.swept_values), standardised, with squared terms once there are enough
+runs to fit them. It is fitted on:
+
+- the sweeps already run in this directory. Every rhea run of a config with a ``schedule`` key --
+  ``index`` included, to learn from before reordering anything -- records how long it took, in
+  ``.rhea_schedule/runtimes.txt``, and the next sweep folds those, with the parameters they ran at,
+  into ``history.npz`` before starting. A parameter a past sweep did not vary is taken to have
+  been at its mean.
+- the sweep's own first runs, with ``--backend pool``. The runs still queued are reordered each time
+  the number of runs finished has doubled since the last fit.
+
+Without either, runs go in run-number order as before. Every plan and refit is appended to
+``.rhea_schedule/schedule.log``, one JSON object per line: the model, the order it produced and the
+makespan it predicts for that order and for run-number order, so that runtimes.txt can afterwards say
+how much was gained.
+
+The order can be applied wherever rhea chooses what starts next: the xargs, GNU Parallel and pool
+backends, and a ``task_farm``'s queue. A plain SLURM array starts tasks by index, and an index is a
+run number, so there it is logged but cannot be applied.
+"""
+
+import heapq
+import json
+import os
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path for imports
+_project_root = Path(__file__).resolve().parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from omphalos.timeouts import RuntimeLedger, load_swept_values, save_swept_values  # noqa: E402
+
+SCHEDULE_DIR = '.rhea_schedule'
+RUNTIMES_FILE = 'runtimes.txt'
+FEATURES_FILE = 'swept_values.npz'
+HISTORY_FILE = 'history.npz'
+LOG_FILE = 'schedule.log'
+
+# What the config's 'schedule' may say.
+SCHEDULES = ('index', 'longest_first')
+
+# Fewest successful runs a model is fitted on. Squared terms are added once there are this many per
+# coefficient.
+MIN_TRAINING_RUNS = 8
+
+# Runs kept in the history, newest first, so that it cannot grow without bound across campaigns.
+HISTORY_LIMIT = 20000
+
+
+def enabled(config):
+    """Whether the config asks for longest-first dispatch.
+
+    Raises:
+        ValueError: If 'schedule' is set to something other than one of SCHEDULES.
+    """
+    setting = (config or {}).get('schedule') or 'index'
+    if setting not in SCHEDULES:
+        raise ValueError(f'schedule must be one of {list(SCHEDULES)}, not {setting!r}')
+    return setting == 'longest_first'
+
+
+def recording(config):
+    """Whether the config's runs keep .rhea_schedule up to date: any config that sets 'schedule'.
+
+    Raises:
+        ValueError: If 'schedule' is set to something other than one of SCHEDULES.
+    """
+    if 'schedule' not in (config or {}):
+        return False
+    enabled(config)
+    return True
+
+
+def ledger(directory='.'):
+    """The runtime ledger every run of the sweep in directory records itself in."""
+    return RuntimeLedger(Path(directory) / SCHEDULE_DIR, RUNTIMES_FILE)
+
+
+def start(file_dict, resume=False, directory='.'):
+    """Prepare for a sweep: fold the last one's runtimes into the history, and note this one's values.
+
+    Args:
+        file_dict: The sweep's InputFiles by run number, or None where they have no swept_values.
+        resume: Keep the runtimes already recorded, which are this same sweep's.
+        directory: Where the sweep runs from.
+    """
+    folder = Path(directory) / SCHEDULE_DIR
+    folder.mkdir(parents=True, exist_ok=True)
+    if not resume:
+        _fold_into_history(folder)
+        (folder / RUNTIMES_FILE).unlink(missing_ok=True)
+
+    save_swept_values(folder / FEATURES_FILE, file_dict)
+
+
+def _successful_runtimes(folder):
+    """{run number: seconds} for the runs in folder's ledger that succeeded, the latest attempt each."""
+    runtimes = {}
+    for file_num, seconds, error_code in RuntimeLedger(folder, RUNTIMES_FILE).entries():
+        if error_code == 0:
+            runtimes[file_num] = seconds
+    return runtimes
+
+
+def _widen(values, names, all_names):
+    """Lay values, whose columns are names, out under all_names, with NaN where a name is absent."""
+    wide = np.full((len(values), len(all_names)), np.nan)
+    for column, name in enumerate(names):
+        wide[:, all_names.index(name)] = values[:, column]
+    return wide
+
+
+def load_history(directory='.'):
+    """The runs folded in from past sweeps.
+
+    Returns:
+        (names, values, runtimes): parameter names, a row of values per run and its runtime.
+    """
+    try:
+        with np.load(Path(directory) / SCHEDULE_DIR / HISTORY_FILE) as history:
+            return ([str(name) for name in history['names']], history['values'],
+                    history['runtimes'])
+    except (OSError, KeyError, ValueError):
+        return [], np.empty((0, 0)), np.empty(0)
+
+
+def _fold_into_history(folder):
+    names, rows = load_swept_values(folder / FEATURES_FILE)
+    runtimes = {run: seconds for run, seconds in _successful_runtimes(folder).items() if run in rows}
+    if not names or not runtimes:
+        return
+
+    old_names, old_values, old_runtimes = load_history(folder.parent)
+    all_names = sorted(set(old_names) | set(names))
+    new_values = np.array([rows[run] for run in runtimes])
+    values = np.vstack([_widen(old_values, old_names, all_names),
+                        _widen(new_values, names, all_names)])[-HISTORY_LIMIT:]
+    seconds = np.concatenate([old_runtimes, list(runtimes.values())])[-HISTORY_LIMIT:]
+
+    np.savez(folder / HISTORY_FILE, names=np.array(all_names), values=values, runtimes=seconds)
+
+
+class RuntimePredictor:
+    """Log runtime as a least-squares function of standardised swept values.
+
+    Use RuntimePredictor.fit rather than the constructor.
+    """
+
+    def __init__(self, names, mean, scale, coefficients, squared, training_runs, source):
+        self.names = names
+        self.mean = mean
+        self.scale = scale
+        self.coefficients = coefficients
+        self.squared = squared
+        self.training_runs = training_runs
+        self.source = source
+
+    @classmethod
+    def fit(cls, names, values, runtimes, source):
+        """Fit on runs with known runtimes.
+
+        Args:
+            names: Parameter names, one per column of values.
+            values: A row of swept values per run. NaN, for a parameter a run's sweep did not vary,
+                is taken as the parameter's mean.
+            runtimes: Seconds each run took.
+            source: What the runs were, for the log.
+
+        Returns:
+            The predictor, or None if there are fewer than MIN_TRAINING_RUNS runs, or nothing varies.
+        """
+        values = np.asarray(values, dtype=float)
+        runtimes = np.asarray(runtimes, dtype=float)
+        if len(runtimes) < MIN_TRAINING_RUNS or values.ndim != 2:
+            return None
+
+        # A parameter no run's sweep varied is all NaN, and numpy warns about averaging nothing.
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            mean = np.nanmean(values, axis=0)
+            scale = np.nanstd(values, axis=0)
+        varied = np.isfinite(scale) & (scale > 0)
+        if not varied.any():
+            return None
+
+        names = [name for name, keep in zip(names, varied) if keep]
+        mean, scale = mean[varied], scale[varied]
+        standard = np.nan_to_num((values[:, varied] - mean) / scale)
+        squared = len(runtimes) >= MIN_TRAINING_RUNS * (2 * len(names) + 1)
+
+        coefficients, *_ = np.linalg.lstsq(cls._design(standard, squared),
+                                           np.log(np.maximum(runtimes, 1e-3)), rcond=None)
+
+        return cls(names, mean, scale, coefficients, squared, len(runtimes), source)
+
+    @staticmethod
+    def _design(standard, squared):
+        columns = [np.ones(len(standard)), *standard.T]
+        if squared:
+            columns += list((standard ** 2).T)
+        return np.column_stack(columns)
+
+    def predict(self, names, rows):
+        """Predicted seconds for runs whose swept values are rows, in the order names gives.
+
+        A parameter the model knows but rows lack is taken at its mean.
+        """
+        rows = np.atleast_2d(np.asarray(rows, dtype=float))
+        standard = np.zeros((len(rows), len(self.names)))
+        for column, name in enumerate(self.names):
+            if name in names:
+                standard[:, column] = (rows[:, names.index(name)] - self.mean[column]) / self.scale[column]
+        standard = np.nan_to_num(standard)
+
+        return np.exp(self._design(standard, self.squared) @ self.coefficients)
+
+    def describe(self):
+        """The model as the log records it."""
+        return {'source': self.source, 'training_runs': int(self.training_runs),
+                'parameters': self.names, 'squared_terms': bool(self.squared),
+                'mean': self.mean.tolist(), 'scale': self.scale.tolist(),
+                'coefficients': self.coefficients.tolist()}
+
+
+def makespan(durations, workers):
+    """How long runs of these durations take on workers, each started as soon as a worker is free."""
+    finishes = [0.0] * max(1, workers)
+    for duration in durations:
+        heapq.heappush(finishes, heapq.heappop(finishes) + duration)
+    return max(finishes)
+
+
+def fit_predictor(directory='.', include_this_sweep=False):
+    """Fit a predictor on the history, and optionally on this sweep's finished runs too.
+
+    Returns:
+        The predictor, or None if there is not enough to fit on.
+    """
+    folder = Path(directory) / SCHEDULE_DIR
+    names, values, runtimes = load_history(directory)
+    source = 'past sweeps'
+
+    if include_this_sweep:
+        sweep_names, rows = load_swept_values(folder / FEATURES_FILE)
+        finished = {run: seconds for run, seconds in _successful_runtimes(folder).items()
+                    if run in rows}
+        if sweep_names and finished:
+            source = f'{len(finished)} run(s) of this sweep'
+            if len(runtimes):
+                source += f' and {len(runtimes)} from past sweeps'
+            all_names = sorted(set(names) | set(sweep_names))
+            values = np.vstack([_widen(values, names, all_names),
+                                _widen(np.array([rows[run] for run in finished]), sweep_names,
+                                       all_names)])
+            runtimes = np.concatenate([runtimes, list(finished.values())])
+            names = all_names
+
+    if not names:
+        return None
+
+    return RuntimePredictor.fit(names, values, runtimes, source)
+
+
+def _log(directory, event, **fields):
+    entry = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'event': event, **fields}
+    with open(Path(directory) / SCHEDULE_DIR / LOG_FILE, 'a') as f:
+        f.write(json.dumps(entry) + '\n')
+
+
+def _longest_first(runs, predictor, directory, workers, event, applied=True):
+    """Order runs by predicted runtime, longest first, and log the plan."""
+    names, rows = load_swept_values(Path(directory) / SCHEDULE_DIR / FEATURES_FILE)
+    known = [run for run in runs if run in rows]
+    if not known:
+        return list(runs)
+
+    predicted = dict(zip(known, predictor.predict(names, [rows[run] for run in known]).tolist()))
+    # A run with no swept values to go on is taken to be typical.
+    typical = float(np.median(list(predicted.values())))
+    ordered = sorted(runs, key=lambda run: -predicted.get(run, typical))
+
+    in_order = makespan([predicted.get(run, typical) for run in runs], workers)
+    longest_first = makespan([predicted.get(run, typical) for run in ordered], workers)
+    _log(directory, event, applied=applied, workers=workers, model=predictor.describe(),
+         order=ordered, predicted_seconds={str(run): predicted[run] for run in known},
+         predicted_makespan={'as_given': in_order, 'longest_first': longest_first})
+    print(f'Schedule ({event}): {len(ordered)} run(s) longest-predicted-first on {workers} worker(s), '
+          f'model fitted on {predictor.source}; predicted makespan {longest_first:.0f} s against '
+          f'{in_order:.0f} s as they stood.')
+
+    return ordered
+
+
+def plan(pending, workers, config, directory='.', applied=True):
+    """The order to dispatch pending runs in.
+
+    Args:
+        pending: Run numbers still to run.
+        workers: Runs that execute at once.
+        config: The sweep's config, for its 'schedule'.
+        directory: Where the sweep runs from.
+        applied: Whether the order will actually be followed, for the log.
+
+    Returns:
+        The runs, longest-predicted-first if the config asks for it and there is a model to go on,
+        otherwise as given.
+    """
+    pending = list(pending)
+    if not enabled(config) or not pending:
+        return pending
+
+    predictor = fit_predictor(directory)
+    if predictor is None:
+        print('Schedule: no past sweeps to predict runtimes from; runs go in run-number order.')
+        _log(directory, 'plan', applied=False, workers=workers, model=None, order=pending)
+        return pending
+
+    return _longest_first(pending, predictor, directory, workers, 'plan', applied=applied)
+
+
+class Dispatcher:
+    """Hand out runs in plan order, reordering what is left as the sweep's own runtimes come in.
+
+    An iterator of run numbers, for worker_pool.run_pool, which takes the next run only when a worker
+    is about to need it.
+
+    Args:
+        runs: Run numbers, in the order plan gave.
+        workers: Runs that execute at once.
+        directory: Where the sweep runs from.
+    """
+
+    def __init__(self, runs, workers, directory='.'):
+        self.remaining = list(runs)
+        self.workers = workers
+        self.directory = directory
+        self.ledger = ledger(directory)
+        # Ledger size, in bytes, at the last fit; refitting waits for it to double. The size stands
+        # in for a count of runs finished, which would mean reading the ledger on every run.
+        self._fitted_at = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.remaining:
+            raise StopIteration
+        self._maybe_refit()
+        return self.remaining.pop(0)
+
+    def _maybe_refit(self):
+        try:
+            size = os.path.getsize(self.ledger.path)
+        except OSError:
+            return
+        if size < 2 * self._fitted_at or len(self.remaining) < 2:
+            return
+
+        finished = len(_successful_runtimes(self.ledger.directory))
+        if finished < max(MIN_TRAINING_RUNS, self.workers):
+            return
+
+        self._fitted_at = size
+        predictor = fit_predictor(self.directory, include_this_sweep=True)
+        if predictor is not None:
+            self.remaining = _longest_first(self.remaining, predictor, self.directory,
+                                            self.workers, 'refit')
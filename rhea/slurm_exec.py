@@ -39,6 +39,10 @@ def _restore_logk_record(input_file, directory):
 def execute(file_num, config, pflo, min3p=False):
     """Execute a single input file.
 
+    The run happens in run<file_num>, or in a copy of it on node-local scratch where the config has
+    a ``scratch`` section (see core/scratch.py), in which case only the files that section keeps
+    come back. Either way the results are parsed before this returns.
+
     Args:
         file_num: File number to run
         config: Configuration dictionary
@@ -48,6 +52,19 @@ def execute(file_num, config, pflo, min3p=False):
     Returns:
         InputFile object with results
     """
+    from core import scratch
+
+    shared = ()
+    if not (pflo or min3p):
+        import omphalos.run as omphalos_run
+        shared = omphalos_run.sweep_dirs(config)
+
+    with scratch.placement(Path(f'run{file_num}'), config, shared=shared) as tmp_dir:
+        return _execute_in(file_num, config, pflo, min3p, tmp_dir)
+
+
+def _execute_in(file_num, config, pflo, min3p, tmp_dir):
+    """execute, in tmp_dir: run<file_num> itself, or its copy in scratch."""
     if min3p:
         print("Running in MIN3P mode")
         import min3p.run as run
@@ -57,7 +74,6 @@ def execute(file_num, config, pflo, min3p=False):
         # The basename, not the config value: joining an absolute template path onto the run
         # directory yields the template itself, so every run would re-read the unswept deck.
         name = Path(config['template']).name
-        tmp_dir = Path(f'run{file_num}')
         config.update({'template': str(cwd / tmp_dir / name)})
 
         input_file = Template(config)
@@ -84,7 +100,6 @@ def execute(file_num, config, pflo, min3p=False):
     aqueous_database = config['aqueous_database']
     catabolic_pathways = config['catabolic_pathways']
     database = config.get('database')
-    tmp_dir = Path(f'run{file_num}')
 
     # overwrite config['template'] entry to fix file reading
     # same for other files that must be read in
@@ -140,7 +155,8 @@ def execute(file_num, config, pflo, min3p=False):
             stage_file.later_inputs = {}  # Clear any later_inputs, stages are handled separately
             stages_dict[stage_num] = stage_file
 
-        input_file = run.run_staged_input(stages_dict, int(file_num), str(tmp_dir), config['timeout'])
+        input_file = run.run_staged_input(stages_dict, int(file_num), str(tmp_dir), config['timeout'],
+                                          config=config)
     else:
         input_file = Template(config)
         input_file.path = Path(config['template'])
@@ -154,9 +170,80 @@ def execute(file_num, config, pflo, min3p=False):
             # this, a deck needing CatabolicPathways.in never gets one, and -- silently --
             # a sweep of the 'namelists:' section runs every file against the unmodified
             # aqueous database, because the only copy in the run directory is the verbatim
-            # one prep_directories.sh placed there.
-            run._print_aux_files(input_file, Path(tmp_dir).resolve())
-            run.crunchtope(input_file, file_num, config['timeout'], str(tmp_dir))
+            # template's copy rhea staged there. Through the sweep's store, so that a file
+            # identical to the one already there is linked rather than written again.
+            from core import staging
+            run._print_aux_files(input_file, Path(tmp_dir).resolve(),
+                                 store=staging.sweep_store(tmp_dir, config))
+            run.crunchtope(input_file, file_num, config['timeout'], str(tmp_dir), config=config)
+
+    return input_file
+
+
+def execute_and_record(file_num, config, pflo=False, min3p=False):
+    """Run one input file and leave its completion record in its run directory.
+
+    What one invocation of this script does, callable in-process so that a long-lived worker
+    (rhea/worker_pool.py) can run many files without paying the interpreter start-up and imports
+    for each.
+
+    Args:
+        file_num: File number to run
+        config: Configuration dictionary. Not modified: execute rewrites the paths in the copy it is
+            given, which a worker reusing one config across runs cannot allow.
+        pflo: Whether to use PFLOTRAN mode
+        min3p: Whether to use MIN3P mode
+
+    Returns:
+        InputFile object with results
+    """
+    import copy
+    import time
+
+    from core import lifecycle, profiling, telemetry
+    from rhea import schedule
+
+    if pflo:
+        import pflotran.file_methods as fm
+    else:
+        # core.file_methods provides pickle_data_set for CrunchTope and MIN3P.
+        from core import file_methods as fm
+    from rhea import slurm_interface as si
+
+    config = copy.deepcopy(config)
+    profiling.configure(config)
+
+    # Record which decks this run ran, before execute rewrites the config's paths, so that
+    # rhea --resume can tell a finished run from one whose decks have since changed.
+    deck_hash = si.deck_hash(si.deck_paths(f'run{file_num}', config))
+
+    started = time.monotonic()
+    try:
+        with profiling.collect() as timings:
+            input_file = execute(file_num, config, pflo, min3p=min3p)
+    except Exception:
+        # Said here, since a run that raised leaves nothing else to say it has stopped.
+        telemetry.finish(config, file_num, None, time.monotonic() - started)
+        raise
+    input_file.deck_hash = deck_hash
+    if profiling.enabled():
+        input_file.timings = timings
+    print(f'File {file_num} returned to __main__.')
+
+    fm.pickle_data_set(input_file, f'run{file_num}/input_file{file_num}_complete.pkl')
+    telemetry.finish(config, file_num, getattr(input_file, 'error_code', 0),
+                     time.monotonic() - started)
+
+    # What rhea/schedule.py learns the next sweep's dispatch order from, where the config has one.
+    if schedule.recording(config):
+        try:
+            schedule.ledger().record(int(file_num), time.monotonic() - started,
+                                     getattr(input_file, 'error_code', 0))
+        except OSError as exc:
+            print(f'Could not record the runtime of file {file_num}: {exc}')
+
+    # What becomes of the run directory, now its record is written; see core/lifecycle.py.
+    lifecycle.finished(f'run{file_num}', config, getattr(input_file, 'error_code', 0))
 
     return input_file
 
@@ -174,16 +261,7 @@ if __name__ == '__main__':
     parser.add_argument('-m', '--min3p', action='store_true')
     args = parser.parse_args()
 
-    if args.pflotran:
-        import pflotran.file_methods as fm
-    else:
-        # core.file_methods provides pickle_data_set for CrunchTope and MIN3P.
-        from core import file_methods as fm
-
     with open(args.config_path) as file:
         config = yaml.safe_load(file)
 
-    input_file = execute(args.file_num, config, args.pflotran, min3p=args.min3p)
-    print(f'File {args.file_num} returned to __main__.')
-
-    fm.pickle_data_set(input_file, f'run{args.file_num}/input_file{args.file_num}_complete.pkl')
+    execute_and_record(args.file_num, config, args.pflotran, min3p=args.min3p)
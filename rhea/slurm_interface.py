@@ -1,5 +1,6 @@
 """Methods for interfacing with slurm."""
 
+import hashlib
 import re
 import shutil
 import subprocess
@@ -40,7 +41,7 @@ def submit(path_to_config, nodes, number_of_files):
     """Submit a job to the SLURM scheduler.
 
     Note: nothing in rhea currently calls this. Cluster runs go through rhea/main.py, which submits
-    prep_directories.sh and run_input_file.sbatch directly.
+    run_input_file.sbatch or task_farm.sbatch directly.
 
     Args:
         path_to_config: Path to the configuration file
@@ -127,29 +128,52 @@ def compile_results(dict_len, simulator='crunchtope'):
     """
     import shutil
     import tempfile
+    import time
 
     from core import file_methods as fm
+    from core import profiling
 
     no_output = []
     errors = {}
+    rejected = {}
+    decided = {}
     results_dict = {}
+    # Each run's phase timings, where the sweep was profiled, and this compilation's own. Timed
+    # whether or not profiling is on, since whether it was is only known from the records.
+    timings = []
+    compiling = {'unpickle': 0.0, 'compile': 0.0}
     spill_dir = tempfile.mkdtemp(prefix='omphalos_spill_')
 
     try:
         for i in range(dict_len):
+            started = time.perf_counter()
             try:
                 input_file = fm.unpickle(f'run{i}/input_file{i}_complete.pkl')
             except Exception:
                 no_output.append(i)
                 continue
+            finally:
+                compiling['unpickle'] += time.perf_counter() - started
+            timings.append(getattr(input_file, 'timings', None))
 
             error_code = getattr(input_file, 'error_code', 0)
             if error_code:
                 errors[i] = error_code
+                if getattr(input_file, 'invalid', None):
+                    rejected[i] = input_file.invalid
                 continue
 
+            # A run a termination criterion stopped keeps its results, so it is compiled; what it was
+            # decided with is only in its pickle, so say so here. See omphalos/criteria.py.
+            termination = getattr(input_file, 'termination', None)
+            if isinstance(termination, dict):
+                decided.setdefault(termination['outcome'], []).append(i)
+
+            started = time.perf_counter()
             results_dict[i] = _spill_results(input_file, i, spill_dir)
+            compiling['compile'] += time.perf_counter() - started
 
+        started = time.perf_counter()
         results_path = None
         if results_dict:
             results_path = fm.dataset_to_netcdf(results_dict, simulator=simulator)
@@ -157,23 +181,48 @@ def compile_results(dict_len, simulator='crunchtope'):
                 del results_dict[file].results
         else:
             print('WARNING: no run returned usable output, so no results file was written.')
+        compiling['compile'] += time.perf_counter() - started
     finally:
         shutil.rmtree(spill_dir, ignore_errors=True)
 
     print(f'Files compiled: {len(results_dict)} of {dict_len}.')
     if no_output:
         print(f'Files that returned no output ({len(no_output)}): {no_output}')
+    for outcome, runs in sorted(decided.items()):
+        print(f'Files stopped early by a {outcome} criterion ({len(runs)}): {runs}')
     if errors:
         print(f'Files that failed during the run ({len(errors)}), as run: error_code: {errors}')
+    if errors and simulator == 'crunchtope':
+        from omphalos.run import ADAPTIVE_TIMEOUT_ERROR_CODE
+
+        retry = [i for i, error_code in errors.items() if error_code == ADAPTIVE_TIMEOUT_ERROR_CODE]
+        if retry:
+            print(f'Of those, stopped by a timeout learned from the sweep ({len(retry)}): {retry}. '
+                  f'rhea --resume reruns them with the full timeout.')
+    # Never run at all: validation found them bound to fail. See omphalos/validate.py.
+    if rejected:
+        from omphalos.validate import REPORTED
+
+        print(f'Of those, rejected by validation before running ({len(rejected)}): '
+              f'{sorted(rejected)}.')
+        for i in sorted(rejected)[:REPORTED]:
+            print(f'  run {i}: {"; ".join(rejected[i])}')
+
+    # Where the time went, if the sweep was profiled; see core/profiling.py.
+    if any(timings):
+        sweep = profiling.load()
+        for name, seconds in compiling.items():
+            sweep[name] = sweep.get(name, 0.0) + seconds
+        print(profiling.breakdown(timings, sweep))
 
     return {'total': dict_len, 'compiled': len(results_dict), 'no_output': no_output,
             'errors': errors, 'results': results_path}
 
 
-def clear_run_directories(num_runs, directory=None):
+def clear_run_directories(num_runs, directory=None, keep=()):
     """Empty the run directories this sweep will use, and refuse to reuse a bigger sweep's.
 
-    prep_directories.sh does `mkdir run$N` and used to clear nothing, so a directory reused by a
+    Preparing a run directory used to be `mkdir run$N` and clear nothing, so a directory reused by a
     later sweep kept everything the previous one left: its database, its deck, its .tec output and
     its .rst restart. CrunchTope writes output per snapshot, so a run that produced fewer
     snapshots this time left the extra ones behind to be parsed as its own.
@@ -185,6 +234,12 @@ def clear_run_directories(num_runs, directory=None):
     refused rather than cleared or ignored. Clearing them would throw away a record; ignoring them
     lets coeus find their pickles and write eight runs' parameters beside three runs' results,
     joined silently on run number. Neither is acceptable without being asked.
+
+    Args:
+        num_runs: Number of runs in this sweep.
+        directory: Where the run directories are. Defaults to the working directory.
+        keep: Run numbers whose directories are left exactly as they are -- the runs a resumed
+            sweep will not rerun (see completed_runs).
     """
     directory = Path(directory) if directory is not None else Path.cwd()
     pattern = re.compile(r'^run(\d+)$')
@@ -208,6 +263,8 @@ def clear_run_directories(num_runs, directory=None):
 
     cleared = 0
     for number in sorted(existing):
+        if number in keep:
+            continue
         for path in existing[number].iterdir():
             if path.name == f'input_file{number}_complete.pkl':
                 continue
@@ -215,5 +272,96 @@ def clear_run_directories(num_runs, directory=None):
             cleared += 1
 
     if cleared:
-        print(f'Cleared {cleared} file(s) from {len(existing)} reused run directory(ies); '
-              f'per-run pickles kept.')
+        print(f'Cleared {cleared} file(s) from {len(set(existing) - set(keep))} reused run '
+              f'directory(ies); per-run pickles kept.')
+
+
+def deck_paths(run_dir, config):
+    """The decks rhea prints into a run directory: the template's, or one per stage of a chain.
+
+    rhea/main.py names them with this, and slurm_exec.py finds them with it to record what it ran,
+    so the two cannot disagree about which files make up a run.
+
+    Args:
+        run_dir: The run directory.
+        config: The sweep's config, as a dict.
+
+    Returns:
+        list of Paths, in stage order.
+    """
+    run_dir = Path(run_dir)
+    template = config['template']
+
+    if config.get('restart_chain'):
+        base_name = template.rsplit('.', 1)[0]
+        ext = template.rsplit('.', 1)[1] if '.' in template else 'in'
+        return [run_dir / f'{base_name}_stage{stage}.{ext}'
+                for stage in range(config['restart_chain']['stages'])]
+
+    return [run_dir / template]
+
+
+def deck_hash(paths):
+    """SHA-256 over the contents of a run's decks, in order, or None if any of them is missing."""
+    from core.file_methods import file_digest
+
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            digest.update(file_digest(path).encode())
+        except OSError:
+            return None
+
+    return digest.hexdigest()
+
+
+def completed_runs(expected_hashes, directory=None):
+    """The runs a resumed sweep can skip.
+
+    A run is complete if its pickle exists, records no error, and records the hash of the decks it
+    ran matching the hash of the decks this sweep would give it. A pickle from before deck hashes
+    were recorded matches nothing, so such a run is rerun rather than trusted.
+
+    Args:
+        expected_hashes: dict mapping run number to the deck_hash this sweep gives that run.
+        directory: Where the run directories are. Defaults to the working directory.
+
+    Returns:
+        set of run numbers.
+    """
+    from core import file_methods as fm
+
+    directory = Path(directory) if directory is not None else Path.cwd()
+
+    done = set()
+    for number, expected in expected_hashes.items():
+        try:
+            input_file = fm.unpickle(directory / f'run{number}' / f'input_file{number}_complete.pkl')
+        except Exception:
+            continue
+
+        if getattr(input_file, 'error_code', 0) == 0 and expected is not None \
+                and getattr(input_file, 'deck_hash', None) == expected:
+            done.add(number)
+
+    return done
+
+
+def array_spec(numbers):
+    """A SLURM --array specification for a set of run numbers, with consecutive runs as ranges.
+
+    >>> array_spec([0, 1, 2, 5, 7, 8])
+    '0-2,5,7-8'
+    """
+    numbers = sorted(numbers)
+    parts = []
+    start = previous = None
+    for number in numbers + [None]:
+        if previous is not None and number == previous + 1:
+            previous = number
+            continue
+        if start is not None:
+            parts.append(str(start) if start == previous else f'{start}-{previous}')
+        start = previous = number
+
+    return ','.join(parts)
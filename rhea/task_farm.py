@@ -0,0 +1,182 @@
+"""Pack many runs into each SLURM array task: rhea cluster mode with a ``task_farm`` section.
+
+Without one, rhea submits one array task per run. For a sweep of thousands of short simulations
+that is thousands of jobs for the scheduler to queue, start and account for, and each spends longer
+waiting for an allocation than it does running.
+
+With one, the array has a task per ``runs_per_task`` runs, each asking for ``workers`` CPUs and
+running that many simulations at a time on a worker pool (rhea/worker_pool.py) inside its
+allocation. The runs are not dealt out in fixed chunks. rhea writes the pending run numbers to a
+queue file before submitting, and a task takes a run by creating a claim file for it with O_EXCL,
+which exactly one task can do. Task k starts on the k-th chunk of the queue, so that tasks seldom
+contend for the same run, and when its chunk is exhausted it carries on around the queue taking
+whatever nobody else has. A task that starts late, or draws cheap runs, therefore takes work from
+one that is slow, and a task that never starts leaves its chunk to the others.
+
+Each run leaves exactly what it would as a task of its own -- its output and its
+input_file<N>_complete.pkl -- so compile_results and --resume need nothing different. A run claimed
+by a task the scheduler then killed stays claimed and unfinished: compile_results reports it, and
+``rhea --resume`` runs it again.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+_project_root = Path(__file__).resolve().parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+# Beside the run directories, in the directory the sweep is submitted from, which every task shares.
+FARM_DIR = '.rhea_farm'
+QUEUE_FILE = 'queue.txt'
+CLAIM_DIR = 'claims'
+
+# What a task_farm section does not set. One run per CPU, and enough runs per task that the
+# scheduler sees a few dozen jobs rather than thousands.
+DEFAULT_RUNS_PER_TASK = 50
+DEFAULT_WORKERS = 1
+
+
+def settings(config):
+    """The task_farm section of a config as (runs_per_task, workers), or None if it has none.
+
+    ``task_farm: true`` takes the defaults.
+    """
+    section = (config or {}).get('task_farm')
+    if not section:
+        return None
+    if section is True:
+        section = {}
+
+    return (max(1, int(section.get('runs_per_task', DEFAULT_RUNS_PER_TASK))),
+            max(1, int(section.get('workers', DEFAULT_WORKERS))))
+
+
+def num_tasks(num_runs, runs_per_task):
+    """How many array tasks a farm of num_runs needs."""
+    return -(-num_runs // runs_per_task)
+
+
+def deal(runs, tasks):
+    """Reorder runs so that each task's chunk of the queue takes every tasks-th of them.
+
+    For a queue sorted longest first (rhea/schedule.py): left as it is, the first task's chunk would
+    hold all the longest runs and finish long after the rest. Dealt, every chunk starts with one of
+    the longest and works down.
+    """
+    runs = list(runs)
+    return [run for task in range(tasks) for run in runs[task::tasks]]
+
+
+def prepare(runs, directory='.'):
+    """Write the queue a farm's tasks take runs from, and clear any previous sweep's claims.
+
+    Args:
+        runs: The run numbers to farm out, in the order tasks should start on them.
+        directory: Where the sweep runs from.
+
+    Returns:
+        The farm directory.
+    """
+    import shutil
+
+    farm = Path(directory) / FARM_DIR
+    shutil.rmtree(farm, ignore_errors=True)
+    (farm / CLAIM_DIR).mkdir(parents=True)
+    (farm / QUEUE_FILE).write_text(''.join(f'{run_num}\n' for run_num in runs))
+
+    return farm
+
+
+def read_queue(directory='.'):
+    """The run numbers prepare wrote, in order."""
+    text = (Path(directory) / FARM_DIR / QUEUE_FILE).read_text()
+    return [int(line) for line in text.split()]
+
+
+def claim(run_num, directory='.'):
+    """Claim a run for this task.
+
+    Returns:
+        True if this call created the claim, False if another task got there first. The claim is
+        made with O_CREAT | O_EXCL, which is atomic on a local filesystem and on NFSv3 and later, so
+        two tasks can never both win the same run.
+    """
+    path = Path(directory) / FARM_DIR / CLAIM_DIR / str(run_num)
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+
+    with os.fdopen(fd, 'w') as f:
+        f.write(f"{os.environ.get('SLURM_JOB_ID', '')} {os.environ.get('SLURM_ARRAY_TASK_ID', '')} "
+                f"{os.uname().nodename}\n")
+
+    return True
+
+
+def claimed_runs(queue, task_id, runs_per_task, directory='.'):
+    """Yield the runs this task wins, claiming each only as it is about to be started.
+
+    Starts at this task's own chunk of the queue and carries on around it, so a task whose chunk is
+    done takes runs from chunks whose tasks are behind.
+
+    Args:
+        queue: Run numbers, as read_queue returns them.
+        task_id: This task's SLURM_ARRAY_TASK_ID.
+        runs_per_task: Chunk size the array was sized with.
+        directory: Where the sweep runs from.
+    """
+    if not queue:
+        return
+
+    start = (task_id * runs_per_task) % len(queue)
+    for run_num in queue[start:] + queue[:start]:
+        if claim(run_num, directory):
+            yield run_num
+
+
+def run_task(config_path, task_id, runs_per_task, workers, pflo=False, directory='.'):
+    """Run one array task: claim and run queued runs until none are left.
+
+    Args:
+        config_path: The sweep's YAML config.
+        task_id: This task's SLURM_ARRAY_TASK_ID.
+        runs_per_task: Chunk size the array was sized with.
+        workers: Simulations to run at once; the CPUs the task was given.
+        pflo: Whether to use PFLOTRAN mode
+        directory: Where the sweep runs from.
+
+    Returns:
+        What worker_pool.run_pool returns: the runs that raised or were lost, with the reason.
+    """
+    from rhea import worker_pool
+
+    queue = read_queue(directory)
+    runs = claimed_runs(queue, task_id, runs_per_task, directory)
+
+    return worker_pool.run_pool(config_path, runs, workers, pflo=pflo)
+
+
+if __name__ == '__main__':
+    import argparse
+    import site
+    site.addsitedir(site.getusersitepackages())
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('config_path', help='Omphalos config file.')
+    parser.add_argument('runs_per_task', type=int, help='Chunk size the array was sized with.')
+    parser.add_argument('-p', '--pflotran', action='store_true')
+    parser.add_argument(
+        '-w', '--workers', type=int, default=None,
+        help='Simulations to run at once. Defaults to the CPUs SLURM gave the task.'
+    )
+    args = parser.parse_args()
+
+    workers = args.workers or int(os.environ.get('SLURM_CPUS_PER_TASK', DEFAULT_WORKERS))
+    task_id = int(os.environ.get('SLURM_ARRAY_TASK_ID', 0))
+
+    failed = run_task(args.config_path, task_id, args.runs_per_task, workers, pflo=args.pflotran)
+    print(f'Task {task_id} finished; {len(failed)} run(s) failed in their worker.')
@@ -0,0 +1,172 @@
+"""A pool of long-lived workers for local rhea sweeps: ``--backend pool``.
+
+The xargs and GNU Parallel backends launch ``python rhea/slurm_exec.py N config`` once per run, and
+each launch starts an interpreter, imports numpy, pandas, xarray and pexpect, and parses the YAML
+before CrunchTope is even started. For a sweep of thousands of runs lasting seconds each, that is a
+large share of the wall time.
+
+Here the workers are started once. Each imports the simulator modules and reads the config when it
+starts, then takes run numbers one at a time and calls slurm_exec.execute_and_record on them
+in-process, so every run after a worker's first costs only the run. What a run leaves behind -- its
+output and its input_file<N>_complete.pkl -- is exactly what slurm_exec.py leaves, so compile_results
+and --resume need nothing different.
+
+A worker's Template is still rebuilt for each run, from the deck rhea printed into that run's
+directory: the decks differ from run to run, and that deck is the record of what ran.
+
+With a config ``resources`` section, the dispatcher here also decides when each run may start and
+which cores it is pinned to; see rhea/resources.py.
+"""
+
+import os
+import sys
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from pathlib import Path
+
+# Add parent directory to path for imports
+_project_root = Path(__file__).resolve().parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+# Runs handed to the pool ahead of the ones in progress, per worker. Enough that no worker waits for
+# the next run number, few enough that a broken pool loses little.
+IN_FLIGHT_PER_WORKER = 2
+
+# The config each worker read when it started. Module state, because it belongs to the worker
+# process: the dispatcher's copy is never touched.
+_config = None
+_simulator = {}
+
+
+def _initialise(config_path, pflo, min3p):
+    """Start a worker: read the config and import everything a run needs, once."""
+    import yaml
+
+    global _config
+
+    with open(config_path) as file:
+        _config = yaml.safe_load(file)
+    _simulator.update(pflo=pflo, min3p=min3p)
+
+    # Import now rather than on the first run, so that every run costs the same.
+    if min3p:
+        import min3p.run  # noqa: F401
+        import min3p.template  # noqa: F401
+    else:
+        import omphalos.run  # noqa: F401
+        import omphalos.template  # noqa: F401
+
+
+def _run(file_num, cpus=()):
+    """Run one file in this worker.
+
+    Args:
+        file_num: The run's number.
+        cpus: CPUs to pin the worker, and so the CrunchTope child it starts, to. Empty leaves the
+            worker's affinity as it is.
+
+    Returns:
+        (file_num, None) on success, or (file_num, the traceback) if it raised. A raising run leaves
+        no pickle, so compile_results counts it as having returned nothing, as it would a
+        slurm_exec.py that died; the worker carries on with the next.
+    """
+    from contextlib import nullcontext
+
+    from rhea import resources
+    from rhea.slurm_exec import execute_and_record
+
+    measure = resources.settings(_config) is not None
+    try:
+        if cpus:
+            os.sched_setaffinity(0, cpus)
+        with resources.PeakMemory() if measure else nullcontext() as peak:
+            input_file = execute_and_record(file_num, _config, _simulator['pflo'],
+                                            min3p=_simulator['min3p'])
+    except Exception:  # noqa: BLE001 - one run's failure must not stop the worker
+        return file_num, traceback.format_exc()
+
+    if measure:
+        resources.record(file_num, input_file, peak.peak)
+
+    return file_num, None
+
+
+def run_pool(config_path, runs, workers, pflo=False, min3p=False, admission=None):
+    """Run every listed file across a pool of long-lived workers.
+
+    Args:
+        config_path: The sweep's YAML config. Each worker reads it once.
+        runs: Run numbers to execute. Read lazily, a few ahead of the workers, so it may be a
+            generator that decides the next run only when one is wanted (see rhea/task_farm.py).
+        workers: Number of worker processes.
+        pflo: Whether to use PFLOTRAN mode
+        min3p: Whether to use MIN3P mode
+        admission: A resources.Admission deciding when each run starts and what it is pinned to,
+            or None to keep workers busy with whatever is next. With one, no run is handed to the
+            pool ahead of being admitted, since the cores it is pinned to are reserved from then.
+
+    Returns:
+        dict mapping the run number of every run that raised, or was lost with a worker that died,
+        to the reason.
+    """
+    queue = iter(runs)
+    failed = {}
+    workers = max(1, int(workers))
+    if admission is not None:
+        workers = min(workers, len(admission.slots))
+    finished_all = False
+    # A run taken from the queue that admission has not yet let start.
+    waiting = None
+
+    while not finished_all:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_initialise,
+                                   initargs=(str(config_path), pflo, min3p))
+        in_flight = {}
+        try:
+            while True:
+                if admission is None:
+                    for file_num in islice(queue, workers * IN_FLIGHT_PER_WORKER - len(in_flight)):
+                        in_flight[pool.submit(_run, file_num)] = file_num
+                else:
+                    while True:
+                        if waiting is None:
+                            waiting = next(queue, None)
+                        if waiting is None:
+                            break
+                        cpus = admission.admit(waiting)
+                        if cpus is None:
+                            break
+                        in_flight[pool.submit(_run, waiting, cpus)] = waiting
+                        waiting = None
+                if not in_flight:
+                    finished_all = True
+                    break
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    # Read the result before letting go of the run, so that a broken pool still
+                    # has it among those in flight.
+                    file_num, error = future.result()
+                    del in_flight[future]
+                    if admission is not None:
+                        admission.release(file_num)
+                    if error is not None:
+                        print(f'File {file_num} raised in its worker:\n{error}')
+                        failed[file_num] = error
+        except BrokenProcessPool:
+            # A worker died outright -- killed for memory, say -- and took the pool with it. The
+            # runs it had in hand cannot be told apart, so all are recorded as lost; the rest of the
+            # queue goes to a fresh pool.
+            for file_num in in_flight.values():
+                failed[file_num] = 'worker process died'
+                if admission is not None:
+                    admission.release(file_num)
+            print(f'A worker died; runs {sorted(in_flight.values())} were lost. '
+                  f'Restarting the pool for the rest.')
+        finally:
+            pool.shutdown(wait=True)
+
+    return failed
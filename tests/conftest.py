@@ -211,6 +211,37 @@ ZONE T="zone1"
 '''
 
 
+# ============================================================================
+# Fake Solver Fixtures
+# ============================================================================
+
+@pytest.fixture
+def fast_checks():
+    """Modules whose CHECK_INTERVAL fake_crunch shortens. A test module overrides this."""
+    return ()
+
+
+@pytest.fixture
+def fake_crunch(tmp_path, monkeypatch, fast_checks):
+    """Point crunch_dir at a shell script that behaves as each run's deck tells it to.
+
+    The deck is the script's first argument, as it is CrunchTope's; its first line is run as shell.
+    The CHECK_INTERVAL of each module fast_checks names is cut to 0.1 s, so that what watches a run
+    looks at it often enough for a test of a few seconds.
+    """
+    # omphalos.run imports omphalos.settings, which install.sh creates from settings_default.py and
+    # which is not tracked.
+    run = pytest.importorskip('omphalos.run',
+                              reason='requires omphalos/settings.py (created by install.sh)')
+    script = tmp_path / 'fake_crunch.sh'
+    script.write_text('#!/bin/sh\neval "$(head -n 1 "$1")"\n')
+    script.chmod(0o755)
+    monkeypatch.setattr(run, 'crunch_dir', str(script))
+    for module in fast_checks:
+        monkeypatch.setattr(module, 'CHECK_INTERVAL', 0.1)
+    return script
+
+
 # ============================================================================
 # Utility Functions
 # ============================================================================
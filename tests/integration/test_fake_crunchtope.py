@@ -0,0 +1,192 @@
+"""Integration tests for benchmarks/fake_crunchtope.py, run by omphalos in CrunchTope's place."""
+
+import subprocess
+import sys
+import time
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from benchmarks import fake_crunchtope as fake
+from benchmarks import synthetic
+from core.file_methods import parse_output
+from omphalos.restart_file import read_records
+
+TIMES = ['10', '20', '30', '40']
+
+
+def _deck(run_dir, directive='', **kwargs):
+    run_dir.mkdir(parents=True, exist_ok=True)
+    deck = run_dir / 'deck.in'
+    text = synthetic.deck_text(kwargs.pop('species', 2), len(TIMES), kwargs.pop('cells', 6))
+    deck.write_text(text + (f'! fake_crunchtope {directive}\n' if directive else ''))
+    return deck
+
+
+def _input_file(deck):
+    from omphalos.input_file import InputFile
+
+    output = Mock(contents={'spatial_profile': list(TIMES)})
+    return InputFile(deck, {'OUTPUT': output}, {}, None, None, {})
+
+
+def _run_fake(run_dir, env=None):
+    return subprocess.run([sys.executable, str(fake.__file__), 'deck.in'], cwd=run_dir,
+                          capture_output=True, text=True, env=env, timeout=60)
+
+
+class TestDeckReading:
+    """The fake takes its grid, species and times from the deck, and its settings from around it."""
+
+    def test_the_deck_gives_the_shape_of_the_output(self, tmp_path):
+        blocks = fake.read_deck(_deck(tmp_path, species=3, cells=7))
+
+        assert fake.grid(blocks) == (7, 1, 1)
+        assert fake.snapshot_times(blocks) == [10.0, 20.0, 30.0, 40.0]
+        assert [words[0] for words in blocks['PRIMARY_SPECIES']] == ['H+', 'Sp1', 'Sp2', 'Sp3']
+
+    def test_the_deck_overrides_the_environment(self, tmp_path):
+        deck = _deck(tmp_path, 'fail=divide by zero fail_at=0.25')
+        environ = {'FAKE_CRUNCHTOPE_COST': '2', 'FAKE_CRUNCHTOPE_FAIL': 'TRY A'}
+
+        found = fake.settings(deck, environ)
+
+        assert (found['cost'], found['fail'], found['fail_at']) == ('2', 'divide by zero', '0.25')
+
+    def test_drawn_failures_are_the_same_every_time(self):
+        found = dict(fake.DEFAULTS, failures='TRY A:0.3')
+
+        drawn = [fake.choose_failure(found, f'run{n}') for n in range(200)]
+
+        assert drawn == [fake.choose_failure(found, f'run{n}') for n in range(200)]
+        assert 30 < drawn.count('TRY A') < 90 and set(drawn) == {'', 'TRY A'}
+
+
+class TestOutput:
+    """What the fake writes is what the parsers read."""
+
+    def test_snapshots_log_and_restart(self, tmp_path):
+        deck = _deck(tmp_path, 'restart=true steps=3')
+
+        result = _run_fake(tmp_path)
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.count('Time (yrs)') == 3 * len(TIMES)
+        ds = parse_output(str(tmp_path), 'totcon', 4)
+        assert dict(ds.sizes) == {'X': 6, 'Y': 1, 'Z': 1}
+        assert list(ds.data_vars) == ['H+', 'Sp1', 'Sp2']
+        assert deck.with_suffix('.out').read_text().endswith('Execution complete\n')
+        # A time record, then a field per primary species.
+        _, records = read_records(deck.with_suffix('.rst'))
+        assert [size for _, size in records] == [8] + [6 * 8] * 3
+
+    def test_a_seeded_run_writes_the_same_values(self, tmp_path):
+        for name in ('a', 'b'):
+            _deck(tmp_path / name / 'run0')
+            _run_fake(tmp_path / name / 'run0')
+
+        first, second = (np.loadtxt(tmp_path / name / 'run0' / 'volume2.tec', skiprows=3)
+                         for name in ('a', 'b'))
+        assert np.array_equal(first, second)
+
+
+class TestFailures:
+    """Each failure the fake can be told to have ends the run as the real one would be ended."""
+
+    @pytest.fixture(autouse=True)
+    def _fake_solver(self, monkeypatch):
+        pytest.importorskip('omphalos.settings',
+                            reason='requires omphalos/settings.py (created by install.sh)')
+        from omphalos import run
+
+        monkeypatch.setattr(run, 'crunch_dir', f'{sys.executable} {fake.__file__}')
+
+    def test_every_error_pattern_has_a_failure(self):
+        import re
+
+        from omphalos import run
+
+        names = {pattern: 'NaN' if pattern == run.NAN_PATTERN else pattern
+                 for pattern in run.CT_ERROR_PATTERNS}
+        assert set(names.values()) == set(fake.FAILURES)
+        for pattern, name in names.items():
+            assert re.search(pattern, fake.FAILURES[name][0] + '\n'), name
+
+    @pytest.mark.parametrize('name', sorted(fake.FAILURES))
+    def test_a_printed_failure_is_caught_by_its_pattern(self, name, tmp_path):
+        from omphalos import run
+
+        input_file = _input_file(_deck(tmp_path, f'fail={name}'))
+
+        run.crunchtope(input_file, 0, 30, tmp_path)
+
+        assert input_file.error_code == run.CT_ERROR_PATTERNS.index(
+            run.NAN_PATTERN if name == 'NaN' else name) + 2
+
+    def test_a_healthy_run_is_parsed(self, tmp_path):
+        from omphalos import run
+
+        input_file = _input_file(_deck(tmp_path))
+
+        run.crunchtope(input_file, 0, 30, tmp_path)
+
+        assert input_file.error_code == 0
+        assert sorted(input_file.results) == ['conc', 'totcon', 'volume']
+        assert input_file.results['totcon'].sizes['time'] == len(TIMES)
+
+    def test_the_output_goes_to_the_log_and_the_console_gets_a_line(self, tmp_path, capsys):
+        from omphalos import run
+
+        run_dir = tmp_path / 'run0'
+        input_file = _input_file(_deck(run_dir, 'steps=50'))
+
+        run.crunchtope(input_file, 0, 30, run_dir)
+
+        out = capsys.readouterr().out
+        assert (run_dir / 'crunch.log').read_text().count('Time (yrs)') == 50 * len(TIMES)
+        assert 'Time (yrs)' not in out
+        assert 'File 0 complete in ' in out and 'solver output in run0/crunch.log.' in out
+
+    def test_a_pattern_deep_in_a_long_output_is_still_caught(self, tmp_path, capsys):
+        """expect searches only a window of the newest output, which must still hold every read."""
+        from omphalos import run
+
+        input_file = _input_file(_deck(tmp_path, 'fail=TRY A fail_at=0.75 steps=2000'))
+
+        run.crunchtope(input_file, 0, 60, tmp_path, config={'solver_log': {'successful': 'delete'}})
+
+        assert input_file.error_code == run.CT_ERROR_PATTERNS.index('TRY A') + 2
+        assert 'it ended: "TRY A SMALLER TIMESTEP"' in capsys.readouterr().out
+        assert (tmp_path / 'crunch0.log').exists()
+
+    def test_a_hang_times_out(self, tmp_path):
+        from omphalos import run
+
+        input_file = _input_file(_deck(tmp_path, 'fail=hang'))
+
+        run.crunchtope(input_file, 0, 2, tmp_path)
+
+        assert input_file.error_code == 1
+
+    def test_a_crash_before_any_output_is_no_output(self, tmp_path):
+        from omphalos import run
+
+        input_file = _input_file(_deck(tmp_path, 'fail=crash fail_at=0'))
+
+        run.crunchtope(input_file, 0, 30, tmp_path)
+
+        assert input_file.error_code == run.NO_OUTPUT_ERROR_CODE
+
+    def test_a_stall_is_detected(self, tmp_path, monkeypatch):
+        from omphalos import run, stall
+
+        monkeypatch.setattr(stall, 'CHECK_INTERVAL', 0.1)
+        input_file = _input_file(_deck(tmp_path, 'fail=stall'))
+
+        started = time.monotonic()
+        run.crunchtope(input_file, 0, 20, tmp_path,
+                       config={'stall_detection': {'grace': 0.5, 'window': 0.5}})
+
+        assert time.monotonic() - started < 10
+        assert input_file.error_code == run.STALLED_ERROR_CODE
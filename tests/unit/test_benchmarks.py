@@ -0,0 +1,106 @@
+"""Unit tests for benchmarks/: the synthetic inputs and the harness that times them."""
+
+import contextlib
+import io
+import json
+
+import numpy as np
+import pytest
+
+from benchmarks import harness, synthetic
+from benchmarks.scenarios import SCENARIOS
+from core.file_methods import parse_output
+from omphalos.database import Database
+
+
+def _record(commit, **timings):
+    return {'commit': commit,
+            'results': {name: {'10': {'min': seconds}} for name, seconds in timings.items()}}
+
+
+class TestSynthetic:
+    """The generated inputs are ones the parsers read, and the same every time."""
+
+    def test_the_database_parses_with_every_species(self, tmp_path):
+        path = tmp_path / 'synthetic.dbs'
+        path.write_text(synthetic.database_text(4, np.random.default_rng(0)))
+
+        database = Database(str(path))
+
+        assert list(database.primary_species)[-4:] == synthetic.species_names(4)
+        assert len(database.minerals) == 4 and len(database.mineral_kinetics) == 4
+        database.modify('minerals', 'Min2', 'log_k', 1.5)
+        assert database.value('minerals', 'Min2', 'log_k') == [1.5] * len(synthetic.TEMPERATURES)
+
+    def test_the_tecplot_output_has_the_grid_asked_for(self, tmp_path):
+        synthetic.write_outputs(tmp_path, 3, (4, 2, 1), 2, np.random.default_rng(0))
+
+        ds = parse_output(str(tmp_path), 'volume', 2)
+
+        assert dict(ds.sizes) == {'X': 4, 'Y': 2, 'Z': 1}
+        assert list(ds.data_vars) == synthetic.mineral_names(3)
+
+    def test_a_seed_gives_the_same_files(self, tmp_path):
+        first = synthetic.write_sweep_inputs(tmp_path / 'a', 3, 2, 10, 5, seed=7)
+        second = synthetic.write_sweep_inputs(tmp_path / 'b', 3, 2, 10, 5, seed=7)
+
+        for key in ('template', 'database'):
+            assert (tmp_path / 'a' / first[key].split('/')[-1]).read_text() == \
+                   (tmp_path / 'b' / second[key].split('/')[-1]).read_text()
+
+    def test_the_sweep_generates(self, tmp_path):
+        from omphalos import generate_inputs
+        from omphalos.template import Template
+
+        config = synthetic.write_sweep_inputs(tmp_path, 3, 2, 10, 4)
+        with contextlib.redirect_stdout(io.StringIO()):
+            file_dict = generate_inputs.configure_input_files(Template(config), f'{tmp_path}/',
+                                                              rhea=True)
+
+        values = {file_dict[n].condition_blocks['boundary'].contents['Sp2'][-1] for n in file_dict}
+        assert len(file_dict) == 4 and len(values) == 4
+
+
+class TestHarness:
+    """Tests for measuring, recording and comparing."""
+
+    def test_a_slow_scenario_is_still_timed_once(self):
+        clock = iter([0.0, 50.0])
+
+        timing = harness.measure(lambda: None, repeats=5, budget=1.0, clock=lambda: next(clock))
+
+        assert timing['repeats'] == 1 and timing['min'] == 50.0
+
+    def test_quick_takes_the_smallest_size_of_each(self):
+        chosen = harness.select(quick=True)
+
+        assert [entry.name for entry, _ in chosen] == list(SCENARIOS)
+        assert all(size == entry.sizes[0] for entry, size in chosen)
+
+    def test_slower_scenarios_are_regressions(self):
+        before = _record('a', parse_output=1.0, compile=1.0, make_dict=1.0)
+        after = _record('b', parse_output=1.05, compile=1.5, make_dict=0.5)
+
+        table, regressions = harness.compare(before, after, threshold=0.1)
+
+        assert regressions == [('compile', '10', 1.5)]
+        assert 'faster' in table
+
+    def test_a_quick_run_is_recorded_and_compared(self, tmp_path, capsys):
+        assert harness.main(['-k', 'evaluate_config', '--quick', '--repeats', '1',
+                             '--output', str(tmp_path / 'a.json')]) == 0
+
+        record = json.loads((tmp_path / 'a.json').read_text())
+        assert record['results']['evaluate_config']['10']['repeats'] == 1
+        assert record['numpy'] == np.__version__
+
+        assert harness.main(['compare', str(tmp_path / 'a.json'), str(tmp_path / 'a.json')]) == 0
+        assert '1.00x' in capsys.readouterr().out
+
+    @pytest.mark.parametrize('name', sorted(SCENARIOS))
+    def test_every_scenario_runs_at_its_smallest_size(self, name, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        entry = SCENARIOS[name]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            entry.setup(entry.sizes[0], tmp_path, 0)()
@@ -0,0 +1,215 @@
+"""Unit tests for omphalos/criteria.py."""
+
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+import xarray as xr
+
+from omphalos import criteria, run, supervisor
+from omphalos.input_file import InputFile
+from rhea import slurm_interface as si
+
+
+def _snapshot(calcite, quartz=1.0):
+    """A volume snapshot of a two-cell column, at x = 0.5 and 1.5, as parse_output returns one."""
+    dims = ('X', 'Y', 'Z')
+    return xr.Dataset({'Calcite': (dims, [[[calcite[0]]], [[calcite[1]]]]),
+                       'Quartz': (dims, [[[quartz]], [[quartz]]])},
+                      coords={'X': [0.5, 1.5], 'Y': [0.5], 'Z': [0.5]})
+
+
+class _Watcher:
+    """Stands in for a SnapshotWatcher that has parsed what a test says it has."""
+
+    def __init__(self, completed=None, pending=()):
+        self.completed_files = dict(completed or {})
+        self.pending_files = set(pending)
+
+    def completed(self):
+        return dict(self.completed_files)
+
+    def pending(self):
+        return set(self.pending_files)
+
+
+class TestCriterion:
+    """Tests for reading and judging one criterion."""
+
+    def test_species_names_and_locations_are_read(self):
+        criterion = criteria.Criterion('totcon:Ca++ >= 1e-3 at x=0.5, Y=2', 'success')
+
+        assert (criterion.category, criterion.variable, criterion.threshold) == ('totcon', 'Ca++', 1e-3)
+        assert criterion.location == {'X': 0.5, 'Y': 2.0}
+
+    def test_unreadable_criterion_is_refused(self):
+        with pytest.raises(ValueError):
+            criteria.Criterion('volume is small', 'success')
+        with pytest.raises(ValueError):
+            criteria.Criterion('volume < 1 at left', 'success')
+        with pytest.raises(ValueError):
+            criteria.Criterion('volume < 1', 'maybe')
+
+    def test_location_picks_the_nearest_cell(self):
+        criterion = criteria.Criterion('volume:Calcite < 1e-4 at x=0', 'failure')
+
+        assert criterion.holds(_snapshot([0.0, 0.5]))
+        assert not criterion.holds(_snapshot([0.5, 0.0]))
+
+    def test_without_a_variable_every_column_must_hold(self):
+        criterion = criteria.Criterion('volume < 0.1 at x=0', 'failure')
+
+        assert not criterion.holds(_snapshot([0.0, 0.0], quartz=1.0))
+        assert criterion.holds(_snapshot([0.0, 0.0], quartz=0.0))
+
+    def test_nan_decides_nothing(self):
+        assert not criteria.Criterion('volume:Calcite < 1', 'failure').holds(
+            _snapshot([float('nan'), 0.0]))
+
+
+class TestFromConfig:
+    """Tests for reading the termination_criteria section."""
+
+    def test_absent_section_is_off(self):
+        assert criteria.from_config({}) is None
+        assert criteria.from_config(None) is None
+
+    def test_criteria_keep_the_order_they_are_listed_in(self):
+        found = criteria.from_config({'termination_criteria': {
+            'failure': 'volume:Calcite < 1e-4',
+            'success': ['total:Tracer > 1e-3 at x=10', 'volume:Quartz > 0.5']}})
+
+        assert [(c.outcome, c.category) for c in found] == [
+            ('failure', 'volume'), ('success', 'total'), ('success', 'volume')]
+
+    def test_a_list_without_outcomes_is_refused(self):
+        with pytest.raises(ValueError):
+            criteria.from_config({'termination_criteria': ['volume:Calcite < 1e-4']})
+
+
+class TestJudge:
+    """Tests for deciding a run on its snapshots in order."""
+
+    CRITERIA = [criteria.Criterion('volume:Calcite < 0.5 at x=0.5', 'failure')]
+
+    def test_first_snapshot_that_holds_decides(self):
+        watcher = _Watcher({('volume', 1): _snapshot([1.0, 1.0]), ('volume', 2): _snapshot([0.4, 1.0]),
+                            ('volume', 3): _snapshot([0.1, 1.0])})
+        judge = criteria.Judge(self.CRITERIA, watcher, times=[10.0, 20.0, 30.0])
+
+        decision = judge.decide()
+
+        assert decision == {'criterion': 'volume:Calcite < 0.5 at x=0.5', 'outcome': 'failure',
+                            'snapshot': 2, 'time': 20.0}
+
+    def test_nothing_past_a_snapshot_still_being_parsed_is_judged(self):
+        watcher = _Watcher({('volume', 3): _snapshot([0.1, 1.0])}, pending={('volume', 2)})
+        judge = criteria.Judge(self.CRITERIA, watcher)
+
+        assert judge.decide() is None
+
+        watcher.pending_files.clear()
+        watcher.completed_files[('volume', 2)] = _snapshot([0.2, 1.0])
+        assert judge.decide()['snapshot'] == 2
+
+    def test_staged_runs_number_from_the_offset(self):
+        watcher = _Watcher({('volume', 5): _snapshot([0.1, 1.0])})
+        judge = criteria.Judge(self.CRITERIA, watcher, times=[10.0, 20.0], file_offset=3)
+
+        assert judge.decide()['time'] == 20.0
+
+    def test_criterion_that_names_a_missing_variable_is_dropped(self, capsys):
+        judge = criteria.Judge([criteria.Criterion('volume:Gypsum > 0', 'success')],
+                               _Watcher({('volume', 1): _snapshot([1.0, 1.0])}))
+
+        assert judge.decide() is None
+        assert judge.criteria == []
+        assert 'Gypsum' in capsys.readouterr().out
+
+
+@pytest.fixture
+def fast_checks():
+    """Judge a run's snapshots every 0.1 s rather than every CHECK_INTERVAL; see fake_crunch."""
+    return (criteria,)
+
+
+def _input_file(run_dir):
+    """A deck whose run writes six snapshots, Calcite at x=0.5 halving in each, then hangs."""
+    run_dir.mkdir(parents=True, exist_ok=True)
+    script = run_dir / 'write_snapshots.sh'
+    script.write_text(
+        'value=1.0\n'
+        'for i in 1 2 3 4 5 6; do\n'
+        '  printf \'TITLE = "Test Output"\\nVARIABLES = "X" "Y" "Z" "Calcite"\\nZONE T="zone1"\\n'
+        '0.5 0.5 0.5 %s\\n1.5 0.5 0.5 1.0\\n\' "$value" > volume$i.tec\n'
+        '  value=$(awk "BEGIN {print $value / 2}")\n'
+        '  sleep 0.2\n'
+        'done\n'
+        'sleep 30\n')
+    (run_dir / 'deck.in').write_text('sh write_snapshots.sh\n')
+    output = Mock(contents={'spatial_profile': ['1', '2', '3', '4', '5', '6']})
+    return InputFile(run_dir / 'deck.in', {'OUTPUT': output}, {}, None, None, {})
+
+
+class TestDecidedRuns:
+    """A decided run is stopped and keeps its results, by crunchtope and by the supervisor alike."""
+
+    CONFIG = {'termination_criteria': {'failure': ['volume:Calcite < 0.2 at x=0']}}
+
+    def _check(self, input_file, started):
+        assert time.monotonic() - started < 10
+        assert input_file.error_code == 0
+        # 1, 0.5, 0.25, 0.125: decided on the fourth snapshot, and nothing after it is kept.
+        assert input_file.termination['snapshot'] == 4
+        assert input_file.termination['outcome'] == 'failure'
+        calcite = input_file.results['volume']['Calcite'].sel(X=0.5).values.ravel()
+        assert list(calcite) == [1.0, 0.5, 0.25, 0.125]
+
+    def test_crunchtope_stops_a_decided_run(self, tmp_path, fake_crunch):
+        input_file = _input_file(tmp_path / 'run0')
+
+        started = time.monotonic()
+        run.crunchtope(input_file, 0, 60, tmp_path / 'run0', config=self.CONFIG)
+
+        self._check(input_file, started)
+
+    def test_supervisor_stops_a_decided_run(self, tmp_path, fake_crunch):
+        input_file = _input_file(tmp_path / 'run0')
+
+        started = time.monotonic()
+        asyncio.run(supervisor._supervise(input_file, 0, 60, tmp_path / 'run0',
+                                          asyncio.Semaphore(1), self.CONFIG))
+
+        self._check(input_file, started)
+
+    def test_a_previous_runs_snapshots_decide_nothing(self, tmp_path, fake_crunch):
+        """In a shared directory, the last run's snapshots are there before this run writes any."""
+        run_dir = tmp_path / 'tmp'
+        input_file = _input_file(run_dir)
+        # What an earlier run in the same directory left: Calcite gone, which would decide at once.
+        for index in range(1, 7):
+            path = run_dir / f'volume{index}.tec'
+            path.write_text('TITLE = "Test Output"\nVARIABLES = "X" "Y" "Z" "Calcite"\n'
+                            'ZONE T="zone1"\n0.5 0.5 0.5 0.01\n1.5 0.5 0.5 0.01\n')
+            os.utime(path, (time.time() - 3600,) * 2)
+
+        started = time.monotonic()
+        run.crunchtope(input_file, 1, 60, run_dir, config=self.CONFIG)
+
+        self._check(input_file, started)
+
+    def test_compile_results_reports_the_outcomes(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.chdir(tmp_path)
+        decided = SimpleNamespace(error_code=0, results={}, termination={'outcome': 'success'})
+        finished = SimpleNamespace(error_code=0, results={}, termination=None)
+        monkeypatch.setattr('core.file_methods.unpickle',
+                            lambda path: decided if 'run1/' in path else finished)
+        monkeypatch.setattr(si, '_spill_results', lambda input_file, i, spill_dir: input_file)
+        monkeypatch.setattr('core.file_methods.dataset_to_netcdf', lambda *a, **k: None)
+
+        si.compile_results(2)
+
+        assert 'stopped early by a success criterion (1): [1]' in capsys.readouterr().out
@@ -0,0 +1,196 @@
+"""Unit tests for rhea/executors.py."""
+
+import shutil
+import time
+
+import pytest
+
+from rhea import executors, slurm_exec, task_farm, worker_pool
+
+# Stands in for slurm_exec.py: leaves run N's completion record, after sleeping for the seconds in
+# the environment's FAKE_RUN_SECONDS.
+FAKE_SLURM_EXEC = '''import os, sys, time
+time.sleep(float(os.environ.get('FAKE_RUN_SECONDS', 0)))
+run = sys.argv[-2]
+os.makedirs(f'run{run}', exist_ok=True)
+open(f'run{run}/input_file{run}_complete.pkl', 'w').write('record')
+'''
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / 'config.yaml'
+    path.write_text('nodes: 2\n')
+    return path
+
+
+class TestFromConfig:
+    """Choosing a backend from run_type, the config and the command line."""
+
+    def test_the_backends_are_registered_by_name(self):
+        assert set(executors.BACKENDS) == {'serial', 'xargs', 'parallel', 'pool', 'slurm'}
+        assert all(name == executor.name for name, executor in executors.BACKENDS.items())
+
+    def test_run_type_gives_the_default(self, config_path, monkeypatch):
+        monkeypatch.setattr(shutil, 'which', lambda name: f'/usr/bin/{name}')
+
+        local = executors.from_config({'nodes': 3}, config_path, 'local')
+        cluster = executors.from_config({}, config_path, 'cluster')
+
+        assert (local.name, local.workers) == ('xargs', 3)
+        assert cluster.name == 'slurm' and not cluster.waits
+
+    def test_the_command_line_wins_over_the_config(self, config_path):
+        config = {'nodes': 3, 'executor': {'backend': 'pool', 'workers': 5}}
+
+        assert executors.from_config(config, config_path, 'local').workers == 5
+        assert executors.from_config(config, config_path, 'local', backend='serial').name == 'serial'
+
+    @pytest.mark.parametrize('section, run_type', [('queue', 'local'), ('slurm', 'local'),
+                                                   ('pool', 'cluster'), ('xargs', 'remote')])
+    def test_a_backend_that_cannot_run_is_an_error(self, section, run_type, config_path):
+        with pytest.raises(executors.ExecutorError):
+            executors.from_config({'executor': section}, config_path, run_type)
+
+    def test_a_missing_program_is_an_error_before_anything_runs(self, config_path, monkeypatch):
+        monkeypatch.setattr(shutil, 'which', lambda name: None)
+
+        with pytest.raises(executors.ExecutorError, match='GNU Parallel not found'):
+            executors.from_config({}, config_path, 'local', backend='parallel')
+
+    def test_a_malformed_section_is_an_error(self, config_path):
+        with pytest.raises(ValueError):
+            executors.from_config({'executor': ['pool']}, config_path, 'local')
+
+
+class TestCommandExecutors:
+    """xargs and GNU Parallel run a process per run from one shell command."""
+
+    @pytest.fixture(autouse=True)
+    def _fake_slurm_exec(self, tmp_path, monkeypatch):
+        script = tmp_path / 'fake_slurm_exec.py'
+        script.write_text(FAKE_SLURM_EXEC)
+        monkeypatch.setattr(executors, 'SLURM_EXEC', script)
+
+    def test_a_whole_sweep_is_a_range_and_a_remainder_a_list(self):
+        assert executors.run_numbers([0, 1, 2]) == ('seq 0 2', '{0..2}')
+        assert executors.run_numbers([2, 0, 5]) == ("printf '%s\\n' 2 0 5", '2 0 5')
+
+    def test_every_run_leaves_its_record(self, tmp_path, config_path):
+        executor = executors.XargsExecutor(config_path, workers=2, directory=tmp_path)
+
+        executor.submit([0, 1, 3])
+
+        assert executor.wait(interval=0.05) == 0
+        assert executor.results() == {run: executors.completion_record(run, tmp_path)
+                                      for run in (0, 1, 3)}
+
+    def test_cancel_stops_the_runs(self, tmp_path, config_path, monkeypatch):
+        monkeypatch.setenv('FAKE_RUN_SECONDS', '30')
+        executor = executors.XargsExecutor(config_path, workers=1, directory=tmp_path)
+
+        started = time.monotonic()
+        executor.submit([0, 1])
+        time.sleep(0.5)
+        executor.cancel()
+
+        assert executor.poll() is not None and time.monotonic() - started < 10
+        assert executor.results() == {0: None, 1: None}
+
+
+class TestSerialExecutor:
+    """Runs in this process, one after another."""
+
+    def test_a_raising_run_does_not_stop_the_rest(self, tmp_path, config_path, monkeypatch):
+        ran = []
+
+        def execute_and_record(file_num, config, pflo, min3p=False):
+            ran.append((file_num, config['nodes']))
+            if file_num == 1:
+                raise RuntimeError('no deck')
+
+        monkeypatch.setattr(slurm_exec, 'execute_and_record', execute_and_record)
+        executor = executors.SerialExecutor(config_path, directory=tmp_path)
+
+        executor.submit([0, 1, 2])
+
+        assert ran == [(0, 2), (1, 2), (2, 2)]
+        assert executor.poll() == 0
+        assert list(executor.failed) == [1] and 'no deck' in executor.failed[1]
+
+
+class TestPoolExecutor:
+    """Hands the runs to the worker pool from a thread."""
+
+    def test_submit_returns_before_the_runs_finish(self, config_path, monkeypatch):
+        gate = []
+
+        def run_pool(config_path, runs, workers, pflo=False, min3p=False, admission=None):
+            while not gate:
+                time.sleep(0.01)
+            return {run: 'lost' for run in runs if run == 2}
+
+        monkeypatch.setattr(worker_pool, 'run_pool', run_pool)
+        executor = executors.PoolExecutor(config_path, workers=2)
+
+        executor.submit([0, 1, 2])
+
+        assert executor.poll() is None
+        gate.append(True)
+        assert executor.wait(interval=0.01) == 0
+        assert executor.submitted == [0, 1, 2] and executor.failed == {2: 'lost'}
+
+    def test_cancel_stops_the_queue_where_it_has_got_to(self, config_path, monkeypatch):
+        taken = []
+
+        def run_pool(config_path, runs, workers, pflo=False, min3p=False, admission=None):
+            for run in runs:
+                taken.append(run)
+                if run == 1:
+                    executor.cancel()
+            return {}
+
+        monkeypatch.setattr(worker_pool, 'run_pool', run_pool)
+        executor = executors.PoolExecutor(config_path)
+
+        executor.submit(range(10))
+
+        assert executor.wait(interval=0.01) == 0
+        assert taken == [0, 1]
+
+
+@pytest.mark.skipif(shutil.which('bash') is None, reason='the scheduler stand-ins are bash scripts')
+class TestSlurmExecutor:
+    """Submits an array and asks squeue when it is done."""
+
+    @staticmethod
+    def _scheduler(tmp_path, monkeypatch, queued):
+        bin_dir = tmp_path / 'bin'
+        bin_dir.mkdir()
+        (bin_dir / 'sbatch').write_text('#!/bin/bash\necho "$@" > sbatch.log\n'
+                                        'echo "Submitted batch job 42"\n')
+        (bin_dir / 'squeue').write_text(f'#!/bin/bash\n{"echo 42_3 rhea R" if queued else ""}\n')
+        for name in ('sbatch', 'squeue'):
+            (bin_dir / name).chmod(0o755)
+        monkeypatch.setenv('PATH', f'{bin_dir}:/usr/bin:/bin')
+
+    def test_a_plain_array_has_a_task_per_run(self, tmp_path, config_path, monkeypatch):
+        self._scheduler(tmp_path, monkeypatch, queued=True)
+        executor = executors.from_config({}, config_path, 'cluster', directory=tmp_path)
+
+        executor.submit([0, 1, 2, 7])
+
+        assert (tmp_path / 'sbatch.log').read_text().startswith('--array=0-2,7 ')
+        assert executor.job_id == '42' and executor.poll() is None
+
+    def test_a_farm_shares_a_queue_between_its_tasks(self, tmp_path, config_path, monkeypatch):
+        self._scheduler(tmp_path, monkeypatch, queued=False)
+        executor = executors.from_config({'task_farm': {'runs_per_task': 4, 'workers': 2}},
+                                         config_path, 'cluster', directory=tmp_path)
+
+        executor.submit(executor.order(list(range(10)), {}))
+
+        assert '--array=0-2 --cpus-per-task=2' in (tmp_path / 'sbatch.log').read_text()
+        assert task_farm.read_queue(tmp_path) == list(range(10))
+        assert executor.poll() == 0
+
@@ -686,3 +686,15 @@ class TestRepairExponents:
 
         assert list(ds.data_vars) == ['A', 'B']
         assert ds['A'].values[1] == pytest.approx(1.1)
+
+
+class TestFileDigest:
+    """Tests for file_digest."""
+
+    def test_matches_hashlib(self, tmp_path):
+        import hashlib
+
+        path = tmp_path / 'data.bin'
+        path.write_bytes(b'abc' * 1000)
+
+        assert fm.file_digest(path, chunk_size=7) == hashlib.sha256(b'abc' * 1000).hexdigest()
@@ -442,6 +442,23 @@ class TestStageSupportFiles:
         assert 'CrunchTope will not find it' in out
 
 
+class TestStagedNames:
+    """Tests for the names stage_support_files gives what it copies."""
+
+    def test_database_by_basename_then_support_files(self, tmp_path):
+        template = TestAuxiliaryFiles._template(
+            tmp_path, poro_line='read_PorosityFile data/porosity.dat')
+        template.config['database'] = '/databases/datacom.dbs'
+
+        assert gi.staged_names(template) == ['datacom.dbs', 'data/porosity.dat']
+
+    def test_no_database(self, tmp_path):
+        template = TestAuxiliaryFiles._template(tmp_path)
+        template.config['database'] = None
+
+        assert gi.staged_names(template) == ['porosity.dat']
+
+
 class TestRescaleRegion:
     """Tests for moving a 1-indexed inclusive cell range between grid resolutions."""
 
@@ -0,0 +1,163 @@
+"""Unit tests for core/lifecycle.py."""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+import yaml
+
+from core import file_methods as fm
+from core import lifecycle
+
+
+def _run_dir(directory, number, error_code=0):
+    """A finished run directory: its record and log, output, a subdirectory, and shared files."""
+    run_dir = directory / f'run{number}'
+    (run_dir / 'sub').mkdir(parents=True)
+    fm.pickle_data_set(SimpleNamespace(error_code=error_code),
+                       str(run_dir / f'input_file{number}_complete.pkl'))
+    (run_dir / 'crunch.log').write_text('log\n')
+    (run_dir / 'conc1.tec').write_text('conc\n')
+    (run_dir / 'sub' / 'column.out').write_text('out\n')
+    # Staged as the store's copy would be: one file, linked into this run and another.
+    store = directory / 'store'
+    store.mkdir(exist_ok=True)
+    shared = store / 'database.dbs'
+    if not shared.exists():
+        shared.write_text('database\n')
+        os.link(shared, store / 'other_run.dbs')
+    os.link(shared, run_dir / 'database.dbs')
+    (run_dir / 'aqueous.dbs').symlink_to(shared)
+    return run_dir
+
+
+def _names(run_dir):
+    return sorted(path.relative_to(run_dir).as_posix() for path in run_dir.rglob('*'))
+
+
+class TestSettings:
+    """The run_directories section of the config."""
+
+    def test_off_unless_asked_for(self):
+        assert lifecycle.settings({}) is None
+        assert lifecycle.settings({'run_directories': 'delete'}) == {
+            'successful': 'delete', 'failed': 'keep', 'format': 'tar.gz', 'when': 'finished',
+            'keep': ()}
+
+    @pytest.mark.parametrize('section', [['archive'], {'successful': 'pack'}, {'format': 'rar'},
+                                         {'when': 'later'}])
+    def test_a_malformed_section_is_an_error(self, section):
+        with pytest.raises(ValueError):
+            lifecycle.settings({'run_directories': section})
+
+
+class TestTidy:
+    """What a run directory is left with."""
+
+    def test_an_archived_run_keeps_its_record_log_and_archive(self, tmp_path):
+        run_dir = _run_dir(tmp_path, 3)
+
+        result = lifecycle.tidy(run_dir, lifecycle.settings({'run_directories': 'archive'}))
+
+        assert _names(run_dir) == ['crunch.log', 'input_file3_complete.pkl', 'run3.tar.gz']
+        assert result == {'policy': 'archive', 'archived': 2, 'removed': 4}
+        files = lifecycle.RunFiles(run_dir)
+        assert files.names() == ['conc1.tec', 'crunch.log', 'input_file3_complete.pkl',
+                                 'sub/column.out']
+        assert files.read('sub/column.out') == b'out\n'
+        assert (tmp_path / 'store' / 'database.dbs').read_text() == 'database\n'
+
+    def test_a_failed_run_follows_its_own_policy(self, tmp_path):
+        run_dir = _run_dir(tmp_path, 0, error_code=1)
+        config = {'run_directories': {'successful': 'delete'}}
+
+        assert lifecycle.finished(run_dir, config, error_code=1) == {
+            'policy': 'keep', 'archived': 0, 'removed': 0}
+        assert 'conc1.tec' in _names(run_dir)
+
+    def test_delete_leaves_what_keep_names(self, tmp_path):
+        run_dir = _run_dir(tmp_path, 1)
+        section = lifecycle.settings({'run_directories': {'successful': 'delete',
+                                                          'keep': ['*.out']}})
+
+        lifecycle.tidy(run_dir, section)
+
+        assert _names(run_dir) == ['crunch.log', 'input_file1_complete.pkl', 'sub',
+                                   'sub/column.out']
+
+    def test_a_zip_is_read_and_extracted_back(self, tmp_path):
+        run_dir = _run_dir(tmp_path, 2)
+        lifecycle.tidy(run_dir, lifecycle.settings({'run_directories': {'format': 'zip'}}))
+
+        files = lifecycle.RunFiles(run_dir)
+        assert files.archive.name == 'run2.zip'
+        assert sorted(files.extract(tmp_path / 'forensics')) == ['conc1.tec', 'sub/column.out']
+        assert (tmp_path / 'forensics' / 'conc1.tec').read_text() == 'conc\n'
+        with pytest.raises(KeyError):
+            files.read('conc2.tec')
+
+
+class TestSweeper:
+    """Tidying from rhea while the runs go on."""
+
+    def test_runs_leave_their_directories_to_a_sweeper(self, tmp_path, monkeypatch):
+        run_dir = _run_dir(tmp_path, 0)
+        config = {'run_directories': {'when': 'background'}}
+        monkeypatch.setenv(lifecycle.SWEEPER_ENV, '1')
+
+        assert lifecycle.finished(run_dir, config) is None
+        monkeypatch.delenv(lifecycle.SWEEPER_ENV)
+        assert lifecycle.finished(run_dir, config)['policy'] == 'archive'
+
+    def test_a_sweep_tidies_only_the_runs_that_have_finished(self, tmp_path):
+        sweeper = lifecycle.Sweeper([0, 1], lifecycle.settings({'run_directories': 'archive'}),
+                                    directory=tmp_path)
+        _run_dir(tmp_path, 0)
+        (tmp_path / 'run1').mkdir()
+
+        assert sweeper.sweep() == 1
+        assert sweeper.pending == {1} and (tmp_path / 'run0' / 'run0.tar.gz').is_file()
+
+    def test_a_rerun_is_not_taken_for_finished_by_the_last_sweeps_record(self, tmp_path):
+        from rhea import slurm_interface as si
+
+        _run_dir(tmp_path, 0)
+        si.clear_run_directories(1, directory=tmp_path)
+        (tmp_path / 'run0' / 'model.in').write_text('deck\n')
+        (tmp_path / 'run0' / 'database.dbs').write_text('database\n')
+        section = lifecycle.settings({'run_directories': {'when': 'background'}})
+        sweeper = lifecycle.Sweeper([0], section, directory=tmp_path)
+
+        assert sweeper.sweep() == 0
+        assert _names(tmp_path / 'run0') == ['database.dbs', 'input_file0_complete.pkl', 'model.in']
+
+        fm.pickle_data_set(SimpleNamespace(error_code=0),
+                           str(tmp_path / 'run0' / 'input_file0_complete.pkl'))
+        assert sweeper.sweep() == 1 and (tmp_path / 'run0' / 'run0.tar.gz').is_file()
+
+    def test_the_sweeper_finishes_what_it_started(self, tmp_path):
+        sweeper = lifecycle.Sweeper([0], lifecycle.settings({'run_directories': 'delete'}),
+                                    directory=tmp_path, interval=60).start()
+        assert os.environ[lifecycle.SWEEPER_ENV]
+        _run_dir(tmp_path, 0)
+
+        sweeper.stop()
+
+        assert sweeper.tidied == 1 and lifecycle.SWEEPER_ENV not in os.environ
+
+
+class TestMain:
+    """rhea runs, from the sweep's directory."""
+
+    def test_tidy_then_list_and_show(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.chdir(tmp_path)
+        _run_dir(tmp_path, 0)
+        _run_dir(tmp_path, 1, error_code=2)
+        (tmp_path / 'config.yaml').write_text(yaml.safe_dump({'run_directories': 'archive'}))
+
+        assert lifecycle.main(['tidy', 'config.yaml']) == 0
+        assert 'Tidied 2 finished run(s): 2 file(s) archived' in capsys.readouterr().out
+        assert lifecycle.main(['list', 'run0']) == 0
+        assert 'conc1.tec  (packed)' in capsys.readouterr().out
+        assert lifecycle.main(['show', 'run1', 'conc1.tec']) == 0
+        assert capsys.readouterr().out == 'conc\n'
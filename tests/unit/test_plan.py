@@ -0,0 +1,156 @@
+"""Unit tests for rhea/plan.py."""
+
+import contextlib
+import io
+import shutil
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import yaml
+
+from benchmarks import synthetic
+from omphalos.restart_file import dims_from_input_file
+from rhea import plan, resources
+
+
+@pytest.fixture
+def sweep(tmp_path, monkeypatch):
+    """A synthetic sweep of four runs of a ten-cell column with two snapshots, and its config."""
+    monkeypatch.chdir(tmp_path)
+    config = synthetic.write_sweep_inputs(tmp_path, 3, 2, 10, 4)
+    (tmp_path / 'config.yaml').write_text(yaml.safe_dump(config))
+    return config
+
+
+def _generate(config):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return plan.generate(config)
+
+
+class TestTecPlot:
+    """Which files a run writes, and how large they are."""
+
+    def test_categories_follow_the_deck_blocks(self):
+        columns = plan.tec_columns({'PRIMARY_SPECIES': 4, 'SECONDARY_SPECIES': 2, 'MINERALS': 3})
+
+        assert (columns['totcon'], columns['conc'], columns['rate'], columns['pH']) == (4, 6, 3, 1)
+        assert 'gases_conc' not in columns and 'surface' not in columns
+
+    def test_the_estimate_is_close_to_a_written_file(self):
+        text = synthetic.tecplot_text(['H+', 'Sp1', 'Sp2'], (500, 1, 1), np.random.default_rng(0))
+
+        assert plan.tec_bytes(500, 3) == pytest.approx(len(text), rel=0.05)
+
+    def test_a_finished_run_is_measured(self, tmp_path):
+        synthetic.write_outputs(tmp_path, 2, (10, 1, 1), 3, np.random.default_rng(0))
+
+        measured = plan.measure_run(tmp_path)
+
+        assert sorted(measured) == sorted(synthetic.CATEGORIES)
+        size = (tmp_path / 'conc1.tec').stat().st_size
+        assert measured['conc'] == (pytest.approx(size / 10, rel=0.01), 3)
+
+
+class TestRestart:
+    """Restart files are sized from the solver's array declarations."""
+
+    def test_the_size_grows_with_the_grid(self):
+        dims = {'PRIMARY_SPECIES': 5, 'SECONDARY_SPECIES': 10, 'MINERALS': 3}
+
+        small, large = (plan.restart_bytes(dims, [nx, 1, 1]) for nx in (1000, 2000))
+
+        assert 1.9 < large / small < 2.1
+
+    def test_a_saved_restart_is_counted_once_per_stage_that_saves_one(self, sweep):
+        file_dict = _generate(sweep)
+        model = resources.MemoryModel(0, 1024)
+        chain = [file_dict[0], file_dict[1]]
+        chain[0].keyword_blocks['RUNTIME'].contents['save_restart'] = ['stage0.rst']
+
+        estimate = plan.estimate_run(chain, model)
+
+        assert estimate['restart_bytes'] == plan.restart_bytes(dims_from_input_file(chain[0]),
+                                                               [10, 1, 1]) > 0
+        assert estimate['snapshots'] == 4
+
+
+class TestEstimate:
+    """One run's figures, and the sweep's totals."""
+
+    def test_a_measured_run_predicts_the_files_written(self, sweep, tmp_path):
+        rng = np.random.default_rng(1)
+        synthetic.write_outputs(tmp_path / 'past', 3, (10, 1, 1), 2, rng)
+        written = sum(path.stat().st_size for path in (tmp_path / 'past').glob('*.tec'))
+
+        estimate = plan.estimate_run([_generate(sweep)[0]], resources.MemoryModel(0, 1024),
+                                     plan.measure_run(tmp_path / 'past'))
+
+        assert estimate['tec_bytes'] == pytest.approx(written, rel=0.01)
+        assert estimate['tec_files'] == 2 * len(synthetic.CATEGORIES)
+        # totcon and conc carry H+ and three species, volume three minerals; all are parsed.
+        assert estimate['netcdf_bytes'] == 8 * (4 + 4 + 3) * 10 * 2
+        assert estimate['memory'] == 10 * 1024
+
+    def test_memory_is_the_largest_runs_that_run_at_once(self):
+        estimates = {run: {'tec_bytes': run, 'netcdf_bytes': 0, 'restart_bytes': 0, 'tec_files': 2,
+                           'memory': 100 * (run + 1)} for run in range(5)}
+
+        total = plan.budget(estimates, workers=2, runtimes={run: 3600.0 for run in range(5)})
+
+        assert total['memory'] == 500 + 400
+        assert total['inodes'] == 5 * (2 + plan.FILES_PER_RUN)
+        assert total['largest'] == [4, 3, 2]
+        assert (total['core_hours'], total['makespan']) == (5.0, 3 * 3600.0)
+
+    def test_runtimes_are_predicted_from_past_sweeps(self, sweep, tmp_path, monkeypatch):
+        from rhea import schedule
+
+        file_dict = _generate(sweep)
+        predictor = SimpleNamespace(predict=lambda names, rows: np.full(len(rows), 60.0),
+                                    describe=lambda: {'source': 'past sweeps'})
+        monkeypatch.setattr(schedule, 'fit_predictor',
+                            lambda directory, include_this_sweep: predictor)
+
+        runtimes, model = plan.predict_runtimes(file_dict, tmp_path)
+
+        assert runtimes == {run: 60.0 for run in file_dict} and model['source'] == 'past sweeps'
+
+
+class TestLimits:
+    """A warning for each limit the sweep would break."""
+
+    def test_free_space_and_the_given_limits(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(shutil, 'disk_usage', lambda path: SimpleNamespace(free=10 * 1024))
+        total = {'disk': 20 * 1024, 'inodes': 50}
+
+        warnings = plan.check_limits(total, tmp_path, quota=1024, inodes=10)
+
+        assert len(warnings) == 3 and 'has 10.0 KB free' in warnings[0]
+        assert plan.check_limits(total, tmp_path, quota=None, inodes=100)[1:] == []
+
+
+class TestMain:
+    """rhea plan from the sweep's directory."""
+
+    def test_the_plan_is_printed_and_nothing_is_left_behind(self, sweep, tmp_path, capsys):
+        before = sorted(path.name for path in tmp_path.iterdir())
+
+        status = plan.main(['config.yaml', '--inodes', '10'])
+
+        out = capsys.readouterr().out
+        assert status == 1
+        assert out.startswith('Plan for 4 runs, 1 at once.')
+        assert 'over the limit of 10' in out
+        assert sorted(path.name for path in tmp_path.iterdir()) == before
+
+    def test_what_generation_writes_goes_to_the_shadow(self, tmp_path):
+        (tmp_path / 'porosity.dat').write_text('0.3\n')
+        (tmp_path / 'porosity_stage1.dat').write_text('0.3\n0.3\n')
+        (tmp_path / 'run0').mkdir()
+
+        with plan._shadow(tmp_path) as shadow:
+            assert sorted(path.name for path in shadow.iterdir()) == ['porosity.dat']
+            (shadow / 'porosity_stage1.dat').write_text('refined\n')
+
+        assert (tmp_path / 'porosity_stage1.dat').read_text() == '0.3\n0.3\n'
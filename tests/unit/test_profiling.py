@@ -0,0 +1,176 @@
+"""Unit tests for core/profiling.py."""
+
+import threading
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+from core import profiling
+from rhea import slurm_interface as si
+
+
+@pytest.fixture(autouse=True)
+def _profiling_off():
+    """Leave profiling off and empty for every other test, whatever this one did."""
+    profiling.reset()
+    yield
+    profiling.reset()
+
+
+@pytest.fixture
+def ticks(monkeypatch):
+    """A perf_counter that advances one second per call."""
+    clock = iter(range(1000))
+    monkeypatch.setattr(profiling.time, 'perf_counter', lambda: float(next(clock)))
+
+
+class TestDisabled:
+    """Off, nothing is timed and nothing is recorded."""
+
+    def test_nothing_is_recorded(self):
+        calls = []
+        work = profiling.timed('work')(lambda: calls.append(1) or 'done')
+
+        with profiling.collect() as record:
+            with profiling.phase('outer'):
+                assert work() == 'done'
+        profiling.add(record, 'solver', 1.0)
+
+        assert calls == [1] and record == {} and profiling.sweep_timings() == {}
+
+    def test_the_config_turns_it_on(self):
+        assert not profiling.configure({})
+        assert profiling.configure({'profiling': True}) and profiling.enabled()
+
+
+class TestPhases:
+    """Tests for timing phases and gathering them."""
+
+    def test_an_inner_phase_is_not_counted_twice(self, ticks):
+        profiling.configure({'profiling': True})
+
+        # perf_counter reads 0 entering outer, 1 and 2 around inner, 3 leaving outer.
+        with profiling.phase('outer'):
+            with profiling.phase('inner'):
+                pass
+
+        assert profiling.sweep_timings() == {'outer': 2.0, 'inner': 1.0}
+
+    def test_a_runs_phases_go_to_its_record(self, ticks):
+        profiling.configure({'profiling': True})
+        solve = profiling.timed('solver')(lambda: None)
+
+        with profiling.collect() as record:
+            solve()
+            solve()
+        with profiling.phase('template'):
+            pass
+
+        assert record == {'solver': 2.0}
+        assert profiling.sweep_timings() == {'template': 1.0}
+
+    def test_a_runs_record_is_carried_on_in_another_thread(self, ticks):
+        """As the supervisor does: its run waits on one thread and is parsed on another."""
+        profiling.configure({'profiling': True})
+        with profiling.collect() as record:
+            pass
+        profiling.add(record, 'solver', 5.0)
+
+        def parse():
+            with profiling.collect(record), profiling.phase('parse'):
+                pass
+
+        thread = threading.Thread(target=parse)
+        thread.start()
+        thread.join()
+
+        assert record == {'solver': 5.0, 'parse': 1.0}
+        assert profiling.sweep_timings() == {}
+
+    def test_the_sweeps_phases_are_saved_for_compile_results(self, tmp_path, ticks):
+        path = tmp_path / profiling.PROFILE_FILE
+        profiling.configure({'profiling': True})
+        with profiling.phase('evaluate_config'):
+            pass
+
+        profiling.save(path)
+        assert profiling.load(path) == {'evaluate_config': 1.0}
+
+        profiling.configure({})
+        profiling.save(path)
+        assert profiling.load(path) == {}
+
+
+class TestBreakdown:
+    """Tests for the table of where the time went."""
+
+    def test_totals_means_and_shares(self):
+        table = profiling.breakdown([{'solver': 6.0, 'parse': 1.0}, {'solver': 2.0}, None],
+                                    sweep={'template': 1.0})
+
+        lines = {line.split()[0]: line.split()[1:] for line in table.splitlines()[2:]}
+        assert lines['solver'] == ['8.000', '4.000', '80.0%']
+        assert lines['parse'] == ['1.000', '1.000', '10.0%']
+        assert lines['template'] == ['1.000', '-', '10.0%']
+        assert lines['total'] == ['10.000']
+        assert 'over 2 run(s)' in table
+
+    def test_nothing_timed_is_no_table(self):
+        assert profiling.breakdown([None, {}]) == ''
+
+
+class TestSweepReports:
+    """Timings travel in the completion records and are summed when the sweep is compiled."""
+
+    def test_compile_results_prints_the_breakdown(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / profiling.PROFILE_FILE).write_text('{"template": 2.0}')
+        records = [SimpleNamespace(error_code=0, results={}, timings={'solver': 5.0}),
+                   SimpleNamespace(error_code=1, results={}, timings={'solver': 3.0})]
+        monkeypatch.setattr('core.file_methods.unpickle',
+                            lambda path: records[int(path.split('/')[0][3:])])
+        monkeypatch.setattr(si, '_spill_results', lambda input_file, i, spill_dir: input_file)
+        monkeypatch.setattr('core.file_methods.dataset_to_netcdf', lambda *a, **k: None)
+
+        si.compile_results(2)
+
+        out = capsys.readouterr().out
+        assert 'over 2 run(s)' in out
+        assert 'solver' in out and 'template' in out and 'unpickle' in out
+
+    def test_an_unprofiled_sweep_prints_none(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr('core.file_methods.unpickle',
+                            lambda path: SimpleNamespace(error_code=0, results={}))
+        monkeypatch.setattr(si, '_spill_results', lambda input_file, i, spill_dir: input_file)
+        monkeypatch.setattr('core.file_methods.dataset_to_netcdf', lambda *a, **k: None)
+
+        si.compile_results(1)
+
+        assert 'Where the time went' not in capsys.readouterr().out
+
+    def test_a_run_times_its_solver_and_parse(self, tmp_path, monkeypatch):
+        pytest.importorskip('omphalos.settings',
+                            reason='requires omphalos/settings.py (created by install.sh)')
+        from omphalos import run
+        from omphalos.input_file import InputFile
+
+        script = tmp_path / 'fake_crunch.sh'
+        script.write_text('#!/bin/sh\neval "$(head -n 1 "$1")"\n')
+        script.chmod(0o755)
+        monkeypatch.setattr(run, 'crunch_dir', str(script))
+        run_dir = tmp_path / 'run0'
+        run_dir.mkdir()
+        (run_dir / 'deck.in').write_text(
+            'sleep 0.2; printf \'TITLE = "T"\\nVARIABLES = "X" "Y" "Z" "Calcite"\\nZONE T="z"\\n'
+            '0.5 0.5 0.5 1.0\\n\' > volume1.tec\n')
+        output = Mock(contents={'spatial_profile': ['1']})
+        input_file = InputFile(run_dir / 'deck.in', {'OUTPUT': output}, {}, None, None, {})
+        profiling.configure({'profiling': True})
+
+        with profiling.collect() as record:
+            run.crunchtope(input_file, 0, 60, run_dir)
+
+        assert set(record) == {'solver', 'parse'}
+        assert record['solver'] >= 0.2
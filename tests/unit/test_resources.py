@@ -0,0 +1,210 @@
+"""Unit tests for rhea/resources.py."""
+
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+import yaml
+
+from rhea import resources, slurm_exec, worker_pool
+
+GB = resources.GB
+
+
+def _input_file(xzones, yzones=None):
+    contents = {'xzones': xzones}
+    if yzones:
+        contents['yzones'] = yzones
+    return SimpleNamespace(keyword_blocks={'DISCRETIZATION': SimpleNamespace(contents=contents)})
+
+
+def _model(tmp_path, per_cell=1000.0, base=0.0):
+    return resources.MemoryModel(base, per_cell, margin=1.0, ledger=resources.PeakLedger(tmp_path))
+
+
+class TestSettings:
+    """Tests for reading the resources section."""
+
+    def test_absent_section_is_off(self):
+        assert resources.settings({}) is None
+        assert resources.from_config({}, {}, 4) is None
+
+    def test_true_takes_the_defaults(self):
+        section = resources.settings({'resources': True})
+
+        assert section['pin'] and section['cores_per_run'] == resources.DEFAULT_CORES_PER_RUN
+        assert section['memory_limit'] is None
+
+    def test_memory_is_given_in_gb(self):
+        section = resources.settings({'resources': {'memory_limit': 2, 'base_memory': 0.5}})
+
+        assert (section['memory_limit'], section['base_memory']) == (2 * GB, 0.5 * GB)
+
+
+class TestTopology:
+    """Tests for reading NUMA nodes and splitting them into core sets."""
+
+    def test_cpulists_are_read(self):
+        assert resources.parse_cpulist('0-3,8,10-11\n') == {0, 1, 2, 3, 8, 10, 11}
+
+    def test_nodes_are_limited_to_the_cpus_allowed(self, tmp_path, monkeypatch):
+        for node, cpulist in (('node0', '0-3'), ('node1', '4-7'), ('node10', '8-9')):
+            (tmp_path / node).mkdir()
+            (tmp_path / node / 'cpulist').write_text(cpulist + '\n')
+        monkeypatch.setattr(resources.os, 'sched_getaffinity', lambda pid: {1, 2, 3, 4, 5, 9})
+
+        assert resources.numa_nodes(tmp_path) == [{1, 2, 3}, {4, 5}, {9}]
+
+    def test_no_nodes_is_one_node(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(resources.os, 'sched_getaffinity', lambda pid: {0, 1})
+
+        assert resources.numa_nodes(tmp_path / 'missing') == [{0, 1}]
+
+    def test_sets_stay_within_a_node_and_alternate(self):
+        sets = resources.core_sets([{0, 1, 2, 3, 4}, {8, 9, 10, 11}], 2)
+
+        assert sets == [(0, 1), (8, 9), (2, 3), (10, 11)]
+
+
+class TestMemoryModel:
+    """Tests for estimating what a run needs."""
+
+    def test_grid_cells_come_from_every_axis(self):
+        assert resources.grid_cells(_input_file(['100', '0.1', '20', '0.5'], ['3', '1.0'])) == 360
+        assert resources.grid_cells(SimpleNamespace()) is None
+
+    def test_a_chain_needs_its_largest_stage(self):
+        cells = resources.run_cells({0: _input_file(['10', '1']),
+                                     1: {0: _input_file(['10', '1']), 1: _input_file(['100', '0.1'])}})
+
+        assert cells == {0: 10, 1: 100}
+
+    def test_prior_until_something_is_observed(self, tmp_path):
+        model = _model(tmp_path, base=100.0)
+
+        assert model.estimate(10) == 100 + 10 * 1000
+
+    def test_this_sweeps_runs_outweigh_past_sweeps(self, tmp_path):
+        ledger = resources.PeakLedger(tmp_path)
+        ledger.record(0, 100, 500_000)
+        model = _model(tmp_path)
+        assert model.per_cell == 5000
+
+        ledger.record(0, 100, 200_000)
+        ledger.record(1, 10, 30_000)
+        model.refine()
+
+        assert model.estimate(100) == pytest.approx(200_000)
+        assert model.estimate(10) == pytest.approx(30_000)
+
+    def test_peaks_below_the_base_still_cost_their_cells(self, tmp_path):
+        """The peaks are the children's, without the interpreter the base is for."""
+        resources.PeakLedger(tmp_path).record(0, 10, 50_000)
+        model = _model(tmp_path, base=100_000.0)
+
+        assert model.per_cell == 5000
+        assert model.estimate(1000) == 100_000 + 1000 * 5000
+
+    def test_a_small_grids_overhead_is_not_charged_to_a_large_grids_cells(self, tmp_path):
+        """A 10-cell run at 30 MB beside a 100,000-cell run at 3 GB: the large run needs 3 GB."""
+        ledger = resources.PeakLedger(tmp_path)
+        ledger.record(0, 10, 30 * 1024 ** 2)
+        ledger.record(1, 100_000, 3 * GB)
+        model = resources.MemoryModel(0.25 * GB, 1000.0, ledger=ledger)
+
+        assert model.estimate(100_000) == pytest.approx(0.25 * GB + 3 * GB * model.margin)
+        assert model.estimate(10) == pytest.approx(0.25 * GB + 30 * 1024 ** 2 * model.margin)
+
+    def test_no_run_seen_lies_above_the_fitted_line(self):
+        fixed, per_cell = resources.fit_peaks([(10, 5_000), (20, 40_000), (30, 35_000)])
+
+        assert per_cell == pytest.approx(1500)
+        assert fixed == pytest.approx(10_000)
+        assert resources.fit_peaks([(10, 9_000), (20, 1_000)]) == (9_000, 0.0)
+
+
+class TestAdmission:
+    """Tests for deciding when a run may start."""
+
+    def test_runs_wait_while_memory_is_committed(self, tmp_path):
+        admission = resources.Admission([(0,), (1,), (2,)], 25_000, _model(tmp_path),
+                                        {0: 10, 1: 10, 2: 10})
+
+        assert admission.admit(0) == (0,)
+        assert admission.admit(1) == (1,)
+        assert admission.admit(2) is None
+
+        admission.release(0)
+        assert admission.admit(2) == (0,)
+
+    def test_a_run_too_large_for_the_limit_starts_alone(self, tmp_path, capsys):
+        admission = resources.Admission([(0,), (1,)], 5_000, _model(tmp_path), {0: 10, 1: 1})
+
+        assert admission.admit(0) == (0,)
+        assert admission.admit(1) is None
+        assert 'starting it alone' in capsys.readouterr().out
+
+    def test_no_more_runs_than_slots(self, tmp_path):
+        admission = resources.Admission([()], None, _model(tmp_path), {})
+
+        assert admission.admit(0) == ()
+        assert admission.admit(1) is None
+
+
+class TestPeakMemory:
+    """Tests for measuring what a run's child used."""
+
+    @pytest.mark.skipif(not sys.platform.startswith('linux'), reason='reads /proc')
+    def test_a_childs_peak_is_seen(self):
+        # Every page written to, since calloc'd pages that are never touched are never resident.
+        script = ('import time; block = bytearray(64 << 20)\n'
+                  'for i in range(0, len(block), 4096): block[i] = 1\n'
+                  'time.sleep(0.5)')
+        with resources.PeakMemory(interval=0.05) as peak:
+            subprocess.run([sys.executable, '-c', script], check=True)
+
+        assert peak.peak > 64 * 1024 * 1024
+
+    def test_runs_are_recorded_against_their_grid(self, tmp_path):
+        resources.record(3, _input_file(['50', '1']), 123_456, directory=tmp_path)
+        resources.record(4, SimpleNamespace(), 1, directory=tmp_path)
+
+        assert resources.PeakLedger(tmp_path).entries() == [(3, 50, 123_456)]
+
+
+class TestAdmittedPool:
+    """run_pool starts each run only once it is admitted, pinned where admission says."""
+
+    def test_pool_keeps_within_the_budget(self, tmp_path, monkeypatch):
+        config_path = tmp_path / 'config.yaml'
+        config_path.write_text(yaml.safe_dump({'template': 'model.in', 'timeout': 60}))
+        monkeypatch.setattr(worker_pool, 'ProcessPoolExecutor', ThreadPoolExecutor)
+        pinned = {}
+        monkeypatch.setattr(worker_pool.os, 'sched_setaffinity',
+                            lambda pid, cpus: pinned.setdefault(threading.get_ident(), cpus))
+        lock = threading.Lock()
+        running, most = [], []
+
+        def execute_and_record(file_num, config, pflo, min3p=False):
+            with lock:
+                running.append(file_num)
+                # The estimated memory of everything running, at 1000 bytes a cell.
+                most.append(sum(cells[run] * 1000 for run in running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(file_num)
+
+        monkeypatch.setattr(slurm_exec, 'execute_and_record', execute_and_record)
+        cells = {0: 10, 1: 10, 2: 1, 3: 1, 4: 1, 5: 1}
+        admission = resources.Admission([(0,), (1,), (2,), (3,)], 12_000, _model(tmp_path), cells)
+
+        failed = worker_pool.run_pool(config_path, range(6), 4, admission=admission)
+
+        assert failed == {}
+        assert max(most) <= 12_000
+        assert set(pinned.values()) <= {(0,), (1,), (2,), (3,)}
+        assert admission.in_flight == {}
@@ -1,6 +1,7 @@
 """Unit tests for omphalos/run.py."""
 
 import re
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock
 
 import pytest
@@ -754,7 +755,7 @@ class TestStagedAuxiliaryFiles:
     def _run_stages(self, monkeypatch, tmp_path, num_stages=3):
         written = []
         monkeypatch.setattr(run, '_print_aux_files',
-                            lambda input_file, path: written.append(input_file.stage_num))
+                            lambda input_file, path, **k: written.append(input_file.stage_num))
         monkeypatch.setattr(run, '_spinup_file_offset', lambda *a, **k: 0)
         monkeypatch.setattr(run, 'regrid_between_stages', lambda *a, **k: None)
         monkeypatch.setattr(run, 'crunchtope', lambda *a, **k: None)
@@ -771,7 +772,7 @@ class TestStagedAuxiliaryFiles:
     def test_they_are_written_before_that_stage_runs(self, monkeypatch, tmp_path):
         order = []
         monkeypatch.setattr(run, '_print_aux_files',
-                            lambda f, p: order.append(f'aux{f.stage_num}'))
+                            lambda f, p, **k: order.append(f'aux{f.stage_num}'))
         monkeypatch.setattr(run, '_spinup_file_offset', lambda *a, **k: 0)
         monkeypatch.setattr(run, 'regrid_between_stages', lambda *a, **k: None)
         monkeypatch.setattr(run, 'crunchtope',
@@ -799,7 +800,7 @@ class TestStagedAuxiliaryFiles:
 class TestStaleLogKRecord:
     """A run directory is reused between sweeps, so a sidecar must not outlive its sweep.
 
-    rhea/prep_directories.sh does `mkdir run$N` and never clears it. A sweep that varied the
+    rhea's directory preparation used to `mkdir run$N` and never clear it. A sweep that varied the
     pressure left logk_settings.json behind; the next sweep, varying nothing, read it back as its
     own and recorded a pressure that never applied.
     """
@@ -899,3 +900,154 @@ class TestNanPattern:
         reported = capsys.readouterr().out
         assert 'NaN in a printed value' in reported
         assert run.NAN_PATTERN not in reported
+
+
+class TestRunDatasetWorkers:
+    """Tests for running a sweep's files side by side, each in a directory of its own."""
+
+    @staticmethod
+    def _record(monkeypatch):
+        """Replace input_file with one that records where each run executed."""
+        seen = {}
+
+        def fake_input_file(input_file, file_num, tmp_dir, timeout, config=None):
+            seen[file_num] = sorted(p.name for p in run.Path(tmp_dir).iterdir())
+            input_file.ran_in = str(tmp_dir)
+            return input_file
+
+        monkeypatch.setattr(run, 'input_file', fake_input_file)
+        # Threads stand in for processes: the pool is the same interface, and a patched input_file
+        # does not survive into a fresh interpreter.
+        monkeypatch.setattr(run, 'ProcessPoolExecutor', ThreadPoolExecutor)
+        return seen
+
+    def test_one_worker_runs_in_tmp_dir(self, tmp_path, monkeypatch):
+        """Test that the default keeps every run in tmp_dir, as before."""
+        self._record(monkeypatch)
+        file_dict = {0: Mock(), 1: Mock()}
+
+        run.run_dataset(file_dict, str(tmp_path), 10)
+
+        assert {file_dict[n].ran_in for n in file_dict} == {str(tmp_path)}
+        assert not (tmp_path / 'run0').exists()
+
+    def test_each_run_gets_its_own_directory(self, tmp_path, monkeypatch):
+        """Test that parallel runs never share a directory, so never share .tec files."""
+        self._record(monkeypatch)
+        file_dict = {0: Mock(), 1: Mock(), 2: Mock()}
+
+        run.run_dataset(file_dict, str(tmp_path), 10, workers=3)
+
+        for n in file_dict:
+            assert file_dict[n].ran_in == str(tmp_path / f'run{n}')
+
+    def test_shared_files_are_copied_into_each_run(self, tmp_path, monkeypatch):
+        """Test that each run reads its own copy of the staged database and auxiliary files."""
+        seen = self._record(monkeypatch)
+        (tmp_path / 'datacom.dbs').write_text('db')
+        (tmp_path / 'aux').mkdir()
+        (tmp_path / 'aux' / 'perm.dat').write_text('1.0')
+
+        run.run_dataset({0: Mock(), 1: Mock()}, str(tmp_path), 10, workers=2,
+                        shared_files=('datacom.dbs', 'aux/perm.dat'))
+
+        for n in (0, 1):
+            assert seen[n] == ['aux', 'datacom.dbs']
+            assert (tmp_path / f'run{n}' / 'aux' / 'perm.dat').read_text() == '1.0'
+
+    def test_results_return_under_their_own_key(self, tmp_path, monkeypatch):
+        """Test that each returned copy replaces the entry it came from."""
+        self._record(monkeypatch)
+        file_dict = {0: Mock(), 1: Mock()}
+        originals = dict(file_dict)
+
+        run.run_dataset(file_dict, str(tmp_path), 10, workers=2)
+
+        assert file_dict[0] is originals[0]
+        assert file_dict[1].ran_in.endswith('run1')
+
+
+class TestInputFilePath:
+    """Tests for where input_file writes the deck."""
+
+    def test_an_absolute_template_path_is_not_overwritten(self, tmp_path, monkeypatch):
+        """Test that the deck goes into tmp_dir under its own name, not back over the template."""
+        monkeypatch.setattr(run, '_print_aux_files', Mock())
+        monkeypatch.setattr(run, 'crunchtope', Mock(side_effect=lambda f, *a, **k: f))
+        input_file = Mock()
+        input_file.path = '/elsewhere/templates/column.in'
+        input_file.later_inputs = {}
+
+        run.input_file(input_file, 0, tmp_path, 10)
+
+        assert input_file.path == tmp_path.resolve() / 'column.in'
+
+
+class TestStartWatcher:
+    """Tests for when crunchtope streams."""
+
+    def test_off_by_default(self, tmp_path):
+        assert run._start_watcher(Mock(), tmp_path, 0, None) is None
+        assert run._start_watcher(Mock(), tmp_path, 0, {'stream_results': False}) is None
+
+    def test_on_when_configured(self, tmp_path):
+        watcher = run._start_watcher(Mock(), tmp_path, 2, {'stream_results': True})
+        try:
+            assert watcher.file_offset == 2
+            assert 'velocityx' in watcher.skip
+        finally:
+            watcher.stop()
+
+
+class TestRunCache:
+    """Tests that crunchtope consults and fills the run cache."""
+
+    @staticmethod
+    def _input_file(tmp_path):
+        (tmp_path / 'model.in').write_text('RUNTIME\nEND\n')
+        input_file = Mock()
+        input_file.path = tmp_path / 'model.in'
+        input_file.keyword_blocks = {'RUNTIME': Mock(contents={})}
+        input_file.later_inputs = {}
+        input_file.stage_num = None
+        input_file.error_code = 0
+        input_file.results = {'totcon': 'parsed'}
+        return input_file
+
+    def test_a_hit_skips_the_solver(self, tmp_path, monkeypatch):
+        monkeypatch.delenv('OMPHALOS_NO_CACHE', raising=False)
+        spawn = Mock()
+        monkeypatch.setattr(run.pexp, 'spawn', spawn)
+        config = {'run_cache': {'path': str(tmp_path / 'cache')}}
+        input_file = self._input_file(tmp_path)
+
+        cache, key = run._cache_lookup(input_file, 0, tmp_path, config)
+        cache.store(key, {'totcon': 'cached'})
+        run.crunchtope(input_file, 0, 10, tmp_path, config=config)
+
+        spawn.assert_not_called()
+        assert input_file.results == {'totcon': 'cached'}
+
+    def test_a_miss_runs_and_stores(self, tmp_path, monkeypatch):
+        monkeypatch.delenv('OMPHALOS_NO_CACHE', raising=False)
+        process = Mock()
+        process.expect.return_value = 0
+        monkeypatch.setattr(run.pexp, 'spawn', Mock(return_value=process))
+        config = {'run_cache': {'path': str(tmp_path / 'cache')}}
+        input_file = self._input_file(tmp_path)
+
+        run.crunchtope(input_file, 0, 10, tmp_path, config=config)
+
+        cache, key = run._cache_lookup(self._input_file(tmp_path), 0, tmp_path, config)
+        assert key is None, 'the successful run was not stored'
+
+    def test_a_failed_run_is_not_stored(self, tmp_path, monkeypatch):
+        monkeypatch.delenv('OMPHALOS_NO_CACHE', raising=False)
+        process = Mock()
+        process.expect.return_value = 1          # pexpect.TIMEOUT
+        monkeypatch.setattr(run.pexp, 'spawn', Mock(return_value=process))
+        config = {'run_cache': {'path': str(tmp_path / 'cache')}}
+
+        run.crunchtope(self._input_file(tmp_path), 0, 10, tmp_path, config=config)
+
+        assert not list((tmp_path / 'cache').glob('*/*.pkl'))
@@ -0,0 +1,161 @@
+"""Unit tests for omphalos/run_cache.py."""
+
+import os
+from unittest.mock import Mock
+
+import pytest
+
+from omphalos import run_cache
+
+
+def _input_file(tmp_path, runtime=None, aux_line=None):
+    """A stand-in InputFile printed into tmp_path, reading the database the deck names."""
+    (tmp_path / 'model.in').write_text('RUNTIME\ndatabase datacom.dbs\nEND\n')
+    (tmp_path / 'datacom.dbs').write_text('database v1\n')
+
+    contents = {'database': ['datacom.dbs']}
+    contents.update(runtime or {})
+    blocks = {'RUNTIME': Mock(contents=contents)}
+    if aux_line:
+        blocks['INITIAL_CONDITIONS'] = Mock(contents={'read_PorosityFile': [aux_line]})
+
+    input_file = Mock()
+    input_file.path = tmp_path / 'model.in'
+    input_file.keyword_blocks = blocks
+    input_file.later_inputs = {}
+    input_file.stage_num = None
+    return input_file
+
+
+@pytest.fixture
+def binary(tmp_path):
+    path = tmp_path / 'CrunchTope'
+    path.write_bytes(b'aqueousdatabase catabolicdatabase')
+    return path
+
+
+class TestKey:
+    """Tests for what the key covers."""
+
+    def test_same_inputs_same_key(self, tmp_path, binary):
+        cache = run_cache.RunCache(tmp_path / 'cache')
+        input_file = _input_file(tmp_path)
+
+        assert cache.key(input_file, tmp_path, binary) == cache.key(input_file, tmp_path, binary)
+
+    def test_deck_changes_the_key(self, tmp_path, binary):
+        cache = run_cache.RunCache(tmp_path / 'cache')
+        input_file = _input_file(tmp_path)
+        before = cache.key(input_file, tmp_path, binary)
+
+        (tmp_path / 'model.in').write_text('RUNTIME\ndatabase datacom.dbs\nEND\n! edited\n')
+
+        assert cache.key(input_file, tmp_path, binary) != before
+
+    def test_database_changes_the_key(self, tmp_path, binary):
+        """A swept database parameter leaves the deck alone and changes the database."""
+        cache = run_cache.RunCache(tmp_path / 'cache')
+        input_file = _input_file(tmp_path)
+        before = cache.key(input_file, tmp_path, binary)
+
+        (tmp_path / 'datacom.dbs').write_text('database v2\n')
+
+        assert cache.key(input_file, tmp_path, binary) != before
+
+    def test_auxiliary_file_changes_the_key(self, tmp_path, binary):
+        cache = run_cache.RunCache(tmp_path / 'cache')
+        input_file = _input_file(tmp_path, aux_line='porosity.dat')
+        (tmp_path / 'porosity.dat').write_text('0.3\n')
+        before = cache.key(input_file, tmp_path, binary)
+
+        (tmp_path / 'porosity.dat').write_text('0.4\n')
+
+        assert cache.key(input_file, tmp_path, binary) != before
+
+    def test_binary_changes_the_key(self, tmp_path, binary):
+        """A rebuilt CrunchTope may answer differently."""
+        cache = run_cache.RunCache(tmp_path / 'cache')
+        input_file = _input_file(tmp_path)
+        before = cache.key(input_file, tmp_path, binary)
+
+        binary.write_bytes(b'kinetic_database catabolic_database rebuilt')
+
+        assert cache.key(input_file, tmp_path, binary) != before
+
+
+class TestStore:
+    """Tests for storing, loading and evicting entries."""
+
+    def test_round_trip(self, tmp_path):
+        cache = run_cache.RunCache(tmp_path / 'cache')
+        cache.store('ab' * 32, {'totcon': [1, 2, 3]})
+
+        assert cache.load('ab' * 32) == {'totcon': [1, 2, 3]}
+        assert cache.load('cd' * 32) is None
+
+    def test_no_temporary_file_is_left_behind(self, tmp_path):
+        cache = run_cache.RunCache(tmp_path / 'cache')
+        cache.store('ab' * 32, {})
+
+        assert [p.name for p in (tmp_path / 'cache' / 'ab').iterdir()] == ['ab' * 32 + '.pkl']
+
+    def test_least_recently_used_goes_first(self, tmp_path):
+        cache = run_cache.RunCache(tmp_path / 'cache', max_gb=0)
+        cache.max_bytes = 2500
+        for n, key in enumerate(('aa' * 32, 'bb' * 32)):
+            cache.store(key, b'x' * 1000)
+            os.utime(cache._entry(key), (1000 + n, 1000 + n))
+
+        # Reading the older entry makes it the more recently used.
+        cache.load('aa' * 32)
+        cache.store('cc' * 32, b'x' * 1000)
+
+        assert cache.load('bb' * 32) is None
+        assert cache.load('aa' * 32) is not None
+        assert cache.load('cc' * 32) is not None
+
+
+class TestFromConfig:
+    """Tests for turning the cache on and off."""
+
+    def test_off_without_a_section(self):
+        assert run_cache.from_config({}) is None
+        assert run_cache.from_config(None) is None
+
+    def test_true_takes_the_defaults(self, monkeypatch):
+        monkeypatch.delenv(run_cache.NO_CACHE_ENV, raising=False)
+        cache = run_cache.from_config({'run_cache': True})
+
+        assert cache.path == run_cache.Path(os.path.expanduser(run_cache.DEFAULT_PATH))
+
+    def test_settings_are_read(self, tmp_path, monkeypatch):
+        monkeypatch.delenv(run_cache.NO_CACHE_ENV, raising=False)
+        cache = run_cache.from_config({'run_cache': {'path': str(tmp_path), 'max_gb': 1}})
+
+        assert cache.path == tmp_path
+        assert cache.max_bytes == 1024 ** 3
+
+    def test_environment_turns_it_off(self, monkeypatch):
+        monkeypatch.setenv(run_cache.NO_CACHE_ENV, '1')
+
+        assert run_cache.from_config({'run_cache': True}) is None
+
+
+class TestCacheable:
+    """Tests for the runs the cache must not answer."""
+
+    def test_stage_of_a_chain_is_not_cacheable(self, tmp_path):
+        """Its successor reads the restart file it writes."""
+        input_file = _input_file(tmp_path)
+        input_file.stage_num = 0
+
+        assert not run_cache.cacheable(input_file)
+
+    def test_deck_with_later_inputs_is_not_cacheable(self, tmp_path):
+        input_file = _input_file(tmp_path)
+        input_file.later_inputs = {'next.in': Mock()}
+
+        assert not run_cache.cacheable(input_file)
+
+    def test_plain_run_is_cacheable(self, tmp_path):
+        assert run_cache.cacheable(_input_file(tmp_path))
@@ -0,0 +1,172 @@
+"""Unit tests for rhea/schedule.py."""
+
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from rhea import schedule, slurm_exec
+
+CONFIG = {'schedule': 'longest_first'}
+
+
+def _file_dict(temperatures):
+    return {n: SimpleNamespace(swept_values={'temperature/T': t})
+            for n, t in enumerate(temperatures)}
+
+
+def _seconds(temperature):
+    """Runs take longer the hotter they are."""
+    return float(np.exp(temperature / 20))
+
+
+def _past_sweep(directory, temperatures):
+    """Leave the record of a finished sweep in directory, as its runs would have."""
+    schedule.start(_file_dict(temperatures), directory=directory)
+    for run_num, temperature in enumerate(temperatures):
+        schedule.ledger(directory).record(run_num, _seconds(temperature), 0)
+
+
+def _log(directory):
+    text = (directory / schedule.SCHEDULE_DIR / schedule.LOG_FILE).read_text()
+    return [json.loads(line) for line in text.splitlines()]
+
+
+class TestSettings:
+    """Tests for reading the schedule key."""
+
+    def test_index_order_is_the_default(self):
+        assert not schedule.enabled({})
+        assert schedule.enabled(CONFIG)
+
+    def test_unknown_schedule_is_refused(self):
+        with pytest.raises(ValueError):
+            schedule.enabled({'schedule': 'shortest_first'})
+
+
+class TestMakespan:
+    """Tests for the makespan of a dispatch order."""
+
+    def test_longest_first_beats_a_long_run_last(self):
+        durations = [1, 1, 1, 1, 1, 1, 6]
+
+        assert schedule.makespan(durations, 2) == 9
+        assert schedule.makespan(sorted(durations, reverse=True), 2) == 6
+
+
+class TestPredictor:
+    """Tests for fitting runtimes on swept values."""
+
+    def test_slower_runs_are_predicted_slower(self):
+        temperatures = np.linspace(10, 90, 12)
+        predictor = schedule.RuntimePredictor.fit(
+            ['T'], temperatures[:, None], [_seconds(t) for t in temperatures], 'test')
+
+        predicted = predictor.predict(['T'], [[20], [50], [80]])
+
+        assert predicted[0] < predicted[1] < predicted[2]
+        assert predicted[1] == pytest.approx(_seconds(50), rel=0.05)
+
+    def test_too_few_runs_fit_nothing(self):
+        assert schedule.RuntimePredictor.fit(['T'], [[1], [2]], [1, 2], 'test') is None
+
+    def test_parameter_nobody_varied_is_ignored(self):
+        values = np.column_stack([np.linspace(0, 1, 10), np.full(10, np.nan)])
+
+        predictor = schedule.RuntimePredictor.fit(['a', 'b'], values, np.arange(1, 11), 'test')
+
+        assert predictor.names == ['a']
+
+
+class TestHistory:
+    """Tests for carrying runtimes from one sweep to the next."""
+
+    def test_next_sweep_folds_in_the_last(self, tmp_path):
+        _past_sweep(tmp_path, [10, 20, 30])
+
+        schedule.start(_file_dict([40]), directory=tmp_path)
+
+        names, values, runtimes = schedule.load_history(tmp_path)
+        assert names == ['temperature/T']
+        assert values[:, 0].tolist() == [10, 20, 30]
+        assert schedule.ledger(tmp_path).entries() == []
+
+    def test_resume_keeps_the_sweeps_own_runtimes(self, tmp_path):
+        _past_sweep(tmp_path, [10, 20, 30])
+
+        schedule.start(_file_dict([10, 20, 30]), resume=True, directory=tmp_path)
+
+        assert len(schedule.ledger(tmp_path).entries()) == 3
+        assert schedule.load_history(tmp_path)[0] == []
+
+
+class TestPlan:
+    """Tests for ordering a sweep's runs."""
+
+    def test_without_history_runs_go_in_order(self, tmp_path):
+        schedule.start(_file_dict([90, 10, 50]), directory=tmp_path)
+
+        assert schedule.plan([0, 1, 2], 2, CONFIG, directory=tmp_path) == [0, 1, 2]
+        assert _log(tmp_path)[-1]['model'] is None
+
+    def test_past_sweeps_order_this_one_longest_first(self, tmp_path):
+        _past_sweep(tmp_path, np.linspace(0, 100, 20).tolist())
+        schedule.start(_file_dict([10, 90, 50, 30]), directory=tmp_path)
+
+        order = schedule.plan([0, 1, 2, 3], 2, CONFIG, directory=tmp_path)
+
+        assert order == [1, 2, 3, 0]
+        entry = _log(tmp_path)[-1]
+        assert entry['order'] == order
+        assert entry['predicted_makespan']['longest_first'] <= entry['predicted_makespan']['as_given']
+
+    def test_not_asked_for_is_not_reordered(self, tmp_path):
+        _past_sweep(tmp_path, np.linspace(0, 100, 20).tolist())
+        schedule.start(_file_dict([10, 90]), directory=tmp_path)
+
+        assert schedule.plan([0, 1], 2, {}, directory=tmp_path) == [0, 1]
+
+
+class TestDispatcher:
+    """Tests for reordering what is left once the sweep's own first runs are in."""
+
+    def test_queue_is_refitted_on_the_first_wave(self, tmp_path):
+        temperatures = [10, 20, 30, 40, 50, 60, 70, 80, 15, 95, 55]
+        schedule.start(_file_dict(temperatures), directory=tmp_path)
+        dispatcher = schedule.Dispatcher(range(len(temperatures)), 2, directory=tmp_path)
+
+        first_wave = [next(dispatcher) for _ in range(8)]
+        for run_num in first_wave:
+            schedule.ledger(tmp_path).record(run_num, _seconds(temperatures[run_num]), 0)
+
+        assert first_wave == list(range(8))
+        assert list(dispatcher) == [9, 10, 8]
+        assert _log(tmp_path)[-1]['event'] == 'refit'
+
+
+class TestRecording:
+    """A rhea run with a schedule leaves its runtime for the next sweep to learn from."""
+
+    def test_execute_and_record_records_the_runtime(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'run3').mkdir()
+        monkeypatch.setattr(slurm_exec, 'execute',
+                            lambda file_num, config, pflo, min3p=False: SimpleNamespace(error_code=1))
+
+        slurm_exec.execute_and_record('3', {'template': 'model.in', 'schedule': 'index'})
+
+        [(file_num, _, error_code)] = schedule.ledger(tmp_path).entries()
+        assert (file_num, error_code) == (3, 1)
+
+    def test_nothing_is_recorded_without_a_schedule(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'run3').mkdir()
+        monkeypatch.setattr(slurm_exec, 'execute',
+                            lambda file_num, config, pflo, min3p=False: SimpleNamespace(error_code=0))
+
+        slurm_exec.execute_and_record('3', {'template': 'model.in'})
+
+        assert schedule.recording({'schedule': 'index'}) and not schedule.recording({})
+        assert not (tmp_path / schedule.SCHEDULE_DIR).exists()
+
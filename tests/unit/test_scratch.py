@@ -0,0 +1,160 @@
+"""Unit tests for core/scratch.py."""
+
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from core import scratch
+
+
+def _run_dir(tmp_path):
+    run_dir = tmp_path / 'sweep' / 'run3'
+    run_dir.mkdir(parents=True)
+    (run_dir / 'model.in').write_text('deck\n')
+    (run_dir / 'input_file3_complete.pkl').write_text('an earlier attempt\n')
+    return run_dir
+
+
+def _write_output(work):
+    for name in ('totcon1.tec', 'volume1.tec', 'model.out', 'model.rst'):
+        (work / name).write_text(name)
+
+
+class TestSettings:
+    """Tests for reading the scratch section."""
+
+    def test_absent_section_is_off(self):
+        assert scratch.settings({}) is None
+        assert scratch.settings(None) is None
+
+    def test_true_is_tmpdir_and_keeps_nothing(self, monkeypatch):
+        monkeypatch.setenv('TMPDIR', '/local/job42')
+
+        assert scratch.settings({'scratch': True}) == {'root': Path('/local/job42'), 'keep': ()}
+
+    def test_locations_are_named_or_given(self, monkeypatch):
+        monkeypatch.setenv('SCRATCH', '/lscratch')
+
+        assert scratch.settings({'scratch': 'shm'})['root'] == Path(scratch.SHM_DIR)
+        section = scratch.settings({'scratch': {'location': '$SCRATCH/runs', 'keep': '*.rst'}})
+        assert section == {'root': Path('/lscratch/runs'), 'keep': ('*.rst',)}
+
+    def test_malformed_section_is_refused(self):
+        with pytest.raises(ValueError):
+            scratch.settings({'scratch': ['*.rst']})
+
+
+class TestPlacement:
+    """Tests for running in a copy of the run directory and writing back what is kept."""
+
+    def test_off_runs_in_place(self, tmp_path):
+        run_dir = _run_dir(tmp_path)
+
+        with scratch.placement(run_dir, {}) as work:
+            assert work == run_dir
+
+    def test_only_kept_files_come_back(self, tmp_path):
+        run_dir = _run_dir(tmp_path)
+        config = {'scratch': {'location': str(tmp_path / 'local'), 'keep': ['*.rst']}}
+        (tmp_path / 'local').mkdir()
+
+        with scratch.placement(run_dir, config) as work:
+            assert work.parent.parent == tmp_path / 'local' and work.name == 'run3'
+            assert (work / 'model.in').read_text() == 'deck\n'
+            assert not (work / 'input_file3_complete.pkl').exists()
+            _write_output(work)
+
+        assert sorted(path.name for path in run_dir.iterdir()) == [
+            'input_file3_complete.pkl', 'model.in', 'model.rst']
+        assert list((tmp_path / 'local').iterdir()) == []
+
+    def test_a_failed_run_is_written_back_and_cleaned_up(self, tmp_path):
+        run_dir = _run_dir(tmp_path)
+        (tmp_path / 'local').mkdir()
+        config = {'scratch': {'location': str(tmp_path / 'local'), 'keep': ['*.out']}}
+
+        with pytest.raises(RuntimeError):
+            with scratch.placement(run_dir, config) as work:
+                _write_output(work)
+                raise RuntimeError('CrunchTope crashed')
+
+        assert (run_dir / 'model.out').exists()
+        assert list((tmp_path / 'local').iterdir()) == []
+
+    def test_shared_directories_stay_shared(self, tmp_path):
+        run_dir = _run_dir(tmp_path)
+        (tmp_path / 'local').mkdir()
+        config = {'scratch': {'location': str(tmp_path / 'local')}}
+
+        with scratch.placement(run_dir, config, shared=('.omphalos_runtimes',)) as work:
+            (work.parent / '.omphalos_runtimes' / 'runtimes.txt').write_text('3 12.5\n')
+
+        assert (tmp_path / 'sweep' / '.omphalos_runtimes' / 'runtimes.txt').read_text() == '3 12.5\n'
+
+    def test_unusable_location_runs_in_place(self, tmp_path, capsys):
+        run_dir = _run_dir(tmp_path)
+
+        with scratch.placement(run_dir, {'scratch': str(tmp_path / 'missing')}) as work:
+            assert work == run_dir
+        assert 'running in' in capsys.readouterr().out
+
+
+class TestExecutors:
+    """Both executors run in scratch and keep only what the config asks for."""
+
+    def test_slurm_exec_runs_in_scratch(self, tmp_path, monkeypatch):
+        pytest.importorskip('omphalos.settings',
+                            reason='requires omphalos/settings.py (created by install.sh)')
+        from rhea import slurm_exec
+
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'run3').mkdir()
+        (tmp_path / 'local').mkdir()
+        seen = []
+
+        def crunchtope(input_file, file_num, timeout, tmp_dir, config=None):
+            seen.append(Path(tmp_dir))
+            _write_output(Path(tmp_dir))
+
+        config = {'template': 'model.in', 'timeout': 60, 'aqueous_database': None,
+                  'catabolic_pathways': None,
+                  'scratch': {'location': str(tmp_path / 'local'), 'keep': ['*.rst']}}
+        with patch('omphalos.template.Template') as template, \
+             patch('omphalos.run._print_aux_files'), \
+             patch('omphalos.run.crunchtope', side_effect=crunchtope):
+            template.return_value.path = Path('model.in')
+            slurm_exec.execute('3', config, pflo=False)
+
+        assert seen[0].parent.parent == tmp_path / 'local'
+        assert config['template'] == str(seen[0] / 'model.in')
+        assert sorted(path.name for path in (tmp_path / 'run3').iterdir()) == ['model.rst']
+
+    def test_one_local_worker_still_gets_a_directory_per_run(self, tmp_path, monkeypatch):
+        pytest.importorskip('omphalos.settings',
+                            reason='requires omphalos/settings.py (created by install.sh)')
+        from omphalos import run
+
+        (tmp_path / 'local').mkdir()
+        (tmp_path / 'tmp').mkdir()
+        (tmp_path / 'tmp' / 'database.dbs').write_text('database\n')
+
+        def input_file(run_file, file_num, work, timeout, config=None):
+            assert (work / 'database.dbs').read_text() == 'database\n'
+            _write_output(work)
+            run_file.ran_in = work
+            return run_file
+
+        monkeypatch.setattr(run, 'input_file', input_file)
+        file_dict = {0: SimpleNamespace(), 1: SimpleNamespace()}
+        config = {'scratch': {'location': str(tmp_path / 'local'), 'keep': ['*.out']}}
+
+        run.run_dataset(file_dict, str(tmp_path / 'tmp') + '/', 60, workers=1,
+                        shared_files=('database.dbs',), config=config)
+
+        for file_num in (0, 1):
+            assert file_dict[file_num].ran_in.parent.parent == tmp_path / 'local'
+            assert (tmp_path / 'tmp' / f'run{file_num}' / 'model.out').exists()
+            assert not (tmp_path / 'tmp' / f'run{file_num}' / 'totcon1.tec').exists()
+        assert not (tmp_path / 'tmp' / 'model.out').exists()
@@ -363,3 +363,96 @@ class TestClearRunDirectories:
 
         assert (tmp_path / 'results.nc').read_text() == 'previous results'
         assert (tmp_path / 'conditions.nc').read_text() == 'previous record'
+
+
+class TestResume:
+    """Tests for deciding which runs a resumed sweep can skip."""
+
+    CONFIG = {'template': 'model.in'}
+
+    def _finished(self, tmp_path, number, deck='deck text', error_code=0, record_hash=True):
+        """A run directory holding a deck and the pickle slurm_exec.py would have left."""
+        import pickle
+
+        directory = tmp_path / f'run{number}'
+        directory.mkdir()
+        (directory / 'model.in').write_text(deck)
+        record = types.SimpleNamespace(error_code=error_code, results={})
+        if record_hash:
+            record.deck_hash = si.deck_hash(si.deck_paths(directory, self.CONFIG))
+        with open(directory / f'input_file{number}_complete.pkl', 'wb') as f:
+            pickle.dump(record, f)
+
+    def _expected(self, tmp_path, decks):
+        """The hashes the regenerated sweep's decks would have."""
+        expected = {}
+        for number, deck in decks.items():
+            scratch = tmp_path / 'scratch' / f'run{number}'
+            scratch.mkdir(parents=True)
+            (scratch / 'model.in').write_text(deck)
+            expected[number] = si.deck_hash(si.deck_paths(scratch, self.CONFIG))
+        return expected
+
+    def test_a_clean_run_with_the_same_deck_is_complete(self, tmp_path):
+        self._finished(tmp_path, 0)
+
+        assert si.completed_runs(self._expected(tmp_path, {0: 'deck text'}), tmp_path) == {0}
+
+    def test_a_changed_deck_is_rerun(self, tmp_path):
+        self._finished(tmp_path, 0)
+
+        assert si.completed_runs(self._expected(tmp_path, {0: 'new deck'}), tmp_path) == set()
+
+    def test_a_failed_run_is_rerun(self, tmp_path):
+        self._finished(tmp_path, 0, error_code=1)
+
+        assert si.completed_runs(self._expected(tmp_path, {0: 'deck text'}), tmp_path) == set()
+
+    def test_a_missing_pickle_is_rerun(self, tmp_path):
+        assert si.completed_runs(self._expected(tmp_path, {0: 'deck text'}), tmp_path) == set()
+
+    def test_a_pickle_without_a_hash_is_rerun(self, tmp_path):
+        """A record from before hashes were kept cannot show its deck is current."""
+        self._finished(tmp_path, 0, record_hash=False)
+
+        assert si.completed_runs(self._expected(tmp_path, {0: 'deck text'}), tmp_path) == set()
+
+    def test_completed_directories_are_not_cleared(self, tmp_path):
+        self._finished(tmp_path, 0)
+        self._finished(tmp_path, 1)
+        (tmp_path / 'run0' / 'totcon1.tec').write_text('output')
+        (tmp_path / 'run1' / 'totcon1.tec').write_text('output')
+
+        si.clear_run_directories(2, directory=tmp_path, keep={0})
+
+        assert (tmp_path / 'run0' / 'totcon1.tec').exists()
+        assert not (tmp_path / 'run1' / 'totcon1.tec').exists()
+
+
+class TestDeckPaths:
+    """Tests for the names rhea prints a run's decks under."""
+
+    def test_a_plain_sweep_has_the_template_name(self, tmp_path):
+        assert si.deck_paths(tmp_path, {'template': 'model.in'}) == [tmp_path / 'model.in']
+
+    def test_a_chain_has_one_deck_per_stage(self, tmp_path):
+        config = {'template': 'model.in', 'restart_chain': {'stages': 2}}
+
+        assert si.deck_paths(tmp_path, config) == [tmp_path / 'model_stage0.in',
+                                                   tmp_path / 'model_stage1.in']
+
+    def test_a_missing_deck_has_no_hash(self, tmp_path):
+        assert si.deck_hash([tmp_path / 'absent.in']) is None
+
+
+class TestArraySpec:
+    """Tests for the --array specification of a resumed cluster sweep."""
+
+    @pytest.mark.parametrize('numbers, spec', [
+        ([0, 1, 2], '0-2'),
+        ([0, 1, 2, 5, 7, 8], '0-2,5,7-8'),
+        ([4], '4'),
+        ([9, 3, 4], '3-4,9'),
+    ])
+    def test_ranges(self, numbers, spec):
+        assert si.array_spec(numbers) == spec
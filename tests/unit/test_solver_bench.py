@@ -0,0 +1,133 @@
+"""Unit tests for omphalos/solver_bench.py."""
+
+import contextlib
+import io
+import sys
+
+import numpy as np
+import pytest
+import xarray as xr
+import yaml
+
+from benchmarks import synthetic
+from omphalos import generate_inputs as gi
+from omphalos import solver_bench as sb
+from omphalos.template import Template
+
+
+def _results(values):
+    return {'totcon': xr.Dataset({'Sp1': ('time', np.asarray(values, dtype=float))},
+                                 coords={'time': [10.0, 20.0, 30.0][:len(values)]})}
+
+
+class TestSettings:
+    """The solver_bench section of the config."""
+
+    def test_off_unless_asked_for(self):
+        assert sb.settings({}) is None
+        assert sb.settings({'solver_bench': {'variants': {'gimrt': True}}}) == {
+            'decks': sb.DEFAULT_DECKS, 'variants': {'gimrt': [True]}, 'reference': {},
+            'tolerance': sb.DEFAULT_TOLERANCE, 'workers': 1}
+
+    @pytest.mark.parametrize('section', [['gimrt'], {'variants': {}}, {'variants': ['gimrt']},
+                                         {'variants': {'gimrt': [True]}, 'decks': 0},
+                                         {'variants': {'gimrt': [True]}, 'reference': ['gimrt']}])
+    def test_a_malformed_section_is_an_error(self, section):
+        with pytest.raises(ValueError):
+            sb.settings({'solver_bench': section})
+
+    def test_every_combination_is_a_variant(self):
+        grid = {'timestep_max': [0.1, 1], 'gimrt': [True, False]}
+
+        assert [sb.label(variant) for variant in sb.variants(grid)] == [
+            'timestep_max=0.1 gimrt=true', 'timestep_max=0.1 gimrt=false',
+            'timestep_max=1 gimrt=true', 'timestep_max=1 gimrt=false']
+
+    def test_decks_are_spread_across_the_sweep(self):
+        assert sb.pick_decks(10, 4) == [0, 3, 6, 9]
+        assert sb.pick_decks(2, 4) == [0, 1]
+        with pytest.raises(ValueError):
+            sb.pick_decks(3, [1, 5])
+
+
+class TestApplyVariant:
+    """Settings reach the deck's RUNTIME block."""
+
+    def test_a_keyword_is_changed_or_added(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        config = synthetic.write_sweep_inputs(tmp_path, 2, 2, 5, 2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            file_dict = gi.configure_input_files(Template(config), str(tmp_path) + '/', rhea=True)
+        block = file_dict[0].keyword_blocks['RUNTIME']
+        existing = next(iter(block.contents))
+
+        sb.apply_variant(file_dict[0], {existing: 7, 'gimrt': False})
+
+        assert block.contents[existing][-1] == '7'
+        assert block.contents['gimrt'] == ['false']
+
+
+class TestJudging:
+    """Deviation from the reference, and which settings win."""
+
+    def test_deviation_is_relative_to_the_references_scale(self):
+        reference = _results([1e-12, 2e-12, 4e-12])
+
+        assert sb.deviation(reference, reference) == 0
+        assert sb.deviation(_results([1e-12, 2e-12, 3e-12]), reference) == pytest.approx(0.25)
+        assert np.isnan(sb.deviation({}, reference))
+
+    def test_the_cheapest_variant_within_tolerance_is_recommended(self):
+        rows = [
+            {'deck': 0, 'variant': sb.REFERENCE, 'seconds': 10.0, 'error_code': 0, 'deviation': 0.0},
+            {'deck': 0, 'variant': 'fast', 'seconds': 1.0, 'error_code': 1, 'deviation': np.nan},
+            {'deck': 0, 'variant': 'loose', 'seconds': 2.0, 'error_code': 0, 'deviation': 0.5},
+            {'deck': 0, 'variant': 'good', 'seconds': 4.0, 'error_code': 0, 'deviation': 1e-3}]
+
+        summary = sb.summarize(rows, tolerance=0.01)
+
+        assert list(summary.index) == ['fast', 'loose', 'good', sb.REFERENCE]
+        assert summary.loc['fast', 'failure_rate'] == 1.0
+        assert summary.loc['good', 'speedup'] == pytest.approx(2.5)
+        assert sb.recommend(summary) == 'good'
+        assert 'Cheapest within a deviation of 0.01 with no failures: good.' in sb.table(summary,
+                                                                                          0.01)
+
+    def test_a_variant_the_failed_reference_left_uncompared_is_not_recommended(self):
+        rows = [
+            {'deck': 0, 'variant': sb.REFERENCE, 'seconds': 10.0, 'error_code': 0, 'deviation': 0.0},
+            {'deck': 1, 'variant': sb.REFERENCE, 'seconds': 10.0, 'error_code': 1,
+             'deviation': np.nan},
+            {'deck': 0, 'variant': 'fast', 'seconds': 1.0, 'error_code': 0, 'deviation': 1e-4},
+            {'deck': 1, 'variant': 'fast', 'seconds': 1.0, 'error_code': 0, 'deviation': np.nan}]
+
+        summary = sb.summarize(rows, tolerance=0.01)
+
+        assert summary.loc['fast', 'uncompared'] == 1
+        assert not summary['within_tolerance'].any() and sb.recommend(summary) is None
+        assert sb.unreferenced(rows) == [1]
+        text = sb.table(summary, 0.01, sb.unreferenced(rows))
+        assert 'The reference failed on deck(s) [1]' in text
+
+
+class TestBench:
+    """A small benchmark, run end to end by the fake CrunchTope."""
+
+    def test_every_deck_runs_under_every_setting(self, tmp_path, monkeypatch, capsys):
+        pytest.importorskip('omphalos.settings')
+        from benchmarks import fake_crunchtope as fake
+        from omphalos import run
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(run, 'crunch_dir', f'{sys.executable} {fake.__file__}')
+        config = synthetic.write_sweep_inputs(tmp_path, 2, 2, 5, 4)
+        config['solver_bench'] = {'decks': 2, 'variants': {'timestep_max': [0.1, 1]},
+                                  'tolerance': 10.0}
+        (tmp_path / 'config.yaml').write_text(yaml.safe_dump(config))
+
+        assert sb.main(['config.yaml']) == 0
+
+        out = capsys.readouterr().out
+        assert 'Running 2 deck(s) under 3 setting(s): 6 runs' in out
+        assert 'Cheapest within a deviation of 10 with no failures' in out
+        assert (tmp_path / 'solver_bench' / 'solver_bench.csv').is_file()
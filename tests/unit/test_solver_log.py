@@ -0,0 +1,95 @@
+"""Unit tests for core/solver_log.py."""
+
+import gzip
+import io
+
+import pytest
+
+from core import solver_log
+from core.solver_log import SolverLog
+
+
+class TestSettings:
+    """Tests for reading the solver_log section of a config."""
+
+    def test_a_log_is_written_by_default(self):
+        assert solver_log.settings({}) == {'successful': 'keep', 'tail': solver_log.DEFAULT_TAIL,
+                                           'echo': False}
+        assert solver_log.settings({'solver_log': True}) == solver_log.settings(None)
+
+    def test_false_echoes_to_the_console_as_before(self, tmp_path, capsys):
+        log = solver_log.from_config({'solver_log': False}, tmp_path, 0)
+        log.write(' Time (yrs) = 1.0\n')
+
+        assert log.path is None
+        assert capsys.readouterr().out == ' Time (yrs) = 1.0\n'
+
+    @pytest.mark.parametrize('section', [{'successful': 'archive'}, {'tail': 0}, 'compress'])
+    def test_a_malformed_section_is_an_error(self, section):
+        with pytest.raises(ValueError):
+            solver_log.settings({'solver_log': section})
+
+    def test_runs_sharing_a_directory_get_a_log_each(self, tmp_path):
+        assert solver_log.log_path(tmp_path / 'run3', 3) == tmp_path / 'run3' / 'crunch.log'
+        assert solver_log.log_path(tmp_path, 3) == tmp_path / 'crunch3.log'
+
+
+class TestSolverLog:
+    """The whole output goes to the file; only the tail of it is kept."""
+
+    def test_the_file_has_everything_and_memory_the_tail(self, tmp_path):
+        reader = io.StringIO()
+        log = SolverLog(tmp_path / 'crunch.log', tail=3, reader=reader)
+
+        for step in range(100):
+            log.write(f' step {step}\r\n')
+        log.write(' TRY A SMALL')
+        log.close()
+
+        assert (tmp_path / 'crunch.log').read_text().count('\n') == 100
+        assert log.tail() == [' step 98', ' step 99', ' TRY A SMALL']
+        assert log.last_line() == 'TRY A SMALL'
+        assert reader.getvalue() == (tmp_path / 'crunch.log').read_bytes().decode('latin-1')
+
+    def test_a_failed_run_keeps_its_log_whatever_the_config_says(self, tmp_path):
+        log = SolverLog(tmp_path / 'crunch.log', successful='delete')
+        log.write(' EXCEEDED MAXIMUM ITERATIONS\n')
+
+        assert log.finish(succeeded=False) == tmp_path / 'crunch.log'
+        assert (tmp_path / 'crunch.log').exists()
+
+    def test_a_successful_log_can_be_compressed(self, tmp_path):
+        log = SolverLog(tmp_path / 'crunch.log', successful='compress')
+        log.write('first stage\n')
+        log.finish(succeeded=True)
+        log = SolverLog(tmp_path / 'crunch.log', successful='compress', append=True)
+        log.write('second stage\n')
+
+        where = log.finish(succeeded=True)
+
+        assert where == tmp_path / 'crunch.log.gz'
+        assert not (tmp_path / 'crunch.log').exists()
+        with gzip.open(where, 'rt') as file:
+            assert file.read() == 'first stage\nsecond stage\n'
+
+    def test_a_successful_log_can_be_truncated_or_deleted(self, tmp_path):
+        truncated = SolverLog(tmp_path / 'a.log', tail=2, successful='truncate')
+        deleted = SolverLog(tmp_path / 'b.log', successful='delete')
+        for log in (truncated, deleted):
+            log.write('one\ntwo\nthree\n')
+
+        assert truncated.finish(succeeded=True).read_text() == 'two\nthree\n'
+        assert deleted.finish(succeeded=True) is None
+        assert not (tmp_path / 'b.log').exists()
+
+    def test_the_summary_is_one_line_saying_how_a_failure_ended(self, tmp_path):
+        (tmp_path / 'run4').mkdir()
+        clock = iter([100.0, 112.5])
+        log = SolverLog(tmp_path / 'run4' / 'crunch.log', clock=lambda: next(clock))
+        log.write(' Time (yrs) = 1.0\n TRY A SMALLER TIMESTEP\n')
+
+        summary = log.summary(4, succeeded=False)
+
+        assert summary == ('File 4 complete in 12.5 s; solver output in run4/crunch.log; '
+                           'it ended: "TRY A SMALLER TIMESTEP".')
+        assert '\n' not in summary
@@ -0,0 +1,130 @@
+"""Unit tests for core/staging.py."""
+
+import os
+import stat
+
+import pytest
+
+from core import staging
+from omphalos import run
+
+
+class _Printable:
+    """Stands in for a Database or Namelist: something with a print(path)."""
+
+    def __init__(self, text):
+        self.text = text
+
+    def print(self, path):
+        with open(path, 'w') as f:
+            f.write(self.text)
+
+
+class TestPlace:
+    """Tests for linking a file into a run directory."""
+
+    def test_hard_link_is_preferred(self, tmp_path):
+        (tmp_path / 'shared.dbs').write_text('database\n')
+
+        mode = staging.place(tmp_path / 'shared.dbs', tmp_path / 'run0' / 'shared.dbs')
+
+        assert mode == 'hardlink'
+        assert os.stat(tmp_path / 'run0' / 'shared.dbs').st_nlink == 2
+
+    def test_falls_back_when_hard_links_are_refused(self, tmp_path, monkeypatch):
+        """Across filesystems, for instance; a symlink works anywhere reflinks do not."""
+        (tmp_path / 'shared.dbs').write_text('database\n')
+
+        def refuse(source, dest):
+            raise OSError('cross-device link')
+
+        monkeypatch.setattr(staging.os, 'link', refuse)
+        monkeypatch.setattr(staging, '_reflink', refuse)
+
+        mode = staging.place(tmp_path / 'shared.dbs', tmp_path / 'run0' / 'shared.dbs')
+
+        assert mode == 'symlink'
+        assert (tmp_path / 'run0' / 'shared.dbs').read_text() == 'database\n'
+
+    def test_copy_mode_copies(self, tmp_path):
+        (tmp_path / 'shared.dbs').write_text('database\n')
+
+        mode = staging.place(tmp_path / 'shared.dbs', tmp_path / 'run.dbs', ('copy',))
+
+        assert mode == 'copy'
+        assert os.stat(tmp_path / 'run.dbs').st_nlink == 1
+
+    def test_existing_file_is_replaced_not_written_through(self, tmp_path):
+        (tmp_path / 'a').write_text('a\n')
+        (tmp_path / 'b').write_text('b\n')
+        staging.place(tmp_path / 'a', tmp_path / 'run.dbs')
+
+        staging.place(tmp_path / 'b', tmp_path / 'run.dbs')
+
+        assert (tmp_path / 'run.dbs').read_text() == 'b\n'
+        assert (tmp_path / 'a').read_text() == 'a\n'
+
+
+class TestContentStore:
+    """Tests for keeping one copy of each distinct file."""
+
+    def test_identical_files_share_one_copy(self, tmp_path):
+        store = staging.ContentStore(tmp_path / 'store')
+        for n in range(3):
+            (tmp_path / f'db{n}').write_text('same\n')
+            store.stage(tmp_path / f'db{n}', tmp_path / f'run{n}' / 'database.dbs')
+
+        assert len([p for p in (tmp_path / 'store').rglob('*') if p.is_file()]) == 1
+
+    def test_stored_copies_are_read_only(self, tmp_path):
+        (tmp_path / 'db').write_text('database\n')
+        entry = staging.ContentStore(tmp_path / 'store').add(tmp_path / 'db')
+
+        assert not os.stat(entry).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+
+    def test_written_files_are_stored_only_when_they_differ(self, tmp_path):
+        """A swept database is written per run; an unswept one comes out the same every time."""
+        store = staging.ContentStore(tmp_path / 'store')
+        contents = ['log K 1\n', 'log K 1\n', 'log K 2\n']
+        for n, text in enumerate(contents):
+            store.write(_Printable(text).print, tmp_path / f'run{n}' / 'database.dbs')
+
+        assert len([p for p in (tmp_path / 'store').rglob('*') if p.is_file()]) == 2
+        assert [(tmp_path / f'run{n}' / 'database.dbs').read_text() for n in range(3)] == contents
+
+    def test_a_changed_source_is_stored_again(self, tmp_path):
+        store = staging.ContentStore(tmp_path / 'store')
+        (tmp_path / 'db').write_text('v1\n')
+        store.stage(tmp_path / 'db', tmp_path / 'run0' / 'db')
+
+        (tmp_path / 'db').write_text('version 2\n')
+        store.stage(tmp_path / 'db', tmp_path / 'run1' / 'db')
+
+        assert (tmp_path / 'run1' / 'db').read_text() == 'version 2\n'
+
+    def test_modes_come_from_the_config(self):
+        assert staging.modes_from_config({}) == staging.LINK_MODES
+        assert staging.modes_from_config({'staging': 'copy'}) == ('copy',)
+        with pytest.raises(ValueError):
+            staging.modes_from_config({'staging': 'hardlink'})
+
+
+class TestWriteAuxFile:
+    """omphalos.run writes a run's own files without disturbing the copy other runs share."""
+
+    def test_a_linked_file_is_replaced(self, tmp_path):
+        (tmp_path / 'shared.dbs').write_text('template\n')
+        os.link(tmp_path / 'shared.dbs', tmp_path / 'run.dbs')
+
+        run._write_aux_file(_Printable('swept\n'), tmp_path / 'run.dbs')
+
+        assert (tmp_path / 'run.dbs').read_text() == 'swept\n'
+        assert (tmp_path / 'shared.dbs').read_text() == 'template\n'
+
+    def test_through_a_store(self, tmp_path):
+        store = staging.ContentStore(tmp_path / 'store')
+
+        run._write_aux_file(_Printable('swept\n'), tmp_path / 'run.dbs', store)
+
+        assert (tmp_path / 'run.dbs').read_text() == 'swept\n'
+        assert os.stat(tmp_path / 'run.dbs').st_nlink == 2
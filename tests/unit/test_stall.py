@@ -0,0 +1,205 @@
+"""Unit tests for omphalos/stall.py."""
+
+import asyncio
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from omphalos import run, stall, supervisor
+
+
+class _Clock:
+    """Wall time that only moves when a test says so."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _input_file(run_dir=None, times=('10',), units=None, behaviour=None):
+    """A stand-in InputFile whose OUTPUT block runs to the last of times."""
+    input_file = Mock()
+    output = {'spatial_profile': list(times)}
+    if units:
+        output['time_units'] = [units]
+    input_file.keyword_blocks = {'OUTPUT': Mock(contents=output)}
+    input_file.later_inputs = None
+    input_file.error_code = 0
+    if run_dir is not None:
+        run_dir.mkdir(parents=True, exist_ok=True)
+        (run_dir / 'deck.in').write_text(behaviour + '\n')
+        input_file.path = run_dir / 'deck.in'
+    return input_file
+
+
+# Prints a progress line every 0.05 s, each a little further on than the last but nowhere near 10 yr.
+CRAWLING = ('i=1; while [ $i -lt 400 ]; do echo " Time (yrs) =  $i.0000E-09  Delt (yrs) = 1.0E-09"; '
+            'i=$((i+1)); sleep 0.05; done')
+
+
+@pytest.fixture
+def fast_checks():
+    """Look for stalls every 0.1 s rather than every CHECK_INTERVAL; see fake_crunch."""
+    return (stall,)
+
+
+class TestProgressLines:
+    """Tests for reading model time from CrunchTope's output."""
+
+    def test_progress_line_is_read_in_years(self):
+        monitor = stall.StallMonitor(10, 60, clock=_Clock())
+
+        monitor.write(' Time (days) =  3.6500E+02  Delt (days) =  1.0000E+00\r\n')
+
+        assert monitor.samples == [(0.0, pytest.approx(1.0))]
+
+    def test_line_split_across_chunks_is_read_once(self):
+        monitor = stall.StallMonitor(10, 60, clock=_Clock())
+
+        monitor.write(' Time (yrs) =  2.50')
+        assert monitor.samples == []
+        monitor.write('00E-01\n')
+
+        assert monitor.samples == [(0.0, 0.25)]
+
+    def test_exponent_without_its_e(self):
+        """What a 1PE12.5 descriptor prints for an exponent of three digits."""
+        monitor = stall.StallMonitor(10, 60, clock=_Clock())
+
+        monitor.write(' Time (yrs) =  1.00000-100\n')
+
+        assert monitor.samples[0][1] == pytest.approx(1e-100)
+
+    def test_other_lines_are_ignored(self):
+        monitor = stall.StallMonitor(10, 60, clock=_Clock())
+
+        monitor.write(' Number of Newton iterations = 3\n Total CPU Time (s) = 12.0\n')
+
+        assert monitor.samples == []
+
+
+class TestProjection:
+    """Tests for judging whether a run will finish in time."""
+
+    def _monitor(self, clock, **kwargs):
+        kwargs.setdefault('grace', 0)
+        kwargs.setdefault('window', 100)
+        return stall.StallMonitor(10, 100, factor=2, clock=clock, **kwargs)
+
+    def test_steady_run_is_not_stalled(self):
+        clock = _Clock()
+        monitor = self._monitor(clock)
+        for step in range(1, 11):
+            clock.now = step * 5
+            monitor.write(f' Time (yrs) = {step * 0.5:.4E}\n')
+
+        assert monitor.projected_finish() == pytest.approx(100)
+        assert not monitor.stalled()
+
+    def test_collapsed_timestep_is_stalled(self):
+        """Fast to begin with; then each step advances a thousandth of what it did."""
+        clock = _Clock()
+        monitor = self._monitor(clock, window=20)
+        model_time = 0.0
+        for step in range(1, 40):
+            clock.now = step
+            model_time += 0.1 if step < 10 else 1e-4
+            monitor.write(f' Time (yrs) = {model_time:.6E}\n')
+
+        assert monitor.stalled()
+
+    def test_silence_counts_against_a_run(self):
+        clock = _Clock()
+        monitor = self._monitor(clock, window=10)
+        for step in range(1, 6):
+            clock.now = step
+            monitor.write(f' Time (yrs) = {step * 0.5:.4E}\n')
+        assert not monitor.stalled()
+
+        clock.now = 500
+
+        assert monitor.stalled()
+
+    def test_nothing_is_judged_during_the_grace_period(self):
+        clock = _Clock()
+        monitor = self._monitor(clock, grace=60)
+        monitor.write(' Time (yrs) = 1.0E-09\n')
+        clock.now = 30
+        monitor.write(' Time (yrs) = 1.1E-09\n')
+
+        assert not monitor.stalled()
+        clock.now = 61
+        assert monitor.stalled()
+
+    def test_one_line_is_not_a_rate(self):
+        clock = _Clock()
+        monitor = self._monitor(clock)
+        monitor.write(' Time (yrs) = 1.0E-09\n')
+        clock.now = 1000
+
+        assert monitor.projected_finish() is None
+        assert not monitor.stalled()
+
+
+class TestFromConfig:
+    """Tests for reading the stall_detection section."""
+
+    def test_absent_section_is_off(self):
+        assert stall.from_config({}, _input_file(), 60) is None
+
+    def test_true_takes_the_defaults(self):
+        monitor = stall.from_config({'stall_detection': True}, _input_file(), 60)
+
+        assert (monitor.factor, monitor.grace, monitor.window) == (
+            stall.DEFAULT_FACTOR, stall.DEFAULT_GRACE, stall.DEFAULT_WINDOW)
+
+    def test_end_time_is_the_last_snapshot_in_years(self):
+        input_file = _input_file(times=('30', '730'), units='days')
+
+        assert stall.from_config({'stall_detection': True}, input_file, 60).end == pytest.approx(2)
+
+    def test_decks_that_cannot_be_judged(self):
+        chained = _input_file()
+        chained.later_inputs = {'stage2': Mock()}
+
+        assert stall.from_config({'stall_detection': True}, chained, 60) is None
+        assert stall.from_config({'stall_detection': True}, _input_file(times=()), 60) is None
+        assert stall.from_config({'stall_detection': True}, _input_file(), None) is None
+
+
+class TestStalledRuns:
+    """A crawling child is killed and flagged, by crunchtope and by the supervisor alike."""
+
+    CONFIG = {'stall_detection': {'grace': 0.5, 'window': 0.5}}
+
+    def test_crunchtope_kills_a_stalled_run(self, tmp_path, fake_crunch):
+        input_file = _input_file(tmp_path / 'run0', behaviour=CRAWLING)
+
+        start = time.monotonic()
+        run.crunchtope(input_file, 0, 20, tmp_path / 'run0', config=self.CONFIG)
+
+        assert time.monotonic() - start < 10
+        assert input_file.error_code == run.STALLED_ERROR_CODE
+        input_file.get_results.assert_not_called()
+
+    def test_crunchtope_leaves_a_healthy_run_alone(self, tmp_path, fake_crunch, monkeypatch):
+        monkeypatch.setattr(run, '_expects_tecplot_output', lambda input_file: False)
+        input_file = _input_file(tmp_path / 'run0', behaviour='echo " Time (yrs) = 1.0E+01"')
+
+        run.crunchtope(input_file, 0, 20, tmp_path / 'run0', config=self.CONFIG)
+
+        assert input_file.error_code == 0
+        input_file.get_results.assert_called_once()
+
+    def test_supervisor_kills_a_stalled_run(self, tmp_path, fake_crunch):
+        input_file = _input_file(tmp_path / 'run0', behaviour=CRAWLING)
+
+        start = time.monotonic()
+        asyncio.run(supervisor._supervise(input_file, 0, 20, tmp_path / 'run0',
+                                          asyncio.Semaphore(1), self.CONFIG))
+
+        assert time.monotonic() - start < 10
+        assert input_file.error_code == run.STALLED_ERROR_CODE
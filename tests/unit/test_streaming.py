@@ -0,0 +1,166 @@
+"""Unit tests for omphalos/streaming.py."""
+
+import os
+import time
+from unittest.mock import Mock
+
+from omphalos import streaming
+from omphalos.input_file import InputFile
+
+TEC = '''TITLE = "Test Output"
+VARIABLES = "X" "Y" "Z" "Calcite"
+ZONE T="zone1"
+0.5 0.5 0.5 {value}
+1.5 0.5 0.5 {value}
+'''
+
+
+def _write(directory, category, index, value=1.0):
+    (directory / f'{category}{index}.tec').write_text(TEC.format(value=value))
+
+
+def _previous_run(directory, indices, value=9.0):
+    """Leave what an earlier run in the same directory wrote, an hour before this one started."""
+    for index in indices:
+        _write(directory, 'volume', index, value=value)
+        os.utime(directory / f'volume{index}.tec', (time.time() - 3600,) * 2)
+
+
+class TestSnapshotWatcher:
+    """Tests for deciding which snapshot files are closed and parsing them."""
+
+    def test_only_files_with_a_successor_are_parsed(self, tmp_path):
+        """The newest snapshot may still be being written, so it is left to get_results."""
+        _write(tmp_path, 'volume', 1)
+        _write(tmp_path, 'totcon', 1)
+        _write(tmp_path, 'volume', 2)
+
+        watcher = streaming.SnapshotWatcher(tmp_path)
+        watcher.poll()
+        parsed = watcher.stop()
+
+        assert set(parsed) == {('volume', 1), ('totcon', 1)}
+
+    def test_stop_returns_the_parsed_datasets(self, tmp_path):
+        _write(tmp_path, 'volume', 1, value=3.0)
+        _write(tmp_path, 'volume', 2)
+
+        watcher = streaming.SnapshotWatcher(tmp_path, poll_interval=0.01).start()
+        time.sleep(0.2)
+        parsed = watcher.stop()
+
+        assert float(parsed[('volume', 1)]['Calcite'].values.ravel()[0]) == 3.0
+
+    def test_earlier_stages_files_are_not_this_runs(self, tmp_path):
+        """Files at or below file_offset belong to the stages before this one."""
+        for index in (1, 2, 3, 4):
+            _write(tmp_path, 'volume', index)
+
+        watcher = streaming.SnapshotWatcher(tmp_path, file_offset=2)
+        watcher.poll()
+        parsed = watcher.stop()
+
+        assert set(parsed) == {('volume', 3)}
+
+    def test_skipped_categories_are_not_parsed(self, tmp_path):
+        _write(tmp_path, 'velocityx', 1)
+        _write(tmp_path, 'volume', 1)
+        _write(tmp_path, 'volume', 2)
+
+        watcher = streaming.SnapshotWatcher(tmp_path, skip=('velocityx',))
+        watcher.poll()
+
+        assert set(watcher.stop()) == {('volume', 1)}
+
+    def test_an_unparseable_file_is_left_for_get_results(self, tmp_path):
+        """get_results retries it and reports the failure as it always has."""
+        (tmp_path / 'volume1.tec').write_text('not tecplot\n')
+        _write(tmp_path, 'volume', 2)
+
+        watcher = streaming.SnapshotWatcher(tmp_path)
+        watcher.poll()
+
+        assert watcher.stop() == {}
+
+    def test_a_previous_runs_files_in_the_same_directory_are_not_this_runs(self, tmp_path):
+        """A sequential sweep runs every deck in one directory; the last run's snapshots stay."""
+        _previous_run(tmp_path, (1, 2, 3))
+        watcher = streaming.SnapshotWatcher(tmp_path, since=time.time_ns())
+
+        watcher.poll()
+        assert watcher.completed() == {} and watcher.pending() == set()
+
+        _write(tmp_path, 'volume', 1, value=1.0)
+        _write(tmp_path, 'volume', 2, value=2.0)
+        watcher.poll()
+        parsed = watcher.stop()
+
+        assert set(parsed) == {('volume', 1)}
+        assert float(parsed[('volume', 1)]['Calcite'].values.ravel()[0]) == 1.0
+
+
+class TestGetResultsWithParsed:
+    """Tests that get_results takes what the watcher already parsed."""
+
+    @staticmethod
+    def _input_file(times):
+        output = Mock()
+        output.contents = {'spatial_profile': [str(t) for t in times]}
+        return InputFile('model.in', {'OUTPUT': output}, {}, None, None, {})
+
+    def test_parsed_snapshots_are_not_read_again(self, tmp_path, monkeypatch):
+        _write(tmp_path, 'volume', 1, value=1.0)
+        _write(tmp_path, 'volume', 2, value=2.0)
+        watcher = streaming.SnapshotWatcher(tmp_path)
+        watcher.poll()
+        parsed = watcher.stop()
+
+        read = []
+        parse_output = streaming.fm.parse_output
+        monkeypatch.setattr('omphalos.input_file.fm.parse_output',
+                            lambda path, cat, n, **k: read.append(n) or parse_output(path, cat, n, **k))
+        input_file = self._input_file([10.0, 20.0])
+        input_file.get_results(str(tmp_path), parsed=parsed)
+
+        assert read == [2]
+        assert list(input_file.results['volume']['Calcite'].isel(X=0).values.ravel()) == [1.0, 2.0]
+
+    def test_file_offset_keys_match_the_watchers(self, tmp_path):
+        """A staged restart's later stage reads files numbered from file_offset + 1."""
+        for index, value in ((1, 9.0), (2, 9.0), (3, 3.0), (4, 4.0)):
+            _write(tmp_path, 'volume', index, value=value)
+        watcher = streaming.SnapshotWatcher(tmp_path, file_offset=2)
+        watcher.poll()
+
+        input_file = self._input_file([10.0, 20.0])
+        input_file.get_results(str(tmp_path), file_offset=2, parsed=watcher.stop())
+
+        assert list(input_file.results['volume']['Calcite'].isel(X=0).values.ravel()) == [3.0, 4.0]
+
+
+def _deck(run_dir, name, values, delay=0.0):
+    """A deck whose run writes a volume snapshot per value, after delay seconds, then exits."""
+    script = run_dir / f'{name}.sh'
+    lines = [f'sleep {delay}']
+    for index, value in enumerate(values, start=1):
+        lines.append(f"printf '{TEC.format(value=value)}' > volume{index}.tec")
+    script.write_text('\n'.join(lines) + '\n')
+    (run_dir / f'{name}.in').write_text(f'sh {name}.sh\n')
+    output = Mock(contents={'spatial_profile': [str(10 * n) for n in range(1, len(values) + 1)]})
+    return InputFile(run_dir / f'{name}.in', {'OUTPUT': output}, {}, None, None, {})
+
+
+class TestSharedDirectory:
+    """A sequential sweep runs every deck in one directory, over what the last run left there."""
+
+    def test_the_next_run_streams_only_its_own_snapshots(self, tmp_path, fake_crunch):
+        from omphalos import run
+
+        config = {'stream_results': True}
+        first = _deck(tmp_path, 'first', [9.0, 9.0, 9.0])
+        run.crunchtope(first, 0, 60, tmp_path, config=config)
+        # Long enough for the watcher to look while only the first run's files are there.
+        second = _deck(tmp_path, 'second', [1.0, 2.0], delay=1.5)
+        run.crunchtope(second, 1, 60, tmp_path, config=config)
+
+        assert list(second.results['volume']['Calcite'].isel(X=0).values.ravel()) == [1.0, 2.0]
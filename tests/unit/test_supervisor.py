@@ -0,0 +1,172 @@
+"""Unit tests for omphalos/supervisor.py."""
+
+import asyncio
+import time
+from unittest.mock import Mock
+
+import pytest
+
+# omphalos.run imports omphalos.settings, which install.sh creates from settings_default.py and
+# which is not tracked, so skip these tests where it is absent.
+run = pytest.importorskip(
+    'omphalos.run',
+    reason='requires omphalos/settings.py (created by install.sh)',
+)
+from core import profiling  # noqa: E402
+from omphalos import supervisor  # noqa: E402
+
+
+def _input_file(run_dir, behaviour):
+    """A stand-in InputFile whose deck, already in run_dir, does what behaviour says."""
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / 'deck.in').write_text(behaviour + '\n')
+    input_file = Mock()
+    input_file.path = run_dir / 'deck.in'
+    input_file.keyword_blocks = {}
+    input_file.error_code = 0
+    return input_file
+
+
+@pytest.fixture
+def profiled():
+    """Profiling on for the test, and off again after it."""
+    profiling.configure({'profiling': True})
+    yield
+    profiling.reset()
+
+
+def _supervise(input_file, run_dir, timeout=10, workers=1):
+    slots = asyncio.Semaphore(workers)
+    return asyncio.run(supervisor._supervise(input_file, 0, timeout, run_dir, slots))
+
+
+class TestOutputSearcher:
+    """Tests for matching error patterns a chunk at a time."""
+
+    def test_pattern_split_across_reads_matches(self):
+        """A pattern arriving in two pieces is still found."""
+        searcher = supervisor.OutputSearcher()
+
+        assert searcher.feed('step 1\nSegmentation ') is None
+        assert searcher.feed('fault\n') == run.CT_ERROR_PATTERNS.index('Segmentation fault')
+
+    def test_earliest_match_wins(self):
+        """As pexpect does: the match earliest in the output, not the earliest in the list."""
+        searcher = supervisor.OutputSearcher(['second', 'first'])
+
+        assert searcher.feed('first then second') == 1
+
+    def test_regex_patterns_are_honoured(self):
+        """NAN_PATTERN is a regex, and must not match a species name."""
+        searcher = supervisor.OutputSearcher()
+
+        assert searcher.feed('NaNO3(aq) 1.0e-3\n') is None
+        assert searcher.feed('residual = NaN \n') == run.CT_ERROR_PATTERNS.index(run.NAN_PATTERN)
+
+    def test_buffer_stays_bounded(self):
+        searcher = supervisor.OutputSearcher()
+        for _ in range(100):
+            searcher.feed('x' * 1000)
+
+        assert len(searcher.buffer) <= supervisor.SEARCH_WINDOW
+
+
+class TestSupervise:
+    """Tests for supervising real children."""
+
+    def test_clean_exit_parses_results(self, tmp_path, fake_crunch):
+        input_file = _input_file(tmp_path / 'run0', 'echo done')
+
+        _supervise(input_file, tmp_path / 'run0')
+
+        assert input_file.error_code == 0
+        input_file.get_results.assert_called_once()
+
+    def test_error_pattern_flags_and_kills_a_hung_child(self, tmp_path, fake_crunch):
+        """The child prints a pattern and then blocks; it must not cost the whole timeout."""
+        input_file = _input_file(tmp_path / 'run0', 'echo " Return to continue"; sleep 30')
+
+        start = time.monotonic()
+        _supervise(input_file, tmp_path / 'run0', timeout=20)
+
+        assert time.monotonic() - start < 10
+        assert input_file.error_code == run.CT_ERROR_PATTERNS.index('Return to continue') + 2
+        input_file.get_results.assert_not_called()
+
+    def test_timeout_flags_the_run(self, tmp_path, fake_crunch):
+        input_file = _input_file(tmp_path / 'run0', 'sleep 30')
+
+        _supervise(input_file, tmp_path / 'run0', timeout=0.5)
+
+        assert input_file.error_code == 1
+        input_file.get_results.assert_not_called()
+
+
+class TestRunDataset:
+    """Tests for supervising a whole sweep."""
+
+    @staticmethod
+    def _prepared(monkeypatch):
+        """Leave each run's deck as the test wrote it, rather than printing an InputFile."""
+        monkeypatch.setattr(run, '_write_run_files', lambda input_file, run_dir: run_dir)
+
+    def test_runs_execute_side_by_side(self, tmp_path, fake_crunch, monkeypatch):
+        """Three one-second runs with three workers take about a second, not three."""
+        self._prepared(monkeypatch)
+        file_dict = {n: _input_file(tmp_path / 'tmp' / f'run{n}', 'sleep 1') for n in range(3)}
+
+        start = time.monotonic()
+        supervisor.run_dataset(file_dict, str(tmp_path / 'tmp'), 10, workers=3)
+
+        assert time.monotonic() - start < 2.5
+        for n in file_dict:
+            assert file_dict[n].error_code == 0
+            file_dict[n].get_results.assert_called_once_with(
+                str(tmp_path / 'tmp' / f'run{n}'), file_offset=0)
+
+    def test_workers_bound_concurrency(self, tmp_path, fake_crunch, monkeypatch):
+        """With one worker the same three runs go one after another."""
+        self._prepared(monkeypatch)
+        file_dict = {n: _input_file(tmp_path / 'tmp' / f'run{n}', 'sleep 0.5') for n in range(3)}
+
+        start = time.monotonic()
+        supervisor.run_dataset(file_dict, str(tmp_path / 'tmp'), 10, workers=1)
+
+        assert time.monotonic() - start >= 1.5
+
+    def test_shared_files_are_copied(self, tmp_path, fake_crunch, monkeypatch):
+        self._prepared(monkeypatch)
+        (tmp_path / 'tmp').mkdir()
+        (tmp_path / 'tmp' / 'datacom.dbs').write_text('db')
+        file_dict = {0: _input_file(tmp_path / 'tmp' / 'run0', 'echo done')}
+
+        supervisor.run_dataset(file_dict, str(tmp_path / 'tmp'), 10, workers=2,
+                               shared_files=('datacom.dbs',))
+
+        assert (tmp_path / 'tmp' / 'run0' / 'datacom.dbs').read_text() == 'db'
+
+    def test_staging_copy_is_honoured(self, tmp_path, fake_crunch, monkeypatch):
+        """staging: copy gives each run a file of its own, as it does on the process-pool path."""
+        self._prepared(monkeypatch)
+        (tmp_path / 'tmp').mkdir()
+        (tmp_path / 'tmp' / 'datacom.dbs').write_text('db')
+        file_dict = {0: _input_file(tmp_path / 'tmp' / 'run0', 'echo done')}
+
+        supervisor.run_dataset(file_dict, str(tmp_path / 'tmp'), 10, workers=1,
+                               shared_files=('datacom.dbs',), config={'staging': 'copy'})
+
+        assert (tmp_path / 'tmp' / 'run0' / 'datacom.dbs').stat().st_nlink == 1
+
+    def test_each_runs_phases_are_kept_on_it(self, tmp_path, fake_crunch, monkeypatch, profiled):
+        """Runs waited on side by side are each timed for their own wait, and for their parsing."""
+        self._prepared(monkeypatch)
+        file_dict = {0: _input_file(tmp_path / 'tmp' / 'run0', 'sleep 0.2'),
+                     1: _input_file(tmp_path / 'tmp' / 'run1', 'sleep 1')}
+
+        supervisor.run_dataset(file_dict, str(tmp_path / 'tmp'), 10, workers=2,
+                               config={'profiling': True})
+
+        assert set(file_dict[0].timings) == set(file_dict[1].timings) == {'solver', 'parse'}
+        assert 0.2 <= file_dict[0].timings['solver'] < 0.8
+        assert 1.0 <= file_dict[1].timings['solver'] < 1.6
+        assert profiling.sweep_timings() == {}
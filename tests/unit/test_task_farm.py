@@ -0,0 +1,176 @@
+"""Unit tests for rhea/task_farm.py."""
+
+import shutil
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from rhea import slurm_exec, task_farm, worker_pool
+
+RHEA_MAIN = Path(__file__).resolve().parent.parent.parent / 'rhea' / 'main.py'
+
+# Records its arguments, then runs each array task in turn with the variables SLURM would give it.
+FAKE_SBATCH = '''#!/bin/bash
+echo "$@" >> sbatch.log
+array=0; cpus=1
+for arg in "$@"; do
+    case $arg in
+        --array=*) array=${arg#--array=} ;;
+        --cpus-per-task=*) cpus=${arg#--cpus-per-task=} ;;
+        --export=*) IFS=, read -ra pairs <<< "${arg#--export=}"
+                    for pair in "${pairs[@]}"; do [ "$pair" = ALL ] || export "$pair"; done ;;
+    esac
+done
+IFS=, read -ra ranges <<< "$array"
+for range in "${ranges[@]}"; do
+    for id in $(seq ${range%-*} ${range#*-}); do
+        SLURM_ARRAY_TASK_ID=$id SLURM_CPUS_PER_TASK=$cpus bash "${!#}" > /dev/null 2>&1
+    done
+done
+echo "Submitted batch job 1"
+'''
+
+
+class TestSettings:
+    """Tests for reading the task_farm section."""
+
+    def test_absent_section_is_off(self):
+        assert task_farm.settings({}) is None
+        assert task_farm.settings({'task_farm': ''}) is None
+
+    def test_true_takes_the_defaults(self):
+        assert task_farm.settings({'task_farm': True}) == (task_farm.DEFAULT_RUNS_PER_TASK,
+                                                           task_farm.DEFAULT_WORKERS)
+
+    def test_values_are_read(self):
+        assert task_farm.settings({'task_farm': {'runs_per_task': 20, 'workers': 8}}) == (20, 8)
+
+    def test_task_count_rounds_up(self):
+        assert task_farm.num_tasks(15, 4) == 4
+        assert task_farm.num_tasks(16, 4) == 4
+        assert task_farm.num_tasks(1, 50) == 1
+
+
+class TestClaims:
+    """Tests for sharing the queue out between tasks."""
+
+    def test_prepare_clears_a_previous_sweeps_claims(self, tmp_path):
+        task_farm.prepare([0, 1], tmp_path)
+        assert task_farm.claim(0, tmp_path)
+
+        task_farm.prepare([0, 1, 2], tmp_path)
+
+        assert task_farm.read_queue(tmp_path) == [0, 1, 2]
+        assert task_farm.claim(0, tmp_path)
+
+    def test_a_run_is_claimed_once(self, tmp_path):
+        task_farm.prepare([0], tmp_path)
+
+        assert task_farm.claim(0, tmp_path)
+        assert not task_farm.claim(0, tmp_path)
+
+    def test_task_starts_on_its_own_chunk(self, tmp_path):
+        queue = list(range(10))
+        task_farm.prepare(queue, tmp_path)
+
+        runs = task_farm.claimed_runs(queue, 1, 4, tmp_path)
+
+        assert [next(runs) for _ in range(4)] == [4, 5, 6, 7]
+
+    def test_finished_task_takes_what_others_have_not(self, tmp_path):
+        """Task 0 is done with its chunk while task 1 has started only one of its runs."""
+        queue = list(range(8))
+        task_farm.prepare(queue, tmp_path)
+        task_farm.claim(4, tmp_path)
+
+        assert list(task_farm.claimed_runs(queue, 0, 4, tmp_path)) == [0, 1, 2, 3, 5, 6, 7]
+
+    def test_longest_first_queue_is_dealt_across_chunks(self):
+        """Each chunk starts with one of the longest runs rather than one chunk holding them all."""
+        assert task_farm.deal(range(8), 4) == [0, 4, 1, 5, 2, 6, 3, 7]
+
+    def test_concurrent_tasks_share_every_run_exactly_once(self, tmp_path):
+        queue = list(range(200))
+        task_farm.prepare(queue, tmp_path)
+        won = {}
+
+        def task(task_id):
+            won[task_id] = list(task_farm.claimed_runs(queue, task_id, 50, tmp_path))
+
+        threads = [threading.Thread(target=task, args=(task_id,)) for task_id in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        claimed = [run_num for runs in won.values() for run_num in runs]
+        assert sorted(claimed) == queue
+
+
+class TestRunTask:
+    """Tests for running one array task."""
+
+    def test_task_runs_the_runs_it_claims(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(worker_pool, 'ProcessPoolExecutor', ThreadPoolExecutor)
+        ran = []
+        monkeypatch.setattr(slurm_exec, 'execute_and_record',
+                            lambda file_num, config, pflo, min3p=False: ran.append(file_num))
+        config_path = tmp_path / 'config.yaml'
+        config_path.write_text('timeout: 60\n')
+        task_farm.prepare(range(6), tmp_path)
+        task_farm.claim(5, tmp_path)
+
+        failed = task_farm.run_task(config_path, 0, 3, 2, directory=tmp_path)
+
+        assert sorted(ran) == [0, 1, 2, 3, 4]
+        assert failed == {}
+
+
+@pytest.mark.skipif(shutil.which('bash') is None, reason='the sbatch stand-in is a bash script')
+class TestClusterSubmission:
+    """rhea cluster mode against an sbatch stand-in, as far as the runs being started."""
+
+    @staticmethod
+    def _submit(rhea_test_dir, tmp_path, extra_config='', python=sys.executable):
+        """Run rhea cluster mode on the test sweep; return what was passed to sbatch."""
+        for path in rhea_test_dir.iterdir():
+            shutil.copy(path, tmp_path / path.name)
+        with open(tmp_path / 'iron_rates.yaml', 'a') as f:
+            f.write(extra_config)
+        bin_dir = tmp_path / 'bin'
+        bin_dir.mkdir()
+        (bin_dir / 'sbatch').write_text(FAKE_SBATCH)
+        (bin_dir / 'sbatch').chmod(0o755)
+
+        # No squeue on PATH: rhea must not wait on the scheduler.
+        env = {'PATH': f'{bin_dir}:/usr/bin:/bin', 'OMPHALOS_PYTHON': python,
+               'HOME': str(tmp_path)}
+        subprocess.run([sys.executable, str(RHEA_MAIN), 'iron_rates.yaml', 'cluster'],
+                       cwd=tmp_path, env=env, check=True, capture_output=True)
+
+        return (tmp_path / 'sbatch.log').read_text().splitlines()
+
+    def test_sweep_is_one_submission(self, rhea_test_dir, tmp_path):
+        """No preparation array ahead of it: rhea stages every directory before submitting."""
+        # 'true' for python: the tasks start and skip the runs.
+        submissions = self._submit(rhea_test_dir, tmp_path, python='true')
+
+        assert len(submissions) == 1
+        assert submissions[0].startswith('--array=0-14 ')
+        assert submissions[0].endswith('run_input_file.sbatch')
+        assert all((tmp_path / f'run{n}' / 'SukindaCr53.dbs').exists() for n in range(15))
+
+    def test_sweep_is_packed_into_tasks(self, rhea_test_dir, tmp_path):
+        submissions = self._submit(rhea_test_dir, tmp_path,
+                                   '\ntask_farm:\n  runs_per_task: 4\n  workers: 2\n')
+
+        assert len(submissions) == 1
+        assert '--array=0-3 --cpus-per-task=2' in submissions[0]
+        assert submissions[0].endswith('task_farm.sbatch')
+        # Every run was taken by a task, whether or not there was a solver to run it.
+        claims = tmp_path / task_farm.FARM_DIR / task_farm.CLAIM_DIR
+        assert sorted(int(path.name) for path in claims.iterdir()) == list(range(15))
@@ -0,0 +1,178 @@
+"""Unit tests for core/telemetry.py."""
+
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+import yaml
+
+from core import telemetry
+
+RHEA_MAIN = Path(__file__).resolve().parents[2] / 'rhea' / 'main.py'
+
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _record(file_num, phase, updated=1000.0, **extra):
+    return {'file_num': file_num, 'phase': phase, 'updated': updated, 'interval': 30.0, **extra}
+
+
+class TestSettings:
+    """Tests for reading the telemetry section."""
+
+    def test_absent_section_is_off(self):
+        assert telemetry.settings({}) is None
+        assert telemetry.from_config(None, 0) is None
+
+    def test_true_takes_the_defaults(self):
+        section = telemetry.settings({'telemetry': True})
+
+        assert section == {'interval': telemetry.DEFAULT_INTERVAL,
+                           'directory': Path(telemetry.STATUS_DIR)}
+
+    def test_malformed_section_is_refused(self):
+        with pytest.raises(ValueError):
+            telemetry.settings({'telemetry': 'often'})
+
+
+class TestHeartbeat:
+    """Tests for what a run writes as it goes."""
+
+    def test_a_pulse_records_where_the_run_is(self, tmp_path):
+        clock = _Clock()
+        board = telemetry.StatusBoard(tmp_path)
+        beat = telemetry.Heartbeat(board, 4, interval=10, end=500.0,
+                                   reader=Mock(model_time=125.0), clock=clock)
+
+        beat.pulse()
+        clock.now += 12
+        assert beat.due()
+        beat.pulse('parsing')
+
+        record = board.read(4)
+        assert (record['phase'], record['model_time'], record['end_time']) == ('parsing', 125.0, 500.0)
+        assert record['wall_time'] == 12
+
+    def test_a_later_stage_keeps_the_chains_clock(self, tmp_path):
+        board = telemetry.StatusBoard(tmp_path)
+        telemetry.Heartbeat(board, 2, clock=_Clock(100.0)).pulse()
+
+        beat = telemetry.Heartbeat(board, 2, clock=_Clock(160.0))
+
+        assert beat.started == 100.0
+
+    def test_finish_records_the_outcome(self, tmp_path):
+        config = {'telemetry': {'directory': str(tmp_path)}}
+        board = telemetry.StatusBoard(tmp_path)
+
+        telemetry.finish(config, 0, 0, seconds=42.0)
+        telemetry.finish(config, 1, 1)
+        telemetry.finish(config, 2, None)
+
+        assert [record['phase'] for record in board.records()] == ['done', 'failed', 'failed']
+        assert board.read(0)['wall_time'] == 42.0
+
+    def test_a_new_sweep_forgets_only_the_runs_it_reruns(self, tmp_path):
+        board = telemetry.StatusBoard(tmp_path)
+        for file_num in range(3):
+            board.write(_record(file_num, 'done'))
+
+        board.start_sweep(3, [1, 2])
+
+        assert [record['file_num'] for record in board.records()] == [0]
+        assert board.sweep()['total'] == 3
+
+
+class TestSummary:
+    """Tests for counting a sweep's runs and projecting its finish."""
+
+    def test_phases_are_counted_and_silent_runs_are_lost(self):
+        sweep = {'total': 10, 'started': 0.0}
+        records = [_record(0, 'done'), _record(1, 'done'), _record(2, 'failed'),
+                   _record(3, 'running', updated=990.0), _record(4, 'running', updated=100.0)]
+
+        summary = telemetry.summarize(sweep, records, now=1000.0)
+
+        assert summary['counts'] == {'done': 2, 'failed': 1, 'running': 1, 'lost': 1, 'pending': 5}
+        assert (summary['failed'], summary['lost']) == ([2], [4])
+        # Three finished in 1000 s: the other seven take 7000/3 s more.
+        assert summary['rate'] == pytest.approx(10.8)
+        assert summary['eta'] == pytest.approx(7000 / 3)
+
+    def test_nothing_finished_projects_nothing(self):
+        summary = telemetry.summarize({'total': 2, 'started': 0.0}, [_record(0, 'running')], 1000.0)
+
+        assert summary['eta'] is None
+
+    def test_the_table_shows_the_runs_in_hand(self):
+        sweep = {'total': 3, 'started': 0.0}
+        records = [_record(0, 'done'),
+                   _record(1, 'running', model_time=50.0, end_time=200.0, wall_time=75,
+                           rss=300 * 1024 ** 2, host='node7')]
+
+        table = telemetry.table(sweep, telemetry.summarize(sweep, records, 1000.0), 1000.0)
+
+        assert 'Throughput 3.6 runs/hour' in table
+        assert '50/200 yr (25%)' in table and '300 MB' in table and 'node7' in table
+
+
+class TestStatusCommand:
+    """rhea status <config> prints the table from the directory the sweep runs in."""
+
+    def test_status_reads_the_sweep(self, tmp_path):
+        (tmp_path / 'config.yaml').write_text(yaml.safe_dump({'telemetry': True}))
+        board = telemetry.StatusBoard(tmp_path / telemetry.STATUS_DIR)
+        board.start_sweep(2, [0, 1])
+        board.write(_record(0, 'done'))
+
+        result = subprocess.run([sys.executable, str(RHEA_MAIN), 'status', 'config.yaml'],
+                                cwd=tmp_path, capture_output=True, text=True)
+
+        assert result.returncode == 0, result.stderr
+        assert 'Sweep of 2 runs' in result.stdout
+
+    def test_status_without_telemetry_says_so(self, tmp_path, capsys):
+        (tmp_path / 'config.yaml').write_text(yaml.safe_dump({'template': 'model.in'}))
+
+        assert telemetry.main([str(tmp_path / 'config.yaml')]) == 1
+        assert 'telemetry: true' in capsys.readouterr().out
+
+
+class TestRunsBeat:
+    """crunchtope writes a heartbeat from the run's own progress lines."""
+
+    def test_a_run_reports_its_model_time(self, tmp_path, monkeypatch):
+        pytest.importorskip('omphalos.settings',
+                            reason='requires omphalos/settings.py (created by install.sh)')
+        from omphalos import run
+        from omphalos.input_file import InputFile
+
+        script = tmp_path / 'fake_crunch.sh'
+        script.write_text('#!/bin/sh\neval "$(head -n 1 "$1")"\n')
+        script.chmod(0o755)
+        monkeypatch.setattr(run, 'crunch_dir', str(script))
+        monkeypatch.chdir(tmp_path)
+
+        run_dir = tmp_path / 'run0'
+        run_dir.mkdir()
+        (run_dir / 'deck.in').write_text(
+            'for t in 1.0 2.0 3.0; do echo " Time (yrs) =  $t  Delt (yrs) = 1.0"; sleep 0.2; done; '
+            'printf \'TITLE = "T"\\nVARIABLES = "X" "Y" "Z" "Calcite"\\nZONE T="z"\\n'
+            '0.5 0.5 0.5 1.0\\n\' > volume1.tec\n')
+        output = Mock(contents={'spatial_profile': ['4']})
+        input_file = InputFile(run_dir / 'deck.in', {'OUTPUT': output}, {}, None, None, {})
+        config = {'telemetry': {'interval': 0.1}}
+
+        run.crunchtope(input_file, 0, 60, run_dir, config=config)
+
+        record = telemetry.StatusBoard(telemetry.STATUS_DIR).read(0)
+        assert record['phase'] == 'parsing'
+        assert (record['model_time'], record['end_time']) == (3.0, 4.0)
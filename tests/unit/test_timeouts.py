@@ -0,0 +1,153 @@
+"""Unit tests for omphalos/timeouts.py."""
+
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from omphalos import generate_inputs as gi
+from omphalos import run, timeouts
+
+
+def _adaptive(tmp_path, **kwargs):
+    kwargs.setdefault('min_runs', 4)
+    kwargs.setdefault('min_timeout', 1)
+    return timeouts.AdaptiveTimeout(tmp_path / timeouts.LEDGER_DIR, **kwargs)
+
+
+class TestLedger:
+    """Tests for recording runtimes."""
+
+    def test_runs_are_read_back_in_order(self, tmp_path):
+        adaptive = _adaptive(tmp_path)
+        adaptive.record(3, 12.5, 0)
+        adaptive.record(1, 600, 1)
+
+        assert adaptive.entries() == [(3, 12.5, 0), (1, 600.0, 1)]
+
+    def test_torn_line_is_skipped(self, tmp_path):
+        adaptive = _adaptive(tmp_path)
+        adaptive.record(0, 10, 0)
+        with open(adaptive.directory / timeouts.LEDGER_FILE, 'a') as f:
+            f.write('1 1')
+        adaptive.record(2, 11, 0)
+
+        assert [entry[0] for entry in adaptive.entries()] == [0]
+
+    def test_start_clears_unless_resuming(self, tmp_path):
+        adaptive = _adaptive(tmp_path)
+        adaptive.record(0, 10, 0)
+
+        timeouts.start_ledger(adaptive.directory, resume=True)
+        assert adaptive.entries() == [(0, 10.0, 0)]
+
+        timeouts.start_ledger(adaptive.directory)
+        assert adaptive.entries() == []
+
+
+class TestLimit:
+    """Tests for learning a run's timeout."""
+
+    def test_full_timeout_until_enough_runs_succeed(self, tmp_path):
+        adaptive = _adaptive(tmp_path)
+        for run_num in range(3):
+            adaptive.record(run_num, 10, 0)
+        adaptive.record(3, 3600, 1)
+
+        assert adaptive.limit(4, 3600) == 3600
+
+    def test_learned_limit_is_a_quantile_times_the_factor(self, tmp_path):
+        adaptive = _adaptive(tmp_path, quantile=0.5, factor=3)
+        for run_num, seconds in enumerate([10, 20, 30, 40, 50]):
+            adaptive.record(run_num, seconds, 0)
+
+        assert adaptive.limit(5, 3600) == pytest.approx(90)
+
+    def test_limit_stays_between_the_floor_and_the_timeout(self, tmp_path):
+        adaptive = _adaptive(tmp_path, min_timeout=60)
+        for run_num in range(4):
+            adaptive.record(run_num, 1, 0)
+        assert adaptive.limit(4, 3600) == 60
+
+        for run_num in range(4, 8):
+            adaptive.record(run_num, 5000, 0)
+        assert adaptive.limit(8, 3600) == 3600
+
+    def test_run_stopped_by_a_learned_limit_gets_the_full_timeout(self, tmp_path):
+        adaptive = _adaptive(tmp_path)
+        for run_num in range(4):
+            adaptive.record(run_num, 10, 0)
+        adaptive.record(4, 30, run.ADAPTIVE_TIMEOUT_ERROR_CODE)
+
+        assert adaptive.limit(4, 3600) == 3600
+        assert adaptive.limit(5, 3600) < 3600
+
+    def test_limit_is_learned_from_the_nearest_runs(self, tmp_path):
+        """Runs at high temperature take ten times as long as those at low."""
+        adaptive = _adaptive(tmp_path, quantile=1.0, factor=2, neighbours=3)
+        temperatures = [10, 11, 12, 13, 90, 91, 92, 93, 89, 12.5]
+        file_dict = {n: SimpleNamespace(swept_values={'temperature/T': t})
+                     for n, t in enumerate(temperatures)}
+        timeouts.start_ledger(adaptive.directory, file_dict)
+        for run_num, temperature in enumerate(temperatures[:8]):
+            adaptive.record(run_num, 100 if temperature > 50 else 10, 0)
+
+        assert adaptive.limit(8, 3600) == pytest.approx(200)
+        assert adaptive.limit(9, 3600) == pytest.approx(20)
+
+
+class TestFromConfig:
+    """Tests for reading the adaptive_timeout section."""
+
+    def test_absent_section_is_off(self, tmp_path):
+        assert timeouts.from_config({}, tmp_path / 'run0') is None
+
+    def test_ledger_is_beside_the_run_directories(self, tmp_path):
+        adaptive = timeouts.from_config({'adaptive_timeout': {'factor': 5}}, tmp_path / 'run0')
+
+        assert adaptive.directory == tmp_path.resolve() / timeouts.LEDGER_DIR
+        assert adaptive.factor == 5
+        assert adaptive.min_runs == timeouts.DEFAULT_MIN_RUNS
+
+
+class TestSweptValues:
+    """generate_inputs records where each run sits in parameter space."""
+
+    def test_numbers_per_run_are_kept(self):
+        modified = {'temperature': {'set_temperature': np.array([10.0, 20.0])},
+                    'isotopes': {'recrystallisation': ['bulk', 'surface']},
+                    'database_logk': {'settings': {'method': 'supcrt'},
+                                      'swept': {'pressure': np.array([1.0, 100.0])}}}
+
+        swept = gi.swept_values(modified)
+
+        assert sorted(swept) == ['database_logk/swept/pressure', 'temperature/set_temperature']
+        assert list(swept['temperature/set_temperature']) == [10.0, 20.0]
+
+
+class TestAdaptiveTimeoutRuns:
+    """crunchtope stops a run at its learned limit and flags it apart from a timeout."""
+
+    def test_run_past_its_learned_limit_is_flagged(self, tmp_path, monkeypatch):
+        script = tmp_path / 'fake_crunch.sh'
+        script.write_text('#!/bin/sh\nsleep 30\n')
+        script.chmod(0o755)
+        monkeypatch.setattr(run, 'crunch_dir', str(script))
+        run_dir = tmp_path / 'run4'
+        run_dir.mkdir()
+        (run_dir / 'deck.in').write_text('\n')
+        input_file = Mock(path=run_dir / 'deck.in', error_code=0)
+        config = {'adaptive_timeout': {'min_runs': 4, 'min_timeout': 0.5}}
+        adaptive = timeouts.from_config(config, run_dir)
+        for run_num in range(4):
+            adaptive.record(run_num, 0.1, 0)
+
+        start = time.monotonic()
+        run.crunchtope(input_file, 4, 60, run_dir, config=config)
+
+        assert time.monotonic() - start < 10
+        assert input_file.error_code == run.ADAPTIVE_TIMEOUT_ERROR_CODE
+        assert adaptive.entries()[-1][::2] == (4, run.ADAPTIVE_TIMEOUT_ERROR_CODE)
+        assert adaptive.limit(4, 60) == 60
@@ -0,0 +1,176 @@
+"""Unit tests for omphalos/validate.py."""
+
+import contextlib
+import io
+import pickle
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks import synthetic
+from omphalos import generate_inputs as gi
+from omphalos import validate
+from omphalos.template import Template
+
+
+def _sweep(tmp_path, deck_edit=None):
+    """A synthetic four-run sweep of two species, with its deck edited first if asked."""
+    config = synthetic.write_sweep_inputs(tmp_path, 2, 2, 5, 4)
+    if deck_edit is not None:
+        deck = tmp_path / 'synthetic.in'
+        deck.write_text(deck_edit(deck.read_text()))
+    with contextlib.redirect_stdout(io.StringIO()):
+        template = Template(config)
+        file_dict = gi.configure_input_files(template, str(tmp_path) + '/', rhea=True)
+    return config, template, file_dict
+
+
+@pytest.fixture
+def sweep(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return _sweep(tmp_path)
+
+
+class TestSettings:
+    """The validation section of the config."""
+
+    def test_off_unless_asked_for(self):
+        assert validate.settings({}) is None
+        assert validate.settings({'validation': False}) is None
+        assert validate.settings({'validation': True}) == {'checks': validate.CHECKS}
+        assert validate.settings({'validation': {'checks': 'concentrations'}}) == {
+            'checks': ('concentrations',)}
+
+    @pytest.mark.parametrize('section', [['concentrations'], {'checks': ['porosity']}])
+    def test_a_malformed_section_is_an_error(self, section):
+        with pytest.raises(ValueError):
+            validate.settings({'validation': section})
+
+
+class TestValues:
+    """Numbers in the conditions, swept or not."""
+
+    def test_a_sweep_as_generated_passes(self, sweep):
+        config, template, file_dict = sweep
+
+        assert validate.validate(file_dict, template, config) == {}
+
+    def test_a_swept_concentration_is_judged_in_each_run(self, sweep):
+        config, template, file_dict = sweep
+        file_dict[2].condition_blocks['boundary'].contents['Sp1'] = ['-1e-3']
+
+        problems = validate.validate(file_dict, template, config)
+
+        assert problems == {2: ['negative concentration of Sp1 in condition boundary: -0.001']}
+
+    def test_an_unswept_entry_is_the_templates_in_every_run(self, sweep):
+        config, template, file_dict = sweep
+        template.condition_blocks['initial'].contents['Sp2'] = ['-1']
+
+        assert sorted(validate.validate(file_dict, template, config)) == [0, 1, 2, 3]
+
+    def test_minerals_that_leave_no_porosity(self, sweep):
+        config, template, file_dict = sweep
+        file_dict[1].condition_blocks['initial'].contents['Min1'] = ['1.0', 'ssa', '1.0']
+
+        problems = validate.validate(file_dict, template, config)
+
+        assert list(problems) == [1] and 'leaving no porosity' in problems[1][0]
+        template.keyword_blocks['POROSITY'] = SimpleNamespace(contents={'fix_porosity': ['0.3']})
+        assert validate.validate(file_dict, template, config) == {}
+
+
+class TestNames:
+    """What the deck names that the database must have."""
+
+    def test_a_neutral_charge_balance_species_in_one_runs_database(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        config, template, file_dict = _sweep(
+            tmp_path, lambda deck: deck.replace('Sp1  1.0E-03', 'Sp1  charge'))
+        file_dict[3].database.modify('primary_species', 'Sp1', 'charge', 0.0)
+
+        problems = validate.validate(file_dict, template, config)
+
+        assert problems == {3: ['condition boundary balances charge on Sp1, which is neutral']}
+
+    def test_a_mineral_the_database_does_not_have(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        config, template, file_dict = _sweep(
+            tmp_path, lambda deck: deck.replace('MINERALS\n', 'MINERALS\nMin9  -label default\n'))
+
+        problems = validate.validate(file_dict, template, config, checks=('database_names',))
+
+        assert sorted(problems) == [0, 1, 2, 3]
+        assert problems[0] == [f'the deck declares the mineral Min9, which {config["database"]} '
+                               f'does not have']
+
+
+class TestOutputTimes:
+    """Snapshot times, per stage of a staged run."""
+
+    def test_a_stage_whose_times_go_backwards(self, sweep):
+        config, template, file_dict = sweep
+        later = pickle.loads(pickle.dumps(file_dict[1]))
+        later.keyword_blocks['OUTPUT'].contents['spatial_profile'] = ['20', '10']
+        staged = {0: {0: file_dict[0], 1: file_dict[0]}, 1: {0: file_dict[1], 1: later}}
+
+        problems = validate.validate(staged, template, config, checks=('output_times',))
+
+        assert problems == {1: ['stage 1: spatial_profile times 20 10 do not increase']}
+
+
+class TestRejection:
+    """Rejected runs are marked, skipped and reported."""
+
+    def test_a_rejected_run_is_marked_and_not_run(self, sweep, tmp_path, capsys):
+        from omphalos import run
+
+        config, template, file_dict = sweep
+        file_dict[0].condition_blocks['boundary'].contents['Sp1'] = ['-1']
+
+        assert validate.from_config({**config, 'validation': True}, file_dict, template) == {0}
+        assert file_dict[0].error_code == validate.INVALID_ERROR_CODE
+        assert run.input_file(file_dict[0], 0, tmp_path / 'nowhere', 60) is file_dict[0]
+        assert not (tmp_path / 'nowhere').exists()
+        assert 'File 0 not run, rejected by validation' in capsys.readouterr().out
+
+    def test_a_rejected_run_is_counted_as_failed_by_rhea_status(self, sweep, tmp_path):
+        from core import telemetry
+        from omphalos import run
+
+        config, template, file_dict = sweep
+        config = {**config, 'validation': True,
+                  'telemetry': {'directory': str(tmp_path / 'status')}}
+        file_dict[0].condition_blocks['boundary'].contents['Sp1'] = ['-1']
+        validate.from_config(config, file_dict, template)
+        telemetry.start_sweep(config, 1, [0])
+
+        run.input_file(file_dict[0], 0, tmp_path / 'nowhere', 60, config=config)
+
+        board = telemetry.StatusBoard(tmp_path / 'status')
+        summary = telemetry.summarize(board.sweep(), board.records())
+        assert summary['failed'] == [0] and summary['counts']['pending'] == 0
+        assert summary['eta'] == 0
+
+    def test_nothing_is_rejected_unless_asked_for(self, sweep):
+        config, template, file_dict = sweep
+        file_dict[0].condition_blocks['boundary'].contents['Sp1'] = ['-1']
+
+        assert validate.from_config(config, file_dict, template) == set()
+        assert validate.from_config({**config, 'validation': False}, file_dict, template) == set()
+        assert file_dict[0].error_code == 0
+
+    def test_compile_results_says_why(self, tmp_path, monkeypatch, capsys):
+        from core import file_methods as fm
+        from rhea import slurm_interface as si
+
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'run0').mkdir()
+        record = SimpleNamespace(error_code=validate.INVALID_ERROR_CODE, invalid=['a reason'])
+        fm.pickle_data_set(record, 'run0/input_file0_complete.pkl')
+
+        summary = si.compile_results(1)
+
+        assert summary['errors'] == {0: validate.INVALID_ERROR_CODE}
+        out = capsys.readouterr().out
+        assert 'rejected by validation before running (1): [0]' in out and 'a reason' in out
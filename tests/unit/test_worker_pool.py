@@ -0,0 +1,103 @@
+"""Unit tests for rhea/worker_pool.py."""
+
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+
+import pytest
+import yaml
+
+from rhea import slurm_exec, worker_pool
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / 'config.yaml'
+    path.write_text(yaml.safe_dump({'template': 'model.in', 'timeout': 60}))
+    return path
+
+
+@pytest.fixture
+def threaded(monkeypatch):
+    """Run the pool's workers as threads, so that the monkeypatched execute_and_record is seen."""
+    monkeypatch.setattr(worker_pool, 'ProcessPoolExecutor', ThreadPoolExecutor)
+
+
+class TestRunPool:
+    """Tests for dispatching runs to the pool."""
+
+    def test_every_run_is_dispatched(self, config_path, threaded, monkeypatch):
+        ran = []
+        monkeypatch.setattr(slurm_exec, 'execute_and_record',
+                            lambda file_num, config, pflo, min3p=False: ran.append(file_num))
+
+        failed = worker_pool.run_pool(config_path, range(7), 2)
+
+        assert sorted(ran) == list(range(7))
+        assert failed == {}
+
+    def test_a_raising_run_is_reported_and_the_rest_carry_on(self, config_path, threaded,
+                                                              monkeypatch):
+        ran = []
+
+        def execute_and_record(file_num, config, pflo, min3p=False):
+            if file_num == 3:
+                raise RuntimeError('bad deck')
+            ran.append(file_num)
+
+        monkeypatch.setattr(slurm_exec, 'execute_and_record', execute_and_record)
+
+        failed = worker_pool.run_pool(config_path, range(6), 2)
+
+        assert sorted(ran) == [0, 1, 2, 4, 5]
+        assert list(failed) == [3]
+        assert 'bad deck' in failed[3]
+
+    def test_workers_read_the_config(self, config_path, threaded, monkeypatch):
+        seen = []
+        monkeypatch.setattr(slurm_exec, 'execute_and_record',
+                            lambda file_num, config, pflo, min3p=False: seen.append(config))
+
+        worker_pool.run_pool(config_path, [0], 1)
+
+        assert seen == [{'template': 'model.in', 'timeout': 60}]
+
+    def test_runs_lost_with_a_dead_worker_are_reported(self, config_path, threaded, monkeypatch):
+        """The rest of the queue goes to a fresh pool."""
+        ran = []
+
+        def run(file_num):
+            # How a process pool reports a worker killed mid-run: every pending future raises.
+            if file_num == 0 and not ran:
+                raise BrokenProcessPool('killed')
+            ran.append(file_num)
+            return file_num, None
+
+        monkeypatch.setattr(worker_pool, '_run', run)
+        monkeypatch.setattr(worker_pool, 'IN_FLIGHT_PER_WORKER', 1)
+
+        failed = worker_pool.run_pool(config_path, range(4), 1)
+
+        assert failed == {0: 'worker process died'}
+        assert ran == [1, 2, 3]
+
+
+class TestExecuteAndRecord:
+    """Tests for running one file in-process."""
+
+    def test_config_is_not_modified(self, tmp_path, monkeypatch):
+        """A worker passes the same config to every run."""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'run0').mkdir()
+
+        def execute(file_num, config, pflo, min3p=False):
+            config['template'] = '/rewritten/model.in'
+            return SimpleNamespace()
+
+        monkeypatch.setattr(slurm_exec, 'execute', execute)
+        config = {'template': 'model.in', 'timeout': 60}
+
+        slurm_exec.execute_and_record(0, config)
+
+        assert config == {'template': 'model.in', 'timeout': 60}
+        assert (tmp_path / 'run0' / 'input_file0_complete.pkl').exists()